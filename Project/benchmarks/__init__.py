@@ -0,0 +1,12 @@
+"""
+Benchmarks package - Timing and memory measurements for the workbook code paths
+
+This package includes:
+- workbook_benchmarks: Workbook creation, save, rename and read benchmarks,
+  compared against a stored baseline (run with
+  python -m benchmarks.workbook_benchmarks from the Project folder)
+- approval_server: Local stand-in for the supervisor approval backend, with
+  configurable latency, failures and rate limit
+- submission_load: Throughput and latency of the approval submission path
+  under synthetic load
+"""
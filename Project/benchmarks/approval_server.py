@@ -0,0 +1,459 @@
+"""
+Approval server - a local stand-in for the supervisor approval backend
+
+The app sends samples for approval to a backend that is not part of this
+repository. This server speaks the same protocol, so the submission path
+can be tried and measured on one machine:
+    POST /submit-sample      one sample; an Idempotency-Key header makes repeats harmless
+    POST /submit-samples     many samples, optionally gzip-compressed, one result each
+    GET  /capabilities       advertises the batch endpoint
+    GET  /sample-status      ?project_name=...&sample_name=... approval state of one sample
+    GET  /approval-status    ?project_name=...[&since=<version>] approval state of a whole
+                             project, or of the samples changed after a version; the ETag is
+                             the project's version, and If-None-Match gets 304 when unchanged
+    POST /review             {"project_name", "sample_name", "decision": "approved" | "rejected"}
+    GET  /stats              request, sample and injected-failure counts
+
+Latency, injected errors and a request rate limit are configurable, so slow,
+flaky and overloaded backends can be reproduced. Samples are held in memory
+and are "pending" until reviewed, or decided automatically after
+--approve-after seconds.
+
+Usage (from the Project folder):
+    python -m benchmarks.approval_server
+    python -m benchmarks.approval_server --latency 0.2 --error-rate 0.1 --rate-limit 50
+"""
+import argparse
+import collections
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8000
+DEFAULT_MAX_BATCH = 500
+# Largest request body taken, after decompression
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+class _TokenBucket:
+    """Allows `rate` requests a second on average, with bursts of up to `rate`"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Take a token; returns 0 if one was free, else the seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class ApprovalStore:
+    """The submitted samples and their approval state, shared by the request threads"""
+
+    def __init__(self, approve_after: Optional[float] = None, reject_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            approve_after: Seconds after which a pending sample is decided
+                           automatically; None leaves it pending until reviewed
+            reject_rate: Fraction of automatic decisions that are rejections
+            seed: Seed for the automatic decisions
+        """
+        self.approve_after = approve_after
+        self.reject_rate = reject_rate
+        self._random = random.Random(seed)
+        # Samples by name, by project; every change bumps the project's version
+        # and stamps it on the changed sample
+        self._samples: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = collections.Counter()
+
+    def submit(self, sample: Dict[str, Any], key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Take one sample
+
+        Returns:
+            {"status": "accepted"} or {"status": "rejected", "error": ...};
+            a key seen before gets its first result again
+        """
+        with self._lock:
+            if key and key in self._keys:
+                self.stats['duplicates'] += 1
+                return self._keys[key]
+
+            if not isinstance(sample, dict):
+                sample = {}
+            project_name = sample.get('project_name')
+            sample_name = sample.get('sample_name')
+            if not project_name or not sample_name or not isinstance(sample.get('data'), dict):
+                result = {'status': 'rejected', 'error': "project_name, sample_name and data are required"}
+                self.stats['samples_rejected'] += 1
+            else:
+                record = {
+                    'project_name': project_name,
+                    'sample_name': sample_name,
+                    'sample_type': sample.get('sample_type'),
+                    'data': sample['data'],
+                    'status': 'pending',
+                    'submitted_at': time.time(),
+                    'decided_at': None
+                }
+                self._samples.setdefault(project_name, {})[sample_name] = record
+                self._touch(record)
+                result = {'status': 'accepted'}
+                self.stats['samples_accepted'] += 1
+            if key:
+                self._keys[key] = result
+            return result
+
+    def count(self, name: str, amount: int = 1):
+        """Add to one of the statistics"""
+        with self._lock:
+            self.stats[name] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        """Get a copy of the statistics"""
+        with self._lock:
+            return dict(self.stats)
+
+    def review(self, project_name: str, sample_name: str, decision: str) -> Optional[Dict[str, Any]]:
+        """Approve or reject a sample; returns None if it was never submitted"""
+        with self._lock:
+            record = self._samples.get(project_name, {}).get(sample_name)
+            if record is not None:
+                record['status'] = decision
+                record['decided_at'] = time.time()
+                self._touch(record)
+            return dict(record) if record is not None else None
+
+    def status(self, project_name: str, sample_name: str) -> Optional[Dict[str, Any]]:
+        """Get a sample's approval state; returns None if it was never submitted"""
+        with self._lock:
+            record = self._samples.get(project_name, {}).get(sample_name)
+            if record is None:
+                return None
+            self._decide(record)
+            return _public(record)
+
+    def project_status(self, project_name: str, since: Optional[int] = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Get the approval state of a project's samples
+
+        Args:
+            project_name: Project to report on
+            since: Only report samples changed after this project version
+
+        Returns:
+            (the project's current version, the samples)
+        """
+        with self._lock:
+            samples = self._samples.get(project_name, {})
+            if self.approve_after is not None:
+                for record in samples.values():
+                    self._decide(record)
+            changed = [_public(record) for record in samples.values()
+                       if since is None or record['version'] > since]
+            return self._versions.get(project_name, 0), changed
+
+    def project_version(self, project_name: str) -> int:
+        """Get a project's version, which changes whenever one of its samples does"""
+        with self._lock:
+            samples = self._samples.get(project_name, {})
+            if self.approve_after is not None:
+                for record in samples.values():
+                    self._decide(record)
+            return self._versions.get(project_name, 0)
+
+    def _touch(self, record: Dict[str, Any]):
+        version = self._versions.get(record['project_name'], 0) + 1
+        self._versions[record['project_name']] = version
+        record['version'] = version
+
+    def _decide(self, record: Dict[str, Any]):
+        if (record['status'] == 'pending' and self.approve_after is not None
+                and time.time() - record['submitted_at'] >= self.approve_after):
+            record['status'] = 'rejected' if self._random.random() < self.reject_rate else 'approved'
+            record['decided_at'] = record['submitted_at'] + self.approve_after
+            self._touch(record)
+
+
+def _public(record: Dict[str, Any]) -> Dict[str, Any]:
+    """A sample as reported by the status endpoints, without its form data"""
+    return {key: value for key, value in record.items() if key != 'data'}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; with Nagle on, a keep-alive
+    # client waits out its delayed ACK (about 40 ms) on every response
+    disable_nagle_algorithm = True
+    server: "ApprovalServer"
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def _handle(self, method: str):
+        server = self.server
+        url = urlsplit(self.path)
+        server.store.count(f'{method} {url.path}')
+
+        # Read the body first, so a refused request does not leave it unread on a keep-alive connection
+        try:
+            body = self._read_body() if method == 'POST' else None
+        except ValueError as e:
+            self._reply(400, {'detail': str(e)})
+            return
+
+        wait = server.bucket.take() if server.bucket is not None else 0.0
+        if wait:
+            server.store.count('throttled')
+            self._reply(429, {'detail': "Too many requests"}, {'Retry-After': str(max(1, round(wait)))})
+            return
+        server.simulate_latency()
+        if server.error_rate and server.random() < server.error_rate:
+            server.store.count('errors_injected')
+            self._reply(503, {'detail': "Injected failure"})
+            return
+
+        route = (method, url.path)
+        if route == ('POST', '/submit-sample'):
+            result = server.store.submit(body, self.headers.get('Idempotency-Key'))
+            if result['status'] == 'accepted':
+                self._reply(200, {'message': "Sample submitted for approval"})
+            else:
+                self._reply(422, {'detail': result['error']})
+        elif route == ('POST', '/submit-samples') and server.batch:
+            samples = body.get('samples') if isinstance(body, dict) else None
+            if not isinstance(samples, list):
+                self._reply(422, {'detail': "samples must be a list"})
+            elif len(samples) > server.max_batch:
+                self._reply(413, {'detail': f"At most {server.max_batch} samples per request"})
+            else:
+                server.store.count('batch_samples', len(samples))
+                results = [dict(server.store.submit(sample, sample.get('key')), key=sample.get('key'))
+                           for sample in samples]
+                self._reply(200, {'results': results})
+        elif route == ('GET', '/capabilities') and server.batch:
+            self._reply(200, {'batch_submit': {
+                'path': '/submit-samples',
+                'max_samples': server.max_batch,
+                'content_encodings': ['gzip'] if server.gzip else []
+            }})
+        elif route == ('GET', '/sample-status'):
+            query = parse_qs(url.query)
+            record = server.store.status(query.get('project_name', [''])[0], query.get('sample_name', [''])[0])
+            if record is None:
+                self._reply(404, {'detail': "Sample not found"})
+            else:
+                self._reply(200, record)
+        elif route == ('GET', '/approval-status'):
+            self._approval_status(parse_qs(url.query))
+        elif route == ('POST', '/review'):
+            decision = body.get('decision') if isinstance(body, dict) else None
+            if decision not in ('approved', 'rejected', 'pending'):
+                self._reply(422, {'detail': "decision must be approved, rejected or pending"})
+                return
+            record = server.store.review(body.get('project_name'), body.get('sample_name'), decision)
+            if record is None:
+                self._reply(404, {'detail': "Sample not found"})
+            else:
+                self._reply(200, _public(record))
+        elif route == ('GET', '/stats'):
+            self._reply(200, server.store.snapshot())
+        else:
+            self._reply(404, {'detail': "Not Found"})
+
+    def _approval_status(self, query: Dict[str, List[str]]):
+        """Answer a bulk status request, as cheaply as possible when nothing changed"""
+        store = self.server.store
+        project_name = query.get('project_name', [''])[0]
+        if not project_name:
+            self._reply(422, {'detail': "project_name is required"})
+            return
+        try:
+            since = int(query['since'][0]) if 'since' in query else None
+        except ValueError:
+            self._reply(422, {'detail': "since must be a version number"})
+            return
+
+        etag = f'W/"{store.project_version(project_name)}"'
+        if self.headers.get('If-None-Match') == etag:
+            store.count('not_modified')
+            self._reply(304, None, {'ETag': etag})
+            return
+
+        version, samples = store.project_status(project_name, since)
+        store.count('status_samples', len(samples))
+        self._reply(200, {
+            'project_name': project_name,
+            'version': version,
+            'since': since,
+            'samples': samples
+        }, {'ETag': f'W/"{version}"'})
+
+    def _read_body(self) -> Any:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        raw = self.rfile.read(length)
+        encoding = (self.headers.get('Content-Encoding') or '').lower()
+        if encoding == 'gzip':
+            if not self.server.gzip:
+                raise ValueError("gzip request bodies are not accepted")
+            try:
+                decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+                raw = decompressor.decompress(raw, MAX_BODY_BYTES)
+            except zlib.error as e:
+                raise ValueError(f"Invalid gzip body: {e}")
+            if decompressor.unconsumed_tail:
+                raise ValueError("Request body too large")
+        elif encoding not in ('', 'identity'):
+            raise ValueError(f"Unsupported Content-Encoding {encoding}")
+        try:
+            return json.loads(raw) if raw else {}
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+
+    def _reply(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, default=str).encode('utf-8') if status != 304 else b''
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ApprovalServer(ThreadingHTTPServer):
+    """Stand-in approval backend with configurable latency, failures and rate limit"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, rate_limit: Optional[float] = None,
+                 batch: bool = True, max_batch: int = DEFAULT_MAX_BATCH, gzip: bool = True,
+                 approve_after: Optional[float] = None, reject_rate: float = 0.0,
+                 seed: Optional[int] = None, verbose: bool = False):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on, 0 for any free port
+            latency: Seconds each request takes at least
+            jitter: Up to this many seconds are added to the latency at random
+            error_rate: Fraction of requests answered with 503
+            rate_limit: Requests per second served; the rest get 429 with Retry-After
+            batch: Whether /capabilities and /submit-samples are offered
+            max_batch: Most samples taken in one batch request
+            gzip: Whether gzip-compressed request bodies are taken
+            approve_after: Seconds after which a pending sample is decided
+                           automatically; None leaves it pending until reviewed
+            reject_rate: Fraction of automatic decisions that are rejections
+            seed: Seed for the injected failures, latencies and decisions
+            verbose: Log every request
+        """
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bucket = _TokenBucket(rate_limit) if rate_limit else None
+        self.batch = batch
+        self.max_batch = max(1, max_batch)
+        self.gzip = gzip
+        self.verbose = verbose
+        self.store = ApprovalStore(approve_after, reject_rate, seed)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def random(self) -> float:
+        with self._random_lock:
+            return self._random.random()
+
+    def simulate_latency(self):
+        delay = self.latency + (self.random() * self.jitter if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def start(self) -> "ApprovalServer":
+        """Serve from a background thread; returns the server"""
+        self._thread = threading.Thread(target=self.serve_forever, name="ApprovalServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds each request takes at least")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many random seconds added")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--rate-limit', type=float, default=None, help="Requests per second before 429s")
+    parser.add_argument('--no-batch', action='store_true', help="Offer only the one-sample endpoint")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument('--no-gzip', action='store_true', help="Refuse gzip-compressed request bodies")
+    parser.add_argument('--approve-after', type=float, default=None,
+                        help="Decide pending samples automatically after this many seconds")
+    parser.add_argument('--reject-rate', type=float, default=0.0, help="Fraction of automatic decisions rejected")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args(argv)
+
+    server = ApprovalServer(
+        args.host, args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit=args.rate_limit, batch=not args.no_batch, max_batch=args.max_batch,
+        gzip=not args.no_gzip, approve_after=args.approve_after, reject_rate=args.reject_rate,
+        seed=args.seed, verbose=args.verbose
+    )
+    print(f"Approval server listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(json.dumps(server.store.snapshot(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
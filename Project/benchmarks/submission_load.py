@@ -0,0 +1,216 @@
+"""
+Submission load - throughput and latency of the approval submission path
+
+Drives the app's own SubmissionOutbox and SubmissionSender with synthetic
+samples against the stand-in approval server (started in this process
+unless --url points at another one), the way the BMP page uses them:
+    single    every sample submitted on its own, as with "Save" on each sample
+    project   each project's samples submitted together, as with "Submit All Samples"
+
+Reported per run:
+    submit call   time the caller (the Tk thread in the app) spends queueing a sample
+    end to end    time from queueing a sample until it was sent or given up
+    throughput    settled samples per second over the whole run
+along with the requests the server saw. Server latency, failures and rate
+limit are set as for benchmarks.approval_server.
+
+Usage (from the Project folder):
+    python -m benchmarks.submission_load
+    python -m benchmarks.submission_load --samples 5000 --mode single --latency 0.01 --error-rate 0.05
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+from benchmarks.approval_server import ApprovalServer
+from utils.submission_outbox import FAILED, SENT, CircuitBreaker, SubmissionOutbox, SubmissionSender
+
+MODES = ['single', 'project']
+DEFAULT_SAMPLES = 2000
+DEFAULT_PROJECT_SIZE = 100
+DEFAULT_TIMEOUT = 600
+
+
+def _form_data(project: int, sample: int) -> Dict[str, str]:
+    """Form values as a user would fill them in"""
+    return {
+        'B1': 'Solid',
+        'B2': 'Sludge',
+        'D1': f"P{project:03d}-S{sample:04d}",
+        'D2': '2026-01-15',
+        'B3:D3': f"Biomethane potential of sample {sample} in project {project}",
+        'B4:D4': 'Inoculum batch 7, mesophilic',
+        'B5:D5': 'Feed sample from digester 2',
+        'B6:D6': 'Trace elements added'
+    }
+
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50, p95, p99 and max of a list of seconds"""
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+    if len(values) == 1:
+        return {'p50': values[0], 'p95': values[0], 'p99': values[0], 'max': values[0]}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98], 'max': max(values)}
+
+
+def run_load(samples: int, mode: str, project_size: int = DEFAULT_PROJECT_SIZE,
+             server_url: Optional[str] = None, server_options: Optional[Dict[str, Any]] = None,
+             batch_size: Optional[int] = None, max_attempts: Optional[int] = None,
+             timeout: float = DEFAULT_TIMEOUT) -> Dict[str, Any]:
+    """
+    Submit synthetic samples and wait until every one was sent or given up
+
+    Args:
+        samples: Number of samples to submit
+        mode: 'single' or 'project'
+        project_size: Samples per project
+        server_url: Approval server to use; None starts a stand-in server
+        server_options: ApprovalServer arguments for the stand-in server
+        batch_size: Most samples per batch request, defaults to SUBMISSION_BATCH_SIZE
+        max_attempts: Sends before a sample is given up, defaults to SUBMISSION_MAX_ATTEMPTS
+        timeout: Seconds to wait for the samples to settle
+
+    Returns:
+        Dictionary of results
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'")
+
+    server = None
+    if server_url is None:
+        server = ApprovalServer(port=0, **(server_options or {})).start()
+        server_url = server.url
+
+    settled = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        outbox = SubmissionOutbox(os.path.join(temp_dir, 'submission_outbox.sqlite3'))
+        # Breaker pauses are part of what is measured, but a long one would only stall the run
+        sender = SubmissionSender(outbox, server_url, breaker=CircuitBreaker(reset_seconds=1.0),
+                                  max_attempts=max_attempts, batch_size=batch_size)
+
+        def on_change(submission):
+            if submission.status in (SENT, FAILED):
+                settled[submission.id] = submission
+
+        sender.add_listener(on_change)
+        submit_seconds = []
+        submission_ids = []
+        started = time.perf_counter()
+        try:
+            for project_start in range(0, samples, project_size):
+                project = project_start // project_size
+                names = [f"Sample {index + 1}" for index in range(min(project_size, samples - project_start))]
+                if mode == 'project':
+                    call_started = time.perf_counter()
+                    queued = sender.submit_many(f"Load project {project}", 'Solid',
+                                                {name: _form_data(project, index) for index, name in enumerate(names)})
+                    submit_seconds.append((time.perf_counter() - call_started) / len(names))
+                    submission_ids += [submission.id for submission in queued]
+                else:
+                    for index, name in enumerate(names):
+                        call_started = time.perf_counter()
+                        submission = sender.submit(f"Load project {project}", name, 'Solid',
+                                                   _form_data(project, index))
+                        submit_seconds.append(time.perf_counter() - call_started)
+                        submission_ids.append(submission.id)
+                sender.poll()
+
+            deadline = time.perf_counter() + timeout
+            while len(settled) < len(submission_ids) and time.perf_counter() < deadline:
+                time.sleep(0.01)
+                sender.poll()
+            elapsed = time.perf_counter() - started
+        finally:
+            sender.stop(timeout=10)
+
+    if server is not None:
+        server_stats = server.store.snapshot()
+        server.stop()
+    else:
+        server_stats = {}
+
+    finished = [settled[submission_id] for submission_id in submission_ids if submission_id in settled]
+    return {
+        'mode': mode,
+        'samples': samples,
+        'project_size': project_size,
+        'server_options': server_options or {},
+        'sent': sum(1 for submission in finished if submission.status == SENT),
+        'failed': sum(1 for submission in finished if submission.status == FAILED),
+        'unsettled': len(submission_ids) - len(finished),
+        'seconds': elapsed,
+        'samples_per_second': len(finished) / elapsed if elapsed else None,
+        'submit_call_seconds': _summary(submit_seconds),
+        'end_to_end_seconds': _summary([submission.updated_at - submission.created_at
+                                        for submission in finished]),
+        'attempts': sum(submission.attempts for submission in finished),
+        'server': server_stats
+    }
+
+
+def _print_result(result: Dict[str, Any]):
+    def milliseconds(summary):
+        return "  ".join(f"{key} {value * 1000:9.2f}" if value is not None else f"{key} {'-':>9}"
+                         for key, value in summary.items())
+
+    print(f"mode {result['mode']}, {result['samples']} samples in projects of {result['project_size']}")
+    print(f"  sent {result['sent']}, failed {result['failed']}, unsettled {result['unsettled']}, "
+          f"{result['attempts']} attempts")
+    print(f"  {result['seconds']:.2f} s, {result['samples_per_second'] or 0:.1f} samples/s")
+    print(f"  submit call (ms)  {milliseconds(result['submit_call_seconds'])}")
+    print(f"  end to end (ms)   {milliseconds(result['end_to_end_seconds'])}")
+    if result['server']:
+        requests = {key: value for key, value in sorted(result['server'].items()) if key.startswith(('GET', 'POST'))}
+        print(f"  server requests   {requests}")
+        others = {key: value for key, value in sorted(result['server'].items()) if key not in requests}
+        print(f"  server counts     {others}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument('--mode', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--project-size', type=int, default=DEFAULT_PROJECT_SIZE)
+    parser.add_argument('--batch-size', type=int, default=None, help="Most samples per batch request")
+    parser.add_argument('--max-attempts', type=int, default=None)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help="Seconds to wait for the samples to settle")
+    parser.add_argument('--url', default=None, help="Use this approval server instead of a stand-in one")
+    parser.add_argument('--latency', type=float, default=0.0, help="Stand-in server: seconds per request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Stand-in server: random extra seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Stand-in server: fraction of 503s")
+    parser.add_argument('--rate-limit', type=float, default=None, help="Stand-in server: requests per second")
+    parser.add_argument('--no-batch', action='store_true', help="Stand-in server: no batch endpoint")
+    parser.add_argument('--no-gzip', action='store_true', help="Stand-in server: refuse gzip bodies")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    server_options = {
+        'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate,
+        'rate_limit': args.rate_limit, 'batch': not args.no_batch, 'gzip': not args.no_gzip,
+        'seed': args.seed
+    }
+    results = []
+    for mode in args.mode:
+        result = run_load(args.samples, mode, args.project_size, args.url,
+                          None if args.url else server_options, args.batch_size,
+                          args.max_attempts, args.timeout)
+        _print_result(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0 if all(result['unsettled'] == 0 for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+"""
+Workbook benchmarks - how the handler operations scale with sample count and template size
+
+Each operation is run at every sample count against every available
+workbook engine and every template size. Each case runs in its own process,
+so its peak RSS is its own:
+    create_bmp_workbook / create_characterisation_workbook
+        create a project workbook with that many samples
+    save_bmp_data / save_characterisation_data
+        fill in the form cells of every sample, then flush
+    rename_sheet
+        rename one sample sheet, then flush
+    get_sheet_data
+        read the form cells of every sample
+
+"cold" is the first run in a fresh process with empty template, metadata
+and session caches. "warm" is the median of the repeats that follow in the
+same process. Wall time, peak RSS and the workbook's file size are written
+to JSON. Each result is compared with the stored baseline, and a case that
+got slower, bigger or hungrier than the tolerances allow fails the run.
+
+Usage (from the Project folder):
+    python -m benchmarks.workbook_benchmarks
+    python -m benchmarks.workbook_benchmarks --engines xlsx --samples 1 10 --save-baseline
+    python -m benchmarks.workbook_benchmarks --engines xlsx --samples 1 10 --require-baseline
+
+Without a baseline the results are only written out; --require-baseline
+(for CI) fails the run instead, as it does for cases the baseline lacks.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE_PATH = os.path.join(PROJECT_DIR, 'benchmarks', 'baseline.json')
+
+OPERATIONS = [
+    'create_bmp_workbook',
+    'create_characterisation_workbook',
+    'save_bmp_data',
+    'save_characterisation_data',
+    'rename_sheet',
+    'get_sheet_data',
+]
+DEFAULT_SAMPLE_COUNTS = [1, 10, 100, 1000]
+# Rows in the generated master templates: about the size of the real ones, and ten times that
+DEFAULT_TEMPLATE_ROWS = [40, 400]
+DEFAULT_REPEATS = 3
+
+# A case regresses when a metric grows past baseline * (1 + tolerance) ...
+DEFAULT_TIME_TOLERANCE = 0.5
+DEFAULT_RSS_TOLERANCE = 0.25
+DEFAULT_SIZE_TOLERANCE = 0.10
+# ... and, for times, by more than this many seconds, so timer noise on tiny cases passes
+MIN_TIME_REGRESSION_SECONDS = 0.01
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<styleSheet xmlns="{_MAIN_NS}">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+).encode('utf-8')
+
+
+def available_engines() -> List[str]:
+    """Get the workbook engines that can run on this machine"""
+    engines = ['xlsx', 'memory']
+    if sys.platform == 'win32':
+        try:
+            import xlwings  # noqa: F401
+            engines.insert(0, 'xlwings')
+        except ImportError:
+            pass
+    return engines
+
+
+def write_template(path: str, rows: int):
+    """
+    Write a master template laid out like the real ones: the form cells of
+    CHARACTERISATION_CELL_MAPPING at the top, then `rows` rows of labels and
+    numbers
+
+    Args:
+        path: Destination .xlsx path
+        rows: Number of rows in the template
+    """
+    from utils.xlsx_package import XML_DECLARATION, cell_ref, write_new_workbook, xml_text
+
+    def cell(ref, value, style=0):
+        style_attr = f' s="{style}"' if style else ''
+        if isinstance(value, str):
+            return f'<c r="{ref}" t="inlineStr"{style_attr}><is><t>{xml_text(value)}</t></is></c>'
+        return f'<c r="{ref}"{style_attr}><v>{value}</v></c>'
+
+    def chunks():
+        yield XML_DECLARATION.encode('utf-8')
+        yield (f'<worksheet xmlns="{_MAIN_NS}"><cols><col min="1" max="1" width="24" customWidth="1"/></cols>'
+               '<sheetData>').encode('utf-8')
+        for row in range(1, max(rows, 6) + 1):
+            cells = [cell(cell_ref(row, 1), f"Label {row}", style=1)]
+            if row > 6:
+                cells += [cell(cell_ref(row, col), row * col) for col in range(2, 7)]
+            yield f'<row r="{row}">{"".join(cells)}</row>'.encode('utf-8')
+        yield ('</sheetData><mergeCells count="4"><mergeCell ref="B3:D3"/><mergeCell ref="B4:D4"/>'
+               '<mergeCell ref="B5:D5"/><mergeCell ref="B6:D6"/></mergeCells></worksheet>').encode('utf-8')
+
+    write_new_workbook(path, ["Template"], [chunks()], _STYLES_XML)
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, None where it cannot be measured"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    except (ImportError, AttributeError):
+        return None
+
+
+def _form_values(run: int) -> Dict[str, Any]:
+    """Form values that differ from run to run, so no save is skipped as unchanged"""
+    from utils.constants import CHARACTERISATION_CELL_MAPPING
+    values = {
+        "Sample Type": "Solid",
+        "Sub Sample Type": f"Sub sample {run}",
+        "Sample Code": f"CODE-{run:04d}",
+        "Sample Receive Date": f"2024-01-{run % 28 + 1:02d}",
+        "Objective": f"Objective for run {run}",
+        "Inoculum": f"Inoculum {run}",
+        "Feed Sample": f"Feed sample {run}",
+        "Trace": f"Trace {run}",
+    }
+    return {CHARACTERISATION_CELL_MAPPING[label]: value for label, value in values.items()}
+
+
+def run_case(engine: str, operation: str, samples: int, repeats: int) -> Dict[str, Any]:
+    """
+    Run one case in this process; the caller sets up the environment
+
+    Returns:
+        Dictionary with cold_seconds, warm_seconds, peak_rss_bytes and file_size_bytes
+    """
+    from utils.constants import CHARACTERISATION_CELL_MAPPING
+    from utils.excel_handler import create_excel_handler
+    from utils.template_cache import clear_blueprints
+    from utils.workbook_metadata import clear_metadata
+
+    names = [f"Sample {i}" for i in range(1, samples + 1)]
+    cells = list(CHARACTERISATION_CELL_MAPPING.values())
+    handler = create_excel_handler(engine)
+    path = None
+
+    if operation.startswith('create_'):
+        create = getattr(handler, operation)
+
+        def run(number):
+            return create(f"Bench{number}", samples, names, "Solid")
+    else:
+        if operation == 'save_bmp_data':
+            path = handler.create_bmp_workbook("Bench", samples, names, "Solid")
+        else:
+            path = handler.create_characterisation_workbook("Bench", samples, names, "Solid")
+        handler.close()
+        # Cold means nothing from the setup is cached
+        clear_blueprints()
+        clear_metadata()
+        handler = create_excel_handler(engine)
+
+        if operation in ('save_bmp_data', 'save_characterisation_data'):
+            save = getattr(handler, operation)
+
+            def run(number):
+                values = _form_values(number)
+                for name in names:
+                    save(path, name, values)
+                handler.flush(path)
+                return path
+        elif operation == 'rename_sheet':
+            middle = names[len(names) // 2]
+
+            def run(number):
+                # Rename back and forth so every run renames an existing sheet
+                old_name, new_name = (middle, "Renamed") if number % 2 == 0 else ("Renamed", middle)
+                handler.rename_sheet(path, old_name, new_name)
+                handler.flush(path)
+                return path
+        elif operation == 'get_sheet_data':
+            def run(number):
+                for name in names:
+                    handler.get_sheet_data(path, name, cells)
+                return path
+        else:
+            raise ValueError(f"Unknown operation: {operation}")
+
+    times = []
+    for number in range(repeats + 1):
+        start = time.perf_counter()
+        result_path = run(number)
+        times.append(time.perf_counter() - start)
+    handler.close()
+
+    return {
+        'cold_seconds': round(times[0], 6),
+        'warm_seconds': round(statistics.median(times[1:]), 6) if repeats else None,
+        'peak_rss_bytes': _peak_rss_bytes(),
+        'file_size_bytes': os.path.getsize(result_path),
+    }
+
+
+def _run_case_process(engine: str, operation: str, samples: int, template_rows: int,
+                      template_path: str, repeats: int) -> Dict[str, Any]:
+    """Run one case in a fresh Python process with its own project folder"""
+    with tempfile.TemporaryDirectory(prefix='bench-') as project_dir:
+        env = dict(os.environ)
+        env.update({
+            'BASE_PROJECT_DIR': project_dir,
+            'LOCAL_DATA_DIR': project_dir,
+            'MASTER_TEMPLATE_PATH': template_path,
+            'MASTER_TEMPLATE_PATH_EFFLUENT': template_path,
+            'MASTER_TEMPLATE_PATH_BMP_SOLID': template_path,
+            'MASTER_TEMPLATE_PATH_BMP_EFFLUENT': template_path,
+            'EXCEL_ENGINE': engine,
+        })
+        case = {'engine': engine, 'operation': operation, 'samples': samples, 'repeats': repeats}
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.workbook_benchmarks', '--case', json.dumps(case)],
+            cwd=PROJECT_DIR, env=env, capture_output=True, text=True
+        )
+
+    result = {'engine': engine, 'operation': operation, 'samples': samples, 'template_rows': template_rows}
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        result['error'] = error[-1] if error else f"exit code {completed.returncode}"
+        return result
+    result.update(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return result
+
+
+def _case_key(result: Dict[str, Any]) -> tuple:
+    return result['engine'], result['operation'], result['samples'], result['template_rows']
+
+
+def compare_results(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                    time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+                    rss_tolerance: float = DEFAULT_RSS_TOLERANCE,
+                    size_tolerance: float = DEFAULT_SIZE_TOLERANCE,
+                    require_cases: bool = False) -> List[str]:
+    """
+    Compare results with a baseline
+
+    Args:
+        results: Results of this run
+        baseline: Results of the baseline run
+        time_tolerance: Allowed relative growth of cold and warm times
+        rss_tolerance: Allowed relative growth of peak RSS
+        size_tolerance: Allowed relative growth of file size
+        require_cases: Report cases missing from the baseline, which are
+                       otherwise not regressions
+
+    Returns:
+        One message per regression
+    """
+    previous = {_case_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        name = "{engine} {operation} x{samples} (template {template_rows} rows)".format(**result)
+        if 'error' in result:
+            regressions.append(f"{name}: failed: {result['error']}")
+            continue
+        old = previous.get(_case_key(result))
+        if old is None and require_cases:
+            regressions.append(f"{name}: not in the baseline")
+            continue
+        if old is None or 'error' in old:
+            continue
+        for metric, tolerance in (('cold_seconds', time_tolerance), ('warm_seconds', time_tolerance),
+                                  ('peak_rss_bytes', rss_tolerance), ('file_size_bytes', size_tolerance)):
+            new_value, old_value = result.get(metric), old.get(metric)
+            if new_value is None or not old_value:
+                continue
+            if new_value <= old_value * (1 + tolerance):
+                continue
+            if metric.endswith('_seconds') and new_value - old_value < MIN_TIME_REGRESSION_SECONDS:
+                continue
+            regressions.append(f"{name}: {metric} {old_value} -> {new_value} "
+                               f"(+{(new_value / old_value - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run_benchmarks(engines: List[str], operations: List[str], sample_counts: List[int],
+                   template_rows: List[int], repeats: int = DEFAULT_REPEATS) -> List[Dict[str, Any]]:
+    """
+    Run every combination of engine, operation, sample count and template size
+
+    Returns:
+        One result dictionary per case
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench-templates-') as template_dir:
+        for rows in template_rows:
+            template_path = os.path.join(template_dir, f"template_{rows}.xlsx")
+            write_template(template_path, rows)
+            for engine in engines:
+                for operation in operations:
+                    for samples in sample_counts:
+                        result = _run_case_process(engine, operation, samples, rows, template_path, repeats)
+                        results.append(result)
+                        _print_result(result)
+    return results
+
+
+def _print_result(result: Dict[str, Any]):
+    label = "{engine:8} {operation:34} {samples:>5} samples  template {template_rows:>4} rows".format(**result)
+    if 'error' in result:
+        print(f"{label}  FAILED: {result['error']}")
+        return
+    warm = result['warm_seconds']
+    rss = result['peak_rss_bytes']
+    print(f"{label}  cold {result['cold_seconds']:8.4f} s"
+          f"  warm {warm if warm is None else format(warm, '8.4f')} s"
+          f"  peak RSS {'n/a' if rss is None else format(rss / 2 ** 20, '6.1f')} MB"
+          f"  file {result['file_size_bytes'] / 1024:8.1f} KB", flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--engines', nargs='+', default=None,
+                        help="Workbook engines to run (default: every available one)")
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument('--samples', nargs='+', type=int, default=DEFAULT_SAMPLE_COUNTS)
+    parser.add_argument('--template-rows', nargs='+', type=int, default=DEFAULT_TEMPLATE_ROWS)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS,
+                        help="Warm runs after the cold one")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write the results")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="Baseline results to compare with")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store these results as the new baseline instead of comparing")
+    parser.add_argument('--time-tolerance', type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument('--rss-tolerance', type=float, default=DEFAULT_RSS_TOLERANCE)
+    parser.add_argument('--size-tolerance', type=float, default=DEFAULT_SIZE_TOLERANCE)
+    parser.add_argument('--require-baseline', action='store_true',
+                        help="Fail when there is no baseline, or it lacks one of the cases run (for CI)")
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        # Child process: run one case and print its result as the last line
+        case = json.loads(args.case)
+        print(json.dumps(run_case(case['engine'], case['operation'], case['samples'], case['repeats'])))
+        return 0
+
+    if args.require_baseline and not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline on this machine to store one")
+        return 1
+
+    engines = args.engines or available_engines()
+    results = run_benchmarks(engines, args.operations, args.samples, args.template_rows, args.repeats)
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'platform': {'system': platform.platform(), 'python': platform.python_version(),
+                     'machine': platform.machine()},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0 if all('error' not in result for result in results) else 1
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one")
+        return 0 if all('error' not in result for result in results) else 1
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_results(results, baseline.get('results', []), args.time_tolerance,
+                                  args.rss_tolerance, args.size_tolerance, args.require_baseline)
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
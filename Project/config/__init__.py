@@ -14,10 +14,12 @@ from .settings import (
     # File paths
     MASTER_TEMPLATE_PATH,
     BASE_PROJECT_DIR,
+    LOCAL_DATA_DIR,
     
     # Excel settings
     EXCEL_COPY_RANGE,
     AUTO_FIT_COLUMN,
+    EXCEL_ENGINE,
     
     # UI settings
     FONT_TITLE,
@@ -54,10 +56,12 @@ __all__ = [
     # File paths
     'MASTER_TEMPLATE_PATH',
     'BASE_PROJECT_DIR',
+    'LOCAL_DATA_DIR',
     
     # Excel settings
     'EXCEL_COPY_RANGE',
     'AUTO_FIT_COLUMN',
+    'EXCEL_ENGINE',
     
     # UI settings
     'FONT_TITLE',
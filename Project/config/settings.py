@@ -29,9 +29,15 @@ BASE_PROJECT_DIR = (
     r'C:\Users\Admin\Desktop\Master Template interface project\Project\Internal Projects'
 )
 
+# Per-user local data. BASE_PROJECT_DIR may be a shared drive, so what belongs
+# to one user on one machine is kept here instead (None = a folder in
+# %LOCALAPPDATA%, or in the home folder where that is not set)
+LOCAL_DATA_DIR = None
+
 # Excel settings
 EXCEL_COPY_RANGE = 'A1:Z100'  # Range to copy from master template
 AUTO_FIT_COLUMN = 'D2'  # Column to auto-fit after saving
+MAX_COLUMN_WIDTH = 50  # Widest a fitted column gets; longer text wraps
 
 # UI settings
 FONT_TITLE = ("Arial", 20, "bold")
@@ -58,6 +64,7 @@ DATE_ENTRY_WIDTH = 37
 # Validation settings
 MIN_SAMPLE_COUNT = 1
 MAX_SAMPLE_COUNT = 100
+MAX_SAMPLE_COUNT_HEADLESS = 5000  # The streaming xlsx engine handles large campaigns
 MAX_PROJECT_NAME_LENGTH = 50
 MAX_SHEET_NAME_LENGTH = 31
 
@@ -72,6 +79,90 @@ EXCEL_VISIBLE = False
 EXCEL_DISPLAY_ALERTS = False
 EXCEL_SCREEN_UPDATING = False
 
+# Excel application pool: how many Excel processes the xlwings engine shares
+# between all pages and the background writer, and how long one nobody is
+# using keeps running
+EXCEL_APP_POOL_SIZE = 1
+EXCEL_APP_IDLE_SECONDS = 300
+
+# Workbook engine: 'xlwings' drives a live Excel process over COM,
+# 'xlsx' reads and writes the .xlsx package directly (no Excel needed),
+# 'memory' runs the xlwings code paths on an in-memory stand-in for Excel
+# (for tests and benchmarks; workbooks are saved as JSON)
+EXCEL_ENGINE = 'xlwings'
+
+# Workbook sessions: how many project workbooks stay open between saves
+WORKBOOK_CACHE_SIZE = 4
+
+# Workbook metadata: how many workbooks' sheet names and summaries are kept
+WORKBOOK_METADATA_CACHE_SIZE = 256
+
+# Background save queue: how long the writer waits to gather more saves into
+# one workbook flush, how often the UI checks for finished saves, and how long
+# the writer keeps workbooks open after the last save (an open workbook is
+# locked for other users)
+SAVE_QUEUE_COALESCE_SECONDS = 0.25
+SAVE_QUEUE_POLL_MS = 100
+SAVE_QUEUE_IDLE_CLOSE_SECONDS = 5
+
+# Save journal: every save is recorded here before it is written to a workbook
+# and replayed on startup if it never got there (None = inside LOCAL_DATA_DIR).
+# Only one copy of the app can use a journal at a time
+SAVE_JOURNAL_PATH = None
+
+# Project catalog: SQLite index of the project workbooks, so projects can be
+# listed without opening them (None = inside BASE_PROJECT_DIR)
+PROJECT_CATALOG_PATH = None
+
+# Workbook backups: a version is stored in the "backups" folder next to a
+# workbook every time it is saved. The newest BACKUP_KEEP_LAST versions are
+# kept, plus the last version of each of the latest BACKUP_KEEP_HOURLY hours
+# and BACKUP_KEEP_DAILY days
+BACKUP_KEEP_LAST = 20
+BACKUP_KEEP_HOURLY = 24
+BACKUP_KEEP_DAILY = 30
+
+# Tracing: every workbook operation and its steps are timed and written to a
+# rotating Chrome trace file (open it in chrome://tracing or ui.perfetto.dev;
+# None = inside LOCAL_DATA_DIR). The latest TRACE_RECENT_SPANS durations of
+# each operation feed the in-app latency view
+TRACE_ENABLED = True
+TRACE_FILE_PATH = None
+TRACE_MAX_BYTES = 5 * 1024 * 1024
+TRACE_BACKUP_COUNT = 3
+TRACE_RECENT_SPANS = 200
+
+# Supervisor approval: submitted samples are kept in a local SQLite outbox
+# (None = inside LOCAL_DATA_DIR) and sent to the approval server in the
+# background. A failed send is retried after SUBMISSION_BACKOFF_BASE_SECONDS,
+# doubling up to SUBMISSION_BACKOFF_MAX_SECONDS, and given up after
+# SUBMISSION_MAX_ATTEMPTS. After SUBMISSION_BREAKER_FAILURES failures in a
+# row nothing is sent for SUBMISSION_BREAKER_RESET_SECONDS. When the server
+# takes batches, up to SUBMISSION_BATCH_SIZE samples go in one request
+APPROVAL_SERVER_URL = 'http://127.0.0.1:8000'
+SUBMISSION_OUTBOX_PATH = None
+SUBMISSION_CONNECT_TIMEOUT = 3.05
+SUBMISSION_READ_TIMEOUT = 10
+SUBMISSION_MAX_ATTEMPTS = 10
+SUBMISSION_BACKOFF_BASE_SECONDS = 2
+SUBMISSION_BACKOFF_MAX_SECONDS = 300
+SUBMISSION_BREAKER_FAILURES = 5
+SUBMISSION_BREAKER_RESET_SECONDS = 30
+SUBMISSION_BATCH_SIZE = 500
+SUBMISSION_POLL_MS = 250
+
+# Approval statuses: the supervisors' decisions are cached locally (None =
+# inside LOCAL_DATA_DIR) and refreshed with conditional requests every
+# APPROVAL_STATUS_REFRESH_SECONDS while the status view is open
+APPROVAL_STATUS_CACHE_PATH = None
+APPROVAL_STATUS_REFRESH_SECONDS = 10
+
+# Startup: pages are built the first time they are shown. With FRAME_WARMUP
+# the pages usually opened next are built in idle time, starting
+# FRAME_WARMUP_DELAY_MS after a page is shown
+FRAME_WARMUP = True
+FRAME_WARMUP_DELAY_MS = 300
+
 # Project types
 PROJECT_TYPES = {
     'BMP_SOLID': 'BMP - Solid Samples',
@@ -129,6 +220,17 @@ def get_template_path(project_type, sample_type):
         # Default fallback
         return MASTER_TEMPLATE_PATH
 
+def get_max_sample_count():
+    """
+    Get the largest sample count the configured Excel engine supports
+    
+    Returns:
+        int: Maximum number of samples per project
+    """
+    if EXCEL_ENGINE == 'xlsx':
+        return MAX_SAMPLE_COUNT_HEADLESS
+    return MAX_SAMPLE_COUNT
+
 def validate_template_paths():
     """
     Validate that all template paths exist
@@ -172,4 +274,41 @@ MASTER_TEMPLATE_PATH = get_setting('MASTER_TEMPLATE_PATH', MASTER_TEMPLATE_PATH)
 MASTER_TEMPLATE_PATH_EFFLUENT = get_setting('MASTER_TEMPLATE_PATH_EFFLUENT', MASTER_TEMPLATE_PATH_EFFLUENT)
 MASTER_TEMPLATE_PATH_BMP_SOLID = get_setting('MASTER_TEMPLATE_PATH_BMP_SOLID', MASTER_TEMPLATE_PATH_BMP_SOLID)
 MASTER_TEMPLATE_PATH_BMP_EFFLUENT = get_setting('MASTER_TEMPLATE_PATH_BMP_EFFLUENT', MASTER_TEMPLATE_PATH_BMP_EFFLUENT)
-BASE_PROJECT_DIR = get_setting('BASE_PROJECT_DIR', BASE_PROJECT_DIR)
\ No newline at end of file
+BASE_PROJECT_DIR = get_setting('BASE_PROJECT_DIR', BASE_PROJECT_DIR)
+LOCAL_DATA_DIR = get_setting('LOCAL_DATA_DIR', LOCAL_DATA_DIR) or (
+    os.path.join(os.environ['LOCALAPPDATA'], 'ProjectManagementApp') if os.environ.get('LOCALAPPDATA')
+    else os.path.join(os.path.expanduser('~'), '.project_management_app')
+)
+EXCEL_ENGINE = str(get_setting('EXCEL_ENGINE', EXCEL_ENGINE)).strip().lower()
+WORKBOOK_CACHE_SIZE = int(get_setting('WORKBOOK_CACHE_SIZE', WORKBOOK_CACHE_SIZE))
+WORKBOOK_METADATA_CACHE_SIZE = int(get_setting('WORKBOOK_METADATA_CACHE_SIZE', WORKBOOK_METADATA_CACHE_SIZE))
+SAVE_QUEUE_COALESCE_SECONDS = float(get_setting('SAVE_QUEUE_COALESCE_SECONDS', SAVE_QUEUE_COALESCE_SECONDS))
+SAVE_QUEUE_POLL_MS = int(get_setting('SAVE_QUEUE_POLL_MS', SAVE_QUEUE_POLL_MS))
+SAVE_QUEUE_IDLE_CLOSE_SECONDS = float(get_setting('SAVE_QUEUE_IDLE_CLOSE_SECONDS', SAVE_QUEUE_IDLE_CLOSE_SECONDS))
+SAVE_JOURNAL_PATH = get_setting('SAVE_JOURNAL_PATH', SAVE_JOURNAL_PATH) or os.path.join(LOCAL_DATA_DIR, 'save_journal.jsonl')
+PROJECT_CATALOG_PATH = get_setting('PROJECT_CATALOG_PATH', PROJECT_CATALOG_PATH) or os.path.join(BASE_PROJECT_DIR, 'project_catalog.sqlite3')
+BACKUP_KEEP_LAST = int(get_setting('BACKUP_KEEP_LAST', BACKUP_KEEP_LAST))
+BACKUP_KEEP_HOURLY = int(get_setting('BACKUP_KEEP_HOURLY', BACKUP_KEEP_HOURLY))
+BACKUP_KEEP_DAILY = int(get_setting('BACKUP_KEEP_DAILY', BACKUP_KEEP_DAILY))
+EXCEL_APP_POOL_SIZE = int(get_setting('EXCEL_APP_POOL_SIZE', EXCEL_APP_POOL_SIZE))
+EXCEL_APP_IDLE_SECONDS = float(get_setting('EXCEL_APP_IDLE_SECONDS', EXCEL_APP_IDLE_SECONDS))
+TRACE_ENABLED = str(get_setting('TRACE_ENABLED', TRACE_ENABLED)).lower() not in ('0', 'false', 'no')
+TRACE_FILE_PATH = get_setting('TRACE_FILE_PATH', TRACE_FILE_PATH) or os.path.join(LOCAL_DATA_DIR, 'traces', 'workbook_trace.json')
+TRACE_MAX_BYTES = int(get_setting('TRACE_MAX_BYTES', TRACE_MAX_BYTES))
+TRACE_BACKUP_COUNT = int(get_setting('TRACE_BACKUP_COUNT', TRACE_BACKUP_COUNT))
+TRACE_RECENT_SPANS = int(get_setting('TRACE_RECENT_SPANS', TRACE_RECENT_SPANS))
+APPROVAL_SERVER_URL = get_setting('APPROVAL_SERVER_URL', APPROVAL_SERVER_URL)
+SUBMISSION_OUTBOX_PATH = get_setting('SUBMISSION_OUTBOX_PATH', SUBMISSION_OUTBOX_PATH) or os.path.join(LOCAL_DATA_DIR, 'submission_outbox.sqlite3')
+SUBMISSION_CONNECT_TIMEOUT = float(get_setting('SUBMISSION_CONNECT_TIMEOUT', SUBMISSION_CONNECT_TIMEOUT))
+SUBMISSION_READ_TIMEOUT = float(get_setting('SUBMISSION_READ_TIMEOUT', SUBMISSION_READ_TIMEOUT))
+SUBMISSION_MAX_ATTEMPTS = int(get_setting('SUBMISSION_MAX_ATTEMPTS', SUBMISSION_MAX_ATTEMPTS))
+SUBMISSION_BACKOFF_BASE_SECONDS = float(get_setting('SUBMISSION_BACKOFF_BASE_SECONDS', SUBMISSION_BACKOFF_BASE_SECONDS))
+SUBMISSION_BACKOFF_MAX_SECONDS = float(get_setting('SUBMISSION_BACKOFF_MAX_SECONDS', SUBMISSION_BACKOFF_MAX_SECONDS))
+SUBMISSION_BREAKER_FAILURES = int(get_setting('SUBMISSION_BREAKER_FAILURES', SUBMISSION_BREAKER_FAILURES))
+SUBMISSION_BREAKER_RESET_SECONDS = float(get_setting('SUBMISSION_BREAKER_RESET_SECONDS', SUBMISSION_BREAKER_RESET_SECONDS))
+SUBMISSION_POLL_MS = int(get_setting('SUBMISSION_POLL_MS', SUBMISSION_POLL_MS))
+SUBMISSION_BATCH_SIZE = int(get_setting('SUBMISSION_BATCH_SIZE', SUBMISSION_BATCH_SIZE))
+APPROVAL_STATUS_CACHE_PATH = get_setting('APPROVAL_STATUS_CACHE_PATH', APPROVAL_STATUS_CACHE_PATH) or os.path.join(LOCAL_DATA_DIR, 'approval_status.sqlite3')
+APPROVAL_STATUS_REFRESH_SECONDS = float(get_setting('APPROVAL_STATUS_REFRESH_SECONDS', APPROVAL_STATUS_REFRESH_SECONDS))
+FRAME_WARMUP = str(get_setting('FRAME_WARMUP', FRAME_WARMUP)).lower() not in ('0', 'false', 'no')
+FRAME_WARMUP_DELAY_MS = int(get_setting('FRAME_WARMUP_DELAY_MS', FRAME_WARMUP_DELAY_MS))
@@ -5,33 +5,50 @@ This package includes:
 - StartPage: Main entry point for project type selection
 - InternalPage: Internal project options
 - InternalProjectType: Project type selection after project creation
+- InternalProjectTypeLoad: Load an existing project workbook
 - Project_name: Project creation form
 - Characterisation: Solid sample characterisation workflow
 - BMPandCharacterisation: BMP and characterisation workflow
 - SMA: SMA workflow
 - Other: Other project types
+- BatchRenameDialog: Rename many samples at once
+- PerformanceWindow: Recent latencies of the workbook operations
+- ApprovalStatusWindow: Submission and approval state of every sample
 """
 
-# Import all frame classes for easy access
-from .start_page import StartPage
-from .internal_page import InternalPage
-from .internal_project_type import InternalProjectType
-from .project_name import Project_name
-from .characterisation import Characterisation
-from .bmp_characterisation import BMPandCharacterisation
-from .sma import SMA
-from .other import Other
+import importlib
+
+# Where each frame class lives. A frame's module (and what it needs, such as
+# tkcalendar and the Excel handler) is only imported when the frame is used
+_EXPORTS = {
+    'StartPage': 'start_page',
+    'InternalPage': 'internal_page',
+    'InternalProjectType': 'internal_project_type',
+    'InternalProjectTypeLoad': 'internal_project_type_load',
+    'Project_name': 'project_name',
+    'Characterisation': 'characterisation',
+    'BMPandCharacterisation': 'bmp_characterisation',
+    'SMA': 'sma',
+    'Other': 'other',
+    'BatchRenameDialog': 'batch_rename',
+    'PerformanceWindow': 'performance_view',
+    'ApprovalStatusWindow': 'approval_status'
+}
 
 # Define what gets imported when using "from frames import *"
 __all__ = [
     'StartPage',
     'InternalPage', 
     'InternalProjectType',
+    'InternalProjectTypeLoad',
     'Project_name',
     'Characterisation',
     'BMPandCharacterisation',
     'SMA',
-    'Other'
+    'Other',
+    'BatchRenameDialog',
+    'PerformanceWindow',
+    'ApprovalStatusWindow'
 ]
 
 # Package version
@@ -39,4 +56,17 @@ __version__ = '1.0.0'
 
 # Package metadata
 __author__ = 'Your Name'
-__description__ = 'GUI frames for project management application'
\ No newline at end of file
+__description__ = 'GUI frames for project management application'
+
+
+def __getattr__(name):
+    """Import a frame class from its module on first use"""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,179 @@
+"""
+Approval status window - Submission and supervisor approval state of every sample
+"""
+import collections
+import datetime
+import queue
+import threading
+import tkinter as tk
+from tkinter import ttk
+from config.settings import APPROVAL_STATUS_REFRESH_SECONDS
+from utils.submission_outbox import FAILED, QUEUED
+
+
+class ApprovalStatusWindow(tk.Toplevel):
+    COLUMNS = (
+        ("submission", "Submission", 110),
+        ("approval", "Approval", 110),
+        ("decided", "Decided", 150)
+    )
+    POLL_MS = 100
+
+    def __init__(self, parent, controller):
+        """
+        Args:
+            parent: Frame opening the window
+            controller: Application holding the project data, submissions and status cache
+        """
+        super().__init__(parent)
+        self.controller = controller
+        self.project_name = controller.project_data['name']
+        self.sample_names = list(controller.project_data['sample_sheets'])
+        self._rows = {}
+        self._states = {}
+        self._approvals = {}
+        self._results = queue.Queue()
+        self._worker = None
+        self._refresh_job = None
+        self._poll_job = None
+
+        self.title(f"Approval Status - {self.project_name}")
+        self.geometry("560x500")
+        self._setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self._close)
+        self.controller.submissions.add_listener(self._on_submission_changed)
+
+        # The last known statuses straight away, then whatever changed since
+        self._show()
+        self.refresh()
+
+    def _setup_ui(self):
+        """Setup the user interface"""
+        tk.Label(self, text=f"Samples in {self.project_name}", font=("Arial", 14, "bold")).pack(pady=10)
+
+        list_frame = tk.Frame(self)
+        list_frame.pack(pady=5, padx=20, fill="both", expand=True)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
+        self.tree = ttk.Treeview(
+            list_frame,
+            columns=[column for column, _, _ in self.COLUMNS],
+            yscrollcommand=scrollbar.set
+        )
+        self.tree.heading("#0", text="Sample")
+        self.tree.column("#0", width=170)
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width)
+        for tag, colour in (("approved", "green"), ("rejected", "red"), ("failed", "red")):
+            self.tree.tag_configure(tag, foreground=colour)
+        scrollbar.config(command=self.tree.yview)
+        self.tree.pack(side=tk.LEFT, fill="both", expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill="y")
+
+        self.summary_label = tk.Label(self, text="", font=("Arial", 10))
+        self.summary_label.pack(padx=20, anchor="w")
+        self.status_label = tk.Label(self, text="", font=("Arial", 9), fg="gray", wraplength=520, justify="left")
+        self.status_label.pack(padx=20, anchor="w")
+
+        btn_frame = tk.Frame(self)
+        btn_frame.pack(pady=10)
+        tk.Button(btn_frame, text="Refresh", font=("Arial", 11), command=self.refresh).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Close", font=("Arial", 11), command=self._close).pack(side=tk.LEFT, padx=5)
+
+    def refresh(self):
+        """Ask the server what changed, in the background, and schedule the next refresh"""
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        self.status_label.config(text="Checking for updates...", fg="gray")
+        self._worker = threading.Thread(target=self._fetch, name="ApprovalStatus", daemon=True)
+        self._worker.start()
+        self._poll_job = self.after(self.POLL_MS, self._check_worker)
+
+    def _fetch(self):
+        """Worker thread: refresh the project's cached statuses"""
+        try:
+            self._results.put((self.controller.approval_statuses.refresh(self.project_name), None))
+        except Exception as e:
+            self._results.put((False, e))
+
+    def _check_worker(self):
+        """Show the refreshed statuses once the worker is done"""
+        try:
+            changed, error = self._results.get_nowait()
+        except queue.Empty:
+            self._poll_job = self.after(self.POLL_MS, self._check_worker)
+            return
+
+        self._poll_job = None
+        checked_at = datetime.datetime.now().strftime("%H:%M:%S")
+        if error is not None:
+            fetched_at = self.controller.approval_statuses.fetched_at(self.project_name)
+            known = (f"statuses as of {datetime.datetime.fromtimestamp(fetched_at).strftime('%Y-%m-%d %H:%M')}"
+                     if fetched_at else "no statuses known yet")
+            self.status_label.config(text=f"{error} - showing {known}", fg="red")
+        else:
+            self.status_label.config(
+                text=f"Checked at {checked_at}" + ("" if changed else " - no changes"),
+                fg="gray"
+            )
+        if changed:
+            self._show()
+        self._refresh_job = self.after(int(APPROVAL_STATUS_REFRESH_SECONDS * 1000), self.refresh)
+
+    def _show(self):
+        """Update the rows whose status changed and the totals"""
+        self._approvals = self.controller.approval_statuses.cached(self.project_name)
+        for sample_name in self.sample_names:
+            self._show_sample(sample_name)
+        self._show_totals()
+
+    def _show_sample(self, sample_name):
+        """Update one sample's row if its status changed"""
+        submission = self.controller.submissions.status(self.project_name, sample_name)
+        approval = self._approvals.get(sample_name)
+        if submission is not None and submission.status in (QUEUED, FAILED):
+            # Not at the server yet; an earlier decision no longer applies
+            approval = None
+
+        if submission is None and approval is None:
+            values = ("not submitted", "", "")
+        elif approval is None:
+            values = (submission.status, "", "")
+        else:
+            decided = approval['decided_at']
+            values = (
+                submission.status if submission is not None else "sent",
+                approval['status'],
+                datetime.datetime.fromtimestamp(decided).strftime("%Y-%m-%d %H:%M") if decided else ""
+            )
+        state = values[1] or values[0]
+        self._states[sample_name] = state
+        tags = (state,) if state in ("approved", "rejected", "failed") else ()
+
+        item = self._rows.get(sample_name)
+        if item is None:
+            self._rows[sample_name] = self.tree.insert("", "end", text=sample_name, values=values, tags=tags)
+        elif tuple(self.tree.item(item, "values")) != values:
+            self.tree.item(item, values=values, tags=tags)
+
+    def _show_totals(self):
+        totals = collections.Counter(self._states.values())
+        self.summary_label.config(text=", ".join(f"{count} {state}" for state, count in sorted(totals.items())))
+
+    def _on_submission_changed(self, submission):
+        """Show a sample's new submission state as soon as the sender reports it"""
+        if submission.project_name == self.project_name and submission.sample_name in self._rows:
+            self._show_sample(submission.sample_name)
+            self._show_totals()
+
+    def _close(self):
+        self.controller.submissions.remove_listener(self._on_submission_changed)
+        for job in (self._refresh_job, self._poll_job):
+            if job is not None:
+                self.after_cancel(job)
+        self._refresh_job = self._poll_job = None
+        self.destroy()
@@ -0,0 +1,150 @@
+"""
+Batch rename dialog - Rename many samples at once from a pattern, a pasted column or a mapping
+"""
+import tkinter as tk
+from tkinter import ttk, messagebox
+from utils.sample_renames import renames_from_column, renames_from_mapping, renames_from_pattern
+from utils.validators import validate_sample_renames
+
+
+class BatchRenameDialog(tk.Toplevel):
+    MODES = {
+        "pattern": "Name from a pattern",
+        "column": "Paste new names (one per line, in sample order)",
+        "mapping": "Paste current and new names (two columns)"
+    }
+
+    def __init__(self, parent, sample_names, get_codes, on_apply):
+        """
+        Args:
+            parent: Frame opening the dialog
+            sample_names: Current sample names in order
+            get_codes: Called without arguments to get {sample name: sample code},
+                       only when a pattern uses {code}
+            on_apply: Called with the validated {current name: new name} dictionary
+        """
+        super().__init__(parent)
+        self.sample_names = list(sample_names)
+        self.get_codes = get_codes
+        self.on_apply = on_apply
+        self._codes = None
+
+        self.title("Rename Samples")
+        self.transient(parent.winfo_toplevel())
+        self._setup_ui()
+        self.grab_set()
+
+    def _setup_ui(self):
+        """Setup the user interface"""
+        self.mode_var = tk.StringVar(value="pattern")
+        for mode, text in self.MODES.items():
+            tk.Radiobutton(
+                self,
+                text=text,
+                variable=self.mode_var,
+                value=mode,
+                font=("Arial", 11),
+                command=self._preview
+            ).pack(anchor="w", padx=20)
+
+        pattern_frame = tk.Frame(self)
+        pattern_frame.pack(pady=5, padx=20, fill="x")
+        tk.Label(pattern_frame, text="Pattern:", font=("Arial", 11)).pack(side=tk.LEFT)
+        self.pattern_var = tk.StringVar(value="{code}-{index:03d}")
+        tk.Entry(pattern_frame, textvariable=self.pattern_var, font=("Arial", 11), width=25).pack(side=tk.LEFT, padx=5)
+        tk.Label(pattern_frame, text="Start at:", font=("Arial", 11)).pack(side=tk.LEFT)
+        self.start_var = tk.StringVar(value="1")
+        tk.Spinbox(pattern_frame, from_=0, to=9999, textvariable=self.start_var, width=5).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(
+            self,
+            text="Pattern fields: {index}, {name} (current name), {code} (Sample Code)",
+            font=("Arial", 9),
+            fg="gray"
+        ).pack(anchor="w", padx=20)
+
+        self.paste_text = tk.Text(self, font=("Arial", 11), width=50, height=8)
+        self.paste_text.pack(pady=5, padx=20, fill="both")
+
+        preview_btn = tk.Button(self, text="Preview", font=("Arial", 11), command=self._preview)
+        preview_btn.pack(pady=5)
+
+        list_frame = tk.Frame(self)
+        list_frame.pack(pady=5, padx=20, fill="both", expand=True)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
+        self.preview_list = tk.Listbox(list_frame, font=("Arial", 10), height=12, width=60,
+                                       yscrollcommand=scrollbar.set)
+        scrollbar.config(command=self.preview_list.yview)
+        self.preview_list.pack(side=tk.LEFT, fill="both", expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill="y")
+
+        self.status_label = tk.Label(self, text="", font=("Arial", 10), fg="blue")
+        self.status_label.pack()
+
+        btn_frame = tk.Frame(self)
+        btn_frame.pack(pady=10)
+        tk.Button(btn_frame, text="Rename", font=("Arial", 11), width=10, command=self._apply).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Cancel", font=("Arial", 11), width=10, command=self.destroy).pack(side=tk.LEFT, padx=5)
+
+    def _build_renames(self):
+        """Build the {current name: new name} dictionary from the chosen input"""
+        mode = self.mode_var.get()
+        if mode == "column":
+            return renames_from_column(self.paste_text.get("1.0", tk.END), self.sample_names)
+        if mode == "mapping":
+            return renames_from_mapping(self.paste_text.get("1.0", tk.END))
+
+        pattern = self.pattern_var.get()
+        try:
+            start = int(self.start_var.get())
+        except ValueError:
+            raise ValueError("Start must be a whole number")
+        if "{code" in pattern and self._codes is None:
+            self.status_label.config(text="Reading sample codes...", fg="blue")
+            self.update_idletasks()
+            self._codes = self.get_codes()
+        return renames_from_pattern(pattern, self.sample_names, self._codes, start=start)
+
+    def _preview(self):
+        """List every rename, marking the ones that cannot be applied"""
+        self.preview_list.delete(0, tk.END)
+        try:
+            renames = self._build_renames()
+        except Exception as e:
+            self.status_label.config(text=str(e), fg="red")
+            return None, None
+
+        errors = validate_sample_renames(renames, self.sample_names)
+        for old_name, new_name in renames.items():
+            line = f"{old_name}  ->  {new_name}"
+            if old_name in errors:
+                line += f"   ({errors[old_name]})"
+            self.preview_list.insert(tk.END, line)
+            if old_name in errors:
+                self.preview_list.itemconfig(tk.END, fg="red")
+
+        if errors:
+            self.status_label.config(text=f"{len(errors)} problem(s) - nothing will be renamed", fg="red")
+        else:
+            self.status_label.config(text=f"{len(renames)} sample(s) will be renamed", fg="blue")
+        return renames, errors
+
+    def _apply(self):
+        """Validate every rename and hand them over together"""
+        renames, errors = self._preview()
+        if renames is None:
+            return
+        if errors:
+            messagebox.showwarning(
+                "Name Error",
+                "Please fix these names first:\n\n" + "\n".join(
+                    f"• {name}: {error}" for name, error in errors.items()),
+                parent=self
+            )
+            return
+        if not renames:
+            messagebox.showinfo("Rename Samples", "No sample names would change.", parent=self)
+            return
+
+        self.destroy()
+        self.on_apply(renames)
@@ -1,12 +1,17 @@
 """
 BMP and Characterisation frame - OPTIMIZED VERSION
 """
+import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from tkcalendar import DateEntry
-from utils.excel_handler import ExcelHandler
+from frames.approval_status import ApprovalStatusWindow
+from frames.batch_rename import BatchRenameDialog
+from utils.column_widths import display_text
+from utils.constants import CHARACTERISATION_CELL_MAPPING
+from utils.excel_handler import create_excel_handler
+from utils.sample_values import SampleValueCache
+from utils.submission_outbox import FAILED, QUEUED, SENT
 from utils.validators import validate_form_data
-import requests
 
 
 class BMPandCharacterisation(tk.Frame):
@@ -16,8 +21,12 @@ class BMPandCharacterisation(tk.Frame):
         self.current_sample_index = 0
         self.excel_created = False
         self.sample_type = None
-        self.excel_handler = ExcelHandler()
+        self.excel_handler = create_excel_handler()
         self.form_widgets_created = False  # Track if form widgets are already created
+        # Saved form values, read from the workbook when a sample is first shown
+        self.sample_values = SampleValueCache(self.excel_handler, CHARACTERISATION_CELL_MAPPING.values())
+        self.submission_label = None
+        self.controller.submissions.add_listener(self._on_submission_changed)
         
         self._setup_ui()
     
@@ -155,6 +164,15 @@ class BMPandCharacterisation(tk.Frame):
             )
             info_label.pack()
 
+    def open_project(self):
+        """Show a project loaded from an existing workbook, starting at its first sample"""
+        self.excel_created = True
+        self.current_sample_index = 0
+        self.sample_values.clear()
+        sample_type = self.controller.project_data.get('sample_type') or "Solid"
+        self.sample_type_var.set(sample_type)
+        self.load_sample_selection(sample_type)
+
     def load_sample_selection(self, selected_value):
         """Load the appropriate interface based on sample type - OPTIMIZED"""
         self.sample_type = selected_value
@@ -224,14 +242,14 @@ class BMPandCharacterisation(tk.Frame):
         self.current_sample_var = tk.StringVar(
             value=self.controller.project_data['sample_sheets'][0]
         )
-        sample_dropdown = ttk.OptionMenu(
+        self.sample_dropdown = ttk.OptionMenu(
             self.sample_selection_frame,
             self.current_sample_var,
             self.controller.project_data['sample_sheets'][0],
             *self.controller.project_data['sample_sheets'],
             command=self.change_sample
         )
-        sample_dropdown.pack()
+        self.sample_dropdown.pack()
 
         # Create sample management buttons immediately
         self._setup_sample_management_buttons()
@@ -249,14 +267,30 @@ class BMPandCharacterisation(tk.Frame):
         )
         rename_btn.pack(side=tk.LEFT, padx=5)
 
+        batch_rename_btn = tk.Button(
+            btn_frame,
+            text="Rename Samples...",
+            font=("Arial", 10),
+            command=self.batch_rename_samples
+        )
+        batch_rename_btn.pack(side=tk.LEFT, padx=5)
+
         progress_btn = tk.Button(
             btn_frame,
-            text="Show Sample Progress",
+            text="Show Approval Status",
             font=("Arial", 10),
             command=self.show_sample_progress
         )
         progress_btn.pack(side=tk.LEFT, padx=5)
 
+        submit_all_btn = tk.Button(
+            btn_frame,
+            text="Submit All Samples",
+            font=("Arial", 10),
+            command=self.submit_all_samples
+        )
+        submit_all_btn.pack(side=tk.LEFT, padx=5)
+
     def _create_multi_sheet_excel(self, sample_type):
         """Create Excel workbook with multiple sheets for samples - OPTIMIZED"""
         try:
@@ -281,7 +315,11 @@ class BMPandCharacterisation(tk.Frame):
                 )
 
                 self.controller.project_data['excel_path'] = excel_path
+                self.controller.project_data['sample_type'] = sample_type
                 self.excel_created = True
+                self.sample_values.clear()
+                if self.controller.project_catalog is not None:
+                    self.controller.project_catalog.record(excel_path)
 
                 messagebox.showinfo(
                     "Excel Created",
@@ -308,13 +346,13 @@ class BMPandCharacterisation(tk.Frame):
             widget.destroy()
 
         current_sample = self.controller.project_data['sample_sheets'][self.current_sample_index]
-        sample_info = tk.Label(
+        self.sample_info_label = tk.Label(
             self.form_frame,
             text=f"Working on: {current_sample}",
             font=("Arial", 12, "bold"),
             fg="green"
         )
-        sample_info.pack(pady=10)
+        self.sample_info_label.pack(pady=10)
 
         # Create form entries based on sample type
         if self.sample_type == "Solid":
@@ -324,6 +362,8 @@ class BMPandCharacterisation(tk.Frame):
 
         # Create form buttons
         self._add_form_buttons()
+        self._fill_form(current_sample)
+        self._show_submission_status()
         
         # Mark form as created
         self.form_widgets_created = True
@@ -352,6 +392,8 @@ class BMPandCharacterisation(tk.Frame):
 
     def _generate_form_widgets_optimized(self, labels):
         """Generate form widgets based on labels - OPTIMIZED VERSION"""
+        from tkcalendar import DateEntry
+
         # Create all widgets in a batch to reduce individual pack() calls
         widgets_to_pack = []
         
@@ -378,6 +420,32 @@ class BMPandCharacterisation(tk.Frame):
         for widget, pack_options in widgets_to_pack:
             widget.pack(**pack_options)
 
+    def _fill_form(self, sample_name):
+        """Show the values already saved for a sample, reading its sheet on first view"""
+        excel_path = self.controller.project_data['excel_path']
+        if not excel_path:
+            return
+
+        from tkcalendar import DateEntry
+
+        values = self.sample_values.get(excel_path, sample_name)
+        for cell_range, entry in self.entries.items():
+            value = values.get(cell_range)
+            if isinstance(value, list):
+                # A merged range keeps its value in the top-left cell
+                value = value[0] if value else None
+            if value is None or value == '':
+                continue
+
+            if isinstance(entry, DateEntry):
+                try:
+                    entry.set_date(value.date() if isinstance(value, datetime.datetime) else value)
+                except Exception:
+                    print(f"Warning: Could not show saved date {value!r} for {sample_name}")
+            else:
+                entry.delete(0, tk.END)
+                entry.insert(0, display_text(value))
+
     def _add_form_buttons(self):
         """Add form buttons for saving and navigation - OPTIMIZED"""
         # Create save button
@@ -389,6 +457,9 @@ class BMPandCharacterisation(tk.Frame):
         )
         save_btn.pack(pady=10)
 
+        self.submission_label = tk.Label(self.form_frame, text="", font=("Arial", 10), wraplength=500)
+        self.submission_label.pack()
+
         # Create navigation frame and buttons
         nav_frame = tk.Frame(self.form_frame)
         nav_frame.pack(pady=5)
@@ -446,69 +517,216 @@ class BMPandCharacterisation(tk.Frame):
             messagebox.showwarning("Name Error", "A sample with this name already exists!")
             return
 
-        try:
-            self.excel_handler.rename_sheet(
-                self.controller.project_data['excel_path'],
-                current_name,
-                new_name
-            )
+        # The rename is queued behind any pending saves; the UI moves on right away
+        self.controller.save_queue.submit_rename(
+            self.controller.project_data['excel_path'],
+            current_name,
+            new_name,
+            callback=lambda job: self._on_rename_done(job, current_name)
+        )
+        self.sample_values.rename(self.controller.project_data['excel_path'], current_name, new_name)
 
-            self.controller.project_data['sample_sheets'][self.current_sample_index] = new_name
-            self.current_sample_var.set(new_name)
-            self.load_sample_selection(self.sample_type)
+        self._relabel_samples({current_name: new_name})
 
-            messagebox.showinfo("Success", f"Sample renamed to '{new_name}'")
+    def _on_rename_done(self, job, old_name):
+        """Report a failed rename and restore the old name"""
+        if job.ok:
+            return
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to rename sample:\n{e}")
+        sample_sheets = self.controller.project_data['sample_sheets']
+        if job.new_name in sample_sheets:
+            self.sample_values.rename(job.excel_path, job.new_name, old_name)
+            self._relabel_samples({job.new_name: old_name})
+        messagebox.showerror("Error", f"Failed to rename sample:\n{job.error}")
+
+    def batch_rename_samples(self):
+        """Rename many samples at once from a pattern, a pasted column or a mapping"""
+        BatchRenameDialog(
+            self,
+            self.controller.project_data['sample_sheets'],
+            self._sample_codes,
+            self._apply_sample_renames
+        )
 
-    def show_sample_progress(self):
-        """Show progress of all samples"""
-        sample_list = "\n".join([f"• {name}" for name in self.controller.project_data['sample_sheets']])
-        messagebox.showinfo("Sample Progress", f"All samples in project:\n\n{sample_list}")
+    def _sample_codes(self):
+        """Get each sample's Sample Code, reading all unloaded sheets in one pass"""
+        code_cell = CHARACTERISATION_CELL_MAPPING["Sample Code"]
+        values = self.sample_values.get_many(
+            self.controller.project_data['excel_path'],
+            self.controller.project_data['sample_sheets']
+        )
+        return {name: display_text(data[code_cell]) for name, data in values.items()
+                if data.get(code_cell) not in (None, '')}
+
+    def _apply_sample_renames(self, renames):
+        """Queue validated renames as one job and show the new names straight away"""
+        excel_path = self.controller.project_data['excel_path']
+        self.controller.save_queue.submit_renames(
+            excel_path,
+            renames,
+            callback=self._on_batch_rename_done
+        )
+        self.sample_values.rename_many(excel_path, renames)
+        self._relabel_samples(renames)
 
-    def save_current_sample(self):
-        """Send current sample data to FastAPI for supervisor approval"""
-        try:
-            save_label = tk.Label(self.form_frame, text="Saving...", fg="orange", font=("Arial", 10))
-            save_label.pack()
-            self.update()
+    def _on_batch_rename_done(self, job):
+        """Report a failed batch rename and restore the old names"""
+        if job.ok:
+            return
 
-            try:
-                form_data = {}
-                for cell_range, entry in self.entries.items():
-                    form_data[cell_range] = entry.get().strip()
+        sample_sheets = self.controller.project_data['sample_sheets']
+        restore = {new_name: old_name for old_name, new_name in job.data.items() if new_name in sample_sheets}
+        self.sample_values.rename_many(job.excel_path, restore)
+        self._relabel_samples(restore)
+        messagebox.showerror("Error", f"Failed to rename samples:\n{job.error}")
 
-                if not validate_form_data(form_data):
-                    messagebox.showwarning("Input Error", "All fields must be filled.")
-                    return
+    def _relabel_samples(self, renames):
+        """Show renamed samples under their new names without rebuilding the form"""
+        sample_sheets = self.controller.project_data['sample_sheets']
+        changed = [index for index, name in enumerate(sample_sheets) if name in renames]
+        sample_sheets[:] = [renames.get(name, name) for name in sample_sheets]
 
-                current_sample = self.controller.project_data['sample_sheets'][self.current_sample_index]
+        # Submission and approval state follow the samples to their new names
+        project_name = self.controller.project_data['name']
+        try:
+            self.controller.submissions.rename_samples(project_name, renames)
+            self.controller.approval_statuses.rename_samples(project_name, renames)
+        except Exception as e:
+            print(f"Warning: Could not move approval state to the new sample names: {e}")
+        self._show_submission_status()
+        if not self.sample_type:
+            return
 
-                # Send to FastAPI backend
-                try:
-                    response = requests.post("http://127.0.0.1:8000/submit-sample", json={
-                        "project_name": self.controller.project_data['name'],
-                        "sample_name": current_sample,
-                        "sample_type": self.sample_type,
-                        "data": form_data
-                    })
+        menu = self.sample_dropdown['menu']
+        for index in changed:
+            menu.entryconfigure(
+                index,
+                label=sample_sheets[index],
+                command=tk._setit(self.current_sample_var, sample_sheets[index], self.change_sample)
+            )
+        if self.current_sample_index in changed:
+            current_sample = sample_sheets[self.current_sample_index]
+            self.current_sample_var.set(current_sample)
+            self.sample_info_label.config(text=f"Working on: {current_sample}")
 
-                    if response.status_code == 200:
-                        messagebox.showinfo("Submitted", "Form sent for supervisor approval.")
-                    else:
-                        messagebox.showerror("Error", "Submission failed: " + response.text)
+    def show_sample_progress(self):
+        """Show the submission and supervisor approval state of every sample"""
+        ApprovalStatusWindow(self, self.controller)
 
-                except requests.exceptions.RequestException as e:
-                    messagebox.showerror("Network Error", f"Could not reach backend:\n{e}")
+    def save_current_sample(self):
+        """Queue current sample data for supervisor approval; it is sent in the background"""
+        try:
+            form_data = {}
+            for cell_range, entry in self.entries.items():
+                form_data[cell_range] = entry.get().strip()
+
+            if not validate_form_data(form_data):
+                messagebox.showwarning("Input Error", "All fields must be filled.")
+                return
+
+            current_sample = self.controller.project_data['sample_sheets'][self.current_sample_index]
+            self.controller.submissions.submit(
+                self.controller.project_data['name'],
+                current_sample,
+                self.sample_type,
+                form_data
+            )
+            self._show_submission_status()
 
-            finally:
-                save_label.destroy()
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            messagebox.showerror("Error", f"Could not queue the sample for approval:\n{e}")
+
+    def submit_all_samples(self):
+        """Queue every completed sample of the project for approval, sent together in one batch"""
+        if not self.form_widgets_created:
+            return
+
+        try:
+            project_data = self.controller.project_data
+            sample_sheets = project_data['sample_sheets']
+            current_sample = sample_sheets[self.current_sample_index]
+            saved = {}
+            if project_data['excel_path']:
+                saved = self.sample_values.get_many(project_data['excel_path'], sample_sheets)
+
+            samples = {}
+            incomplete = []
+            for sample_name in sample_sheets:
+                submission = self.controller.submissions.status(project_data['name'], sample_name)
+                if sample_name == current_sample:
+                    form_data = {cell_range: entry.get().strip() for cell_range, entry in self.entries.items()}
+                elif submission is not None:
+                    # What was last submitted is newer than what the workbook holds
+                    form_data = dict(submission.data)
+                else:
+                    values = saved.get(sample_name, {})
+                    form_data = {cell_range: self._saved_text(values.get(cell_range)) for cell_range in self.entries}
+
+                if validate_form_data(form_data):
+                    samples[sample_name] = form_data
+                else:
+                    incomplete.append(sample_name)
+
+            if not samples:
+                messagebox.showwarning("Input Error", "No sample has all its fields filled.")
+                return
+            if incomplete and not messagebox.askyesno(
+                "Incomplete Samples",
+                f"{len(incomplete)} sample(s) have empty fields and will not be submitted:\n\n"
+                + "\n".join(f"• {name}" for name in incomplete[:20])
+                + ("\n..." if len(incomplete) > 20 else "")
+                + f"\n\nSubmit the other {len(samples)} sample(s)?"
+            ):
+                return
+
+            self.controller.submissions.submit_many(project_data['name'], self.sample_type, samples)
+            self._show_submission_status()
 
         except Exception as e:
             import traceback
             traceback.print_exc()
-            messagebox.showerror("Error", f"Unexpected error occurred:\n{e}")
+            messagebox.showerror("Error", f"Could not queue the samples for approval:\n{e}")
+
+    @staticmethod
+    def _saved_text(value):
+        """Form text for a value read from the workbook"""
+        if isinstance(value, list):
+            # A merged range keeps its value in the top-left cell
+            value = value[0] if value else None
+        if value is None:
+            return ''
+        return display_text(value).strip()
+
+    def _on_submission_changed(self, submission):
+        """Show a delivery update if it is for the sample on screen"""
+        sample_sheets = self.controller.project_data['sample_sheets']
+        if self.current_sample_index >= len(sample_sheets):
+            return
+        if submission.sample == (self.controller.project_data['name'], sample_sheets[self.current_sample_index]):
+            self._show_submission_status()
+
+    def _show_submission_status(self):
+        """Show whether the current sample is queued, sent or failed"""
+        if self.submission_label is None or not self.submission_label.winfo_exists():
+            return
+
+        current_sample = self.controller.project_data['sample_sheets'][self.current_sample_index]
+        submission = self.controller.submissions.status(self.controller.project_data['name'], current_sample)
+        if submission is None:
+            self.submission_label.config(text="")
+        elif submission.status == QUEUED and submission.attempts:
+            self.submission_label.config(
+                text=f"Approval: queued, retrying ({submission.attempts} failed attempt(s): {submission.last_error})",
+                fg="orange"
+            )
+        elif submission.status == QUEUED:
+            self.submission_label.config(text="Approval: queued", fg="orange")
+        elif submission.status == SENT:
+            self.submission_label.config(text="Approval: sent for supervisor approval", fg="green")
+        elif submission.status == FAILED:
+            self.submission_label.config(text=f"Approval: failed - {submission.last_error}", fg="red")
 
     
     def _go_back(self):
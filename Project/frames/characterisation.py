@@ -1,7 +1,11 @@
+import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from tkcalendar import DateEntry
-from utils.excel_handler import ExcelHandler
+from frames.batch_rename import BatchRenameDialog
+from utils.column_widths import display_text
+from utils.constants import CHARACTERISATION_CELL_MAPPING
+from utils.excel_handler import create_excel_handler
+from utils.sample_values import SampleValueCache
 from utils.validators import validate_form_data
 
 
@@ -12,7 +16,9 @@ class Characterisation(tk.Frame):
         self.current_sample_index = 0
         self.excel_created = False
         self.sample_type = None
-        self.excel_handler = ExcelHandler()
+        self.excel_handler = create_excel_handler()
+        # Saved form values, read from the workbook when a sample is first shown
+        self.sample_values = SampleValueCache(self.excel_handler, CHARACTERISATION_CELL_MAPPING.values())
         
         self._setup_ui()
     
@@ -85,6 +91,10 @@ class Characterisation(tk.Frame):
         self.form_frame = tk.Frame(self.scrollable_frame)
         self.form_frame.pack(pady=20)
 
+        # Background save status
+        self.save_status_label = tk.Label(self.scrollable_frame, text="", font=("Arial", 10))
+        self.save_status_label.pack()
+
         # Back button
         back_btn = tk.Button(
             self.scrollable_frame, 
@@ -140,6 +150,15 @@ class Characterisation(tk.Frame):
             )
             info_label.pack()
 
+    def open_project(self):
+        """Show a project loaded from an existing workbook, starting at its first sample"""
+        self.excel_created = True
+        self.current_sample_index = 0
+        self.sample_values.clear()
+        sample_type = self.controller.project_data.get('sample_type') or "Solid"
+        self.sample_type_var.set(sample_type)
+        self.load_sample_selection(sample_type)
+
     def load_sample_selection(self, selected_value):
         """Load the appropriate interface based on sample type"""
         self.sample_type = selected_value
@@ -187,14 +206,14 @@ class Characterisation(tk.Frame):
         self.current_sample_var = tk.StringVar(
             value=self.controller.project_data['sample_sheets'][0]
         )
-        sample_dropdown = ttk.OptionMenu(
+        self.sample_dropdown = ttk.OptionMenu(
             self.sample_selection_frame,
             self.current_sample_var,
             self.controller.project_data['sample_sheets'][0],
             *self.controller.project_data['sample_sheets'],
             command=self.change_sample
         )
-        sample_dropdown.pack()
+        self.sample_dropdown.pack()
 
         self._setup_sample_management_buttons()
 
@@ -211,6 +230,14 @@ class Characterisation(tk.Frame):
         )
         rename_btn.pack(side=tk.LEFT, padx=5)
 
+        batch_rename_btn = tk.Button(
+            btn_frame,
+            text="Rename Samples...",
+            font=("Arial", 10),
+            command=self.batch_rename_samples
+        )
+        batch_rename_btn.pack(side=tk.LEFT, padx=5)
+
         progress_btn = tk.Button(
             btn_frame,
             text="Show Sample Progress",
@@ -231,7 +258,11 @@ class Characterisation(tk.Frame):
             )
 
             self.controller.project_data['excel_path'] = excel_path
+            self.controller.project_data['sample_type'] = sample_type
             self.excel_created = True
+            self.sample_values.clear()
+            if self.controller.project_catalog is not None:
+                self.controller.project_catalog.record(excel_path)
 
             messagebox.showinfo(
                 "Excel Created",
@@ -254,13 +285,13 @@ class Characterisation(tk.Frame):
             widget.destroy()
 
         current_sample = self.controller.project_data['sample_sheets'][self.current_sample_index]
-        sample_info = tk.Label(
+        self.sample_info_label = tk.Label(
             self.form_frame,
             text=f"Working on: {current_sample}",
             font=("Arial", 12, "bold"),
             fg="green"
         )
-        sample_info.pack(pady=10)
+        self.sample_info_label.pack(pady=10)
 
         if self.sample_type == "Solid":
             self._create_form_entries_solid()
@@ -268,6 +299,7 @@ class Characterisation(tk.Frame):
             self._create_form_entries_effluent()
 
         self._add_form_buttons()
+        self._fill_form(current_sample)
         
         # Update scroll region after adding new widgets
         self.after(100, self._update_scroll_region)
@@ -304,6 +336,8 @@ class Characterisation(tk.Frame):
 
     def _generate_form_widgets(self, labels):
         """Generate form widgets based on labels"""
+        from tkcalendar import DateEntry
+
         for text, cell in labels:
             label = tk.Label(self.form_frame, text=text, font=("Arial", 12))
             label.pack(anchor="w", padx=20)
@@ -316,6 +350,32 @@ class Characterisation(tk.Frame):
             entry.pack(padx=20, pady=3)
             self.entries[cell] = entry
 
+    def _fill_form(self, sample_name):
+        """Show the values already saved for a sample, reading its sheet on first view"""
+        excel_path = self.controller.project_data['excel_path']
+        if not excel_path:
+            return
+
+        from tkcalendar import DateEntry
+
+        values = self.sample_values.get(excel_path, sample_name)
+        for cell_range, entry in self.entries.items():
+            value = values.get(cell_range)
+            if isinstance(value, list):
+                # A merged range keeps its value in the top-left cell
+                value = value[0] if value else None
+            if value is None or value == '':
+                continue
+
+            if isinstance(entry, DateEntry):
+                try:
+                    entry.set_date(value.date() if isinstance(value, datetime.datetime) else value)
+                except Exception:
+                    print(f"Warning: Could not show saved date {value!r} for {sample_name}")
+            else:
+                entry.delete(0, tk.END)
+                entry.insert(0, display_text(value))
+
     def _add_form_buttons(self):
         """Add form buttons for saving and navigation"""
         save_btn = tk.Button(
@@ -379,21 +439,92 @@ class Characterisation(tk.Frame):
             messagebox.showwarning("Name Error", "A sample with this name already exists!")
             return
 
-        try:
-            self.excel_handler.rename_sheet(
-                self.controller.project_data['excel_path'],
-                current_name,
-                new_name
-            )
+        # The rename is queued behind any pending saves; the UI moves on right away
+        self.controller.save_queue.submit_rename(
+            self.controller.project_data['excel_path'],
+            current_name,
+            new_name,
+            callback=lambda job: self._on_rename_done(job, current_name)
+        )
+        self.sample_values.rename(self.controller.project_data['excel_path'], current_name, new_name)
 
-            self.controller.project_data['sample_sheets'][self.current_sample_index] = new_name
-            self.current_sample_var.set(new_name)
-            self.load_sample_selection(self.sample_type)
+        self._relabel_samples({current_name: new_name})
 
-            messagebox.showinfo("Success", f"Sample renamed to '{new_name}'")
+    def _on_rename_done(self, job, old_name):
+        """Report a finished rename, restoring the old name if it failed"""
+        if job.ok:
+            self._show_save_status(f"Sample renamed to '{job.new_name}'", "green")
+            return
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to rename sample:\n{e}")
+        sample_sheets = self.controller.project_data['sample_sheets']
+        if job.new_name in sample_sheets:
+            self.sample_values.rename(job.excel_path, job.new_name, old_name)
+            self._relabel_samples({job.new_name: old_name})
+        self._show_save_status(f"Rename of '{old_name}' failed", "red")
+        messagebox.showerror("Error", f"Failed to rename sample:\n{job.error}")
+
+    def batch_rename_samples(self):
+        """Rename many samples at once from a pattern, a pasted column or a mapping"""
+        BatchRenameDialog(
+            self,
+            self.controller.project_data['sample_sheets'],
+            self._sample_codes,
+            self._apply_sample_renames
+        )
+
+    def _sample_codes(self):
+        """Get each sample's Sample Code, reading all unloaded sheets in one pass"""
+        code_cell = CHARACTERISATION_CELL_MAPPING["Sample Code"]
+        values = self.sample_values.get_many(
+            self.controller.project_data['excel_path'],
+            self.controller.project_data['sample_sheets']
+        )
+        return {name: display_text(data[code_cell]) for name, data in values.items()
+                if data.get(code_cell) not in (None, '')}
+
+    def _apply_sample_renames(self, renames):
+        """Queue validated renames as one job and show the new names straight away"""
+        excel_path = self.controller.project_data['excel_path']
+        self.controller.save_queue.submit_renames(
+            excel_path,
+            renames,
+            callback=self._on_batch_rename_done
+        )
+        self.sample_values.rename_many(excel_path, renames)
+        self._relabel_samples(renames)
+
+    def _on_batch_rename_done(self, job):
+        """Report a finished batch rename, restoring the old names if it failed"""
+        if job.ok:
+            self._show_save_status(f"{len(job.data)} sample(s) renamed", "green")
+            return
+
+        sample_sheets = self.controller.project_data['sample_sheets']
+        restore = {new_name: old_name for old_name, new_name in job.data.items() if new_name in sample_sheets}
+        self.sample_values.rename_many(job.excel_path, restore)
+        self._relabel_samples(restore)
+        self._show_save_status("Renaming samples failed", "red")
+        messagebox.showerror("Error", f"Failed to rename samples:\n{job.error}")
+
+    def _relabel_samples(self, renames):
+        """Show renamed samples under their new names without rebuilding the form"""
+        sample_sheets = self.controller.project_data['sample_sheets']
+        changed = [index for index, name in enumerate(sample_sheets) if name in renames]
+        sample_sheets[:] = [renames.get(name, name) for name in sample_sheets]
+        if not self.sample_type:
+            return
+
+        menu = self.sample_dropdown['menu']
+        for index in changed:
+            menu.entryconfigure(
+                index,
+                label=sample_sheets[index],
+                command=tk._setit(self.current_sample_var, sample_sheets[index], self.change_sample)
+            )
+        if self.current_sample_index in changed:
+            current_sample = sample_sheets[self.current_sample_index]
+            self.current_sample_var.set(current_sample)
+            self.sample_info_label.config(text=f"Working on: {current_sample}")
 
     def show_sample_progress(self):
         """Show progress of all samples"""
@@ -413,18 +544,34 @@ class Characterisation(tk.Frame):
 
             current_sample = self.controller.project_data['sample_sheets'][self.current_sample_index]
 
-            self.excel_handler.save_characterisation_data(
+            # Written in the background; _on_save_done reports the outcome
+            self.controller.save_queue.submit(
                 self.controller.project_data['excel_path'],
                 current_sample,
-                form_data
+                form_data,
+                kind='characterisation',
+                callback=self._on_save_done
             )
-
-            messagebox.showinfo("Success", f"Data saved for {current_sample}!")
+            self.sample_values.update(self.controller.project_data['excel_path'], current_sample, form_data)
+            self._show_save_status(f"Saving {current_sample}...", "orange")
 
         except Exception as e:
             import traceback
             traceback.print_exc()
             messagebox.showerror("Error", f"Failed to save to Excel:\n{e}")
+
+    def _on_save_done(self, job):
+        """Report a finished background save"""
+        if job.ok:
+            if not self.controller.save_queue.pending():
+                self._show_save_status(f"Data saved for {job.sheet_name}!", "green")
+        else:
+            self._show_save_status(f"Save failed for {job.sheet_name}", "red")
+            messagebox.showerror("Error", f"Failed to save {job.sheet_name} to Excel:\n{job.error}")
+
+    def _show_save_status(self, text, color):
+        """Show the outcome of background saves under the form"""
+        self.save_status_label.config(text=text, fg=color)
     
     def _go_back(self):
         """Navigate back to internal project type page"""
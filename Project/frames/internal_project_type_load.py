@@ -1,108 +1,292 @@
 """
-Internal project type frame - Select project type after creating project
+Load project frame - Pick an existing project workbook and reopen it
 """
+import os
 import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from utils.backup_store import BackupStore
+from utils.project_catalog import read_project_details
 
 
 class InternalProjectTypeLoad(tk.Frame):
+    # Which frame reopens each project type written to the summary sheet
+    PROJECT_TYPE_FILTERS = {
+        "All": None,
+        "Characterisation": "Characterisation",
+        "Characterisation and BMP": "BMP Analysis"
+    }
+
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
-        
+        self.projects = []
+
         self._setup_ui()
 
     def _setup_ui(self):
         """Setup the user interface"""
-        label = tk.Label(self, text="Select Project Type", font=("Arial", 16))
-        label.pack(pady=40)
-
-        # Show project info
-        self.info_frame = tk.Frame(self)
-        self.info_frame.pack(pady=10)
-
-        btn_char = tk.Button(
-            self, 
-            text="Characterisation", 
-            font=("Arial", 14), 
-            width=30,
-            command=self._go_to_characterisation
+        label = tk.Label(self, text="Load Existing Project", font=("Arial", 16))
+        label.pack(pady=20)
+
+        # Filters
+        filter_frame = tk.Frame(self)
+        filter_frame.pack(pady=5)
+
+        tk.Label(filter_frame, text="Search:", font=("Arial", 12)).pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.update_project_list())
+        search_entry = tk.Entry(filter_frame, textvariable=self.search_var, font=("Arial", 12), width=20)
+        search_entry.pack(side=tk.LEFT, padx=5)
+
+        self.type_var = tk.StringVar(value="All")
+        type_dropdown = ttk.OptionMenu(
+            filter_frame,
+            self.type_var,
+            "All",
+            *self.PROJECT_TYPE_FILTERS,
+            command=lambda value: self.update_project_list()
+        )
+        type_dropdown.pack(side=tk.LEFT, padx=5)
+
+        # Project list
+        list_frame = tk.Frame(self)
+        list_frame.pack(pady=10, padx=20, fill="both", expand=True)
+
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
+        self.project_list = tk.Listbox(
+            list_frame,
+            font=("Arial", 11),
+            height=15,
+            yscrollcommand=scrollbar.set
+        )
+        scrollbar.config(command=self.project_list.yview)
+        self.project_list.pack(side=tk.LEFT, fill="both", expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.project_list.bind("<Double-Button-1>", lambda e: self._open_selected())
+
+        self.status_label = tk.Label(self, text="", font=("Arial", 10), fg="blue")
+        self.status_label.pack()
+
+        # Actions
+        btn_frame = tk.Frame(self)
+        btn_frame.pack(pady=10)
+
+        open_btn = tk.Button(
+            btn_frame,
+            text="Open Project",
+            font=("Arial", 12),
+            width=15,
+            command=self._open_selected
         )
-        btn_char.pack(pady=10)
-
-        btn_char_bmp = tk.Button(
-            self, 
-            text="Characterisation and BMP", 
-            font=("Arial", 14), 
-            width=30,
-            command=self._go_to_bmp_characterisation
+        open_btn.pack(side=tk.LEFT, padx=5)
+
+        browse_btn = tk.Button(
+            btn_frame,
+            text="Browse...",
+            font=("Arial", 12),
+            command=self._browse
         )
-        btn_char_bmp.pack(pady=10)
-
-        btn_sma = tk.Button(
-            self, 
-            text="SMA", 
-            font=("Arial", 14), 
-            width=30,
-            command=self._go_to_sma
+        browse_btn.pack(side=tk.LEFT, padx=5)
+
+        restore_btn = tk.Button(
+            btn_frame,
+            text="Restore Backup...",
+            font=("Arial", 12),
+            command=self._restore_selected
         )
-        btn_sma.pack(pady=10)
-
-        btn_other = tk.Button(
-            self, 
-            text="Other", 
-            font=("Arial", 14), 
-            width=30,
-            command=self._go_to_other
+        restore_btn.pack(side=tk.LEFT, padx=5)
+
+        refresh_btn = tk.Button(
+            btn_frame,
+            text="Refresh",
+            font=("Arial", 12),
+            command=self.refresh_projects
         )
-        btn_other.pack(pady=10)
+        refresh_btn.pack(side=tk.LEFT, padx=5)
 
         back_btn = tk.Button(
-            self, 
-            text="Back", 
+            self,
+            text="Back",
             font=("Arial", 12),
             command=self._go_back
         )
-        back_btn.pack(pady=20)
+        back_btn.pack(pady=10)
 
     def tkraise(self):
-        """Override to update project info when frame is raised"""
+        """Override to rescan the project folders when frame is raised"""
         super().tkraise()
-        self.update_project_info()
-
-    def update_project_info(self):
-        """Update project information display"""
-        # Clear previous info
-        for widget in self.info_frame.winfo_children():
-            widget.destroy()
-            
-        # Show current project info
-        if self.controller.project_data['name']:
-            info_text = (f"Project: {self.controller.project_data['name']} | "
-                        f"Samples: {self.controller.project_data['sample_count']}")
-            info_label = tk.Label(self.info_frame, text=info_text, font=("Arial", 10), fg="blue")
-            info_label.pack()
-    
-    def _go_to_characterisation(self):
-        """Navigate to characterisation page"""
-        from frames.characterisation_load import Characterisation
-        self.controller.show_frame(Characterisation)
-    
-    def _go_to_bmp_characterisation(self):
-        """Navigate to BMP characterisation page"""
-        from frames.bmp_characterisation_load import BMPandCharacterisation
-        self.controller.show_frame(BMPandCharacterisation)
-    
-    def _go_to_sma(self):
-        """Navigate to SMA page"""
-        from frames.sma_load import SMA
-        self.controller.show_frame(SMA)
-    
-    def _go_to_other(self):
-        """Navigate to other page"""
-        from frames.other_load import Other
-        self.controller.show_frame(Other)
-    
+        self.refresh_projects()
+
+    def refresh_projects(self):
+        """Bring the project catalog up to date and list its projects"""
+        catalog = self.controller.project_catalog
+        if catalog is None:
+            self.status_label.config(text="Project list unavailable - use Browse...", fg="red")
+            return
+
+        self.status_label.config(text="Scanning projects...", fg="blue")
+        self.update_idletasks()
+        try:
+            catalog.refresh()
+        except Exception as e:
+            print(f"Warning: {e}")
+            self.status_label.config(text="Could not scan the project folder", fg="red")
+        self.update_project_list()
+
+    def update_project_list(self):
+        """Show the catalogued projects matching the filters"""
+        catalog = self.controller.project_catalog
+        if catalog is None:
+            return
+
+        try:
+            self.projects = [
+                project for project in catalog.list_projects(
+                    name=self.search_var.get().strip() or None,
+                    project_type=self.PROJECT_TYPE_FILTERS.get(self.type_var.get())
+                )
+                if project['project_type'] in ("Characterisation", "BMP Analysis")
+            ]
+        except Exception as e:
+            print(f"Warning: {e}")
+            self.projects = []
+
+        self.project_list.delete(0, tk.END)
+        for project in self.projects:
+            self.project_list.insert(tk.END, (
+                f"{project['name']} | {project['project_type']} | {project['sample_type']} | "
+                f"{project['sample_count']} samples | {project['created_date'] or ''}"
+            ))
+        self.status_label.config(text=f"{len(self.projects)} project(s)", fg="blue")
+
+    def _open_selected(self):
+        """Open the project selected in the list"""
+        selection = self.project_list.curselection()
+        if not selection:
+            messagebox.showwarning("No Project", "Please select a project to open.")
+            return
+        self.open_project(self.projects[selection[0]]['path'])
+
+    def _browse(self):
+        """Open a project workbook that is not in the list"""
+        excel_path = filedialog.askopenfilename(
+            title="Open Project Workbook",
+            initialdir=self.controller.project_catalog.base_dir if self.controller.project_catalog else None,
+            filetypes=[("Excel workbooks", "*.xlsx")]
+        )
+        if excel_path:
+            self.open_project(excel_path)
+
+    def _restore_selected(self):
+        """Pick a backed-up version of the selected project to restore"""
+        selection = self.project_list.curselection()
+        if not selection:
+            messagebox.showwarning("No Project", "Please select a project to restore.")
+            return
+        excel_path = self.projects[selection[0]]['path']
+
+        snapshots = BackupStore.for_workbook(excel_path).list_snapshots(excel_path)
+        if not snapshots:
+            messagebox.showinfo("No Backups", f"There are no backups of '{os.path.basename(excel_path)}'.")
+            return
+
+        dialog = tk.Toplevel(self)
+        dialog.title("Restore Backup")
+        dialog.transient(self.winfo_toplevel())
+        tk.Label(dialog, text=os.path.basename(excel_path), font=("Arial", 12, "bold")).pack(pady=10, padx=20)
+
+        versions = tk.Listbox(dialog, font=("Arial", 11), height=15, width=30)
+        for snapshot in snapshots:
+            versions.insert(tk.END, snapshot['time'].strftime("%Y-%m-%d %H:%M:%S"))
+        versions.pack(padx=20, fill="both", expand=True)
+        versions.selection_set(0)
+
+        def restore():
+            chosen = versions.curselection()
+            if chosen:
+                dialog.destroy()
+                self._restore_backup(excel_path, snapshots[chosen[0]])
+
+        btn_frame = tk.Frame(dialog)
+        btn_frame.pack(pady=10)
+        tk.Button(btn_frame, text="Restore", font=("Arial", 11), width=10, command=restore).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Cancel", font=("Arial", 11), width=10, command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+        dialog.grab_set()
+
+    def _restore_backup(self, excel_path, snapshot):
+        """Replace a project workbook with one of its backed-up versions and reopen it"""
+        if not messagebox.askyesno(
+                "Restore Backup",
+                f"Replace '{os.path.basename(excel_path)}' with the version saved at "
+                f"{snapshot['time'].strftime('%Y-%m-%d %H:%M:%S')}?\n\n"
+                "The current version is backed up first."):
+            return
+
+        # Queued saves must reach the file, and Excel must let go of it, before
+        # it is replaced; the writer does both in order and reports back
+        self.status_label.config(text="Saving pending changes before restoring...", fg="blue")
+        for frame in self.controller.frames.values():
+            handler = getattr(frame, 'excel_handler', None)
+            if handler is not None:
+                try:
+                    handler.close_workbooks(excel_path)
+                except Exception as e:
+                    self.status_label.config(text="", fg="blue")
+                    messagebox.showerror("Error", f"Could not save open workbook:\n{e}")
+                    return
+        self.controller.save_queue.submit_close(
+            excel_path, callback=lambda job: self._on_workbook_closed(job, excel_path, snapshot))
+
+    def _on_workbook_closed(self, job, excel_path, snapshot):
+        """Restore a backup once the save queue has saved and closed its workbook"""
+        self.status_label.config(text="", fg="blue")
+        try:
+            if job.error is not None:
+                raise Exception(f"Failed to save pending changes: {job.error}")
+            BackupStore.for_workbook(excel_path).restore(excel_path, snapshot['id'])
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        if self.controller.project_catalog is not None:
+            self.controller.project_catalog.record(excel_path)
+        self.open_project(excel_path)
+
+    def open_project(self, excel_path):
+        """
+        Rebuild the project data from a workbook and show it in its project frame
+
+        Args:
+            excel_path: Path to the project workbook
+        """
+        try:
+            catalog = self.controller.project_catalog
+            project = catalog.lookup(excel_path) if catalog is not None else read_project_details(excel_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open project:\n{e}")
+            return
+
+        if project['status'] == 'Unreadable' or not project['sample_sheets']:
+            messagebox.showerror("Error", f"'{os.path.basename(excel_path)}' is not a readable project workbook.")
+            return
+
+        self.controller.project_data.update({
+            'name': project['name'],
+            'sample_count': len(project['sample_sheets']),
+            'excel_path': os.path.abspath(excel_path),
+            'sample_sheets': list(project['sample_sheets']),
+            'project_type': project['project_type'],
+            'sample_type': project['sample_type']
+        })
+
+        if project['project_type'] == "BMP Analysis":
+            from frames.bmp_characterisation import BMPandCharacterisation as frame_class
+        else:
+            from frames.characterisation import Characterisation as frame_class
+        self.controller.show_frame(frame_class)
+        self.controller.get_frame(frame_class).open_project()
+
     def _go_back(self):
         """Navigate back to internal page"""
         from frames.internal_page import InternalPage
-        self.controller.show_frame(InternalPage)
\ No newline at end of file
+        self.controller.show_frame(InternalPage)
@@ -0,0 +1,91 @@
+"""
+Performance window - Recent latencies of the workbook operations
+"""
+import tkinter as tk
+from tkinter import ttk
+from utils.tracing import get_tracer
+
+
+class PerformanceWindow(tk.Toplevel):
+    COLUMNS = (
+        ("count", "Count", 70),
+        ("p50", "p50 (ms)", 90),
+        ("p95", "p95 (ms)", 90),
+        ("max", "Max (ms)", 90),
+        ("last", "Last (ms)", 90)
+    )
+    REFRESH_MS = 2000
+
+    def __init__(self, parent):
+        """
+        Args:
+            parent: Window opening the view
+        """
+        super().__init__(parent)
+        self.tracer = get_tracer()
+        self._refresh_job = None
+
+        self.title("Workbook Performance")
+        self.geometry("600x400")
+        self._setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self._close)
+        self.refresh()
+
+    def _setup_ui(self):
+        """Setup the user interface"""
+        tk.Label(self, text="Workbook Operation Latencies", font=("Arial", 14, "bold")).pack(pady=10)
+
+        list_frame = tk.Frame(self)
+        list_frame.pack(pady=5, padx=20, fill="both", expand=True)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
+        self.tree = ttk.Treeview(
+            list_frame,
+            columns=[column for column, _, _ in self.COLUMNS],
+            yscrollcommand=scrollbar.set
+        )
+        self.tree.heading("#0", text="Operation")
+        self.tree.column("#0", width=200)
+        for column, heading, width in self.COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor="e")
+        scrollbar.config(command=self.tree.yview)
+        self.tree.pack(side=tk.LEFT, fill="both", expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill="y")
+
+        if self.tracer.path:
+            trace_text = f"Trace file: {self.tracer.path}"
+        else:
+            trace_text = "Trace file: none (latencies are kept in memory only)"
+        if not self.tracer.enabled:
+            trace_text = "Tracing is turned off (TRACE_ENABLED)"
+        tk.Label(self, text=trace_text, font=("Arial", 9), fg="gray", wraplength=560).pack(padx=20, anchor="w")
+
+        btn_frame = tk.Frame(self)
+        btn_frame.pack(pady=10)
+        tk.Button(btn_frame, text="Refresh", font=("Arial", 11), command=self.refresh).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Reset", font=("Arial", 11), command=self._reset).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="Close", font=("Arial", 11), command=self._close).pack(side=tk.LEFT, padx=5)
+
+    def refresh(self):
+        """Show the latest latencies, slowest p95 first, and schedule the next refresh"""
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+
+        summary = self.tracer.latency_summary()
+        self.tree.delete(*self.tree.get_children())
+        for name, stats in sorted(summary.items(), key=lambda item: item[1]['p95'], reverse=True):
+            values = [stats['count']] + [f"{stats[key] * 1000:.1f}" for key, _, _ in self.COLUMNS[1:]]
+            self.tree.insert("", "end", text=name, values=values)
+
+        self._refresh_job = self.after(self.REFRESH_MS, self.refresh)
+
+    def _reset(self):
+        """Forget the latencies recorded so far"""
+        self.tracer.reset()
+        self.refresh()
+
+    def _close(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        self.destroy()
@@ -3,6 +3,7 @@ Project name frame - Input project details
 """
 import tkinter as tk
 from tkinter import messagebox
+from config.settings import get_max_sample_count
 from utils.validators import validate_project_name, validate_sample_count
 
 
@@ -56,7 +57,10 @@ class Project_name(tk.Frame):
             return
         
         if not validate_sample_count(sample_count):
-            messagebox.showwarning("Input Error", "Please enter a valid number of samples (greater than 0).")
+            messagebox.showwarning(
+                "Input Error",
+                f"Please enter a valid number of samples (1-{get_max_sample_count()})."
+            )
             return
         
         # Store project data
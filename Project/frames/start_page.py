@@ -20,6 +20,14 @@ class StartPage(tk.Frame):
             command=self._go_to_internal_page
         )
         btn_internal.pack(pady=10)
+
+        btn_performance = tk.Button(
+            self,
+            text="Performance...",
+            font=("Arial", 10),
+            command=self.controller.show_performance
+        )
+        btn_performance.pack(side=tk.BOTTOM, pady=10)
     
     def _go_to_internal_page(self):
         """Navigate to internal page"""
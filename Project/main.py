@@ -1,21 +1,37 @@
 """
 Main application entry point
 """
+import importlib
+import threading
 import tkinter as tk
+from config.settings import FRAME_WARMUP, FRAME_WARMUP_DELAY_MS
 from frames.start_page import StartPage
-from frames.internal_page import InternalPage
-from frames.internal_project_type import InternalProjectType
-from frames.internal_project_type_load import InternalProjectTypeLoad
-from frames.project_name import Project_name
-from frames.characterisation import Characterisation
-from frames.bmp_characterisation import BMPandCharacterisation
-from frames.bmp_characterisation_load import BMPandCharacterisationLoad
-from frames.sma import SMA
-from frames.other import Other
+from frames.performance_view import PerformanceWindow
+from utils.approval_status import ApprovalStatusCache
+from utils.excel_app_pool import shutdown_excel_app_pool
+from utils.project_catalog import ProjectCatalog
+from utils.save_journal import SaveJournal
+from utils.save_queue import SaveQueue
+from utils.submission_outbox import SubmissionOutbox, SubmissionSender
+from utils.tracing import get_tracer, span
 
 
 
 class ProjectManagementApp(tk.Tk):
+    # Pages usually opened next from each page, as "module.Class" so that
+    # they are only imported when warmed up or shown
+    NEXT_FRAMES = {
+        'StartPage': ['frames.internal_page.InternalPage'],
+        'InternalPage': ['frames.project_name.Project_name',
+                         'frames.internal_project_type_load.InternalProjectTypeLoad'],
+        'Project_name': ['frames.internal_project_type.InternalProjectType'],
+        'InternalProjectType': ['frames.bmp_characterisation.BMPandCharacterisation',
+                                'frames.characterisation.Characterisation'],
+        'InternalProjectTypeLoad': ['frames.bmp_characterisation.BMPandCharacterisation',
+                                    'frames.characterisation.Characterisation']
+    }
+    WARMUP_POLL_MS = 50
+
     def __init__(self):
         super().__init__()
         self.title("Project Management App")
@@ -30,21 +46,180 @@ class ProjectManagementApp(tk.Tk):
             'sample_sheets': []
         }
 
+        # Index of existing project workbooks, for loading projects
+        self.project_catalog = self._open_project_catalog()
+
+        # Workbook saves are journalled, then run on a background writer;
+        # finished saves are reported back to the frames from the Tk event loop
+        self.save_queue = SaveQueue(journal=self._open_save_journal())
+        self.save_queue.attach(self)
+        self._replay_save_journal()
+
+        # Samples sent for supervisor approval go through a local outbox and a
+        # background sender; the frames show each sample's delivery state
+        self.submissions = SubmissionSender(self._open_submission_outbox())
+        self.submissions.attach(self)
+        self.approval_statuses = self._open_approval_status_cache()
+
         self.container = tk.Frame(self)
         self.container.pack(fill="both", expand=True)
 
+        # Pages are built when first shown, so only the start page is built
+        # (and imported) before the window appears
         self.frames = {}
-        for F in (StartPage, InternalPage, InternalProjectType,InternalProjectTypeLoad,BMPandCharacterisationLoad, Project_name,
-                  Characterisation, BMPandCharacterisation, SMA, Other):
-            frame = F(parent=self.container, controller=self)
-            self.frames[F] = frame
-            frame.place(relwidth=1, relheight=1)
+        self._warmup = []
+        self._warmup_job = None
+        self._warmup_imports = None
 
         self.show_frame(StartPage)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        # Ctrl+Shift+P opens the workbook latency view from any page
+        self.performance_window = None
+        self.bind_all("<Control-P>", lambda event: self.show_performance())
+
+    def _open_save_journal(self):
+        """Open the save journal, running without one if it cannot be opened"""
+        try:
+            return SaveJournal()
+        except Exception as e:
+            print(f"Warning: Could not open save journal: {e}")
+            return None
+
+    def _open_submission_outbox(self):
+        """Open the submission outbox, keeping submissions in memory if it cannot be opened"""
+        try:
+            return SubmissionOutbox()
+        except Exception as e:
+            print(f"Warning: Could not open submission outbox; unsent submissions will be lost on exit: {e}")
+            return SubmissionOutbox(':memory:')
+
+    def _open_approval_status_cache(self):
+        """Open the approval status cache, keeping statuses in memory if it cannot be opened"""
+        try:
+            return ApprovalStatusCache()
+        except Exception as e:
+            print(f"Warning: Could not open approval status cache: {e}")
+            return ApprovalStatusCache(':memory:')
+
+    def _open_project_catalog(self):
+        """Open the project catalog, running without one if it cannot be opened"""
+        try:
+            return ProjectCatalog()
+        except Exception as e:
+            print(f"Warning: Could not open project catalog: {e}")
+            return None
+
+    def _replay_save_journal(self):
+        """Write saves that did not reach their workbooks last time"""
+        count = self.save_queue.replay_journal(callback=self._on_replayed_save)
+        if count:
+            print(f"Replaying {count} unsaved change(s) from the save journal")
+
+    def _on_replayed_save(self, job):
+        """Report a journalled change that still could not be written"""
+        if not job.ok:
+            print(f"Warning: Could not replay journalled change to {job.excel_path}: {job.error}")
+
+    def _on_close(self):
+        """Save pending workbook changes before the window closes"""
+        self.save_queue.detach(self)
+        self.save_queue.stop()
+        self.submissions.detach(self)
+        self.submissions.stop(timeout=5)
+        self.approval_statuses.close()
+        if self._warmup_job is not None:
+            self.after_cancel(self._warmup_job)
+            self._warmup_job = None
+        for frame in self.frames.values():
+            handler = getattr(frame, 'excel_handler', None)
+            if handler is not None:
+                try:
+                    handler.close_workbooks()
+                except Exception as e:
+                    print(f"Warning: Could not save open workbooks: {e}")
+        shutdown_excel_app_pool()
+        if self.project_catalog is not None:
+            self.project_catalog.close()
+        get_tracer().close()
+        self.destroy()
+
+    def show_performance(self):
+        """Open the workbook latency view, or bring it to the front if it is open"""
+        if self.performance_window is not None and self.performance_window.winfo_exists():
+            self.performance_window.lift()
+            return
+        self.performance_window = PerformanceWindow(self)
+
+    def get_frame(self, page):
+        """
+        Get a page, building it on first use without showing it
+
+        Args:
+            page: Frame class of the page
+
+        Returns:
+            The page's frame
+        """
+        frame = self.frames.get(page)
+        if frame is None:
+            with span('build_frame', frame=page.__name__):
+                frame = page(parent=self.container, controller=self)
+                frame.place(relwidth=1, relheight=1)
+                # Placed last, it would cover the page being shown
+                frame.lower()
+            self.frames[page] = frame
+        return frame
 
     def show_frame(self, page):
-        frame = self.frames[page]
+        frame = self.get_frame(page)
         frame.tkraise()
+        if FRAME_WARMUP:
+            self._schedule_warmup(page)
+
+    def _schedule_warmup(self, page):
+        """Build the pages usually opened next from page once the app is idle"""
+        if self._warmup_job is not None:
+            self.after_cancel(self._warmup_job)
+            self._warmup_job = None
+        built = {f"{F.__module__}.{F.__name__}" for F in self.frames}
+        self._warmup = [path for path in self.NEXT_FRAMES.get(page.__name__, []) if path not in built]
+        if not self._warmup:
+            return
+
+        # Their modules (tkcalendar, the Excel handler...) are imported in the
+        # background; only building the widgets has to happen on the Tk thread
+        modules = [path.rsplit('.', 1)[0] for path in self._warmup]
+        self._warmup_imports = threading.Thread(target=self._import_modules, args=(modules,),
+                                                name="FrameWarmup", daemon=True)
+        self._warmup_imports.start()
+        self._warmup_job = self.after(FRAME_WARMUP_DELAY_MS, self._warm_next_frame)
+
+    @staticmethod
+    def _import_modules(modules):
+        for module in modules:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                print(f"Warning: Could not import {module} ahead of time: {e}")
+
+    def _warm_next_frame(self):
+        """Build one waiting page, then yield to the event loop before the next"""
+        self._warmup_job = None
+        if self._warmup_imports is not None and self._warmup_imports.is_alive():
+            self._warmup_job = self.after(self.WARMUP_POLL_MS, self._warm_next_frame)
+            return
+        if not self._warmup:
+            return
+
+        module, name = self._warmup.pop(0).rsplit('.', 1)
+        try:
+            self.get_frame(getattr(importlib.import_module(module), name))
+        except Exception as e:
+            # The page is built again, and the error shown, when it is opened
+            print(f"Warning: Could not build {name} ahead of time: {e}")
+        if self._warmup:
+            self._warmup_job = self.after_idle(self._warm_next_frame)
 
 
 if __name__ == "__main__":
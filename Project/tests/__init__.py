@@ -0,0 +1,5 @@
+"""
+Tests package - pytest suite run on the in-memory Excel engine
+
+Run with python -m pytest from the Project folder.
+"""
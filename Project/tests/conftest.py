@@ -0,0 +1,39 @@
+"""
+Shared test setup - points the app at a scratch project folder and generated
+master templates, and selects the in-memory Excel engine
+
+The settings are read once when config.settings is first imported, so the
+environment is set here before any app module is loaded.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix='project-tests-')
+TEMPLATE_PATH = os.path.join(WORK_DIR, 'template.xlsx')
+
+os.environ.update({
+    'BASE_PROJECT_DIR': os.path.join(WORK_DIR, 'projects'),
+    'LOCAL_DATA_DIR': os.path.join(WORK_DIR, 'local'),
+    'MASTER_TEMPLATE_PATH': TEMPLATE_PATH,
+    'MASTER_TEMPLATE_PATH_EFFLUENT': TEMPLATE_PATH,
+    'MASTER_TEMPLATE_PATH_BMP_SOLID': TEMPLATE_PATH,
+    'MASTER_TEMPLATE_PATH_BMP_EFFLUENT': TEMPLATE_PATH,
+    'EXCEL_ENGINE': 'memory',
+    'TRACE_ENABLED': '0',
+})
+
+from benchmarks.workbook_benchmarks import write_template  # noqa: E402
+
+write_template(TEMPLATE_PATH, 40)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    from utils.excel_app_pool import shutdown_excel_app_pool
+    shutdown_excel_app_pool()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
@@ -0,0 +1,140 @@
+"""
+Tests for the Excel application pool, run on MemoryExcelBackend
+"""
+import time
+
+import pytest
+
+from utils.excel_app_pool import ExcelAppPool, get_excel_app_pool
+from utils.excel_handler import ExcelHandler
+from utils.memory_excel import MemoryExcelBackend
+from utils.save_queue import SaveQueue
+
+
+@pytest.fixture
+def backend():
+    return MemoryExcelBackend()
+
+
+def test_leases_share_processes_once_the_pool_is_full(backend):
+    pool = ExcelAppPool(backend, max_size=2, idle_seconds=60)
+    try:
+        leases = [pool.lease() for _ in range(3)]
+
+        assert pool.stats['started'] == 2
+        assert pool.stats['leases'] == 3
+        assert len({lease.pid for lease in leases}) == 2
+        assert sorted(app['leases'] for app in pool.status()) == [1, 2]
+    finally:
+        pool.shutdown()
+
+
+def test_released_process_is_reused_before_starting_another(backend):
+    pool = ExcelAppPool(backend, max_size=2, idle_seconds=60)
+    try:
+        first = pool.lease()
+        pid = first.pid
+        first.release()
+
+        second = pool.lease()
+
+        assert second.pid == pid
+        assert pool.stats['started'] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_crashed_process_is_restarted_for_every_lease_on_it(backend):
+    pool = ExcelAppPool(backend, max_size=1, idle_seconds=60)
+    try:
+        first = pool.lease()
+        second = pool.lease()
+        app = first.app
+        old_pid = first.pid
+        assert first.generation == 0
+
+        backend.crash(old_pid)
+        assert not backend.is_alive(old_pid, app)
+
+        restarted = first.app
+
+        assert first.pid != old_pid
+        assert first.generation == 1
+        assert backend.is_alive(first.pid, restarted)
+        assert pool.stats['restarted'] == 1
+        # The other lease on the process sees the replacement without a second restart
+        assert second.pid == first.pid
+        assert second.generation == 1
+        second.app
+        assert pool.stats['restarted'] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_idle_processes_are_reaped(backend):
+    pool = ExcelAppPool(backend, max_size=2, idle_seconds=0.05)
+    try:
+        lease = pool.lease()
+        pid = lease.pid
+        lease.release()
+
+        deadline = time.monotonic() + 5
+        while pool.status() and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        assert pool.status() == []
+        assert pool.stats['stopped'] == 1
+        assert not backend.is_alive(pid)
+    finally:
+        pool.shutdown()
+
+
+def test_leased_processes_are_not_reaped(backend):
+    pool = ExcelAppPool(backend, max_size=2, idle_seconds=0.05)
+    try:
+        held = pool.lease()
+        idle = pool.lease()
+        idle.release()
+        time.sleep(0.3)
+
+        assert pool.status() == [{'pid': held.pid, 'leases': 1}]
+    finally:
+        pool.shutdown()
+
+
+def test_shutdown_stops_leased_processes(backend):
+    pool = ExcelAppPool(backend, max_size=2, idle_seconds=60)
+    lease = pool.lease()
+    pid = lease.pid
+
+    pool.shutdown()
+
+    assert pool.status() == []
+    assert not backend.is_alive(pid)
+
+
+def test_save_queue_writer_process_is_reaped_after_a_quiet_period(monkeypatch):
+    pool = get_excel_app_pool('memory')
+    monkeypatch.setattr(pool, 'idle_seconds', 0.05)
+    handler = ExcelHandler('memory')
+    try:
+        workbook = handler.create_characterisation_workbook('reaped', 1, ['S1'], "Solid")
+    finally:
+        handler.close()
+
+    queue = SaveQueue(handler_factory=lambda: ExcelHandler('memory'), coalesce_seconds=0,
+                      idle_close_seconds=0.5)
+    try:
+        queue.submit(workbook, 'S1', {'B5': 'value'})
+        assert queue.wait(10)
+        leased = [app['pid'] for app in pool.status() if app['leases']]
+        assert len(leased) == 1
+
+        deadline = time.monotonic() + 5
+        while pool.backend.is_alive(leased[0]) and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        assert not pool.backend.is_alive(leased[0])
+        assert all(not app['leases'] for app in pool.status())
+    finally:
+        queue.stop(10)
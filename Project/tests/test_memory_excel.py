@@ -0,0 +1,100 @@
+"""
+Tests for ExcelHandler on the in-memory Excel engine
+"""
+import os
+
+import pytest
+
+from utils.excel_app_pool import get_excel_app_pool
+from utils.excel_handler import ExcelHandler
+
+SAMPLES = ['S1', 'S2', 'S3']
+
+
+@pytest.fixture
+def handler():
+    handler = ExcelHandler('memory')
+    yield handler
+    handler.close()
+
+
+@pytest.fixture
+def workbook(handler, request):
+    return handler.create_characterisation_workbook(request.node.name, len(SAMPLES), SAMPLES, "Solid")
+
+
+def test_create_save_rename_read_round_trip(handler, workbook):
+    assert os.path.exists(workbook)
+    for name in SAMPLES:
+        assert handler.check_sheet_exists(workbook, name)
+
+    handler.save_characterisation_data(workbook, 'S1', {'B5': 'Sludge', 'B7': 12.5, 'B3:D3': 'merged'})
+    assert handler.flush(workbook) == [workbook]
+    handler.close_workbooks()
+
+    handler.rename_sheet(workbook, 'S1', 'Sample 1')
+    handler.close_workbooks()
+
+    assert not handler.check_sheet_exists(workbook, 'S1')
+    assert handler.check_sheet_exists(workbook, 'Sample 1')
+    assert handler.get_sheet_data(workbook, 'Sample 1', ['B5', 'B7', 'B3']) == {
+        'B5': 'Sludge', 'B7': 12.5, 'B3': 'merged'
+    }
+
+
+def test_saved_values_are_read_back_by_a_new_handler(handler, workbook):
+    handler.save_characterisation_data(workbook, 'S2', {'B5': 'Effluent'})
+    handler.close_workbooks()
+
+    reader = ExcelHandler('memory')
+    try:
+        assert reader.get_sheet_data(workbook, 'S2', ['B5']) == {'B5': 'Effluent'}
+    finally:
+        reader.close()
+
+
+def test_rename_sheets_swaps_names(handler, workbook):
+    handler.save_characterisation_data(workbook, 'S1', {'B5': 'first'})
+    handler.save_characterisation_data(workbook, 'S2', {'B5': 'second'})
+
+    handler.rename_sheets(workbook, {'S1': 'S2', 'S2': 'S1'})
+    handler.close_workbooks()
+
+    assert handler.get_sheet_data(workbook, 'S1', ['B5']) == {'B5': 'second'}
+    assert handler.get_sheet_data(workbook, 'S2', ['B5']) == {'B5': 'first'}
+
+
+def test_handler_recovers_after_excel_crashes(handler, workbook):
+    handler.save_characterisation_data(workbook, 'S1', {'B5': 'saved'})
+    handler.flush()
+    handler.save_characterisation_data(workbook, 'S2', {'B5': 'lost'})
+    pool = get_excel_app_pool('memory')
+    restarted = pool.stats['restarted']
+
+    pool.backend.crash(handler._app_lease.pid)
+    handler.save_characterisation_data(workbook, 'S3', {'B5': 'after crash'})
+    handler.close_workbooks()
+
+    assert pool.stats['restarted'] == restarted + 1
+    data = {name: handler.get_sheet_data(workbook, name, ['B5'])['B5'] for name in SAMPLES}
+    assert data == {'S1': 'saved', 'S2': None, 'S3': 'after crash'}
+
+
+def test_unchanged_values_are_not_rewritten_by_a_new_session(handler, workbook):
+    values = {'B1': 'Solid', 'D1': '12', 'B3:D3': 'merged', 'B4:D4': ''}
+    handler.save_characterisation_data(workbook, 'S1', values)
+    handler.close_workbooks()
+    backend = get_excel_app_pool('memory').backend
+    backend.reset_operations()
+
+    # The form is filled from the workbook and saved again without changes
+    handler.save_characterisation_data(workbook, 'S1', values)
+
+    operations = backend.reset_operations()
+    assert operations.get('range.write', 0) == 0
+    assert operations.get('range.read', 0) == 1
+    assert handler.flush(workbook) == []
+
+    handler.save_characterisation_data(workbook, 'S1', dict(values, D1='13'))
+    assert backend.reset_operations().get('range.write', 0) == 1
+    assert handler.flush(workbook) == [workbook]
@@ -0,0 +1,50 @@
+"""
+Tests for the save journal
+"""
+import pytest
+
+from utils.save_journal import SaveJournal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'save_journal.jsonl')
+
+
+def test_outstanding_entries_survive_a_restart(path):
+    journal = SaveJournal(path)
+    first = journal.append('characterisation', 'project.xlsx', 'S1', data={'B5': 'one'})
+    second = journal.append('rename', 'project.xlsx', 'S1', new_name='Sample 1')
+    journal.mark_applied([first])
+    journal.close()
+
+    reopened = SaveJournal(path)
+    try:
+        assert [entry['seq'] for entry in reopened.pending_entries()] == [second]
+        assert reopened.append('characterisation', 'project.xlsx', 'S2', data={}) == second + 1
+    finally:
+        reopened.close()
+
+
+def test_journal_in_use_cannot_be_opened_again(path):
+    journal = SaveJournal(path)
+    journal.append('characterisation', 'project.xlsx', 'S1', data={'B5': 'mine'})
+    try:
+        with pytest.raises(Exception, match="held by another copy"):
+            SaveJournal(path)
+        assert len(journal.pending_entries()) == 1
+    finally:
+        journal.close()
+
+    reopened = SaveJournal(path)
+    try:
+        assert len(reopened.pending_entries()) == 1
+    finally:
+        reopened.close()
+
+
+def test_default_journal_is_kept_in_the_local_data_folder():
+    from config.settings import BASE_PROJECT_DIR, LOCAL_DATA_DIR, SAVE_JOURNAL_PATH
+
+    assert SAVE_JOURNAL_PATH.startswith(LOCAL_DATA_DIR)
+    assert not SAVE_JOURNAL_PATH.startswith(BASE_PROJECT_DIR)
@@ -0,0 +1,177 @@
+"""
+Tests for the background save queue and the save journal it replays
+"""
+import os
+import time
+
+import pytest
+
+from utils.excel_handler import ExcelHandler
+from utils.save_journal import SaveJournal
+from utils.save_queue import SaveQueue
+
+SAMPLES = ['S1', 'S2']
+
+
+@pytest.fixture
+def workbook(request):
+    handler = ExcelHandler('memory')
+    try:
+        return handler.create_characterisation_workbook(request.node.name, len(SAMPLES), SAMPLES, "Solid")
+    finally:
+        handler.close()
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = SaveJournal(str(tmp_path / 'save_journal.jsonl'))
+    yield journal
+    journal.close()
+
+
+def read_cells(excel_path, sheet_name, cell_ranges):
+    handler = ExcelHandler('memory')
+    try:
+        return handler.get_sheet_data(excel_path, sheet_name, cell_ranges)
+    finally:
+        handler.close()
+
+
+def memory_queue(journal=None):
+    return SaveQueue(handler_factory=lambda: ExcelHandler('memory'), coalesce_seconds=0, journal=journal)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_queued_saves_reach_the_workbook(workbook, journal):
+    queue = memory_queue(journal)
+    finished = []
+    try:
+        first = queue.submit(workbook, 'S1', {'B5': 'first'}, callback=finished.append)
+        second = queue.submit(workbook, 'S1', {'B7': 2})
+        rename = queue.submit_rename(workbook, 'S2', 'Renamed')
+        assert queue.wait(10)
+        assert queue.poll() == [first, second, rename]
+    finally:
+        queue.stop(10)
+
+    assert finished == [first]
+    assert first.ok and second.ok and rename.ok
+    assert journal.pending_entries() == []
+    assert read_cells(workbook, 'S1', ['B5', 'B7']) == {'B5': 'first', 'B7': 2}
+    assert read_cells(workbook, 'Renamed', ['B5']) == {'B5': None}
+
+
+def test_journal_entries_left_by_a_crash_are_replayed(workbook, tmp_path):
+    path = str(tmp_path / 'save_journal.jsonl')
+    crashed = SaveJournal(path)
+    crashed.append('characterisation', workbook, 'S1', data={'B5': 'recovered'})
+    crashed.append('rename', workbook, 'S2', new_name='Renamed')
+    crashed.close()
+
+    journal = SaveJournal(path)
+    queue = memory_queue(journal)
+    try:
+        assert queue.replay_journal() == 2
+        assert queue.wait(10)
+        jobs = queue.poll()
+    finally:
+        queue.stop(10)
+
+    assert [job.ok for job in jobs] == [True, True]
+    assert all(job.replayed for job in jobs)
+    assert SaveJournal(path).pending_entries() == []
+    assert read_cells(workbook, 'S1', ['B5']) == {'B5': 'recovered'}
+    assert read_cells(workbook, 'Renamed', ['B5']) == {'B5': None}
+
+
+def test_writer_closes_its_workbooks_when_idle(workbook):
+    handlers = []
+
+    def handler_factory():
+        handlers.append(ExcelHandler('memory'))
+        return handlers[-1]
+
+    queue = SaveQueue(handler_factory=handler_factory, coalesce_seconds=0, idle_close_seconds=0.3)
+    try:
+        queue.submit(workbook, 'S1', {'B5': 'first'})
+        assert queue.wait(10)
+        writer, = handlers
+        assert writer._workbook_cache.peek(workbook) is not None
+
+        assert wait_until(lambda: writer._workbook_cache.peek(workbook) is None)
+
+        # The next save opens the workbook again
+        queue.submit(workbook, 'S1', {'B5': 'second'})
+        assert queue.wait(10)
+        assert writer._workbook_cache.peek(workbook) is not None
+    finally:
+        queue.stop(10)
+
+    assert read_cells(workbook, 'S1', ['B5']) == {'B5': 'second'}
+
+
+class FlakyHandler:
+    """Handler that rejects cell A1 and, while fail_flush is set, cannot save"""
+
+    fail_flush = True
+
+    def save_many(self, excel_path, sheets):
+        return {sheet_name: {cell_range: ("Invalid value" if cell_range == 'A1' else None)
+                             for cell_range in data}
+                for sheet_name, data in sheets.items()}
+
+    def flush(self, excel_path=None):
+        if FlakyHandler.fail_flush:
+            raise Exception("Failed to save Excel workbook: disk full")
+        return [excel_path]
+
+    def close(self):
+        pass
+
+
+def test_job_with_rejected_cells_stays_journalled_when_the_save_fails(journal, tmp_path, monkeypatch):
+    monkeypatch.setattr(FlakyHandler, 'fail_flush', True)
+    excel_path = str(tmp_path / 'project.xlsx')
+    queue = SaveQueue(handler_factory=FlakyHandler, coalesce_seconds=0, journal=journal)
+    try:
+        job = queue.submit(excel_path, 'S1', {'A1': 'bad', 'B2': 'good'})
+        assert queue.wait(10)
+        queue.poll()
+
+        assert job.failed_cells == {'A1': 'Invalid value'}
+        assert job.flush_error is not None
+        assert not job.ok
+        assert len(journal.pending_entries()) == 1
+
+        monkeypatch.setattr(FlakyHandler, 'fail_flush', False)
+        assert queue.replay_journal() == 1
+        assert queue.wait(10)
+        replayed, = queue.poll()
+    finally:
+        queue.stop(10)
+
+    # Still rejected, but the rest of it is saved, so the entry is settled
+    assert replayed.failed_cells == {'A1': 'Invalid value'}
+    assert replayed.flush_error is None
+    assert journal.pending_entries() == []
+
+
+def test_saves_fail_when_the_handler_cannot_be_created(journal, tmp_path):
+    def broken_factory():
+        raise Exception("Failed to start Excel: not installed")
+
+    queue = SaveQueue(handler_factory=broken_factory, coalesce_seconds=0, journal=journal)
+    queue._thread.join(10)
+    job = queue.submit(str(tmp_path / 'project.xlsx'), 'S1', {'B5': 'value'})
+    queue.wait(10)
+
+    assert queue.poll() == [job]
+    assert job.done and not job.ok
+    assert len(journal.pending_entries()) == 1
+    assert os.path.exists(journal.path)
@@ -0,0 +1,39 @@
+"""
+Tests for the headless xlsx engine
+"""
+import datetime
+
+import pytest
+
+from utils.xlsx_handler import XlsxHandler
+
+SAMPLES = ['S1', 'S2']
+
+
+@pytest.fixture
+def handler():
+    handler = XlsxHandler()
+    yield handler
+    handler.close()
+
+
+@pytest.fixture
+def workbook(handler, request):
+    return handler.create_characterisation_workbook(request.node.name, len(SAMPLES), SAMPLES, "Solid")
+
+
+def test_unchanged_values_are_not_rewritten_by_a_new_session(handler, workbook):
+    values = {'B1': 'Solid', 'D1': '12', 'D2': '2024-05-01', 'B3:D3': 'merged', 'B4:D4': ''}
+    handler.save_characterisation_data(workbook, 'S1', values)
+    handler.close_workbooks()
+
+    # The form is filled from the workbook and saved again without changes
+    handler.save_characterisation_data(workbook, 'S1', values)
+    assert handler.flush(workbook) == []
+
+    handler.save_characterisation_data(workbook, 'S1', dict(values, D1='13'))
+    assert handler.flush(workbook) == [workbook]
+    handler.close_workbooks()
+    assert handler.get_sheet_data(workbook, 'S1', ['B1', 'D1', 'D2', 'B3']) == {
+        'B1': 'Solid', 'D1': 13, 'D2': datetime.datetime(2024, 5, 1), 'B3': 'merged'
+    }
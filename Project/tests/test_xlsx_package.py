@@ -0,0 +1,178 @@
+"""
+Tests for renaming sheets inside an .xlsx package
+"""
+import re
+
+import pytest
+
+from utils.xlsx_package import (
+    MAIN_NS,
+    XML_DECLARATION,
+    XlsxWorkbook,
+    read_package,
+    rename_sheet_in_package,
+    rename_sheet_references,
+    rename_sheets_in_package,
+    workbook_metadata_parts,
+    write_package,
+    xml_attr,
+    xml_text
+)
+
+SHEETS = ['S1', 'S2', 'Sample A', 'Data']
+
+STYLES = (
+    XML_DECLARATION + f'<styleSheet xmlns="{MAIN_NS}">'
+    '<fonts count="1"><font/></fonts><fills count="1"><fill/></fills>'
+    '<borders count="1"><border/></borders><cellXfs count="1"><xf/></cellXfs></styleSheet>'
+).encode('utf-8')
+
+DEFINED_NAMES = {
+    'Total': "S1!$A$1",
+    'Pair': "'Sample A'!$B$2",
+    'Across': "S1:S2!$A$1",
+}
+
+FORMULAS = {
+    'A1': "S1!A1+'Sample A'!B2",
+    'A2': '"S1!A1"&[1]S1!A1&\'[2]S2\'!A1',
+    'A3': "SUM(S1:S2!A1)",
+    'A4': "SUM('S2:Sample A'!A1)",
+}
+
+
+def worksheet(cells):
+    rows = ''.join(f'<row r="{ref[1:]}">{cell}</row>' for ref, cell in cells.items())
+    return (XML_DECLARATION + f'<worksheet xmlns="{MAIN_NS}"><sheetData>{rows}</sheetData>'
+            '</worksheet>').encode('utf-8')
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Workbook whose Data sheet, defined names and app.xml refer to the other sheets"""
+    parts = workbook_metadata_parts(SHEETS, STYLES)
+    names = ''.join(f'<definedName name="{name}">{xml_text(formula)}</definedName>'
+                    for name, formula in DEFINED_NAMES.items())
+    parts['xl/workbook.xml'] = parts['xl/workbook.xml'].replace(
+        b'<calcPr', f'<definedNames>{names}</definedNames><calcPr'.encode('utf-8'))
+    titles = ''.join(f'<vt:lpstr>{xml_text(name)}</vt:lpstr>' for name in SHEETS)
+    parts['docProps/app.xml'] = parts['docProps/app.xml'].replace(
+        b'</Properties>',
+        f'<TitlesOfParts><vt:vector size="{len(SHEETS)}" baseType="lpstr">{titles}</vt:vector>'
+        '</TitlesOfParts></Properties>'.encode('utf-8'))
+
+    for index, name in enumerate(SHEETS, start=1):
+        if name == 'Data':
+            cells = {ref: f'<c r="{ref}"><f>{xml_text(formula)}</f></c>' for ref, formula in FORMULAS.items()}
+        else:
+            cells = {'A1': f'<c r="A1" t="inlineStr"><is><t>{xml_attr(name)} marker</t></is></c>'}
+        parts[f'xl/worksheets/sheet{index}.xml'] = worksheet(cells)
+
+    path = str(tmp_path / 'project.xlsx')
+    write_package(path, parts)
+    return path
+
+
+def defined_names(path):
+    xml = read_package(path)['xl/workbook.xml'].decode('utf-8')
+    return {name: re.sub('&apos;', "'", text) for name, text in
+            re.findall(r'<definedName name="([^"]+)">(.*?)</definedName>', xml)}
+
+
+def formulas(path):
+    xml = read_package(path)['xl/worksheets/sheet4.xml'].decode('utf-8')
+    cells = re.findall(r'<c r="([A-Z]+\d+)"><f>(.*?)</f>', xml)
+    return {ref: text.replace('&quot;', '"').replace('&amp;', '&').replace('&apos;', "'")
+            for ref, text in cells}
+
+
+def titles(path):
+    return re.findall(r'<vt:lpstr>(.*?)</vt:lpstr>', read_package(path)['docProps/app.xml'].decode('utf-8'))
+
+
+def marker(path, sheet_name):
+    workbook = XlsxWorkbook.open(path)
+    return workbook.worksheet(sheet_name).get_value('A1', workbook.shared_strings)
+
+
+def test_rename_updates_every_reference(workbook):
+    rename_sheet_in_package(workbook, 'S1', 'Sample 1')
+
+    assert XlsxWorkbook.open(workbook).sheet_names() == ['Sample 1', 'S2', 'Sample A', 'Data']
+    assert marker(workbook, 'Sample 1') == 'S1 marker'
+    assert defined_names(workbook) == {
+        'Total': "'Sample 1'!$A$1",
+        'Pair': "'Sample A'!$B$2",
+        'Across': "'Sample 1:S2'!$A$1",
+    }
+    assert formulas(workbook) == {
+        'A1': "'Sample 1'!A1+'Sample A'!B2",
+        'A2': FORMULAS['A2'],
+        'A3': "SUM('Sample 1:S2'!A1)",
+        'A4': FORMULAS['A4'],
+    }
+    assert titles(workbook) == ['Sample 1', 'S2', 'Sample A', 'Data']
+
+
+def test_quoted_sheet_name_is_renamed(workbook):
+    rename_sheet_in_package(workbook, 'Sample A', 'Plain')
+
+    assert defined_names(workbook)['Pair'] == "Plain!$B$2"
+    assert formulas(workbook)['A1'] == "S1!A1+Plain!B2"
+    assert formulas(workbook)['A4'] == "SUM('S2:Plain'!A1)"
+    assert titles(workbook) == ['S1', 'S2', 'Plain', 'Data']
+
+
+def test_sheets_can_swap_names(workbook):
+    rename_sheets_in_package(workbook, {'S1': 'S2', 'S2': 'S1'})
+
+    assert XlsxWorkbook.open(workbook).sheet_names() == ['S2', 'S1', 'Sample A', 'Data']
+    assert marker(workbook, 'S2') == 'S1 marker'
+    assert marker(workbook, 'S1') == 'S2 marker'
+    assert defined_names(workbook)['Total'] == "'S2'!$A$1"
+    assert defined_names(workbook)['Across'] == "'S2:S1'!$A$1"
+    assert formulas(workbook)['A3'] == "SUM('S2:S1'!A1)"
+    assert titles(workbook) == ['S2', 'S1', 'Sample A', 'Data']
+
+
+def test_case_insensitive_clash_leaves_the_file_unchanged(workbook):
+    with open(workbook, 'rb') as f:
+        before = f.read()
+
+    with pytest.raises(ValueError, match="already exists"):
+        rename_sheet_in_package(workbook, 'S1', 'sample a')
+    with pytest.raises(ValueError, match="already exists"):
+        rename_sheets_in_package(workbook, {'S1': 'Data', 'S2': 'Other'})
+
+    with open(workbook, 'rb') as f:
+        assert f.read() == before
+
+
+def test_missing_sheet_leaves_the_file_unchanged(workbook):
+    with open(workbook, 'rb') as f:
+        before = f.read()
+
+    with pytest.raises(KeyError):
+        rename_sheets_in_package(workbook, {'S1': 'New', 'Nope': 'Other'})
+
+    with open(workbook, 'rb') as f:
+        assert f.read() == before
+
+
+@pytest.mark.parametrize('formula, renamed', [
+    ("S1!A1*2", "New!A1*2"),
+    ("s1!A1", "New!A1"),
+    ("'S1'!A1", "New!A1"),
+    ('"S1!A1"&S1!A1', '"S1!A1"&New!A1'),
+    ("[1]S1!A1+'[1]S1'!A1", "[1]S1!A1+'[1]S1'!A1"),
+    ("S10!A1+MyS1!A1+S1.x!A1", "S10!A1+MyS1!A1+S1.x!A1"),
+    ("SUM(S1:Last!A1)+SUM(First:S1!A1)", "SUM(New:Last!A1)+SUM(First:New!A1)"),
+])
+def test_rename_sheet_references(formula, renamed):
+    assert rename_sheet_references(formula, 'S1', 'New') == renamed
+
+
+def test_rename_sheet_references_quotes_names_that_need_it():
+    assert rename_sheet_references("S1!A1", 'S1', "It's here") == "'It''s here'!A1"
+    assert rename_sheet_references("'It''s here'!A1", "It's here", 'S1') == "'S1'!A1"
+    assert rename_sheet_references("SUM(A:S1!A1)", 'S1', 'B 2') == "SUM('A:B 2'!A1)"
@@ -3,33 +3,83 @@ Utils package - Contains utility functions and classes for the project managemen
 
 This package includes:
 - ExcelHandler: Excel file operations and management
+- XlsxHandler: Headless Excel file operations on the .xlsx package
+- read_workbook_cells: Streaming bulk reads of the same cells across sheets
+- ProjectCatalog: SQLite index of the project workbooks
+- BackupStore: Versioned, deduplicated workbook backups
+- ExcelAppPool: Excel processes shared by every handler
+- MemoryExcelBackend: In-memory stand-in for Excel, counting the calls made to it
+- Tracer: Timing spans of the workbook operations, written as a Chrome trace
+- SubmissionOutbox / SubmissionSender: Samples sent for approval in the background
+- ApprovalStatusCache: Supervisor decisions, cached and refreshed with conditional requests
 - validators: Input validation functions
 - constants: Application constants and configurations
 """
 
-# Import main utility classes and functions
-from .excel_handler import ExcelHandler
-from .validators import (
-    validate_project_name,
-    validate_sample_count,
-    validate_form_data,
-    validate_date_format,
-    validate_sample_name,
-    validate_excel_path
-)
-from .constants import (
-    CHARACTERISATION_CELL_MAPPING,
-    CHARACTERISATION_FORM_LABELS,
-    SAMPLE_TYPES,
-    PROJECT_TYPES,
-    ERROR_MESSAGES,
-    SUCCESS_MESSAGES
-)
+import importlib
+
+# Where each exported name lives. Submodules are imported the first time one
+# of their names is used, so importing a single submodule (as the app does
+# at startup) does not load the Excel engines along with it
+_EXPORTS = {
+    'ExcelHandler': 'excel_handler',
+    'create_excel_handler': 'excel_handler',
+    'XlsxHandler': 'xlsx_handler',
+    'read_workbook_cells': 'xlsx_reader',
+    'ProjectCatalog': 'project_catalog',
+    'read_project_details': 'project_catalog',
+    'BackupStore': 'backup_store',
+    'ExcelAppPool': 'excel_app_pool',
+    'get_excel_app_pool': 'excel_app_pool',
+    'MemoryExcelBackend': 'memory_excel',
+    'Tracer': 'tracing',
+    'get_tracer': 'tracing',
+    'span': 'tracing',
+    'traced': 'tracing',
+    'CircuitBreaker': 'submission_outbox',
+    'SubmissionOutbox': 'submission_outbox',
+    'SubmissionSender': 'submission_outbox',
+    'ApprovalStatusCache': 'approval_status',
+    'get_sheet_names': 'workbook_metadata',
+    'get_summary': 'workbook_metadata',
+    'validate_project_name': 'validators',
+    'validate_sample_count': 'validators',
+    'validate_form_data': 'validators',
+    'validate_date_format': 'validators',
+    'validate_sample_name': 'validators',
+    'validate_sample_renames': 'validators',
+    'validate_excel_path': 'validators',
+    'CHARACTERISATION_CELL_MAPPING': 'constants',
+    'CHARACTERISATION_FORM_LABELS': 'constants',
+    'SAMPLE_TYPES': 'constants',
+    'PROJECT_TYPES': 'constants',
+    'ERROR_MESSAGES': 'constants',
+    'SUCCESS_MESSAGES': 'constants'
+}
 
 # Define what gets imported when using "from utils import *"
 __all__ = [
     # Classes
     'ExcelHandler',
+    'XlsxHandler',
+    'ProjectCatalog',
+    'BackupStore',
+    'ExcelAppPool',
+    'MemoryExcelBackend',
+    'Tracer',
+    'SubmissionOutbox',
+    'SubmissionSender',
+    'CircuitBreaker',
+    'ApprovalStatusCache',
+    'get_excel_app_pool',
+    'get_tracer',
+    'span',
+    'traced',
+    'create_excel_handler',
+    'read_workbook_cells',
+    'read_project_details',
+    'get_sheet_names',
+    'get_summary',
     
     # Validation functions
     'validate_project_name',
@@ -37,6 +87,7 @@ __all__ = [
     'validate_form_data',
     'validate_date_format',
     'validate_sample_name',
+    'validate_sample_renames',
     'validate_excel_path',
     
     # Constants
@@ -55,14 +106,31 @@ __version__ = '1.0.0'
 __author__ = 'Your Name'
 __description__ = 'Utility functions and classes for project management'
 
-# Initialize Excel handler instance for easy access
-excel_handler = ExcelHandler()
+_excel_handler = None
+
+
+def __getattr__(name):
+    """Import an exported name from its submodule on first use"""
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
 
 def get_excel_handler():
     """
-    Get a singleton instance of ExcelHandler
+    Get a singleton instance of the configured Excel handler, created on first use
     
     Returns:
-        ExcelHandler: Excel handler instance
+        ExcelHandler or XlsxHandler: Excel handler instance
     """
-    return excel_handler
\ No newline at end of file
+    global _excel_handler
+    if _excel_handler is None:
+        from .excel_handler import create_excel_handler
+        _excel_handler = create_excel_handler()
+    return _excel_handler
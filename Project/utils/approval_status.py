@@ -0,0 +1,229 @@
+"""
+Approval status - what the supervisors decided about the submitted samples
+
+The approval server reports the state of every sample of a project in one
+request. The statuses are kept in a local SQLite cache together with the
+project's version and ETag, and a refresh sends If-None-Match and
+since=<version>: when nothing changed the server answers 304 with no body,
+otherwise only the samples that changed are sent and merged into the cache.
+Refreshing a project of hundreds of samples every few seconds therefore
+costs one small request on both sides. The cache also lets the status view
+show the last known statuses at once, and while the server is unreachable.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from config.settings import (
+    APPROVAL_SERVER_URL,
+    APPROVAL_STATUS_CACHE_PATH,
+    SUBMISSION_CONNECT_TIMEOUT,
+    SUBMISSION_READ_TIMEOUT
+)
+from utils.submission_outbox import approval_session
+
+APPROVAL_STATUS_PATH = '/approval-status'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    server_url TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    etag TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (server_url, project_name)
+);
+CREATE TABLE IF NOT EXISTS samples (
+    server_url TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    sample_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submitted_at REAL,
+    decided_at REAL,
+    PRIMARY KEY (server_url, project_name, sample_name)
+);
+"""
+
+
+class ApprovalStatusCache:
+    """Locally cached approval statuses, refreshed with conditional requests"""
+
+    def __init__(self, path: Optional[str] = None, server_url: Optional[str] = None,
+                 session_factory: Callable[[], Any] = approval_session):
+        """
+        Args:
+            path: SQLite file, defaults to APPROVAL_STATUS_CACHE_PATH;
+                  ':memory:' keeps the cache for this session only
+            server_url: Approval server, defaults to APPROVAL_SERVER_URL
+            session_factory: Creates the HTTP session, on the first refresh
+        """
+        self.path = path or APPROVAL_STATUS_CACHE_PATH
+        self.server_url = (server_url or APPROVAL_SERVER_URL).rstrip('/')
+        self._session_factory = session_factory
+        self._session = None
+        self._lock = threading.Lock()
+        # Refreshes share one session and must not interleave their cache updates
+        self._refresh_lock = threading.Lock()
+
+        try:
+            if self.path != ':memory:':
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            # Read from the Tk thread, refreshed from a worker; every use holds the lock
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.executescript(_SCHEMA)
+        except Exception as e:
+            raise Exception(f"Failed to open approval status cache: {e}")
+
+    def cached(self, project_name: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the last known approval statuses of a project, without asking the server
+
+        Returns:
+            Dictionary of {sample name: {'status', 'submitted_at', 'decided_at'}};
+            status is 'pending', 'approved' or 'rejected'
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT sample_name, status, submitted_at, decided_at FROM samples "
+                "WHERE server_url = ? AND project_name = ?",
+                (self.server_url, project_name)
+            ).fetchall()
+        return {row['sample_name']: {'status': row['status'], 'submitted_at': row['submitted_at'],
+                                     'decided_at': row['decided_at']} for row in rows}
+
+    def fetched_at(self, project_name: str) -> Optional[float]:
+        """When the server last confirmed the project's cached statuses, or None if never"""
+        project = self._project(project_name)
+        return project['fetched_at'] if project is not None else None
+
+    def _project(self, project_name: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT version, etag, fetched_at FROM projects WHERE server_url = ? AND project_name = ?",
+                (self.server_url, project_name)
+            ).fetchone()
+
+    def refresh(self, project_name: str) -> bool:
+        """
+        Bring a project's cached statuses up to date; this makes a network
+        request, so call it off the Tk thread
+
+        Returns:
+            True if any status changed
+        """
+        with self._refresh_lock:
+            project = self._project(project_name)
+            body = self._fetch(project_name, project)
+            if body is None:
+                return False
+            if project is not None and body['version'] < project['version']:
+                # The server lost or reset its history; start again from a full report
+                body = self._fetch(project_name, None)
+                project = None
+            self._store(project_name, body, full=project is None)
+            return bool(body['samples']) or project is None
+
+    def _fetch(self, project_name: str, project: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        """Ask for the samples changed since the cached version; None if nothing changed"""
+        params = {'project_name': project_name}
+        headers = {}
+        if project is not None:
+            params['since'] = project['version']
+            if project['etag']:
+                headers['If-None-Match'] = project['etag']
+
+        try:
+            if self._session is None:
+                self._session = self._session_factory()
+            response = self._session.get(self.server_url + APPROVAL_STATUS_PATH, params=params, headers=headers,
+                                         timeout=(SUBMISSION_CONNECT_TIMEOUT, SUBMISSION_READ_TIMEOUT))
+        except Exception as e:
+            raise Exception(f"Failed to reach the approval server: {e}")
+
+        if response.status_code == 304:
+            with self._lock, self._db:
+                self._db.execute(
+                    "UPDATE projects SET fetched_at = ? WHERE server_url = ? AND project_name = ?",
+                    (time.time(), self.server_url, project_name)
+                )
+            return None
+        if response.status_code in (404, 405):
+            raise Exception("The approval server does not report approval statuses")
+        if response.status_code != 200:
+            raise Exception(f"Failed to get approval statuses: server error {response.status_code}")
+        try:
+            body = response.json()
+            body['version'] = int(body['version'])
+            if not isinstance(body['samples'], list):
+                raise ValueError("samples is not a list")
+        except (ValueError, KeyError, TypeError) as e:
+            raise Exception(f"Failed to read approval statuses: {e}")
+        body['etag'] = response.headers.get('ETag')
+        return body
+
+    def _store(self, project_name: str, body: Dict[str, Any], full: bool):
+        try:
+            with self._lock, self._db:
+                if full:
+                    self._db.execute("DELETE FROM samples WHERE server_url = ? AND project_name = ?",
+                                     (self.server_url, project_name))
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO samples (server_url, project_name, sample_name, status, "
+                    "submitted_at, decided_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(self.server_url, project_name, sample['sample_name'], sample['status'],
+                      sample.get('submitted_at'), sample.get('decided_at'))
+                     for sample in body['samples']]
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO projects (server_url, project_name, version, etag, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.server_url, project_name, body['version'], body['etag'], time.time())
+                )
+        except Exception as e:
+            raise Exception(f"Failed to update approval status cache: {e}")
+
+    def rename_samples(self, project_name: str, renames: Dict[str, str]):
+        """
+        Show the cached statuses of renamed samples under their new names
+
+        Args:
+            project_name: Project the samples belong to
+            renames: New sample names keyed by current name
+        """
+        try:
+            with self._lock, self._db:
+                rows = self._db.execute(
+                    f"SELECT sample_name, status, submitted_at, decided_at FROM samples "
+                    f"WHERE server_url = ? AND project_name = ? "
+                    f"AND sample_name IN ({', '.join('?' * len(renames))})",
+                    (self.server_url, project_name, *renames)
+                ).fetchall() if renames else []
+                self._db.executemany(
+                    "DELETE FROM samples WHERE server_url = ? AND project_name = ? AND sample_name = ?",
+                    [(self.server_url, project_name, name) for name in {*renames, *renames.values()}]
+                )
+                self._db.executemany(
+                    "INSERT INTO samples (server_url, project_name, sample_name, status, submitted_at, "
+                    "decided_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(self.server_url, project_name, renames[row['sample_name']], row['status'],
+                      row['submitted_at'], row['decided_at']) for row in rows]
+                )
+        except Exception as e:
+            raise Exception(f"Failed to update approval status cache: {e}")
+
+    def close(self):
+        """Close the cache database and the HTTP session; a refresh still running fails"""
+        # Not waiting for a refresh in progress, which may take until its read timeout
+        if self._refresh_lock.acquire(blocking=False):
+            try:
+                if self._session is not None:
+                    self._session.close()
+                    self._session = None
+            finally:
+                self._refresh_lock.release()
+        with self._lock:
+            self._db.close()
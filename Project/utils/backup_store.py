@@ -0,0 +1,343 @@
+"""
+Backup store - versioned, deduplicated workbook backups
+
+A version of a workbook is stored every time it is saved. Versions are
+content-addressed: an .xlsx file is split into its zip members, and each
+member's stored (already deflated) bytes are kept once under their SHA-256,
+so the sheets a save did not touch cost nothing in later versions. Other
+files are split into fixed-size zlib-compressed chunks. A gzipped JSON
+manifest per version lists its members, and restoring reassembles the zip
+from the stored bytes without compressing anything again.
+
+Layout of a store (the "backups" folder next to the workbooks):
+
+    objects/ab/abcdef...                member bytes or chunks, by SHA-256
+    snapshots/<workbook>/<id>.json.gz  one manifest per version, id = local time
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+import zlib
+from typing import Any, Dict, List, Optional, Union
+from config.settings import BACKUP_KEEP_DAILY, BACKUP_KEEP_HOURLY, BACKUP_KEEP_LAST
+from utils.xlsx_package import RawZipWriter, atomic_file, raw_member_offset
+
+_ID_FORMAT = '%Y%m%d-%H%M%S-%f'
+_MANIFEST_SUFFIX = '.json.gz'
+_CHUNK_SIZE = 1024 * 1024
+# Objects this new are never collected: a snapshot may be about to reference them
+_GC_GRACE_SECONDS = 600
+
+# Object files start with how their payload is stored
+_RAW = b'r'
+_ZLIB = b'z'
+
+_store_lock = threading.RLock()
+
+
+class BackupStore:
+    """Content-addressed versions of the workbooks in one folder"""
+
+    def __init__(self, root: str, keep_last: Optional[int] = None, keep_hourly: Optional[int] = None,
+                 keep_daily: Optional[int] = None):
+        """
+        Args:
+            root: Folder holding the store, usually <project folder>/backups
+            keep_last: Newest versions always kept, defaults to BACKUP_KEEP_LAST
+            keep_hourly: Hours for which the last version is kept, defaults to BACKUP_KEEP_HOURLY
+            keep_daily: Days for which the last version is kept, defaults to BACKUP_KEEP_DAILY
+        """
+        self.root = os.path.abspath(root)
+        self.keep_last = keep_last if keep_last is not None else BACKUP_KEEP_LAST
+        self.keep_hourly = keep_hourly if keep_hourly is not None else BACKUP_KEEP_HOURLY
+        self.keep_daily = keep_daily if keep_daily is not None else BACKUP_KEEP_DAILY
+
+    @classmethod
+    def for_workbook(cls, file_path: str) -> "BackupStore":
+        """Get the store in the "backups" folder next to a workbook"""
+        return cls(os.path.join(os.path.dirname(os.path.abspath(file_path)), "backups"))
+
+    # Paths
+
+    def _object_path(self, object_id: str) -> str:
+        return os.path.join(self.root, 'objects', object_id[:2], object_id)
+
+    def _snapshot_dir(self, file_path: str) -> str:
+        return os.path.join(self.root, 'snapshots', os.path.basename(file_path))
+
+    def _manifest_path(self, file_path: str, snapshot_id: str) -> str:
+        return os.path.join(self._snapshot_dir(file_path), snapshot_id + _MANIFEST_SUFFIX)
+
+    # Taking versions
+
+    def snapshot(self, file_path: str) -> Optional[str]:
+        """
+        Store the current version of a file and apply the retention policy
+
+        Args:
+            file_path: Workbook to back up
+
+        Returns:
+            Id of the version holding the file's content, None if the file does not exist
+        """
+        try:
+            if not os.path.exists(file_path):
+                return None
+            with _store_lock:
+                latest = self._latest_manifest(file_path)
+                known = set()
+                if latest is not None:
+                    known = {member[1] for member in latest.get('members', [])}
+                    known.update(latest.get('chunks', []))
+
+                if zipfile.is_zipfile(file_path):
+                    manifest = self._store_members(file_path, known)
+                else:
+                    manifest = self._store_chunks(file_path, known)
+
+                if latest is not None and (manifest.get('members'), manifest.get('chunks')) == \
+                        (latest.get('members'), latest.get('chunks')):
+                    return latest['id']
+
+                snapshot_id = datetime.datetime.now().strftime(_ID_FORMAT)
+                manifest.update({'id': snapshot_id, 'file': os.path.basename(file_path),
+                                 'time': time.time(), 'size': os.path.getsize(file_path)})
+                os.makedirs(self._snapshot_dir(file_path), exist_ok=True)
+                with atomic_file(self._manifest_path(file_path, snapshot_id), suffix='.tmp') as f:
+                    f.write(gzip.compress(json.dumps(manifest, separators=(',', ':')).encode('utf-8')))
+
+                self.prune(file_path)
+                return snapshot_id
+
+        except Exception as e:
+            raise Exception(f"Failed to back up {os.path.basename(file_path)}: {e}")
+
+    def _store_members(self, file_path: str, known: set) -> Dict[str, Any]:
+        """Store each zip member's stored bytes once, by their hash"""
+        members = []
+        with open(file_path, 'rb') as source, zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                source.seek(raw_member_offset(source, info))
+                data = source.read(info.compress_size)
+                object_id = hashlib.sha256(data).hexdigest()
+                if object_id not in known:
+                    # Deflated members are stored as they are; anything else is compressed
+                    self._put_object(object_id, data, compress=info.compress_type != zipfile.ZIP_DEFLATED)
+                    known.add(object_id)
+                members.append([info.filename, object_id, info.flag_bits, info.compress_type,
+                                list(info.date_time), info.CRC, info.compress_size, info.file_size])
+        return {'kind': 'zip', 'members': members}
+
+    def _store_chunks(self, file_path: str, known: set) -> Dict[str, Any]:
+        """Store a non-zip file as fixed-size compressed chunks"""
+        chunks = []
+        with open(file_path, 'rb') as source:
+            while True:
+                data = source.read(_CHUNK_SIZE)
+                if not data:
+                    break
+                object_id = hashlib.sha256(data).hexdigest()
+                if object_id not in known:
+                    self._put_object(object_id, data, compress=True)
+                    known.add(object_id)
+                chunks.append(object_id)
+        return {'kind': 'chunks', 'chunks': chunks}
+
+    def _put_object(self, object_id: str, data: bytes, compress: bool):
+        path = self._object_path(object_id)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_file(path, suffix='.obj') as f:
+            if compress:
+                f.write(_ZLIB + zlib.compress(data, 6))
+            else:
+                f.write(_RAW + data)
+
+    def _get_object(self, object_id: str) -> bytes:
+        with open(self._object_path(object_id), 'rb') as f:
+            data = f.read()
+        payload = data[1:]
+        if data[:1] == _ZLIB:
+            payload = zlib.decompress(payload)
+        if hashlib.sha256(payload).hexdigest() != object_id:
+            raise ValueError(f"Backup object {object_id} is corrupt")
+        return payload
+
+    # Listing and restoring
+
+    def list_snapshots(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        List the stored versions of a file, newest first
+
+        Returns:
+            List of dictionaries with 'id' and 'time' (datetime of the backup)
+        """
+        snapshots = []
+        try:
+            names = os.listdir(self._snapshot_dir(file_path))
+        except FileNotFoundError:
+            return snapshots
+        for name in names:
+            if not name.endswith(_MANIFEST_SUFFIX):
+                continue
+            snapshot_id = name[:-len(_MANIFEST_SUFFIX)]
+            try:
+                when = datetime.datetime.strptime(snapshot_id, _ID_FORMAT)
+            except ValueError:
+                continue
+            snapshots.append({'id': snapshot_id, 'time': when})
+        snapshots.sort(key=lambda snapshot: snapshot['id'], reverse=True)
+        return snapshots
+
+    def get_manifest(self, file_path: str, snapshot_id: str) -> Dict[str, Any]:
+        """Read the manifest of one version, with its 'size' and member list"""
+        with open(self._manifest_path(file_path, snapshot_id), 'rb') as f:
+            return json.loads(gzip.decompress(f.read()).decode('utf-8'))
+
+    def _latest_manifest(self, file_path: str) -> Optional[Dict[str, Any]]:
+        for snapshot in self.list_snapshots(file_path):
+            try:
+                return self.get_manifest(file_path, snapshot['id'])
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def restore(self, file_path: str, snapshot_id: Optional[str] = None,
+                at: Optional[Union[datetime.datetime, float]] = None,
+                target_path: Optional[str] = None) -> str:
+        """
+        Put back a stored version of a file
+
+        The current content of the file is backed up first, so a restore can
+        itself be undone.
+
+        Args:
+            file_path: Workbook whose versions to use
+            snapshot_id: Version to restore; by default the one in effect at `at`
+            at: Point in time (datetime or epoch seconds); the last version taken
+                at or before it is restored. Latest version if neither is given
+            target_path: Where to write the restored file, defaults to file_path
+
+        Returns:
+            Id of the version that was restored
+        """
+        try:
+            with _store_lock:
+                snapshots = self.list_snapshots(file_path)
+                if snapshot_id is None:
+                    if at is not None:
+                        if not isinstance(at, datetime.datetime):
+                            at = datetime.datetime.fromtimestamp(at)
+                        snapshots = [snapshot for snapshot in snapshots if snapshot['time'] <= at]
+                    if not snapshots:
+                        raise ValueError("No backup from that time")
+                    snapshot_id = snapshots[0]['id']
+                manifest = self.get_manifest(file_path, snapshot_id)
+
+                target_path = target_path or file_path
+                if os.path.exists(target_path) and os.path.abspath(target_path) == os.path.abspath(file_path):
+                    self.snapshot(file_path)
+
+                with atomic_file(target_path) as target:
+                    if manifest['kind'] == 'zip':
+                        writer = RawZipWriter(target)
+                        for name, object_id, flags, method, date_time, crc, compressed_size, size \
+                                in manifest['members']:
+                            data = self._get_object(object_id)
+                            writer.add(name, flags, method, tuple(date_time), crc, compressed_size, size,
+                                       lambda data=data: target.write(data))
+                        writer.close()
+                    else:
+                        for object_id in manifest['chunks']:
+                            target.write(self._get_object(object_id))
+                return snapshot_id
+
+        except Exception as e:
+            raise Exception(f"Failed to restore backup: {e}")
+
+    # Retention
+
+    def prune(self, file_path: str, now: Optional[datetime.datetime] = None) -> int:
+        """
+        Drop the versions of a file the retention policy no longer needs, then
+        the stored objects no version refers to any more
+
+        Kept: the newest keep_last versions, and the last version of each of
+        the latest keep_hourly hours and keep_daily days.
+
+        Returns:
+            Number of versions removed
+        """
+        now = now or datetime.datetime.now()
+        with _store_lock:
+            snapshots = self.list_snapshots(file_path)
+            keep = {snapshot['id'] for snapshot in snapshots[:self.keep_last]}
+            hours = set()
+            days = set()
+            for snapshot in snapshots:
+                # Newest first, so the first version seen in an hour or day is its last
+                when = snapshot['time']
+                hour = when.replace(minute=0, second=0, microsecond=0)
+                if hour not in hours and now - hour < datetime.timedelta(hours=self.keep_hourly):
+                    hours.add(hour)
+                    keep.add(snapshot['id'])
+                if when.date() not in days and (now.date() - when.date()).days < self.keep_daily:
+                    days.add(when.date())
+                    keep.add(snapshot['id'])
+
+            removed = 0
+            for snapshot in snapshots:
+                if snapshot['id'] not in keep:
+                    try:
+                        os.remove(self._manifest_path(file_path, snapshot['id']))
+                        removed += 1
+                    except OSError as e:
+                        print(f"Warning: Could not remove backup {snapshot['id']}: {e}")
+            if removed:
+                self.collect_garbage()
+            return removed
+
+    def collect_garbage(self) -> int:
+        """
+        Delete stored objects that no version of any workbook in the store refers to
+
+        Returns:
+            Number of objects deleted
+        """
+        with _store_lock:
+            referenced = set()
+            snapshots_root = os.path.join(self.root, 'snapshots')
+            for directory, _, names in os.walk(snapshots_root):
+                for name in names:
+                    if not name.endswith(_MANIFEST_SUFFIX):
+                        continue
+                    try:
+                        with open(os.path.join(directory, name), 'rb') as f:
+                            manifest = json.loads(gzip.decompress(f.read()).decode('utf-8'))
+                    except (OSError, ValueError) as e:
+                        # An unreadable manifest must not cost the others their objects
+                        print(f"Warning: Could not read backup manifest {name}: {e}")
+                        return 0
+                    referenced.update(member[1] for member in manifest.get('members', []))
+                    referenced.update(manifest.get('chunks', []))
+
+            deleted = 0
+            cutoff = time.time() - _GC_GRACE_SECONDS
+            for directory, _, names in os.walk(os.path.join(self.root, 'objects')):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    if name in referenced or name.startswith('.~'):
+                        continue
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                            deleted += 1
+                    except OSError:
+                        pass
+            return deleted
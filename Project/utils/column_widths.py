@@ -0,0 +1,107 @@
+"""
+Column width estimation - AutoFit computed in Python
+
+Excel measures column widths in widths of the digit "0" in the workbook's
+default font (Calibri 11). The helpers here estimate how many of those a
+cell's displayed text needs from its characters, font, size and weight, so
+column widths can be worked out without asking Excel to AutoFit.
+"""
+import datetime
+import unicodedata
+from typing import Any, Iterable, Optional, Tuple
+from config.settings import MAX_COLUMN_WIDTH
+
+# Character widths relative to "0" in Calibri
+_NARROW_CHARS = set("iljI.,:;!|'`")
+_SEMI_NARROW_CHARS = set("ftr()[]{}-/\\\" J")
+_WIDE_CHARS = set("mwMW@%&")
+
+# How much wider each font's glyphs run than Calibri's
+_FONT_WIDTH_FACTORS = {
+    'calibri': 1.0,
+    'arial': 1.12,
+    'helvetica': 1.12,
+    'tahoma': 1.1,
+    'segoe ui': 1.1,
+    'verdana': 1.3,
+    'cambria': 1.05,
+    'times new roman': 0.95,
+    'consolas': 1.1,
+    'courier new': 1.2,
+}
+_DEFAULT_FONT_WIDTH_FACTOR = 1.1
+
+_BOLD_FACTOR = 1.08
+
+# Cell margins AutoFit adds around the text
+_PADDING = 1.0
+
+
+def _char_width(char: str) -> float:
+    if char in _NARROW_CHARS:
+        return 0.43
+    if char in _SEMI_NARROW_CHARS:
+        return 0.6
+    if char in _WIDE_CHARS:
+        return 1.6
+    if unicodedata.east_asian_width(char) in ('W', 'F'):
+        return 2.0
+    if char.isupper():
+        return 1.15
+    return 1.0
+
+
+def display_text(value: Any) -> str:
+    """Approximate the text Excel displays for a cell value"""
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S" if value.time() != datetime.time() else "%Y-%m-%d")
+    if isinstance(value, datetime.date):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def text_width(text: str, font_name: Optional[str] = None, font_size: Optional[float] = None,
+               bold: bool = False) -> float:
+    """
+    Estimate the width of displayed text in Excel column width units
+
+    Args:
+        text: Displayed text; for several lines the longest one counts
+        font_name: Font family, None for Calibri
+        font_size: Point size, None for 11
+        bold: Whether the text is bold
+
+    Returns:
+        Width in widths of "0" in Calibri 11
+    """
+    longest = max(sum(_char_width(char) for char in line) for line in str(text).split('\n'))
+    factor = _FONT_WIDTH_FACTORS.get((font_name or 'Calibri').lower(), _DEFAULT_FONT_WIDTH_FACTOR)
+    factor *= (font_size or 11.0) / 11.0
+    if bold:
+        factor *= _BOLD_FACTOR
+    return longest * factor
+
+
+def column_width(text_widths: Iterable[float],
+                 max_width: Optional[float] = None) -> Tuple[Optional[float], bool]:
+    """
+    Work out a column width from the widths of its cells' text
+
+    Args:
+        text_widths: text_width() of every cell that counts towards the column
+        max_width: Widest the column may get, defaults to MAX_COLUMN_WIDTH
+
+    Returns:
+        Tuple of (column width or None if the column is empty, whether the
+        column was capped and its text should wrap)
+    """
+    max_width = max_width or MAX_COLUMN_WIDTH
+    widest = max(text_widths, default=None)
+    if widest is None:
+        return None, False
+    width = round(widest + _PADDING, 2)
+    if width > max_width:
+        return float(max_width), True
+    return width, False
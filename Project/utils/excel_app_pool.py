@@ -0,0 +1,302 @@
+"""
+Excel application pool - one set of Excel processes shared by every handler
+
+Each ExcelHandler used to start its own hidden Excel and only quit it when
+the handler was garbage collected, so every page and the background writer
+kept an Excel process of its own, and crashed instances were left behind.
+Handlers now take a lease on a pooled process instead. The pool checks that
+a process still responds before handing it out, starts a replacement when
+it does not, and quits processes nobody has leased for a while.
+
+Excel itself is driven through a backend object, so the pool can be used
+with a stand-in backend where Excel is not available; the 'memory' engine
+pool runs on utils.memory_excel.
+"""
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from config.settings import (
+    EXCEL_APP_IDLE_SECONDS,
+    EXCEL_APP_POOL_SIZE,
+    EXCEL_DISPLAY_ALERTS,
+    EXCEL_SCREEN_UPDATING,
+    EXCEL_VISIBLE
+)
+
+try:
+    import pythoncom
+except ImportError:
+    pythoncom = None
+
+
+class XlwingsBackend:
+    """
+    Starts, attaches to and stops Excel processes through xlwings
+
+    Processes are identified by pid. COM objects belong to the thread that
+    created them, so every thread attaches its own handle to a process.
+    """
+
+    def __init__(self):
+        try:
+            import xlwings
+        except ImportError:
+            raise ImportError("xlwings is not installed; set EXCEL_ENGINE=xlsx to use the headless engine")
+        self.xw = xlwings
+
+    def start(self) -> int:
+        """Start a new Excel process and return its pid"""
+        app = self.xw.App(visible=EXCEL_VISIBLE, add_book=False)
+        app.display_alerts = EXCEL_DISPLAY_ALERTS
+        app.screen_updating = EXCEL_SCREEN_UPDATING
+        return app.pid
+
+    def attach(self, pid: int):
+        """Get an xw.App for the process, usable from the calling thread"""
+        return self.xw.apps[pid]
+
+    def is_alive(self, pid: int, handle=None) -> bool:
+        """Whether the process still answers COM calls, asked through handle if given"""
+        try:
+            (handle or self.attach(pid)).books.count
+            return True
+        except Exception:
+            return False
+
+    def stop(self, pid: int):
+        """Quit the process, killing it if it does not respond"""
+        try:
+            app = self.attach(pid)
+        except Exception:
+            # Already gone
+            return
+        try:
+            for book in app.books:
+                book.close()
+            app.quit()
+        except Exception:
+            app.kill()
+
+
+class _PooledApp:
+    """A pool slot: its current process and how many leases share it"""
+
+    def __init__(self, pid: Any):
+        self.pid = pid
+        self.leases = 0
+        self.idle_since = time.monotonic()
+        # Bumped every time the slot's process is replaced after a crash
+        self.generation = 0
+
+
+class ExcelAppLease:
+    """A handler's share of a pooled Excel process, held until released"""
+
+    def __init__(self, pool: "ExcelAppPool", pooled: _PooledApp):
+        self._pool = pool
+        self._pooled = pooled
+        self._handles = threading.local()
+        self.released = False
+
+    @property
+    def pid(self) -> Any:
+        return self._pooled.pid
+
+    @property
+    def generation(self) -> int:
+        """Changes whenever the leased process was replaced, losing its open workbooks"""
+        return self._pooled.generation
+
+    @property
+    def app(self):
+        """
+        Get the leased application for the calling thread, checking first that
+        it still responds and switching to a fresh process if it does not
+        """
+        if self.released:
+            raise RuntimeError("The Excel lease has been released")
+        handle = getattr(self._handles, 'handle', None)
+        if handle is not None and self._handles.pid != self._pooled.pid:
+            handle = None
+        pooled = self._pool._checked(self, handle)
+        if handle is None or self._handles.pid != pooled.pid:
+            self._handles.handle = self._pool.backend.attach(pooled.pid)
+            self._handles.pid = pooled.pid
+        return self._handles.handle
+
+    def release(self):
+        """Give the process back to the pool; releasing twice does nothing"""
+        if not self.released:
+            self.released = True
+            self._pool._release(self)
+
+
+class ExcelAppPool:
+    """Shared, health-checked Excel processes handed out as leases"""
+
+    def __init__(self, backend: Optional[Any] = None, max_size: Optional[int] = None,
+                 idle_seconds: Optional[float] = None):
+        """
+        Args:
+            backend: Object with start(), attach(pid), is_alive(pid, handle) and
+                     stop(pid); defaults to XlwingsBackend, created on first use
+            max_size: Most Excel processes to run; further leases share the
+                      least used one. Defaults to EXCEL_APP_POOL_SIZE
+            idle_seconds: How long a process nobody leases is kept running,
+                          defaults to EXCEL_APP_IDLE_SECONDS
+        """
+        self._backend = backend
+        self.max_size = max(1, max_size if max_size is not None else EXCEL_APP_POOL_SIZE)
+        self.idle_seconds = idle_seconds if idle_seconds is not None else EXCEL_APP_IDLE_SECONDS
+        self._apps: List[_PooledApp] = []
+        self._lock = threading.RLock()
+        self._reaper = None
+        self.stats = {'started': 0, 'restarted': 0, 'stopped': 0, 'leases': 0}
+
+    @property
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = XlwingsBackend()
+            return self._backend
+
+    def lease(self) -> ExcelAppLease:
+        """
+        Lease an Excel process, starting one if the pool has room or none is running
+
+        Returns:
+            ExcelAppLease whose app property gives the application
+        """
+        try:
+            with self._lock:
+                if len(self._apps) < self.max_size and all(app.leases for app in self._apps):
+                    pooled = self._start()
+                else:
+                    pooled = min(self._apps, key=lambda app: app.leases)
+                pooled.leases += 1
+                self.stats['leases'] += 1
+                return ExcelAppLease(self, pooled)
+        except Exception as e:
+            raise Exception(f"Failed to start Excel: {e}")
+
+    def _start(self) -> _PooledApp:
+        pooled = _PooledApp(self.backend.start())
+        self._apps.append(pooled)
+        self.stats['started'] += 1
+        return pooled
+
+    def _checked(self, lease: ExcelAppLease, handle=None) -> _PooledApp:
+        """Health-check a lease's process, replacing it for every lease on it if it died"""
+        with self._lock:
+            pooled = lease._pooled
+            if pooled not in self._apps:
+                # The pool was shut down while the lease was held
+                self._apps.append(pooled)
+            elif self.backend.is_alive(pooled.pid, handle):
+                return pooled
+            else:
+                print(f"Warning: Excel process {pooled.pid} stopped responding; starting a new one")
+                try:
+                    self.backend.stop(pooled.pid)
+                except Exception as e:
+                    print(f"Warning: Could not stop Excel process {pooled.pid}: {e}")
+                self.stats['restarted'] += 1
+
+            pooled.pid = self.backend.start()
+            pooled.generation += 1
+            return pooled
+
+    def _release(self, lease: ExcelAppLease):
+        with self._lock:
+            pooled = lease._pooled
+            pooled.leases -= 1
+            if pooled.leases <= 0:
+                pooled.leases = 0
+                pooled.idle_since = time.monotonic()
+                self._schedule_reaper(self.idle_seconds)
+
+    def _schedule_reaper(self, delay: float):
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        if sys.is_finalizing():
+            # Handlers released from __del__ at exit; no new threads can start
+            return
+        self._reaper = threading.Timer(max(0.0, delay), self._reap)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap(self):
+        """Quit the processes that have been idle for idle_seconds"""
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+        try:
+            with self._lock:
+                self._reaper = None
+                now = time.monotonic()
+                idle = [app for app in self._apps if not app.leases]
+                for pooled in idle:
+                    if now - pooled.idle_since >= self.idle_seconds:
+                        self._stop(pooled)
+                remaining = [now - app.idle_since for app in self._apps if not app.leases]
+                if remaining:
+                    self._schedule_reaper(self.idle_seconds - max(remaining))
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+
+    def _stop(self, pooled: _PooledApp):
+        self._apps.remove(pooled)
+        try:
+            self.backend.stop(pooled.pid)
+            self.stats['stopped'] += 1
+        except Exception as e:
+            print(f"Warning: Could not stop Excel process {pooled.pid}: {e}")
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Get the pid and lease count of every pooled process"""
+        with self._lock:
+            return [{'pid': app.pid, 'leases': app.leases} for app in self._apps]
+
+    def shutdown(self):
+        """Quit every pooled process, leased or not"""
+        with self._lock:
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+            for pooled in list(self._apps):
+                self._stop(pooled)
+
+
+_pools: Dict[str, ExcelAppPool] = {}
+_pool_lock = threading.Lock()
+
+
+def get_excel_app_pool(engine: str = 'xlwings') -> ExcelAppPool:
+    """
+    Get the process-wide Excel application pool of an engine
+
+    Args:
+        engine: "xlwings" for real Excel processes or "memory" for the
+                in-memory stand-in
+
+    Returns:
+        The engine's ExcelAppPool, created on first use
+    """
+    with _pool_lock:
+        if engine not in _pools:
+            if engine == 'memory':
+                from utils.memory_excel import MemoryExcelBackend
+                _pools[engine] = ExcelAppPool(MemoryExcelBackend())
+            elif engine == 'xlwings':
+                _pools[engine] = ExcelAppPool()
+            else:
+                raise ValueError(f"Unknown Excel engine: {engine}")
+        return _pools[engine]
+
+
+def shutdown_excel_app_pool():
+    """Quit the pooled Excel processes, if any were started"""
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.shutdown()
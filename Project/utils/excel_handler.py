@@ -1,60 +1,128 @@
 """
 Enhanced Excel handling utilities for project management
 """
-import xlwings as xw
+from __future__ import annotations
+
 import datetime
 import os
-import shutil
-from typing import Dict, List, Any, Optional, Union
+import zipfile
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Union
 from config.settings import (
     MASTER_TEMPLATE_PATH, 
     BASE_PROJECT_DIR, 
     MASTER_TEMPLATE_PATH_EFFLUENT,
     MASTER_TEMPLATE_PATH_BMP_SOLID,
-    MASTER_TEMPLATE_PATH_BMP_EFFLUENT
+    MASTER_TEMPLATE_PATH_BMP_EFFLUENT,
+    EXCEL_ENGINE
 )
+from utils.backup_store import BackupStore
+from utils.column_widths import column_width, display_text, text_width
+from utils.excel_app_pool import get_excel_app_pool
+from utils.tracing import span, traced
+from utils.workbook_metadata import get_sheet_names, get_summary
+from utils.workbook_sessions import WorkbookSessionCache
+from utils.validators import validate_sample_name, validate_sample_renames
+from utils.xlsx_package import cell_ref, rename_sheet_in_package, rename_sheets_in_package, split_cell_ref
+from utils.xlsx_reader import read_workbook_cells
+
+if TYPE_CHECKING:
+    # xlwings is only imported by the Excel application pool, when a handler
+    # first needs Excel; only the headless engine works without it
+    import xlwings as xw
 
 
 class ExcelHandler:
     """Enhanced Excel operations handler for the project management system"""
 
-    def __init__(self):
+    def __init__(self, engine: str = 'xlwings'):
+        """
+        Args:
+            engine: "xlwings" to drive Excel or "memory" for the in-memory
+                    stand-in from utils.memory_excel
+        """
+        self.engine = engine
         self.master_template_path = MASTER_TEMPLATE_PATH
         self.master_template_path_effluent = MASTER_TEMPLATE_PATH_EFFLUENT
         self.master_template_path_bmp_solid = MASTER_TEMPLATE_PATH_BMP_SOLID
         self.master_template_path_bmp_effluent = MASTER_TEMPLATE_PATH_BMP_EFFLUENT
         self.base_dir = BASE_PROJECT_DIR
-        self._app_instance = None
-        self._workbook_cache = {}
+        # Lease on a pooled Excel process, shared with the other handlers
+        self._app_lease = None
+        self._app_generation = None
+        self._workbook_cache = WorkbookSessionCache(
+            opener=self._open_workbook,
+            saver=self._save_session,
+            closer=lambda session: session.book.close()
+        )
+
+    def _get_app_instance(self) -> xw.App:
+        """Get the pooled Excel application, leasing one on first use"""
+        if self._app_lease is None:
+            self._app_lease = get_excel_app_pool(self.engine).lease()
+            self._app_generation = self._app_lease.generation
+        app = self._app_lease.app
+        if self._app_lease.generation != self._app_generation:
+            # Excel was restarted after a crash; the open workbooks went with it
+            print("Warning: Excel was restarted; unsaved changes in open workbooks were lost")
+            self._app_generation = self._app_lease.generation
+            self._workbook_cache.close(save=False)
+        return app
+
+    @traced('open')
+    def _open_workbook(self, excel_path: str) -> xw.Book:
+        """Open a project workbook for the session cache"""
+        return self._get_app_instance().books.open(excel_path)
+
+    def _session(self, excel_path: str):
+        """Get the workbook session, first making sure Excel has not been restarted under it"""
+        if self._app_lease is not None:
+            self._get_app_instance()
+        return self._workbook_cache.get(excel_path)
+
+    def _save_session(self, session):
+        """Fit the columns that changed since the last save, then save the workbook"""
+        self._fit_changed_columns(session)
+        with span('save', workbook=os.path.basename(session.path)):
+            session.book.save()
+        self._create_backup(session.path)
+
+    @traced()
+    def flush(self, excel_path: Optional[str] = None) -> List[str]:
+        """
+        Save workbooks with pending changes
+
+        Args:
+            excel_path: Workbook to save, None for every open workbook
 
-    def _get_app_instance(self, visible: bool = False) -> xw.App:
-        """Get a reusable Excel application instance for better performance"""
+        Returns:
+            Paths of the workbooks that were saved
+        """
         try:
-            if self._app_instance is None:
-                self._app_instance = xw.App(visible=visible)
-                self._app_instance.display_alerts = False
-                self._app_instance.screen_updating = False
-            return self._app_instance
-        except Exception:
-            # Create new instance if current one is invalid
-            self._app_instance = xw.App(visible=visible)
-            self._app_instance.display_alerts = False
-            self._app_instance.screen_updating = False
-            return self._app_instance
+            return self._workbook_cache.flush(excel_path)
+        except Exception as e:
+            raise Exception(f"Failed to save Excel workbook: {e}")
 
-    def _cleanup_app(self):
-        """Clean up Excel application instance"""
-        if self._app_instance:
-            try:
-                for wb in self._app_instance.books:
-                    wb.close()
-                self._app_instance.quit()
-            except Exception:
-                pass
-            finally:
-                self._app_instance = None
-        self._workbook_cache.clear()
+    def close_workbooks(self, excel_path: Optional[str] = None):
+        """Save pending changes and close open workbooks"""
+        self._workbook_cache.close(excel_path)
 
+    def close(self):
+        """Save pending changes, close open workbooks and give Excel back to the pool"""
+        self._cleanup_app()
+
+    def _cleanup_app(self):
+        """Close the handler's workbooks and release its Excel lease"""
+        try:
+            self._workbook_cache.close()
+        except Exception as e:
+            print(f"Warning: Could not save open workbooks: {e}")
+        self._workbook_cache.close(save=False)
+        if self._app_lease is not None:
+            # The pool quits the process once no handler has used it for a while
+            self._app_lease.release()
+            self._app_lease = None
+
+    @traced()
     def create_bmp_workbook(self, project_name: str, sample_count: int, 
                            sample_sheets: List[str], sample_type: str = "Solid") -> str:
         """
@@ -88,23 +156,25 @@ class ExcelHandler:
             if not os.path.exists(template_path):
                 raise FileNotFoundError(f"BMP template file not found: {template_path}")
 
-            master_wb = app.books.open(template_path)
+            with span('open', workbook=os.path.basename(template_path)):
+                master_wb = app.books.open(template_path)
             master_sheet = master_wb.sheets[0]
 
             new_wb = app.books.add()
+            default_sheet = new_wb.sheets[0]
             
             # Create project summary sheet
             self._create_bmp_summary_sheet(new_wb, project_name, sample_count, sample_type)
 
-            # Create sample sheets
+            # Create sample sheets after the summary, in order
             for i in range(sample_count):
                 sheet_name = sample_sheets[i]
 
                 if i == 0:
-                    new_sheet = new_wb.sheets[0]
+                    new_sheet = default_sheet
                     new_sheet.name = sheet_name
                 else:
-                    new_sheet = new_wb.sheets.add(name=sheet_name)
+                    new_sheet = new_wb.sheets.add(name=sheet_name, after=new_wb.sheets[-1])
 
                 # Copy template with better range detection
                 self._copy_template_to_sheet(master_sheet, new_sheet)
@@ -112,7 +182,8 @@ class ExcelHandler:
                 # Add BMP-specific formatting
                 self._format_bmp_sheet(new_sheet, sheet_name)
 
-            new_wb.save(new_file_path)
+            with span('save', workbook=os.path.basename(new_file_path), samples=sample_count):
+                new_wb.save(new_file_path)
             master_wb.close()
             new_wb.close()
 
@@ -124,6 +195,7 @@ class ExcelHandler:
         except Exception as e:
             raise Exception(f"Failed to create BMP workbook: {e}")
 
+    @traced()
     def create_characterisation_workbook(self, project_name: str, sample_count: int, 
                                        sample_sheets: List[str], sample_type: str = "Solid") -> str:
         """
@@ -157,28 +229,31 @@ class ExcelHandler:
             if not os.path.exists(template_path):
                 raise FileNotFoundError(f"Characterisation template file not found: {template_path}")
 
-            master_wb = app.books.open(template_path)
+            with span('open', workbook=os.path.basename(template_path)):
+                master_wb = app.books.open(template_path)
             master_sheet = master_wb.sheets[0]
 
             new_wb = app.books.add()
+            default_sheet = new_wb.sheets[0]
             
             # Create project summary sheet
             self._create_characterisation_summary_sheet(new_wb, project_name, sample_count, sample_type)
 
-            # Create sample sheets
+            # Create sample sheets after the summary, in order
             for i in range(sample_count):
                 sheet_name = sample_sheets[i]
 
                 if i == 0:
-                    new_sheet = new_wb.sheets[0]
+                    new_sheet = default_sheet
                     new_sheet.name = sheet_name
                 else:
-                    new_sheet = new_wb.sheets.add(name=sheet_name)
+                    new_sheet = new_wb.sheets.add(name=sheet_name, after=new_wb.sheets[-1])
 
                 # Copy template with better range detection
                 self._copy_template_to_sheet(master_sheet, new_sheet)
 
-            new_wb.save(new_file_path)
+            with span('save', workbook=os.path.basename(new_file_path), samples=sample_count):
+                new_wb.save(new_file_path)
             master_wb.close()
             new_wb.close()
 
@@ -252,6 +327,7 @@ class ExcelHandler:
         except Exception as e:
             print(f"Warning: Could not create characterisation summary sheet: {e}")
 
+    @traced('copy_template')
     def _copy_template_to_sheet(self, master_sheet: xw.Sheet, target_sheet: xw.Sheet):
         """Copy template content to target sheet with smart range detection"""
         try:
@@ -286,19 +362,15 @@ class ExcelHandler:
         except Exception as e:
             print(f"Warning: Could not format BMP sheet {sheet_name}: {e}")
 
+    @traced('backup')
     def _create_backup(self, file_path: str):
-        """Create a backup of the Excel file"""
+        """Store the current version of the workbook in its folder's backup store"""
         try:
-            backup_dir = os.path.join(os.path.dirname(file_path), "backups")
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            backup_name = f"backup_{os.path.basename(file_path)}"
-            backup_path = os.path.join(backup_dir, backup_name)
-            
-            shutil.copy2(file_path, backup_path)
+            BackupStore.for_workbook(file_path).snapshot(file_path)
         except Exception as e:
             print(f"Warning: Could not create backup: {e}")
 
+    @traced()
     def save_bmp_data(self, excel_path: str, sheet_name: str, data: Dict[str, Any]):
         """
         Save BMP data to a specific sheet with enhanced error handling
@@ -308,41 +380,26 @@ class ExcelHandler:
             sheet_name: Name of the sheet to save to
             data: Dictionary with cell ranges as keys and values to save
         """
-        app = self._get_app_instance()
-
         try:
-            wb = app.books.open(excel_path)
-            sheet = wb.sheets[sheet_name]
+            session = self._session(excel_path)
+            sheet = session.book.sheets[sheet_name]
 
             # Batch operations for better performance
-            for cell_range, value in data.items():
-                try:
-                    if ':' in cell_range:
-                        # Handle merged cells
-                        sheet.range(cell_range).clear_contents()
-                        try:
-                            sheet.range(cell_range).api.UnMerge()
-                        except:
-                            pass  # Cell might not be merged
-                        sheet.range(cell_range).value = value
-                        sheet.range(cell_range).api.Merge()
-                        sheet.range(cell_range).api.HorizontalAlignment = -4108  # Center alignment
-                    else:
-                        # Handle single cells
-                        sheet.range(cell_range).clear_contents()
-                        sheet.range(cell_range).value = value
-                except Exception as e:
-                    print(f"Warning: Could not save data to {cell_range}: {e}")
+            state = session.sheet_state(sheet_name)
+            for cell_range, error in self._write_sheet_data(sheet, data, state).items():
+                if error:
+                    print(f"Warning: Could not save data to {cell_range}: {error}")
 
-            # Auto-fit ALL columns after data entry
-            self._auto_fit_all_columns(sheet)
-
-            wb.save()
-            wb.close()
+            # Nothing to save when every value was already there; changed
+            # columns are fitted when the workbook is saved
+            if state['changed']:
+                # Written to disk by flush(), on close or on eviction
+                session.mark_dirty()
 
         except Exception as e:
             raise Exception(f"Failed to save BMP data to Excel: {e}")
 
+    @traced()
     def save_characterisation_data(self, excel_path: str, sheet_name: str, data: Dict[str, Any]):
         """
         Save characterisation data to a specific sheet with enhanced error handling
@@ -352,37 +409,222 @@ class ExcelHandler:
             sheet_name: Name of the sheet to save to
             data: Dictionary with cell ranges as keys and values to save
         """
-        app = self._get_app_instance()
+        try:
+            session = self._session(excel_path)
+            sheet = session.book.sheets[sheet_name]
+
+            state = session.sheet_state(sheet_name)
+            for cell_range, error in self._write_sheet_data(sheet, data, state).items():
+                if error:
+                    print(f"Warning: Could not save data to {cell_range}: {error}")
 
+            # Nothing to save when every value was already there; changed
+            # columns are fitted when the workbook is saved
+            if state['changed']:
+                # Written to disk by flush(), on close or on eviction
+                session.mark_dirty()
+
+        except Exception as e:
+            raise Exception(f"Failed to save characterisation data to Excel: {e}")
+
+    @traced()
+    def save_many(self, excel_path: str,
+                  sheets_data: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        Save values for many sheets in one open/write/save pass
+
+        Args:
+            excel_path: Path to the Excel file
+            sheets_data: Sheet names mapped to {cell range: value} dictionaries
+
+        Returns:
+            Sheet names mapped to {cell range: error message}, None for cells that were saved
+        """
         try:
-            wb = app.books.open(excel_path)
-            sheet = wb.sheets[sheet_name]
+            session = self._session(excel_path)
+            sheet_names = [sheet.name for sheet in session.book.sheets]
+            results = {}
 
-            for cell_range, value in data.items():
-                try:
-                    if ':' in cell_range:
-                        sheet.range(cell_range).clear_contents()
-                        try:
-                            sheet.range(cell_range).api.UnMerge()
-                        except:
-                            pass  # Cell might not be merged
-                        sheet.range(cell_range).value = value
-                        sheet.range(cell_range).api.Merge()
-                        sheet.range(cell_range).api.HorizontalAlignment = -4108
-                    else:
-                        sheet.range(cell_range).clear_contents()
-                        sheet.range(cell_range).value = value
-                except Exception as e:
-                    print(f"Warning: Could not save data to {cell_range}: {e}")
+            for sheet_name, data in sheets_data.items():
+                if sheet_name not in sheet_names:
+                    error = f"Sheet '{sheet_name}' does not exist"
+                    results[sheet_name] = {cell_range: error for cell_range in data}
+                    continue
 
-            # Auto-fit ALL columns after data entry
-            self._auto_fit_all_columns(sheet)
+                sheet = session.book.sheets[sheet_name]
+                state = session.sheet_state(sheet_name)
+                results[sheet_name] = self._write_sheet_data(sheet, data, state)
+                if state['changed']:
+                    session.mark_dirty()
 
-            wb.save()
-            wb.close()
+            self._workbook_cache.flush(excel_path)
+            return results
 
         except Exception as e:
-            raise Exception(f"Failed to save characterisation data to Excel: {e}")
+            raise Exception(f"Failed to save data to Excel: {e}")
+
+    @traced('write_cells')
+    def _write_sheet_data(self, sheet: xw.Sheet, data: Dict[str, Any],
+                          state: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """
+        Write cell values into a sheet, merging and centring ranges
+
+        Only cells whose value differs from what the workbook holds are
+        touched: the saved values of the form cells are read once, the first
+        time the session writes to them, and a range is merged and centred
+        once per session. Each write is one COM call instead of clear /
+        unmerge / set / merge / align.
+
+        Args:
+            sheet: Sheet to write to
+            data: Dictionary with cell ranges as keys and values to save
+            state: The session's sheet_state for this sheet
+
+        Returns:
+            Cell ranges mapped to an error message, None for cells that were written
+        """
+        written = state['values']
+        self._read_saved_values(sheet, [ref for ref in data if ref not in written], written)
+        results = {}
+        for cell_range, value in data.items():
+            try:
+                if ':' in cell_range and cell_range not in state['merged']:
+                    if self._merge_and_centre(sheet.range(cell_range)):
+                        # Merging cleared the contents
+                        written.pop(cell_range, None)
+                    state['merged'].add(cell_range)
+
+                if cell_range in written and self._same_value(written[cell_range], value):
+                    results[cell_range] = None
+                    continue
+
+                if ':' in cell_range:
+                    # A merged range keeps its value in the top-left cell
+                    sheet.range(cell_range)[0, 0].value = value
+                else:
+                    # Handle single cells
+                    sheet.range(cell_range).value = value
+                written[cell_range] = value
+                state['changed'].add(cell_range)
+                results[cell_range] = None
+            except Exception as e:
+                written.pop(cell_range, None)
+                results[cell_range] = str(e)
+        return results
+
+    def _read_saved_values(self, sheet: xw.Sheet, cell_ranges: List[str], values: Dict[str, Any]):
+        """
+        Read the values of cells (the top-left cell of a range) with one read
+        of the block spanning them, adding them to values
+        """
+        if not cell_ranges:
+            return
+        try:
+            corners = {cell_range: split_cell_ref(cell_range.split(':')[0]) for cell_range in cell_ranges}
+            first_row = min(row for row, col in corners.values())
+            first_col = min(col for row, col in corners.values())
+            last_row = max(row for row, col in corners.values())
+            last_col = max(col for row, col in corners.values())
+            block = sheet.range(f"{cell_ref(first_row, first_col)}:{cell_ref(last_row, last_col)}").value
+        except Exception as e:
+            # Unknown cells are simply written
+            print(f"Warning: Could not read saved values from {sheet.name}: {e}")
+            return
+
+        # Range.value is a scalar for one cell and a flat list for one row or column
+        if first_row == last_row and first_col == last_col:
+            block = [[block]]
+        elif first_row == last_row:
+            block = [block]
+        elif first_col == last_col:
+            block = [[value] for value in block]
+        for cell_range, (row, col) in corners.items():
+            values[cell_range] = block[row - first_row][col - first_col]
+
+    @staticmethod
+    def _same_value(saved: Any, value: Any) -> bool:
+        """Check whether writing value would leave a cell holding saved unchanged"""
+        if saved == value:
+            return True
+        if value in ('', None):
+            return saved in ('', None)
+        if (isinstance(value, str) and isinstance(saved, (int, float))
+                and not isinstance(saved, bool)):
+            # Excel stores a number typed as text as the number
+            try:
+                return float(value.strip()) == saved
+            except ValueError:
+                return False
+        return False
+
+    def _merge_and_centre(self, target: xw.Range) -> bool:
+        """
+        Merge and centre a range, leaving an existing identical merge in place
+
+        Returns:
+            True if the range was (re)merged, which clears its contents
+        """
+        merged = target[0, 0].api.MergeArea.Address != target.api.Address
+        if merged:
+            target.clear_contents()
+            try:
+                target.api.UnMerge()
+            except:
+                pass  # Cell might not be merged
+            target.api.Merge()
+        target.api.HorizontalAlignment = -4108  # Center alignment
+        return merged
+
+    @traced('autofit')
+    def _fit_changed_columns(self, session):
+        """Re-fit only the columns holding cells written since the last save"""
+        for sheet_name, state in session.state.get('sheets', {}).items():
+            if not state['changed']:
+                continue
+            # Merged ranges don't count towards AutoFit, so only single cells matter
+            columns = {split_cell_ref(ref)[1] for ref in state['changed'] if ':' not in ref}
+            if columns:
+                try:
+                    self._fit_columns(session.book.sheets[sheet_name], sorted(columns))
+                except Exception as e:
+                    print(f"Warning: Could not auto-fit columns on {sheet_name}: {e}")
+                    self._auto_fit_all_columns(session.book.sheets[sheet_name])
+            state['changed'].clear()
+
+    def _fit_columns(self, sheet: xw.Sheet, columns: List[int]):
+        """
+        Set column widths computed from their contents and fonts, capped at
+        MAX_COLUMN_WIDTH with wrapping, in a few COM calls per column instead
+        of an AutoFit of the whole sheet
+        """
+        last_row = sheet.used_range.last_cell.row
+        app = sheet.book.app.api
+        default_font = (app.StandardFont, app.StandardFontSize)
+
+        for col in columns:
+            column = sheet.range((1, col), (last_row, col))
+            values = column.options(ndim=1).value
+            font = column.api.Font
+            font_name = font.Name or default_font[0]
+            font_size = font.Size or default_font[1]
+            bold = bool(font.Bold)
+
+            # Cells in merged ranges are ignored by AutoFit; only look when the column has some
+            merge_state = column.api.MergeCells
+            widths = []
+            for row, value in enumerate(values, start=1):
+                if value is None or value == '':
+                    continue
+                if merge_state is not False and sheet.range((row, col)).api.MergeCells:
+                    continue
+                widths.append(text_width(display_text(value), font_name, font_size, bold))
+
+            width, wrap = column_width(widths)
+            if width is None:
+                continue
+            column.api.EntireColumn.ColumnWidth = width
+            if wrap:
+                column.api.EntireColumn.WrapText = True
 
     def _auto_fit_all_columns(self, sheet: xw.Sheet):
         """Auto-fit ALL columns with data for better readability"""
@@ -468,6 +710,7 @@ class ExcelHandler:
         except Exception as e:
             print(f"Warning: Could not auto-fit specific columns: {e}")
 
+    @traced()
     def rename_sheet(self, excel_path: str, old_name: str, new_name: str):
         """
         Rename a sheet in the Excel workbook with validation
@@ -477,10 +720,23 @@ class ExcelHandler:
             old_name: Current name of the sheet
             new_name: New name for the sheet
         """
-        app = self._get_app_instance()
-
         try:
-            wb = app.books.open(excel_path)
+            if self._workbook_cache.peek(excel_path) is None and zipfile.is_zipfile(excel_path):
+                # Not open in Excel: rename inside the .xlsx package, no Excel needed
+                sheet_names = get_sheet_names(excel_path)
+                if old_name not in sheet_names:
+                    raise ValueError(f"Sheet '{old_name}' does not exist")
+                if new_name.lower() in [name.lower() for name in sheet_names if name != old_name]:
+                    raise ValueError(f"Sheet '{new_name}' already exists")
+                # Excel would reject names it cannot store; so do we
+                if not validate_sample_name(new_name, []) or new_name != new_name.strip():
+                    raise ValueError(f"Invalid sheet name '{new_name}'")
+                rename_sheet_in_package(excel_path, old_name, new_name)
+                self._create_backup(excel_path)
+                return
+
+            session = self._session(excel_path)
+            wb = session.book
             
             # Check if old sheet exists
             sheet_names = [sheet.name for sheet in wb.sheets]
@@ -493,12 +749,52 @@ class ExcelHandler:
             
             sheet = wb.sheets[old_name]
             sheet.name = new_name
-            wb.save()
-            wb.close()
+            session.rename_sheet_state(old_name, new_name)
+            session.mark_dirty()
 
         except Exception as e:
             raise Exception(f"Failed to rename sheet: {e}")
 
+    @traced()
+    def rename_sheets(self, excel_path: str, renames: Dict[str, str]):
+        """
+        Rename several sheets in one go; all names are validated first and
+        either every sheet is renamed or none is
+
+        Args:
+            excel_path: Path to the Excel file
+            renames: New sheet names keyed by current sheet name
+        """
+        try:
+            if self._workbook_cache.peek(excel_path) is None and zipfile.is_zipfile(excel_path):
+                # Not open in Excel: one rewrite of the .xlsx package, no Excel needed
+                errors = validate_sample_renames(renames, get_sheet_names(excel_path))
+                if errors:
+                    raise ValueError("; ".join(f"{name}: {error}" for name, error in errors.items()))
+                rename_sheets_in_package(excel_path, renames)
+                self._create_backup(excel_path)
+                return
+
+            session = self._session(excel_path)
+            wb = session.book
+
+            errors = validate_sample_renames(renames, [sheet.name for sheet in wb.sheets])
+            if errors:
+                raise ValueError("; ".join(f"{name}: {error}" for name, error in errors.items()))
+
+            renames = {old_name: new_name for old_name, new_name in renames.items() if old_name != new_name}
+            # Park every sheet on a temporary name first so samples can swap names
+            for index, old_name in enumerate(renames):
+                wb.sheets[old_name].name = f"~rename{index}"
+            for index, new_name in enumerate(renames.values()):
+                wb.sheets[f"~rename{index}"].name = new_name
+            session.rename_sheets_state(renames)
+            session.mark_dirty()
+
+        except Exception as e:
+            raise Exception(f"Failed to rename sheets: {e}")
+
+    @traced()
     def get_sheet_data(self, excel_path: str, sheet_name: str, cell_ranges: List[str]) -> Dict[str, Any]:
         """
         Get data from specific cell ranges in a sheet with error handling
@@ -511,11 +807,8 @@ class ExcelHandler:
         Returns:
             Dictionary with cell ranges as keys and their values
         """
-        app = self._get_app_instance()
-
         try:
-            wb = app.books.open(excel_path)
-            sheet = wb.sheets[sheet_name]
+            sheet = self._session(excel_path).book.sheets[sheet_name]
 
             data = {}
             for cell_range in cell_ranges:
@@ -525,12 +818,46 @@ class ExcelHandler:
                     print(f"Warning: Could not read {cell_range}: {e}")
                     data[cell_range] = None
 
-            wb.close()
             return data
 
         except Exception as e:
             raise Exception(f"Failed to read data from Excel: {e}")
 
+    @traced()
+    def get_all_sheet_data(self, excel_path: str, cell_ranges: List[str],
+                           sheet_names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the same cell ranges from many sheets in one streaming pass over the
+        file, without opening the workbook in Excel
+
+        Args:
+            excel_path: Path to the Excel file
+            cell_ranges: List of cell ranges to read from every sheet
+            sheet_names: Sheets to read, None for all of them
+
+        Returns:
+            Dictionary with sheet names as keys and get_sheet_data()-style dictionaries as values
+        """
+        try:
+            # Pending edits must be on disk before the file is read directly
+            self.flush(excel_path)
+            if zipfile.is_zipfile(excel_path):
+                return read_workbook_cells(excel_path, cell_ranges, sheet_names)
+
+            # Legacy .xls and in-memory engine workbooks are only readable through Excel
+            wb = self._session(excel_path).book
+            available = [sheet.name for sheet in wb.sheets]
+            if sheet_names is None:
+                sheet_names = available
+            missing = [name for name in sheet_names if name not in available]
+            if missing:
+                raise KeyError(f"Sheet '{missing[0]}' does not exist")
+            return {name: {cell_range: wb.sheets[name].range(cell_range).value for cell_range in cell_ranges}
+                    for name in sheet_names}
+        except Exception as e:
+            raise Exception(f"Failed to read data from Excel: {e}")
+
+    @traced()
     def check_sheet_exists(self, excel_path: str, sheet_name: str) -> bool:
         """
         Check if a sheet exists in the workbook
@@ -542,17 +869,21 @@ class ExcelHandler:
         Returns:
             True if sheet exists, False otherwise
         """
-        app = self._get_app_instance()
-
         try:
-            wb = app.books.open(excel_path)
+            if not self._workbook_cache.is_dirty(excel_path):
+                try:
+                    return sheet_name in get_sheet_names(excel_path)
+                except zipfile.BadZipFile:
+                    pass  # Legacy .xls workbooks are only readable through Excel
+
+            wb = self._session(excel_path).book
             sheet_names = [sheet.name for sheet in wb.sheets]
-            wb.close()
             return sheet_name in sheet_names
 
         except Exception:
             return False
 
+    @traced()
     def get_project_summary(self, excel_path: str) -> Dict[str, Any]:
         """
         Get project summary information from Excel file
@@ -563,10 +894,14 @@ class ExcelHandler:
         Returns:
             Dictionary with project summary data
         """
-        app = self._get_app_instance()
-        
         try:
-            wb = app.books.open(excel_path)
+            if not self._workbook_cache.is_dirty(excel_path):
+                try:
+                    return get_summary(excel_path)
+                except zipfile.BadZipFile:
+                    pass  # Legacy .xls workbooks are only readable through Excel
+
+            wb = self._session(excel_path).book
             summary_data = {}
             
             # Look for summary sheets
@@ -586,7 +921,6 @@ class ExcelHandler:
                 except Exception:
                     summary_data['error'] = "Could not read summary data"
             
-            wb.close()
             return summary_data
             
         except Exception as e:
@@ -594,4 +928,25 @@ class ExcelHandler:
 
     def __del__(self):
         """Cleanup when object is destroyed"""
-        self._cleanup_app()
\ No newline at end of file
+        self._cleanup_app()
+
+
+def create_excel_handler(engine: Optional[str] = None):
+    """
+    Create an Excel handler for the selected workbook engine
+
+    Args:
+        engine: "xlwings" to drive Excel over COM, "xlsx" to edit the .xlsx
+                package directly or "memory" to run ExcelHandler on the
+                in-memory stand-in for Excel; defaults to the EXCEL_ENGINE setting
+
+    Returns:
+        ExcelHandler or XlsxHandler instance (both expose the same API)
+    """
+    engine = (engine or EXCEL_ENGINE).lower()
+    if engine == 'xlsx':
+        from utils.xlsx_handler import XlsxHandler
+        return XlsxHandler()
+    if engine in ('xlwings', 'memory'):
+        return ExcelHandler(engine)
+    raise ValueError(f"Unknown Excel engine: {engine}")
\ No newline at end of file
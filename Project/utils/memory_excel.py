@@ -0,0 +1,770 @@
+"""
+In-memory Excel backend - the parts of xlwings ExcelHandler uses, without Excel
+
+ExcelHandler and the frames calling it need xlwings and a running Excel, so
+none of that code can run on Linux. This module mimics the xlwings objects
+the handler touches (App, Books, Book, Sheets, Sheet, Range and the few COM
+.api members it calls) on plain Python dictionaries. Setting EXCEL_ENGINE to
+'memory' makes create_excel_handler() return an ExcelHandler whose pooled
+application is a MemoryApp.
+
+Every call that would be a COM round trip with real Excel is counted per
+operation name in MemoryExcelBackend.operations, so callers can be timed and
+compared by how much work they ask of Excel.
+
+Workbooks are saved as JSON (cell values, fonts, alignment, merged ranges
+and column widths), whatever the file extension. Real .xlsx files, such as
+the master templates, can be opened too; their values, fonts, merged ranges
+and column widths are imported.
+"""
+import datetime
+import json
+import os
+import re
+import threading
+import zipfile
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from utils.column_widths import column_width, display_text, text_width
+from utils.xlsx_package import (
+    MAX_COLUMNS,
+    MAX_ROWS,
+    XlsxWorkbook,
+    atomic_file,
+    cell_ref,
+    column_index,
+    column_letter,
+    range_bounds,
+    shape_range_values
+)
+
+FORMAT_NAME = 'memory-workbook'
+FORMAT_VERSION = 1
+
+DEFAULT_FONT = {'name': 'Calibri', 'size': 11.0, 'bold': False}
+DEFAULT_COLUMN_WIDTH = 8.43
+# Widest column Excel allows
+MAX_EXCEL_COLUMN_WIDTH = 255
+
+_COLUMN_RANGE_RE = re.compile(r'^\$?([A-Za-z]{1,3}):\$?([A-Za-z]{1,3})$')
+
+Bounds = Tuple[int, int, int, int]
+
+
+def _parse_address(address: str) -> Bounds:
+    """Get (first_row, first_col, last_row, last_col) for "A1", "A1:B2" or whole columns like "A:B" """
+    match = _COLUMN_RANGE_RE.match(address.strip())
+    if match:
+        first, last = sorted((column_index(match.group(1)), column_index(match.group(2))))
+        return 1, first, MAX_ROWS, last
+    return range_bounds(address)
+
+
+def _address(bounds: Bounds) -> str:
+    """Absolute address of a range the way COM reports it, e.g. "$A$1:$B$2" """
+    first_row, first_col, last_row, last_col = bounds
+    start = f"${column_letter(first_col)}${first_row}"
+    if (first_row, first_col) == (last_row, last_col):
+        return start
+    return f"{start}:${column_letter(last_col)}${last_row}"
+
+
+def _contains(bounds: Bounds, row: int, col: int) -> bool:
+    return bounds[0] <= row <= bounds[2] and bounds[1] <= col <= bounds[3]
+
+
+def _overlaps(first: Bounds, second: Bounds) -> bool:
+    return not (first[2] < second[0] or second[2] < first[0] or
+                first[3] < second[1] or second[3] < first[1])
+
+
+def _normalise(value: Any) -> Any:
+    """Store a value the way Excel hands it back: numbers as floats, dates as datetimes"""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, float)):
+        return value
+    if isinstance(value, int):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    return str(value)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {'datetime': value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return datetime.datetime.fromisoformat(value['datetime'])
+    return value
+
+
+class MemoryExcelBackend:
+    """
+    Excel application pool backend creating MemoryApp instances
+
+    Stands in for XlwingsBackend; its operations counter is shared by every
+    application it starts.
+    """
+
+    def __init__(self):
+        self.operations = Counter()
+        self._apps = {}
+        self._next_pid = 1
+        self._lock = threading.Lock()
+
+    def count(self, operation: str):
+        """Record one call that would be a round trip to Excel"""
+        with self._lock:
+            self.operations[operation] += 1
+
+    def reset_operations(self) -> Dict[str, int]:
+        """Clear the operation counts, returning the counts so far"""
+        with self._lock:
+            counts = dict(self.operations)
+            self.operations.clear()
+            return counts
+
+    def start(self) -> int:
+        with self._lock:
+            pid = self._next_pid
+            self._next_pid += 1
+            self._apps[pid] = MemoryApp(self, pid)
+        self.count('app.start')
+        return pid
+
+    def attach(self, pid: int) -> "MemoryApp":
+        try:
+            return self._apps[pid]
+        except KeyError:
+            raise RuntimeError(f"No Excel process with pid {pid}")
+
+    def is_alive(self, pid: int, handle=None) -> bool:
+        app = self._apps.get(pid)
+        return app is not None and not app.crashed
+
+    def stop(self, pid: int):
+        with self._lock:
+            app = self._apps.pop(pid, None)
+        if app is not None:
+            app.books._books.clear()
+            self.count('app.stop')
+
+    def crash(self, pid: int):
+        """Make an application stop responding, losing its open workbooks, as a crashed Excel would"""
+        app = self.attach(pid)
+        app.crashed = True
+        app.books._books.clear()
+
+
+class _AppApi:
+    """The Application COM members ExcelHandler reads"""
+    StandardFont = DEFAULT_FONT['name']
+    StandardFontSize = DEFAULT_FONT['size']
+
+
+class MemoryApp:
+    """Stands in for xw.App"""
+
+    def __init__(self, backend: MemoryExcelBackend, pid: int):
+        self.backend = backend
+        self.pid = pid
+        self.books = MemoryBooks(self)
+        self.api = _AppApi()
+        self.visible = False
+        self.display_alerts = False
+        self.screen_updating = False
+        self.crashed = False
+        # Contents of the last Range.copy(), pasted by Range.paste()
+        self.clipboard = None
+
+    def count(self, operation: str):
+        if self.crashed:
+            raise RuntimeError("The remote procedure call failed")
+        self.backend.count(operation)
+
+    def quit(self):
+        self.backend.stop(self.pid)
+
+    def kill(self):
+        self.backend.stop(self.pid)
+
+
+class MemoryBooks:
+    """Stands in for xw.App.books"""
+
+    def __init__(self, app: MemoryApp):
+        self.app = app
+        self._books: List["MemoryBook"] = []
+
+    @property
+    def count(self) -> int:
+        self.app.count('books.count')
+        return len(self._books)
+
+    def open(self, path: str) -> "MemoryBook":
+        """Open a saved workbook, or return it if it is already open"""
+        self.app.count('books.open')
+        fullname = os.path.abspath(path)
+        for book in self._books:
+            if book.fullname == fullname:
+                return book
+        if not os.path.exists(fullname):
+            raise FileNotFoundError(f"Workbook not found: {path}")
+        book = MemoryBook(self.app, os.path.basename(fullname), fullname)
+        if zipfile.is_zipfile(fullname):
+            book._import_xlsx(fullname)
+        else:
+            book._load(fullname)
+        self._books.append(book)
+        return book
+
+    def add(self) -> "MemoryBook":
+        """Create a new workbook with one empty sheet"""
+        self.app.count('books.add')
+        names = {book.name for book in self._books}
+        number = 1
+        while f"Book{number}" in names:
+            number += 1
+        book = MemoryBook(self.app, f"Book{number}")
+        book.sheets._insert(MemorySheet(book, "Sheet1"), 0)
+        self._books.append(book)
+        return book
+
+    def __iter__(self):
+        return iter(list(self._books))
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+
+class MemoryBook:
+    """Stands in for xw.Book"""
+
+    def __init__(self, app: MemoryApp, name: str, fullname: Optional[str] = None):
+        self.app = app
+        self.name = name
+        self.fullname = fullname
+        self.sheets = MemorySheets(self)
+
+    def save(self, path: Optional[str] = None):
+        """
+        Save the workbook as JSON
+
+        Args:
+            path: File to save to, None for the file the workbook came from
+        """
+        self.app.count('book.save')
+        path = path or self.fullname
+        if not path:
+            raise ValueError("The workbook has never been saved; give a path")
+        data = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'sheets': [sheet._to_dict() for sheet in self.sheets],
+        }
+        with atomic_file(path, suffix='.json') as f:
+            f.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        self.fullname = os.path.abspath(path)
+        self.name = os.path.basename(self.fullname)
+
+    def close(self):
+        """Close the workbook without saving it"""
+        self.app.count('book.close')
+        if self in self.app.books._books:
+            self.app.books._books.remove(self)
+
+    def _load(self, path: str):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Not an in-memory engine workbook: {path}: {e}")
+        if data.get('format') != FORMAT_NAME:
+            raise ValueError(f"Not an in-memory engine workbook: {path}")
+        for sheet_data in data['sheets']:
+            sheet = MemorySheet(self, sheet_data['name'])
+            sheet._from_dict(sheet_data)
+            self.sheets._insert(sheet, len(self.sheets._sheets))
+
+    def _import_xlsx(self, path: str):
+        """Copy the values, fonts, merged ranges and column widths of an .xlsx file"""
+        workbook = XlsxWorkbook.open(path)
+        shared_strings = workbook.shared_strings
+        styles = workbook.styles
+        for name in workbook.sheet_names():
+            part = workbook.worksheet(name)
+            sheet = MemorySheet(self, name)
+            for row, col in part.iter_cells():
+                ref = cell_ref(row, col)
+                value = part.get_value(ref, shared_strings, styles)
+                if value is None:
+                    value = part.cell_formula(ref)
+                if value is not None:
+                    sheet.cells[(row, col)] = value
+                style = part.cell_style(ref)
+                if style:
+                    font = styles.font_info(style)
+                    if font != DEFAULT_FONT:
+                        sheet.fonts[(row, col)] = font
+            sheet.merges = [range_bounds(ref) for ref in part.merged_ranges()]
+            sheet.column_widths = part.column_widths()
+            self.sheets._insert(sheet, len(self.sheets._sheets))
+
+
+class MemorySheets:
+    """Stands in for xw.Book.sheets"""
+
+    def __init__(self, book: MemoryBook):
+        self.book = book
+        self._sheets: List["MemorySheet"] = []
+
+    def __getitem__(self, key) -> "MemorySheet":
+        if isinstance(key, int):
+            return self._sheets[key]
+        for sheet in self._sheets:
+            if sheet.name.lower() == key.lower():
+                return sheet
+        raise KeyError(f"Sheet '{key}' does not exist")
+
+    def __iter__(self):
+        return iter(list(self._sheets))
+
+    def __len__(self) -> int:
+        return len(self._sheets)
+
+    @property
+    def count(self) -> int:
+        return len(self._sheets)
+
+    def add(self, name: Optional[str] = None, before: Optional["MemorySheet"] = None,
+            after: Optional["MemorySheet"] = None) -> "MemorySheet":
+        """Add an empty sheet, by default before the active (first) sheet"""
+        self.book.app.count('sheets.add')
+        if name is None:
+            number = len(self._sheets) + 1
+            while self._find(f"Sheet{number}") is not None:
+                number += 1
+            name = f"Sheet{number}"
+        elif self._find(name) is not None:
+            raise ValueError(f"A sheet named '{name}' already exists")
+
+        if after is not None:
+            index = self._sheets.index(after) + 1
+        elif before is not None:
+            index = self._sheets.index(before)
+        else:
+            index = 0
+        sheet = MemorySheet(self.book, name)
+        self._insert(sheet, index)
+        return sheet
+
+    def _find(self, name: str) -> Optional["MemorySheet"]:
+        for sheet in self._sheets:
+            if sheet.name.lower() == name.lower():
+                return sheet
+        return None
+
+    def _insert(self, sheet: "MemorySheet", index: int):
+        self._sheets.insert(index, sheet)
+
+
+class _SheetApi:
+    """The Worksheet COM members ExcelHandler calls"""
+
+    def __init__(self, sheet: "MemorySheet"):
+        self._sheet = sheet
+
+    @property
+    def Columns(self) -> "_ColumnsApi":
+        last_col = max((col for _, col in self._sheet.cells), default=1)
+        return _ColumnsApi(self._sheet, 1, last_col)
+
+
+class MemorySheet:
+    """Stands in for xw.Sheet"""
+
+    def __init__(self, book: MemoryBook, name: str):
+        self.book = book
+        self._name = name
+        self.cells: Dict[Tuple[int, int], Any] = {}
+        self.fonts: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self.alignments: Dict[Tuple[int, int], int] = {}
+        self.merges: List[Bounds] = []
+        self.column_widths: Dict[int, float] = {}
+        self.wrapped_columns = set()
+        self.api = _SheetApi(self)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str):
+        self.book.app.count('sheet.rename')
+        other = self.book.sheets._find(value)
+        if other is not None and other is not self:
+            raise ValueError(f"A sheet named '{value}' already exists")
+        self._name = value
+
+    def range(self, cell1, cell2=None) -> "MemoryRange":
+        """
+        Get a range from an address ("A1", "A1:B2", "A:B") or from
+        (row, column) tuples, as xw.Sheet.range() accepts them
+        """
+        if isinstance(cell1, tuple):
+            first_row, first_col = cell1
+            last_row, last_col = cell2 if cell2 is not None else cell1
+            bounds = (min(first_row, last_row), min(first_col, last_col),
+                      max(first_row, last_row), max(first_col, last_col))
+        else:
+            bounds = _parse_address(cell1)
+            if cell2 is not None:
+                end = _parse_address(cell2)
+                bounds = (min(bounds[0], end[0]), min(bounds[1], end[1]),
+                          max(bounds[2], end[2]), max(bounds[3], end[3]))
+        if not (1 <= bounds[0] and bounds[2] <= MAX_ROWS and 1 <= bounds[1] and bounds[3] <= MAX_COLUMNS):
+            raise ValueError(f"Range outside the sheet: {cell1}")
+        return MemoryRange(self, bounds)
+
+    @property
+    def used_range(self) -> "MemoryRange":
+        """The smallest range holding every stored cell, A1 for an empty sheet"""
+        self.book.app.count('sheet.used_range')
+        if not self.cells:
+            return MemoryRange(self, (1, 1, 1, 1))
+        rows = [row for row, _ in self.cells]
+        cols = [col for _, col in self.cells]
+        return MemoryRange(self, (min(rows), min(cols), max(rows), max(cols)))
+
+    def merge_area(self, row: int, col: int) -> Optional[Bounds]:
+        """Get the merged range covering a cell, if any"""
+        for bounds in self.merges:
+            if _contains(bounds, row, col):
+                return bounds
+        return None
+
+    def _keys_in(self, store: Dict[Tuple[int, int], Any], bounds: Bounds) -> List[Tuple[int, int]]:
+        return [key for key in store if _contains(bounds, *key)]
+
+    def _to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self._name,
+            'cells': [[row, col, _encode_value(value)] for (row, col), value in sorted(self.cells.items())],
+            'fonts': [[row, col, font] for (row, col), font in sorted(self.fonts.items())],
+            'alignments': [[row, col, value] for (row, col), value in sorted(self.alignments.items())],
+            'merges': [_address(bounds).replace('$', '') for bounds in self.merges],
+            'column_widths': {str(col): width for col, width in sorted(self.column_widths.items())},
+            'wrapped_columns': sorted(self.wrapped_columns),
+        }
+
+    def _from_dict(self, data: Dict[str, Any]):
+        self.cells = {(row, col): _decode_value(value) for row, col, value in data.get('cells', [])}
+        self.fonts = {(row, col): font for row, col, font in data.get('fonts', [])}
+        self.alignments = {(row, col): value for row, col, value in data.get('alignments', [])}
+        self.merges = [range_bounds(ref) for ref in data.get('merges', [])]
+        self.column_widths = {int(col): width for col, width in data.get('column_widths', {}).items()}
+        self.wrapped_columns = set(data.get('wrapped_columns', []))
+
+
+class _FontApi:
+    """Range.api.Font: reads give the shared value or None when cells differ, as COM does"""
+
+    def __init__(self, target: "MemoryRange"):
+        self._range = target
+
+    def _get(self, key: str) -> Any:
+        target = self._range
+        sheet = target.sheet
+        sheet.book.app.count('range.font.read')
+        explicit = [sheet.fonts[key_] for key_ in sheet._keys_in(sheet.fonts, target.bounds)]
+        values = {font[key] for font in explicit}
+        if len(explicit) < target.size:
+            values.add(DEFAULT_FONT[key])
+        return values.pop() if len(values) == 1 else None
+
+    def _set(self, key: str, value: Any):
+        target = self._range
+        sheet = target.sheet
+        sheet.book.app.count('range.font.write')
+        for row, col in target._cell_keys():
+            font = dict(sheet.fonts.get((row, col), DEFAULT_FONT))
+            font[key] = float(value) if key == 'size' else value
+            sheet.fonts[(row, col)] = font
+
+    Name = property(lambda self: self._get('name'), lambda self, value: self._set('name', value))
+    Size = property(lambda self: self._get('size'), lambda self, value: self._set('size', value))
+    Bold = property(lambda self: self._get('bold'), lambda self, value: self._set('bold', bool(value)))
+
+
+class _ColumnsApi:
+    """Range.api.EntireColumn / Worksheet.api.Columns"""
+
+    def __init__(self, sheet: MemorySheet, first_col: int, last_col: int):
+        self._sheet = sheet
+        self._first_col = first_col
+        self._last_col = last_col
+
+    def AutoFit(self):
+        """Fit every column to its widest unmerged cell; empty columns keep their width"""
+        sheet = self._sheet
+        sheet.book.app.count('columns.autofit')
+        widths = {}
+        for (row, col), value in sheet.cells.items():
+            if not self._first_col <= col <= self._last_col or value is None or value == '':
+                continue
+            if sheet.merge_area(row, col) is not None:
+                continue
+            font = sheet.fonts.get((row, col), DEFAULT_FONT)
+            widths.setdefault(col, []).append(
+                text_width(display_text(value), font['name'], font['size'], font['bold']))
+        for col, text_widths in widths.items():
+            width, _ = column_width(text_widths, MAX_EXCEL_COLUMN_WIDTH)
+            sheet.column_widths[col] = width
+
+    @property
+    def ColumnWidth(self) -> Optional[float]:
+        self._sheet.book.app.count('columns.width.read')
+        widths = {self._sheet.column_widths.get(col, DEFAULT_COLUMN_WIDTH)
+                  for col in range(self._first_col, self._last_col + 1)}
+        return widths.pop() if len(widths) == 1 else None
+
+    @ColumnWidth.setter
+    def ColumnWidth(self, value: float):
+        self._sheet.book.app.count('columns.width.write')
+        for col in range(self._first_col, self._last_col + 1):
+            self._sheet.column_widths[col] = float(value)
+
+    @property
+    def WrapText(self) -> bool:
+        return all(col in self._sheet.wrapped_columns for col in range(self._first_col, self._last_col + 1))
+
+    @WrapText.setter
+    def WrapText(self, value: bool):
+        self._sheet.book.app.count('columns.wrap.write')
+        columns = set(range(self._first_col, self._last_col + 1))
+        if value:
+            self._sheet.wrapped_columns |= columns
+        else:
+            self._sheet.wrapped_columns -= columns
+
+
+class _RangeApi:
+    """The Range COM members ExcelHandler calls"""
+
+    def __init__(self, target: "MemoryRange"):
+        self._range = target
+
+    @property
+    def Address(self) -> str:
+        return _address(self._range.bounds)
+
+    @property
+    def Font(self) -> _FontApi:
+        return _FontApi(self._range)
+
+    @property
+    def MergeArea(self) -> "_RangeApi":
+        target = self._range
+        target.sheet.book.app.count('range.merge_area')
+        first_row, first_col = target.bounds[:2]
+        bounds = target.sheet.merge_area(first_row, first_col) or (first_row, first_col, first_row, first_col)
+        return _RangeApi(MemoryRange(target.sheet, bounds))
+
+    @property
+    def MergeCells(self) -> Optional[bool]:
+        """True when every cell is merged, False when none is, None otherwise"""
+        target = self._range
+        target.sheet.book.app.count('range.merge_cells')
+        bounds = target.bounds
+        merged = 0
+        for merge in target.sheet.merges:
+            if _overlaps(merge, bounds):
+                rows = min(merge[2], bounds[2]) - max(merge[0], bounds[0]) + 1
+                cols = min(merge[3], bounds[3]) - max(merge[1], bounds[1]) + 1
+                merged += rows * cols
+        if merged == 0:
+            return False
+        return True if merged == target.size else None
+
+    def Merge(self):
+        self._range.merge()
+
+    def UnMerge(self):
+        self._range.unmerge()
+
+    @property
+    def HorizontalAlignment(self) -> Optional[int]:
+        target = self._range
+        target.sheet.book.app.count('range.alignment.read')
+        first_row, first_col = target.bounds[:2]
+        return target.sheet.alignments.get((first_row, first_col))
+
+    @HorizontalAlignment.setter
+    def HorizontalAlignment(self, value: int):
+        target = self._range
+        target.sheet.book.app.count('range.alignment.write')
+        for key in target._cell_keys():
+            target.sheet.alignments[key] = value
+
+    @property
+    def EntireColumn(self) -> _ColumnsApi:
+        return _ColumnsApi(self._range.sheet, self._range.bounds[1], self._range.bounds[3])
+
+
+class MemoryRange:
+    """Stands in for xw.Range"""
+
+    def __init__(self, sheet: MemorySheet, bounds: Bounds, ndim: Optional[int] = None):
+        self.sheet = sheet
+        self.bounds = bounds
+        self._ndim = ndim
+        self.api = _RangeApi(self)
+
+    @property
+    def size(self) -> int:
+        first_row, first_col, last_row, last_col = self.bounds
+        return (last_row - first_row + 1) * (last_col - first_col + 1)
+
+    @property
+    def row(self) -> int:
+        return self.bounds[0]
+
+    @property
+    def column(self) -> int:
+        return self.bounds[1]
+
+    @property
+    def address(self) -> str:
+        return _address(self.bounds)
+
+    @property
+    def last_cell(self) -> "MemoryRange":
+        return MemoryRange(self.sheet, (self.bounds[2], self.bounds[3], self.bounds[2], self.bounds[3]))
+
+    def options(self, ndim: Optional[int] = None, **kwargs) -> "MemoryRange":
+        """Only ndim=1 (always return a flat list) is supported"""
+        return MemoryRange(self.sheet, self.bounds, ndim)
+
+    def __getitem__(self, key) -> "MemoryRange":
+        if isinstance(key, tuple):
+            row_offset, col_offset = key
+        else:
+            width = self.bounds[3] - self.bounds[1] + 1
+            row_offset, col_offset = divmod(key, width)
+        row, col = self.bounds[0] + row_offset, self.bounds[1] + col_offset
+        if not _contains(self.bounds, row, col):
+            raise IndexError("Range index out of range")
+        return MemoryRange(self.sheet, (row, col, row, col))
+
+    def _cell_keys(self) -> List[Tuple[int, int]]:
+        first_row, first_col, last_row, last_col = self.bounds
+        return [(row, col) for row in range(first_row, last_row + 1)
+                for col in range(first_col, last_col + 1)]
+
+    @property
+    def value(self) -> Any:
+        self.sheet.book.app.count('range.read')
+        first_row, first_col, last_row, last_col = self.bounds
+        if last_row == MAX_ROWS:
+            # Whole columns: stop at the last stored row rather than building a million rows
+            last_row = max([row for row, col in self.sheet.cells if first_col <= col <= last_col] or [first_row])
+        rows = [[self.sheet.cells.get((row, col)) for col in range(first_col, last_col + 1)]
+                for row in range(first_row, last_row + 1)]
+        if self._ndim == 1:
+            return [value for row in rows for value in row]
+        return shape_range_values(rows)
+
+    @value.setter
+    def value(self, value: Any):
+        self.sheet.book.app.count('range.write')
+        first_row, first_col, last_row, last_col = self.bounds
+        if isinstance(value, (list, tuple)):
+            rows = value if value and isinstance(value[0], (list, tuple)) else [value]
+            for row_offset, row_values in enumerate(rows):
+                for col_offset, cell_value in enumerate(row_values):
+                    self._set_cell(first_row + row_offset, first_col + col_offset, cell_value)
+            return
+        for row, col in self._cell_keys():
+            self._set_cell(row, col, value)
+
+    def _set_cell(self, row: int, col: int, value: Any):
+        value = _normalise(value)
+        if value is None or value == '':
+            self.sheet.cells.pop((row, col), None)
+        else:
+            self.sheet.cells[(row, col)] = value
+
+    def clear_contents(self):
+        self.sheet.book.app.count('range.clear_contents')
+        for key in self.sheet._keys_in(self.sheet.cells, self.bounds):
+            del self.sheet.cells[key]
+
+    def merge(self):
+        """Merge the range, keeping only the top-left value as Excel does"""
+        self.sheet.book.app.count('range.merge')
+        self.sheet.merges = [bounds for bounds in self.sheet.merges if not _overlaps(bounds, self.bounds)]
+        first_row, first_col = self.bounds[:2]
+        for key in self.sheet._keys_in(self.sheet.cells, self.bounds):
+            if key != (first_row, first_col):
+                del self.sheet.cells[key]
+        if self.size > 1:
+            self.sheet.merges.append(self.bounds)
+
+    def unmerge(self):
+        self.sheet.book.app.count('range.unmerge')
+        self.sheet.merges = [bounds for bounds in self.sheet.merges if not _overlaps(bounds, self.bounds)]
+
+    def autofit(self):
+        _ColumnsApi(self.sheet, self.bounds[1], self.bounds[3]).AutoFit()
+
+    def copy(self, destination: Optional["MemoryRange"] = None):
+        """Copy values, fonts, alignment and merged ranges, to destination or the clipboard"""
+        self.sheet.book.app.count('range.copy')
+        first_row, first_col = self.bounds[:2]
+
+        def relative(store):
+            return {(row - first_row, col - first_col): store[(row, col)]
+                    for row, col in self.sheet._keys_in(store, self.bounds)}
+
+        content = {
+            'cells': relative(self.sheet.cells),
+            'fonts': relative(self.sheet.fonts),
+            'alignments': relative(self.sheet.alignments),
+            'merges': [(bounds[0] - first_row, bounds[1] - first_col, bounds[2] - first_row, bounds[3] - first_col)
+                       for bounds in self.sheet.merges
+                       if _contains(self.bounds, bounds[0], bounds[1]) and _contains(self.bounds, bounds[2], bounds[3])],
+            'shape': (self.bounds[2] - first_row, self.bounds[3] - first_col),
+        }
+        if destination is None:
+            self.sheet.book.app.clipboard = content
+        else:
+            destination._paste(content)
+
+    def paste(self):
+        """Paste the last copied range with this range's top-left cell as its top-left"""
+        self.sheet.book.app.count('range.paste')
+        content = self.sheet.book.app.clipboard
+        if content is None:
+            raise RuntimeError("Nothing has been copied")
+        self._paste(content)
+
+    def _paste(self, content: Dict[str, Any]):
+        sheet = self.sheet
+        first_row, first_col = self.bounds[:2]
+        rows, cols = content['shape']
+        target = (first_row, first_col, first_row + rows, first_col + cols)
+        for store in (sheet.cells, sheet.fonts, sheet.alignments):
+            for key in sheet._keys_in(store, target):
+                del store[key]
+        sheet.merges = [bounds for bounds in sheet.merges if not _overlaps(bounds, target)]
+        for name, store in (('cells', sheet.cells), ('fonts', sheet.fonts), ('alignments', sheet.alignments)):
+            for (row, col), value in content[name].items():
+                store[(first_row + row, first_col + col)] = dict(value) if isinstance(value, dict) else value
+        for bounds in content['merges']:
+            sheet.merges.append((first_row + bounds[0], first_col + bounds[1],
+                                 first_row + bounds[2], first_col + bounds[3]))
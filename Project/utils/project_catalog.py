@@ -0,0 +1,282 @@
+"""
+Project catalog - an SQLite index of the project workbooks under BASE_PROJECT_DIR
+
+Projects live as <name>_<YYYYMMDD>/<name>_<type>_<sampletype>_<timestamp>.xlsx
+on a shared drive. The catalog records each workbook's project details, sample
+sheets, size and mtime so projects can be listed and filtered without opening
+any of them. refresh() only re-reads workbooks whose size or mtime changed,
+and skips project folders that have not changed since the last scan.
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+from config.settings import BASE_PROJECT_DIR, PROJECT_CATALOG_PATH
+from utils.workbook_metadata import get_sheet_names, get_summary
+
+_FILE_NAME_RE = re.compile(
+    r'^(?P<name>.+)_(?P<kind>BMP|characterisation)_(?P<sample_type>[^_]+)_(?P<timestamp>\d{8}_\d{6})\.xlsx$',
+    re.I
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    name TEXT,
+    project_type TEXT,
+    sample_type TEXT,
+    sample_sheets TEXT NOT NULL DEFAULT '[]',
+    sample_count INTEGER NOT NULL DEFAULT 0,
+    created_date TEXT,
+    status TEXT,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    scanned_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS projects_name ON projects (name);
+CREATE TABLE IF NOT EXISTS folders (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+
+def read_project_details(excel_path: str) -> Dict[str, Any]:
+    """
+    Read a project workbook's details from its summary sheet and sheet list,
+    falling back to the file name for anything the summary does not give
+
+    Args:
+        excel_path: Path to the project workbook
+
+    Returns:
+        Dictionary with name, project_type, sample_type, created_date, status
+        and sample_sheets; status is 'Unreadable' if the workbook could not be read
+    """
+    match = _FILE_NAME_RE.match(os.path.basename(excel_path))
+    details = {
+        'name': match.group('name') if match else os.path.splitext(os.path.basename(excel_path))[0],
+        'project_type': ('BMP Analysis' if match.group('kind').upper() == 'BMP'
+                         else 'Characterisation') if match else None,
+        'sample_type': match.group('sample_type') if match else None,
+        'created_date': None,
+        'status': None,
+        'sample_sheets': []
+    }
+
+    try:
+        details['sample_sheets'] = [name for name in get_sheet_names(excel_path)
+                                    if 'summary' not in name.lower()]
+        values = get_summary(excel_path)
+        if 'error' in values:
+            raise Exception(values['error'])
+        if values:
+            details['name'] = values['project_name'] or details['name']
+            details['project_type'] = values['project_type'] or details['project_type']
+            details['sample_type'] = values['sample_type'] or details['sample_type']
+            if values['created_date'] is not None:
+                details['created_date'] = str(values['created_date'])
+            details['status'] = values['status']
+    except Exception as e:
+        # Keep the file listed so it can still be found and repaired
+        print(f"Warning: Could not read project workbook {excel_path}: {e}")
+        details['status'] = 'Unreadable'
+
+    for key in ('name', 'project_type', 'sample_type', 'status'):
+        if details[key] is not None:
+            details[key] = str(details[key])
+    return details
+
+
+class ProjectCatalog:
+    """Persistent, incrementally refreshed index of project workbooks"""
+
+    def __init__(self, base_dir: Optional[str] = None, db_path: Optional[str] = None):
+        """
+        Args:
+            base_dir: Folder holding the project folders, defaults to BASE_PROJECT_DIR
+            db_path: SQLite file, defaults to PROJECT_CATALOG_PATH
+        """
+        self.base_dir = os.path.abspath(base_dir or BASE_PROJECT_DIR)
+        self.db_path = db_path or PROJECT_CATALOG_PATH
+
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Other users may be scanning the same shared catalog
+            self._db = sqlite3.connect(self.db_path, timeout=30)
+            self._db.row_factory = sqlite3.Row
+            self._db.executescript(_SCHEMA)
+        except Exception as e:
+            raise Exception(f"Failed to open project catalog: {e}")
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """
+        Bring the catalog up to date with the workbooks on disk
+
+        Args:
+            force: Check every workbook, even in folders that look unchanged
+
+        Returns:
+            Dictionary with counts of 'added', 'updated', 'removed' and 'unchanged' workbooks
+        """
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        try:
+            known = {}
+            by_folder = {}
+            for row in self._db.execute("SELECT path, size, mtime, folder FROM projects"):
+                known[row['path']] = (row['size'], row['mtime'])
+                by_folder.setdefault(row['folder'], []).append(row['path'])
+            folder_mtimes = {row['path']: row['mtime']
+                             for row in self._db.execute("SELECT path, mtime FROM folders")}
+            seen = set()
+            seen_folders = {}
+
+            for folder in self._scan_dirs(self.base_dir):
+                seen_folders[folder.path] = folder.stat().st_mtime
+                if not force and folder_mtimes.get(folder.path) == seen_folders[folder.path]:
+                    # Adding, replacing or removing a workbook changes its folder's mtime
+                    unchanged = by_folder.get(folder.path, [])
+                    seen.update(unchanged)
+                    counts['unchanged'] += len(unchanged)
+                    continue
+
+                for entry in self._scan_workbooks(folder.path):
+                    seen.add(entry.path)
+                    stat = entry.stat()
+                    previous = known.get(entry.path)
+                    if previous and previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+                        counts['unchanged'] += 1
+                        continue
+                    self._store(entry.path, folder.path, stat)
+                    counts['updated' if previous else 'added'] += 1
+
+            removed = [path for path in known if path not in seen]
+            self._db.executemany("DELETE FROM projects WHERE path = ?", [(path,) for path in removed])
+            counts['removed'] = len(removed)
+            self._db.execute("DELETE FROM folders")
+            self._db.executemany("INSERT INTO folders (path, mtime) VALUES (?, ?)",
+                                 list(seen_folders.items()))
+            self._db.commit()
+            return counts
+
+        except Exception as e:
+            self._db.rollback()
+            raise Exception(f"Failed to refresh project catalog: {e}")
+
+    def record(self, excel_path: str):
+        """Add or update one workbook straight away, e.g. right after creating it"""
+        try:
+            excel_path = os.path.abspath(excel_path)
+            self._store(excel_path, os.path.dirname(excel_path), os.stat(excel_path))
+            self._db.commit()
+        except Exception as e:
+            self._db.rollback()
+            print(f"Warning: Could not update project catalog: {e}")
+
+    def lookup(self, excel_path: str) -> Dict[str, Any]:
+        """
+        Get a workbook's catalog entry, re-reading the workbook first if it is
+        missing from the catalog or changed on disk since it was catalogued
+
+        Args:
+            excel_path: Path to the project workbook
+
+        Returns:
+            Project dictionary as returned by list_projects()
+        """
+        try:
+            excel_path = os.path.abspath(excel_path)
+            stat = os.stat(excel_path)
+            project = self.get_project(excel_path)
+            if project and project['size'] == stat.st_size and project['mtime'] == stat.st_mtime:
+                return project
+            self._store(excel_path, os.path.dirname(excel_path), stat)
+            self._db.commit()
+            return self.get_project(excel_path)
+        except Exception as e:
+            self._db.rollback()
+            raise Exception(f"Failed to read project: {e}")
+
+    def list_projects(self, name: Optional[str] = None, project_type: Optional[str] = None,
+                      sample_type: Optional[str] = None,
+                      status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List catalogued projects, newest first
+
+        Args:
+            name: Only projects whose name contains this text (case-insensitive)
+            project_type: Only this project type, e.g. 'BMP Analysis' or 'Characterisation'
+            sample_type: Only this sample type, 'Solid' or 'Effluent'
+            status: Only projects with this status
+
+        Returns:
+            List of project dictionaries
+        """
+        clauses = []
+        params = []
+        if name:
+            clauses.append("name LIKE ? ESCAPE '\\'")
+            params.append('%' + re.sub(r'([%_\\])', r'\\\1', name) + '%')
+        for column, value in (('project_type', project_type), ('sample_type', sample_type),
+                              ('status', status)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+
+        query = "SELECT * FROM projects"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY mtime DESC"
+        try:
+            return [self._to_dict(row) for row in self._db.execute(query, params)]
+        except Exception as e:
+            raise Exception(f"Failed to read project catalog: {e}")
+
+    def get_project(self, excel_path: str) -> Optional[Dict[str, Any]]:
+        """Get the catalog entry for a workbook, or None if it is not catalogued"""
+        row = self._db.execute("SELECT * FROM projects WHERE path = ?",
+                               (os.path.abspath(excel_path),)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def close(self):
+        """Close the catalog database"""
+        self._db.close()
+
+    @staticmethod
+    def _scan_dirs(path: str):
+        try:
+            with os.scandir(path) as entries:
+                return [entry for entry in entries if entry.is_dir() and entry.name != 'backups']
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _scan_workbooks(path: str):
+        with os.scandir(path) as entries:
+            # Skip Excel's "~$" lock files and half-written temporary saves
+            return [entry for entry in entries
+                    if entry.is_file() and entry.name.lower().endswith('.xlsx')
+                    and not entry.name.startswith(('~$', '.'))]
+
+    def _store(self, excel_path: str, folder: str, stat: os.stat_result):
+        """Read a workbook's details and insert or replace its catalog row"""
+        details = read_project_details(excel_path)
+        self._db.execute(
+            "INSERT OR REPLACE INTO projects (path, folder, name, project_type, sample_type, "
+            "sample_sheets, sample_count, created_date, status, size, mtime, scanned_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (excel_path, folder, details['name'], details['project_type'], details['sample_type'],
+             json.dumps(details['sample_sheets']), len(details['sample_sheets']),
+             details['created_date'], details['status'], stat.st_size, stat.st_mtime, time.time())
+        )
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        project = dict(row)
+        project['sample_sheets'] = json.loads(project['sample_sheets'])
+        return project
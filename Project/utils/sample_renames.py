@@ -0,0 +1,107 @@
+"""
+Batch sample renames - build a set of new sample names in one go
+
+Renaming samples one at a time means one dialog and one workbook rewrite per
+sample. These helpers turn a pasted column of names, a pasted two-column
+mapping or a naming pattern into a {current name: new name} dictionary that
+validate_sample_renames() checks as a whole and rename_sheets() applies in a
+single rewrite. Entries that would not change a name are left out.
+"""
+import string
+from typing import Dict, List, Optional
+
+
+def renames_from_column(text: str, sample_names: List[str]) -> Dict[str, str]:
+    """
+    Pair a pasted column of names with the samples in order
+
+    Blank lines keep the sample's current name, so a column copied from
+    Excel with gaps still lines up.
+
+    Args:
+        text: One new name per line, in sample order
+        sample_names: Current sample names in order
+
+    Returns:
+        Dictionary of new names keyed by current sample name
+    """
+    lines = text.splitlines()
+    # Trailing line breaks from the clipboard are not names
+    while len(lines) > len(sample_names) and not lines[-1].strip():
+        lines.pop()
+    if len(lines) != len(sample_names):
+        raise ValueError(f"Expected {len(sample_names)} names, got {len(lines)}")
+
+    return {old_name: line.strip() for old_name, line in zip(sample_names, lines)
+            if line.strip() and line.strip() != old_name}
+
+
+def renames_from_mapping(text: str) -> Dict[str, str]:
+    """
+    Read pasted "current name<TAB>new name" lines, e.g. two columns copied
+    from Excel; "current name -> new name" is accepted as well
+
+    Args:
+        text: One rename per line
+
+    Returns:
+        Dictionary of new names keyed by current sample name
+    """
+    renames = {}
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        separator = '\t' if '\t' in line else '->'
+        if separator not in line:
+            raise ValueError(f"Line {number} is not in the form 'current name<TAB>new name'")
+        old_name, new_name = (part.strip() for part in line.split(separator, 1))
+        if old_name in renames:
+            raise ValueError(f"Sample '{old_name}' is listed more than once")
+        if new_name != old_name:
+            renames[old_name] = new_name
+    return renames
+
+
+def renames_from_pattern(pattern: str, sample_names: List[str],
+                         codes: Optional[Dict[str, str]] = None, start: int = 1) -> Dict[str, str]:
+    """
+    Name every sample from a format pattern such as "{code}-{index:03d}"
+
+    Fields available to the pattern:
+        index: Position of the sample, counting from start
+        name: Current sample name
+        code: The sample's Sample Code (codes must be given)
+
+    Args:
+        pattern: str.format pattern
+        sample_names: Current sample names in order
+        codes: Sample codes keyed by sample name
+        start: Number given to the first sample
+
+    Returns:
+        Dictionary of new names keyed by current sample name
+    """
+    try:
+        fields = {field for _, field, _, _ in string.Formatter().parse(pattern) if field is not None}
+    except ValueError as e:
+        raise ValueError(f"Invalid pattern: {e}")
+    unknown = fields - {'index', 'name', 'code'}
+    if unknown:
+        raise ValueError(f"Unknown field '{{{sorted(unknown)[0]}}}' in pattern")
+
+    if 'code' in fields:
+        codes = codes or {}
+        missing = [name for name in sample_names if not str(codes.get(name) or '').strip()]
+        if missing:
+            raise ValueError("No sample code for " + ", ".join(f"'{name}'" for name in missing))
+
+    renames = {}
+    for index, old_name in enumerate(sample_names, start=start):
+        code = str((codes or {}).get(old_name) or '').strip()
+        try:
+            new_name = pattern.format(index=index, name=old_name, code=code).strip()
+        except (ValueError, IndexError) as e:
+            raise ValueError(f"Invalid pattern: {e}")
+        if new_name != old_name:
+            renames[old_name] = new_name
+    return renames
@@ -0,0 +1,85 @@
+"""
+Saved form values per sample, fetched from the workbook only when a sample is shown
+
+Opening a project does not read any sample sheet. The first time a sample's
+form is shown its cells are streamed from the workbook; after that, and after
+every save made in this session, the values are served from memory so queued
+saves that have not reached the file yet are never shown stale.
+"""
+from typing import Any, Dict, List, Optional
+
+
+class SampleValueCache:
+    """Lazily loaded {cell range: value} for each sample sheet of open projects"""
+
+    def __init__(self, excel_handler, cell_ranges: List[str]):
+        """
+        Args:
+            excel_handler: Handler whose get_all_sheet_data() reads the workbook
+            cell_ranges: Form cell ranges to fetch for each sample
+        """
+        self.excel_handler = excel_handler
+        self.cell_ranges = list(cell_ranges)
+        self._values = {}
+
+    def get(self, excel_path: str, sheet_name: str) -> Dict[str, Any]:
+        """
+        Get a sample's saved values, reading its sheet the first time
+
+        Returns:
+            Dictionary with cell ranges as keys; empty if the sheet could not be read
+        """
+        key = (excel_path, sheet_name)
+        if key not in self._values:
+            try:
+                data = self.excel_handler.get_all_sheet_data(excel_path, self.cell_ranges, [sheet_name])
+                self._values[key] = data.get(sheet_name, {})
+            except Exception as e:
+                # Not cached, so the next visit tries again
+                print(f"Warning: Could not load saved values for {sheet_name}: {e}")
+                return {}
+        return dict(self._values[key])
+
+    def get_many(self, excel_path: str, sheet_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the saved values of several samples, reading every sheet not yet
+        loaded in a single pass over the workbook
+
+        Returns:
+            Dictionary of {sheet name: {cell range: value}}; samples whose
+            sheets could not be read are left out
+        """
+        missing = [name for name in sheet_names if (excel_path, name) not in self._values]
+        if missing:
+            try:
+                data = self.excel_handler.get_all_sheet_data(excel_path, self.cell_ranges, missing)
+                for name in missing:
+                    self._values[(excel_path, name)] = data.get(name, {})
+            except Exception as e:
+                print(f"Warning: Could not load saved values: {e}")
+        return {name: dict(self._values[(excel_path, name)]) for name in sheet_names
+                if (excel_path, name) in self._values}
+
+    def update(self, excel_path: str, sheet_name: str, data: Dict[str, Any]):
+        """Record values just submitted for saving"""
+        self._values.setdefault((excel_path, sheet_name), {}).update(data)
+
+    def rename(self, excel_path: str, old_name: str, new_name: str):
+        """Carry a sample's values over to its new sheet name"""
+        values = self._values.pop((excel_path, old_name), None)
+        if values is not None:
+            self._values[(excel_path, new_name)] = values
+
+    def rename_many(self, excel_path: str, renames: Dict[str, str]):
+        """Carry the values of several samples renamed together over to their new names"""
+        moved = {(excel_path, new_name): self._values.pop((excel_path, old_name))
+                 for old_name, new_name in renames.items() if (excel_path, old_name) in self._values}
+        self._values.update(moved)
+
+    def clear(self, excel_path: Optional[str] = None):
+        """Forget the values of one workbook, or of every workbook"""
+        if excel_path is None:
+            self._values.clear()
+        else:
+            for key in [key for key in self._values if key[0] == excel_path]:
+                del self._values[key]
@@ -0,0 +1,168 @@
+"""
+Save journal - durable record of form saves until they reach the workbook
+
+Every queued save and rename is appended to a JSON-lines journal and fsync'd
+before it is handed to the background writer. Once the writer has flushed a
+workbook, the entries it covered are marked applied. Whatever is still
+unapplied when the app starts (because Excel hung or the app died mid-save)
+is replayed into the workbooks. The journal is truncated whenever nothing
+is outstanding, so it stays small.
+
+A journal belongs to one copy of the app: it is locked while open, and a
+second copy opening the same journal gets an error instead of sharing it.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from config.settings import SAVE_JOURNAL_PATH
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+    import fcntl
+
+
+class SaveJournal:
+    """Append-only, fsync'd journal of workbook saves"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Journal file, defaults to SAVE_JOURNAL_PATH
+        """
+        self.path = path or SAVE_JOURNAL_PATH
+        self._lock = threading.Lock()
+        self._outstanding = {}
+        self._next_seq = 1
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._acquire_file_lock(self.path + '.lock')
+        try:
+            self._load()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        except Exception:
+            self._release_file_lock()
+            raise
+
+    @staticmethod
+    def _acquire_file_lock(lock_path: str):
+        """Lock the journal against other processes; raises if one already holds it"""
+        lock_file = open(lock_path, 'a+')
+        try:
+            if msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise Exception(f"Failed to lock save journal: {lock_path} is held by another copy of the app")
+        return lock_file
+
+    def _release_file_lock(self):
+        if self._lock_file.closed:
+            return
+        if msvcrt is not None:
+            self._lock_file.seek(0)
+            msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        # Closing the file releases the flock
+        self._lock_file.close()
+
+    def _load(self):
+        """Rebuild the outstanding entries from an existing journal"""
+        if not os.path.exists(self.path):
+            return
+
+        applied = set()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-append; its save never returned
+                    continue
+                if 'applied' in record:
+                    applied.update(record['applied'])
+                elif 'seq' in record:
+                    self._outstanding[record['seq']] = record
+                    self._next_seq = max(self._next_seq, record['seq'] + 1)
+
+        for seq in applied:
+            self._outstanding.pop(seq, None)
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, op: str, excel_path: str, sheet_name: str,
+               data: Optional[Dict[str, Any]] = None, new_name: Optional[str] = None) -> int:
+        """
+        Durably record a save or rename before it is applied
+
+        Args:
+            op: 'characterisation', 'bmp', 'rename' or 'renames'
+            excel_path: Path to the Excel file
+            sheet_name: Sheet the operation applies to
+            data: Cell values for a save, or new names by old name for 'renames'
+            new_name: New sheet name for a rename
+
+        Returns:
+            Sequence number identifying the entry
+        """
+        try:
+            with self._lock:
+                record = {
+                    'seq': self._next_seq,
+                    'time': time.time(),
+                    'op': op,
+                    'excel_path': excel_path,
+                    'sheet_name': sheet_name,
+                }
+                if data is not None:
+                    record['data'] = data
+                if new_name is not None:
+                    record['new_name'] = new_name
+                self._write(record)
+                self._next_seq += 1
+                self._outstanding[record['seq']] = record
+                return record['seq']
+        except Exception as e:
+            raise Exception(f"Failed to write save journal: {e}")
+
+    def mark_applied(self, seqs: Iterable[int]):
+        """Record that entries are now in their workbooks; truncates the journal once none are left"""
+        with self._lock:
+            seqs = [seq for seq in seqs if seq in self._outstanding]
+            if not seqs:
+                return
+            try:
+                if len(seqs) == len(self._outstanding):
+                    self._outstanding.clear()
+                    self._file.truncate(0)
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                else:
+                    self._write({'applied': seqs})
+                    for seq in seqs:
+                        del self._outstanding[seq]
+            except Exception as e:
+                # Entries stay outstanding and are replayed again; harmless, values are idempotent
+                print(f"Warning: Could not update save journal: {e}")
+
+    def pending_entries(self) -> List[Dict[str, Any]]:
+        """Entries not yet known to be in their workbooks, oldest first"""
+        with self._lock:
+            return [self._outstanding[seq] for seq in sorted(self._outstanding)]
+
+    def close(self):
+        """Close the journal file and release its lock"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+            self._release_file_lock()
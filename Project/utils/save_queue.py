@@ -0,0 +1,461 @@
+"""
+Write-behind save queue - keeps workbook I/O off the Tk thread
+
+Saves and renames are queued and applied by a single background writer that
+owns its own Excel handler. With a SaveJournal attached, each job is recorded
+durably before it is queued and marked applied once its workbook is flushed.
+Everything queued while the writer is busy is written in order with one
+save_many pass per workbook, so clicking through samples never waits on
+Excel. Once nothing has been queued for SAVE_QUEUE_IDLE_CLOSE_SECONDS the
+writer closes its workbooks and releases its Excel process, so workbooks
+are not held open (and locked for other users) between bursts of saves
+and the idle process can be shut down. Results are handed back to the Tk
+thread through poll(), which attach() runs periodically with after().
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from config.settings import SAVE_QUEUE_COALESCE_SECONDS, SAVE_QUEUE_IDLE_CLOSE_SECONDS, SAVE_QUEUE_POLL_MS
+from utils.excel_handler import create_excel_handler
+from utils.save_journal import SaveJournal
+
+try:
+    import pythoncom
+except ImportError:
+    pythoncom = None
+
+_STOP = object()
+
+
+class SaveJob:
+    """One queued save or rename and, once finished, its outcome"""
+
+    def __init__(self, job_id: int, kind: str, excel_path: str, sheet_name: str,
+                 data: Optional[Dict[str, Any]] = None, new_name: Optional[str] = None,
+                 callback: Optional[Callable[["SaveJob"], None]] = None):
+        self.job_id = job_id
+        self.kind = kind  # 'bmp', 'characterisation', 'rename', 'renames' or 'close'
+        self.excel_path = excel_path
+        self.sheet_name = sheet_name
+        self.data = data or {}
+        self.new_name = new_name
+        self.callback = callback
+        self.error = None
+        # Error saving the workbook after the cells were written; until it is
+        # saved, none of the job's cells are on disk
+        self.flush_error = None
+        self.done = False
+        self.journal_seq = None
+        self.replayed = False
+        # Per-cell outcome of a save: error message, or None once written
+        self.results = {}
+
+    @property
+    def failed_cells(self) -> Dict[str, str]:
+        return {cell_range: error for cell_range, error in self.results.items() if error}
+
+    @property
+    def ok(self) -> bool:
+        return self.done and self.error is None
+
+
+class SaveQueue:
+    """Background writer applying saves in order, one save pass per workbook per batch"""
+
+    def __init__(self, handler_factory: Callable[[], Any] = create_excel_handler,
+                 coalesce_seconds: Optional[float] = None,
+                 journal: Optional[SaveJournal] = None,
+                 idle_close_seconds: Optional[float] = None):
+        """
+        Args:
+            handler_factory: Creates the writer's Excel handler (called on the writer thread)
+            coalesce_seconds: How long to gather more saves after the first one,
+                              defaults to SAVE_QUEUE_COALESCE_SECONDS
+            journal: Journal recording each job before it is queued
+            idle_close_seconds: How long the writer keeps its workbooks open
+                                with nothing queued, defaults to
+                                SAVE_QUEUE_IDLE_CLOSE_SECONDS
+        """
+        self._handler_factory = handler_factory
+        self.journal = journal
+        self.coalesce_seconds = (coalesce_seconds if coalesce_seconds is not None
+                                 else SAVE_QUEUE_COALESCE_SECONDS)
+        self.idle_close_seconds = (idle_close_seconds if idle_close_seconds is not None
+                                   else SAVE_QUEUE_IDLE_CLOSE_SECONDS)
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._pending_changed = threading.Condition()
+        self._poll_job = None
+        self._thread = threading.Thread(target=self._run, name="SaveQueue", daemon=True)
+        self._thread.start()
+
+    # Tk thread side
+
+    def submit(self, excel_path: str, sheet_name: str, data: Dict[str, Any],
+               kind: str = 'characterisation',
+               callback: Optional[Callable[[SaveJob], None]] = None) -> SaveJob:
+        """
+        Queue cell values to be written to a sheet
+
+        Args:
+            excel_path: Path to the Excel file
+            sheet_name: Name of the sheet to save to
+            data: Dictionary with cell ranges as keys and values to save
+            kind: 'characterisation' or 'bmp', selecting the handler's save method
+            callback: Called from poll() with the finished job
+
+        Returns:
+            The queued SaveJob
+        """
+        if kind not in ('characterisation', 'bmp'):
+            raise ValueError(f"Unknown save kind '{kind}'")
+        return self._put(SaveJob(next(self._ids), kind, excel_path, sheet_name,
+                                 data=dict(data), callback=callback))
+
+    def submit_rename(self, excel_path: str, old_name: str, new_name: str,
+                      callback: Optional[Callable[[SaveJob], None]] = None) -> SaveJob:
+        """
+        Queue a sheet rename, ordered with the saves around it
+
+        Args:
+            excel_path: Path to the Excel file
+            old_name: Current name of the sheet
+            new_name: New name for the sheet
+            callback: Called from poll() with the finished job
+
+        Returns:
+            The queued SaveJob
+        """
+        return self._put(SaveJob(next(self._ids), 'rename', excel_path, old_name,
+                                 new_name=new_name, callback=callback))
+
+    def submit_renames(self, excel_path: str, renames: Dict[str, str],
+                       callback: Optional[Callable[[SaveJob], None]] = None) -> SaveJob:
+        """
+        Queue several sheet renames applied together, ordered with the saves around them
+
+        Args:
+            excel_path: Path to the Excel file
+            renames: New sheet names keyed by current sheet name (kept in job.data)
+            callback: Called from poll() with the finished job
+
+        Returns:
+            The queued SaveJob
+        """
+        return self._put(SaveJob(next(self._ids), 'renames', excel_path, '',
+                                 data=dict(renames), callback=callback))
+
+    def submit_close(self, excel_path: str,
+                     callback: Optional[Callable[[SaveJob], None]] = None) -> SaveJob:
+        """
+        Queue saving and closing the writer's copy of a workbook, after the
+        jobs queued before it; the file can then be replaced
+
+        Args:
+            excel_path: Path to the Excel file
+            callback: Called from poll() with the finished job
+
+        Returns:
+            The queued SaveJob
+        """
+        # Nothing to replay; the jobs before it are journalled themselves
+        return self._put(SaveJob(next(self._ids), 'close', excel_path, '', callback=callback), record=False)
+
+    def replay_journal(self, callback: Optional[Callable[[SaveJob], None]] = None) -> int:
+        """
+        Queue every journal entry that never reached its workbook
+
+        Returns:
+            Number of entries queued
+        """
+        if self.journal is None:
+            return 0
+
+        entries = self.journal.pending_entries()
+        for entry in entries:
+            job = SaveJob(next(self._ids), entry['op'], entry['excel_path'], entry['sheet_name'],
+                          data=entry.get('data'), new_name=entry.get('new_name'), callback=callback)
+            job.journal_seq = entry['seq']
+            job.replayed = True
+            self._put(job, record=False)
+        return len(entries)
+
+    def _put(self, job: SaveJob, record: bool = True) -> SaveJob:
+        if record and self.journal is not None:
+            # Durable before it is queued; raises if the journal cannot be written
+            job.journal_seq = self.journal.append(job.kind, job.excel_path, job.sheet_name,
+                                                  data=job.data if job.kind != 'rename' else None,
+                                                  new_name=job.new_name)
+        with self._pending_changed:
+            self._pending[job.excel_path] = self._pending.get(job.excel_path, 0) + 1
+        self._jobs.put(job)
+        if not self._thread.is_alive():
+            self._fail_remaining(RuntimeError("The save queue is not running"))
+        return job
+
+    def pending(self, excel_path: Optional[str] = None) -> int:
+        """Number of queued jobs not finished yet, for one workbook or all of them"""
+        with self._pending_changed:
+            if excel_path is not None:
+                return self._pending.get(excel_path, 0)
+            return sum(self._pending.values())
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every queued job has finished
+
+        Returns:
+            True if the queue drained, False on timeout
+        """
+        with self._pending_changed:
+            return self._pending_changed.wait_for(lambda: not self._pending, timeout)
+
+    def poll(self) -> List[SaveJob]:
+        """
+        Deliver finished jobs to their callbacks; call this from the Tk thread
+
+        Returns:
+            The jobs that finished since the last poll
+        """
+        finished = []
+        while True:
+            try:
+                job = self._results.get_nowait()
+            except queue.Empty:
+                break
+            finished.append(job)
+            if job.callback is not None:
+                try:
+                    job.callback(job)
+                except Exception as e:
+                    print(f"Warning: Save callback failed: {e}")
+        return finished
+
+    def attach(self, widget, interval_ms: Optional[int] = None):
+        """Run poll() every interval_ms on the widget's event loop"""
+        interval_ms = interval_ms or SAVE_QUEUE_POLL_MS
+
+        def tick():
+            self.poll()
+            self._poll_job = widget.after(interval_ms, tick)
+
+        self.detach(widget)
+        tick()
+
+    def detach(self, widget):
+        """Stop the polling started by attach()"""
+        if self._poll_job is not None:
+            widget.after_cancel(self._poll_job)
+            self._poll_job = None
+
+    def stop(self, timeout: Optional[float] = None):
+        """Finish every queued job, close the writer's workbooks and stop the writer"""
+        if self._thread.is_alive():
+            self._jobs.put(_STOP)
+            self._thread.join(timeout)
+        self.poll()
+        if self.journal is not None:
+            self.journal.close()
+
+    # Writer thread side
+
+    def _run(self):
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+        try:
+            handler = self._handler_factory()
+            try:
+                stopping = False
+                # Whether the handler may still have workbooks open
+                holding = False
+                while not stopping:
+                    batch, stopping = self._next_batch(self.idle_close_seconds if holding else None)
+                    if batch:
+                        self._process(handler, batch)
+                        holding = True
+                    elif holding and not stopping:
+                        holding = not self._close_idle(handler)
+            finally:
+                try:
+                    handler.close()
+                except Exception as e:
+                    print(f"Warning: Could not close workbooks: {e}")
+        except Exception as e:
+            # Without a handler nothing can be written; fail what is queued
+            self._fail_remaining(e)
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+
+    def _next_batch(self, idle_timeout: Optional[float] = None):
+        """
+        Wait for a job, then gather whatever else arrives within the coalesce
+        window; returns an empty batch if none arrives within idle_timeout
+        """
+        try:
+            job = self._jobs.get(timeout=idle_timeout)
+        except queue.Empty:
+            return [], False
+        if job is _STOP:
+            return [], True
+        batch = [job]
+        deadline = time.monotonic() + self.coalesce_seconds
+        while True:
+            try:
+                job = self._jobs.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return batch, False
+            if job is _STOP:
+                return batch, True
+            batch.append(job)
+
+    def _process(self, handler, batch: List[SaveJob]):
+        """
+        Apply a batch in order with one save_many call per workbook between
+        renames, then save each touched workbook once
+        """
+        paths = []
+        segments = {}
+        for job in batch:
+            if job.excel_path not in paths:
+                paths.append(job.excel_path)
+            if job.kind not in ('rename', 'renames', 'close'):
+                segments.setdefault(job.excel_path, []).append(job)
+                continue
+
+            # Saves queued before a rename must land on the sheet's old name
+            self._save_segment(handler, job.excel_path, segments.pop(job.excel_path, []))
+            try:
+                if job.kind == 'close':
+                    # Raises, leaving the workbook open, if its changes cannot be saved
+                    handler.close_workbooks(job.excel_path)
+                    continue
+                if job.replayed and self._rename_already_applied(handler, job):
+                    continue
+                if job.kind == 'renames':
+                    handler.rename_sheets(job.excel_path, job.data)
+                else:
+                    handler.rename_sheet(job.excel_path, job.sheet_name, job.new_name)
+            except Exception as e:
+                job.error = e
+
+        for path, jobs in segments.items():
+            self._save_segment(handler, path, jobs)
+
+        for path in paths:
+            try:
+                handler.flush(path)
+            except Exception as e:
+                for job in batch:
+                    if job.excel_path == path:
+                        job.flush_error = e
+                        if job.error is None:
+                            job.error = e
+
+        for job in batch:
+            failed = job.failed_cells
+            if failed and job.error is None:
+                job.error = Exception("Could not save " + "; ".join(
+                    f"{cell_range}: {error}" for cell_range, error in failed.items()))
+
+        if self.journal is not None:
+            self.journal.mark_applied(job.journal_seq for job in batch
+                                      if job.journal_seq is not None and self._settled(job))
+
+        for job in batch:
+            self._finish(job)
+
+    @staticmethod
+    def _close_idle(handler) -> bool:
+        """
+        Close the writer's workbooks and give its Excel back to the pool, which
+        quits it once nobody else uses it; False if the changes could not be saved
+        """
+        try:
+            handler.close_workbooks()
+        except Exception as e:
+            # Kept open with their changes; tried again after the next idle period
+            print(f"Warning: Could not close idle workbooks: {e}")
+            return False
+        # Nothing is left to save, so this only releases the lease; the next
+        # save leases Excel again
+        handler.close()
+        return True
+
+    def _save_segment(self, handler, excel_path: str, jobs: List[SaveJob]):
+        """Write consecutive saves to one workbook with a single save_many call"""
+        if not jobs:
+            return
+
+        sheets_data = {}
+        for job in jobs:
+            data = sheets_data.setdefault(job.sheet_name, {})
+            for cell_range, value in job.data.items():
+                # Re-insert so the latest write keeps its place after earlier ones
+                data.pop(cell_range, None)
+                data[cell_range] = value
+
+        try:
+            results = handler.save_many(excel_path, sheets_data)
+        except Exception as e:
+            for job in jobs:
+                job.error = e
+            return
+
+        for job in jobs:
+            sheet_results = results.get(job.sheet_name, {})
+            job.results = {cell_range: sheet_results.get(cell_range) for cell_range in job.data}
+
+    @staticmethod
+    def _rename_already_applied(handler, job: SaveJob) -> bool:
+        """A replayed rename may have been saved before its journal entry was marked"""
+        renames = job.data if job.kind == 'renames' else {job.sheet_name: job.new_name}
+        # Names that are only given up by the batch; when samples merely swapped
+        # names there is nothing to tell by, and swapping back would be worse
+        # than leaving a swap undone
+        freed = set(renames) - set(renames.values())
+        return (all(handler.check_sheet_exists(job.excel_path, name) for name in renames.values())
+                and not any(handler.check_sheet_exists(job.excel_path, name) for name in freed))
+
+    @staticmethod
+    def _settled(job: SaveJob) -> bool:
+        """
+        Whether a job's journal entry is no longer needed: it was applied, or
+        it was replayed for a workbook that no longer exists
+        """
+        if job.error is None:
+            return True
+        if job.failed_cells and job.flush_error is None:
+            # The other cells were saved; the ones the workbook rejected would
+            # be rejected again on replay
+            return True
+        if job.replayed and not os.path.exists(job.excel_path):
+            print(f"Warning: Dropping journalled change for missing workbook {job.excel_path}")
+            return True
+        return False
+
+    def _finish(self, job: SaveJob):
+        job.done = True
+        self._results.put(job)
+        with self._pending_changed:
+            remaining = self._pending.get(job.excel_path, 0) - 1
+            if remaining > 0:
+                self._pending[job.excel_path] = remaining
+            else:
+                self._pending.pop(job.excel_path, None)
+            self._pending_changed.notify_all()
+
+    def _fail_remaining(self, error: Exception):
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not _STOP:
+                job.error = error
+                self._finish(job)
@@ -0,0 +1,727 @@
+"""
+Submission outbox - sends samples for supervisor approval off the Tk thread
+
+Submitting a sample used to post it to the approval server from the Tk
+thread, with no timeout and a new connection each time, so the form froze
+whenever the server was slow or down. Submissions are now written to a
+local SQLite outbox and sent by a background sender over one keep-alive
+session. A failed send is retried with exponential backoff, and a circuit
+breaker stops sending for a while after repeated failures, so a server that
+is down is not hammered. The Tk thread only ever reads the latest state of
+each sample ("queued", "sent" or "failed"), which poll() delivers to the
+listeners from the event loop.
+
+Entries still queued when the app closes are sent after the next start.
+Each submission carries an Idempotency-Key header, so a submission whose
+response was lost and is sent again can be recognised by the server.
+
+When several submissions are due together (a whole project submitted at
+once, or retries after an outage) and the server advertises batch support,
+they go in one gzip-compressed request:
+
+    GET  /capabilities    -> {"batch_submit": {"path": "/submit-samples",
+                                               "max_samples": 500,
+                                               "content_encodings": ["gzip"]}}
+    POST /submit-samples     {"samples": [{...sample..., "key": "<idempotency key>"}]}
+                          -> {"results": [{"key": "...", "status": "accepted" | "rejected" | "error",
+                                           "error": "..."}]}
+
+"rejected" samples fail, "error" ones are retried. A server without
+/capabilities gets one POST /submit-sample per sample, as before.
+"""
+import gzip
+import json
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config.settings import (
+    APPROVAL_SERVER_URL,
+    SUBMISSION_BACKOFF_BASE_SECONDS,
+    SUBMISSION_BATCH_SIZE,
+    SUBMISSION_BACKOFF_MAX_SECONDS,
+    SUBMISSION_BREAKER_FAILURES,
+    SUBMISSION_BREAKER_RESET_SECONDS,
+    SUBMISSION_CONNECT_TIMEOUT,
+    SUBMISSION_MAX_ATTEMPTS,
+    SUBMISSION_OUTBOX_PATH,
+    SUBMISSION_POLL_MS,
+    SUBMISSION_READ_TIMEOUT
+)
+
+QUEUED = 'queued'
+SENT = 'sent'
+FAILED = 'failed'
+
+SUBMIT_SAMPLE_PATH = '/submit-sample'
+CAPABILITIES_PATH = '/capabilities'
+SUBMIT_SAMPLES_PATH = '/submit-samples'
+
+# Smaller request bodies are sent uncompressed
+_GZIP_MIN_BYTES = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    sample_name TEXT NOT NULL,
+    sample_type TEXT,
+    data TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_due ON submissions (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS submissions_sample ON submissions (project_name, sample_name);
+"""
+
+
+class Submission:
+    """One sample sent for approval and where it has got to"""
+
+    def __init__(self, row: sqlite3.Row):
+        self.id = row['id']
+        self.key = row['key']
+        self.project_name = row['project_name']
+        self.sample_name = row['sample_name']
+        self.sample_type = row['sample_type']
+        self.data = json.loads(row['data'])
+        self.status = row['status']  # 'queued', 'sent' or 'failed'
+        self.attempts = row['attempts']
+        self.next_attempt_at = row['next_attempt_at']
+        self.last_error = row['last_error']
+        self.created_at = row['created_at']
+        self.updated_at = row['updated_at']
+
+    @property
+    def sample(self) -> Tuple[str, str]:
+        return (self.project_name, self.sample_name)
+
+    def payload(self) -> Dict[str, Any]:
+        """The request body the approval server expects"""
+        return {
+            "project_name": self.project_name,
+            "sample_name": self.sample_name,
+            "sample_type": self.sample_type,
+            "data": self.data
+        }
+
+
+class SubmissionOutbox:
+    """Persistent queue of submissions and their delivery state"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: SQLite file, defaults to SUBMISSION_OUTBOX_PATH;
+                  ':memory:' keeps the outbox for this session only
+        """
+        self.path = path or SUBMISSION_OUTBOX_PATH
+        self._lock = threading.Lock()
+
+        try:
+            if self.path != ':memory:':
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+            # Shared by the Tk thread and the sender; every use holds the lock
+            self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.executescript(_SCHEMA)
+        except Exception as e:
+            raise Exception(f"Failed to open submission outbox: {e}")
+
+    def add(self, project_name: str, sample_name: str, sample_type: Optional[str],
+            data: Dict[str, Any]) -> Submission:
+        """
+        Queue a sample for sending, replacing what was stored for it before
+
+        Returns:
+            The queued Submission
+        """
+        return self.add_many(project_name, sample_type, {sample_name: data})[0]
+
+    def add_many(self, project_name: str, sample_type: Optional[str],
+                 samples: Dict[str, Dict[str, Any]]) -> List[Submission]:
+        """
+        Queue several samples of a project in one transaction
+
+        Args:
+            project_name: Project the samples belong to
+            sample_type: 'Solid' or 'Effluent'
+            samples: Form values keyed by cell range, by sample name
+
+        Returns:
+            The queued Submissions, in the order given
+        """
+        now = time.time()
+        try:
+            with self._lock, self._db:
+                ids = []
+                for sample_name, data in samples.items():
+                    # Only the newest submission of a sample matters; an older one
+                    # still queued would be overruled by this one anyway
+                    self._db.execute(
+                        "DELETE FROM submissions WHERE project_name = ? AND sample_name = ?",
+                        (project_name, sample_name)
+                    )
+                    cursor = self._db.execute(
+                        "INSERT INTO submissions (key, project_name, sample_name, sample_type, data, "
+                        "status, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (uuid.uuid4().hex, project_name, sample_name, sample_type,
+                         json.dumps(data, ensure_ascii=False, default=str), QUEUED, now, now, now)
+                    )
+                    ids.append(cursor.lastrowid)
+                return [self._get(submission_id) for submission_id in ids]
+        except Exception as e:
+            raise Exception(f"Failed to queue submission: {e}")
+
+    def _get(self, submission_id: int) -> Optional[Submission]:
+        row = self._db.execute("SELECT * FROM submissions WHERE id = ?", (submission_id,)).fetchone()
+        return Submission(row) if row is not None else None
+
+    def due(self, now: Optional[float] = None, limit: int = 1) -> List[Submission]:
+        """Get up to limit queued submissions whose next attempt is due, oldest first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM submissions WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?",
+                (QUEUED, now if now is not None else time.time(), limit)
+            ).fetchall()
+        return [Submission(row) for row in rows]
+
+    def next_attempt_at(self) -> Optional[float]:
+        """When the next queued submission is due, or None if nothing is queued"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) FROM submissions WHERE status = ?", (QUEUED,)
+            ).fetchone()
+        return row[0]
+
+    def record_attempts(self, outcomes: List[Tuple[int, str, Optional[str], Optional[float]]]) -> List[Submission]:
+        """
+        Record the outcomes of sends in one transaction
+
+        Args:
+            outcomes: (submission id, status, error, next attempt time) tuples;
+                      status is 'sent', 'failed', or 'queued' to try again at
+                      the next attempt time, error says why a send did not succeed
+
+        Returns:
+            The updated Submissions; ones replaced while being sent are left out
+        """
+        now = time.time()
+        try:
+            with self._lock, self._db:
+                updated = []
+                for submission_id, status, error, next_attempt_at in outcomes:
+                    self._db.execute(
+                        "UPDATE submissions SET status = ?, attempts = attempts + 1, last_error = ?, "
+                        "next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                        (status, error, next_attempt_at if next_attempt_at is not None else now, now,
+                         submission_id)
+                    )
+                    submission = self._get(submission_id)
+                    if submission is not None:
+                        updated.append(submission)
+                return updated
+        except Exception as e:
+            raise Exception(f"Failed to update submission outbox: {e}")
+
+    def rename_samples(self, project_name: str, renames: Dict[str, str]) -> List[Submission]:
+        """
+        Move submissions over to their samples' new names; queued ones are
+        sent under the new name
+
+        Args:
+            project_name: Project the samples belong to
+            renames: New sample names keyed by current name
+
+        Returns:
+            The moved Submissions
+        """
+        try:
+            with self._lock, self._db:
+                rows = self._db.execute(
+                    f"SELECT id, sample_name FROM submissions WHERE project_name = ? "
+                    f"AND sample_name IN ({', '.join('?' * len(renames))})",
+                    (project_name, *renames)
+                ).fetchall() if renames else []
+                # Whatever is left under a name being taken over belongs to an
+                # earlier sample of that name
+                self._db.executemany(
+                    "DELETE FROM submissions WHERE project_name = ? AND sample_name = ?",
+                    [(project_name, new_name) for new_name in set(renames.values()) - set(renames)]
+                )
+                self._db.executemany(
+                    "UPDATE submissions SET sample_name = ? WHERE id = ?",
+                    [(renames[row['sample_name']], row['id']) for row in rows]
+                )
+                return [self._get(row['id']) for row in rows]
+        except Exception as e:
+            raise Exception(f"Failed to rename submissions: {e}")
+
+    def latest(self) -> List[Submission]:
+        """Get every stored submission, one per sample"""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM submissions ORDER BY id").fetchall()
+        return [Submission(row) for row in rows]
+
+    def close(self):
+        """Close the outbox database"""
+        with self._lock:
+            self._db.close()
+
+
+class CircuitBreaker:
+    """
+    Stops sending after repeated failures, then lets a single trial through
+
+    Closed: every send is allowed. After `failures` failures in a row the
+    breaker opens and nothing is sent for `reset_seconds`. The next send is
+    a trial; success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failures: Optional[int] = None, reset_seconds: Optional[float] = None):
+        """
+        Args:
+            failures: Consecutive failures that open the breaker,
+                      defaults to SUBMISSION_BREAKER_FAILURES
+            reset_seconds: How long the breaker stays open,
+                           defaults to SUBMISSION_BREAKER_RESET_SECONDS
+        """
+        self.failures = max(1, failures or SUBMISSION_BREAKER_FAILURES)
+        self.reset_seconds = reset_seconds if reset_seconds is not None else SUBMISSION_BREAKER_RESET_SECONDS
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    @property
+    def retry_at(self) -> float:
+        """When the open breaker lets a trial through"""
+        return (self.opened_at or 0.0) + self.reset_seconds
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        """Whether a send may be made now"""
+        return not self.is_open or (now if now is not None else time.time()) >= self.retry_at
+
+    def record_success(self):
+        if self.is_open:
+            print("Approval server is reachable again; resuming submissions")
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self, now: Optional[float] = None):
+        self.consecutive_failures += 1
+        if self.is_open or self.consecutive_failures >= self.failures:
+            if not self.is_open:
+                print(f"Warning: Approval server failed {self.consecutive_failures} times in a row; "
+                      f"pausing submissions for {self.reset_seconds:g} s")
+            self.opened_at = now if now is not None else time.time()
+
+
+def approval_session():
+    """Keep-alive session for the approval server"""
+    try:
+        import requests
+    except ImportError:
+        raise ImportError("requests is not installed; it is needed to submit samples for approval")
+    session = requests.Session()
+    # Retries are scheduled by the sender, not repeated inside one send
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class SubmissionSender:
+    """Background sender delivering the outbox to the approval server"""
+
+    def __init__(self, outbox: SubmissionOutbox, server_url: Optional[str] = None,
+                 session_factory: Callable[[], Any] = approval_session,
+                 breaker: Optional[CircuitBreaker] = None,
+                 max_attempts: Optional[int] = None,
+                 batch_size: Optional[int] = None):
+        """
+        Args:
+            outbox: Where submissions are stored until they are sent
+            server_url: Approval server, defaults to APPROVAL_SERVER_URL
+            session_factory: Creates the HTTP session (called on the sender thread)
+            breaker: Circuit breaker guarding the server, defaults to a CircuitBreaker()
+            max_attempts: Sends before a submission is given up as failed,
+                          defaults to SUBMISSION_MAX_ATTEMPTS
+            batch_size: Most submissions sent in one batch request, defaults to
+                        SUBMISSION_BATCH_SIZE; 1 always sends them one by one
+        """
+        self.outbox = outbox
+        self.server_url = (server_url or APPROVAL_SERVER_URL).rstrip('/')
+        self.breaker = breaker or CircuitBreaker()
+        self.max_attempts = max(1, max_attempts or SUBMISSION_MAX_ATTEMPTS)
+        self.batch_size = max(1, batch_size or SUBMISSION_BATCH_SIZE)
+        # The server's batch endpoint: None until asked, False if it has none
+        self._batch = None
+        self._session_factory = session_factory
+        self._listeners = []
+        self._changes = queue.Queue()
+        self._poll_job = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        # The outbox is closed by stop(), or by the sender thread if it is
+        # still finishing a send when stop() gives up waiting for it
+        self._exit_lock = threading.Lock()
+        self._exited = False
+        self._close_on_exit = False
+
+        # Latest state of every sample, read by the Tk thread without touching the outbox
+        self._latest = {submission.sample: submission for submission in outbox.latest()}
+        self._latest_lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._run, name="SubmissionSender", daemon=True)
+        self._thread.start()
+
+    # Tk thread side
+
+    def submit(self, project_name: str, sample_name: str, sample_type: Optional[str],
+               data: Dict[str, Any]) -> Submission:
+        """
+        Queue a sample for approval; returns at once, the sender does the rest
+
+        Args:
+            project_name: Project the sample belongs to
+            sample_name: Name of the sample
+            sample_type: 'Solid' or 'Effluent'
+            data: Form values keyed by cell range
+
+        Returns:
+            The queued Submission
+        """
+        return self.submit_many(project_name, sample_type, {sample_name: data})[0]
+
+    def submit_many(self, project_name: str, sample_type: Optional[str],
+                    samples: Dict[str, Dict[str, Any]]) -> List[Submission]:
+        """
+        Queue several samples, or a whole project, to be sent together
+
+        With a server that takes batches they go in as few requests as
+        SUBMISSION_BATCH_SIZE allows; each sample still gets its own result.
+
+        Args:
+            project_name: Project the samples belong to
+            sample_type: 'Solid' or 'Effluent'
+            samples: Form values keyed by cell range, by sample name
+
+        Returns:
+            The queued Submissions, in the order given
+        """
+        submissions = self.outbox.add_many(project_name, sample_type, samples)
+        for submission in submissions:
+            self._changed(submission)
+        self._wake.set()
+        return submissions
+
+    def status(self, project_name: str, sample_name: str) -> Optional[Submission]:
+        """Get the latest submission of a sample, or None if it was never submitted"""
+        with self._latest_lock:
+            return self._latest.get((project_name, sample_name))
+
+    def rename_samples(self, project_name: str, renames: Dict[str, str]):
+        """
+        Carry the submission state of renamed samples over to their new names
+
+        Args:
+            project_name: Project the samples belong to
+            renames: New sample names keyed by current name
+        """
+        moved = self.outbox.rename_samples(project_name, renames)
+        with self._latest_lock:
+            for name in (*renames, *renames.values()):
+                self._latest.pop((project_name, name), None)
+            for submission in moved:
+                self._latest[submission.sample] = submission
+        for submission in moved:
+            self._changes.put(submission)
+
+    def add_listener(self, callback: Callable[[Submission], None]):
+        """Have poll() call callback with every submission whose state changed"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Submission], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def poll(self) -> List[Submission]:
+        """
+        Deliver state changes to the listeners; call this from the Tk thread
+
+        Returns:
+            The submissions that changed since the last poll
+        """
+        changed = []
+        while True:
+            try:
+                submission = self._changes.get_nowait()
+            except queue.Empty:
+                break
+            changed.append(submission)
+            for callback in list(self._listeners):
+                try:
+                    callback(submission)
+                except Exception as e:
+                    print(f"Warning: Submission listener failed: {e}")
+        return changed
+
+    def attach(self, widget, interval_ms: Optional[int] = None):
+        """Run poll() every interval_ms on the widget's event loop"""
+        interval_ms = interval_ms or SUBMISSION_POLL_MS
+
+        def tick():
+            self.poll()
+            self._poll_job = widget.after(interval_ms, tick)
+
+        self.detach(widget)
+        tick()
+
+    def detach(self, widget):
+        """Stop the polling started by attach()"""
+        if self._poll_job is not None:
+            widget.after_cancel(self._poll_job)
+            self._poll_job = None
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop the sender after the send in progress, if any; submissions still
+        queued stay in the outbox for the next start
+        """
+        self._stopping.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self.poll()
+        with self._exit_lock:
+            if not self._exited:
+                print("Warning: Submission sender is still sending; the outbox is closed when it finishes")
+                self._close_on_exit = True
+                return
+        self.outbox.close()
+
+    def _changed(self, submission: Submission):
+        with self._latest_lock:
+            current = self._latest.get(submission.sample)
+            if current is not None and current.id > submission.id:
+                # An outcome for a submission already replaced by a newer one
+                return
+            self._latest[submission.sample] = submission
+        self._changes.put(submission)
+
+    # Sender thread side
+
+    def _run(self):
+        session = None
+        errors = 0
+        try:
+            while not self._stopping.is_set():
+                try:
+                    now = time.time()
+                    if not self.breaker.allow(now):
+                        wait = self.breaker.retry_at - now
+                    else:
+                        submissions = self.outbox.due(now, self.batch_size)
+                        if submissions:
+                            if session is None:
+                                session = self._session_factory()
+                            if self._batch is None and len(submissions) > 1:
+                                self._batch = self._batch_endpoint(session)
+                            if self._batch and len(submissions) > 1:
+                                self._send_batch(session, submissions[:self._batch['max_samples']])
+                            else:
+                                self._send(session, submissions[0])
+                            errors = 0
+                            continue
+                        due = self.outbox.next_attempt_at()
+                        wait = None if due is None else max(0.0, due - now)
+                    errors = 0
+                except Exception as e:
+                    # Submissions stay queued in the outbox; one whose outcome could
+                    # not be recorded is sent again, and the server recognises it by
+                    # its Idempotency-Key. Back off so a lasting fault does not spin
+                    errors += 1
+                    wait = min(SUBMISSION_BACKOFF_MAX_SECONDS,
+                               SUBMISSION_BACKOFF_BASE_SECONDS * 2 ** min(errors - 1, 16))
+                    print(f"Warning: Submission sender error, retrying in {wait:.1f} s: {e}")
+                    if session is not None:
+                        session.close()
+                        session = None
+                self._wake.wait(wait)
+                self._wake.clear()
+        finally:
+            if session is not None:
+                session.close()
+            with self._exit_lock:
+                self._exited = True
+                if self._close_on_exit:
+                    self.outbox.close()
+
+    def _send(self, session, submission: Submission):
+        """Post one submission and record what happened to it"""
+        try:
+            response = session.post(
+                self.server_url + SUBMIT_SAMPLE_PATH,
+                json=submission.payload(),
+                headers={'Idempotency-Key': submission.key},
+                timeout=(SUBMISSION_CONNECT_TIMEOUT, SUBMISSION_READ_TIMEOUT)
+            )
+        except Exception as e:
+            self.breaker.record_failure()
+            self._record(self._retries([submission], f"Could not reach the approval server: {e}"))
+            return
+
+        if 200 <= response.status_code < 300:
+            self.breaker.record_success()
+            self._record([(submission.id, SENT, None, None)])
+        elif _is_transient(response.status_code):
+            self.breaker.record_failure()
+            self._record(self._retries([submission], f"Approval server error {response.status_code}",
+                                       _retry_after(response)))
+        else:
+            # The server is up but will not take this submission; sending it again would not help
+            self.breaker.record_success()
+            self._record([(submission.id, FAILED,
+                           f"Rejected by the approval server ({response.status_code}): {response.text[:200]}",
+                           None)])
+
+    def _batch_endpoint(self, session) -> Optional[Any]:
+        """
+        Ask the server whether it takes batches
+
+        Returns:
+            {'path', 'max_samples', 'gzip'} if it does, False if it does not,
+            None if the server could not be asked
+        """
+        try:
+            response = session.get(self.server_url + CAPABILITIES_PATH,
+                                   timeout=(SUBMISSION_CONNECT_TIMEOUT, SUBMISSION_READ_TIMEOUT))
+        except Exception:
+            # Unreachable; the single send that follows finds that out and backs off
+            return None
+        if _is_transient(response.status_code):
+            return None
+        try:
+            batch = response.json()['batch_submit'] if response.status_code == 200 else None
+        except (ValueError, KeyError, TypeError):
+            batch = None
+        if not isinstance(batch, dict):
+            print("Approval server does not take batches; sending samples one by one")
+            return False
+        return {
+            'path': batch.get('path') or SUBMIT_SAMPLES_PATH,
+            'max_samples': max(1, min(self.batch_size, int(batch.get('max_samples') or self.batch_size))),
+            'gzip': 'gzip' in (batch.get('content_encodings') or [])
+        }
+
+    def _send_batch(self, session, submissions: List[Submission]):
+        """Post several submissions in one request and record each one's result"""
+        body = json.dumps(
+            {"samples": [dict(submission.payload(), key=submission.key) for submission in submissions]},
+            ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self._batch['gzip'] and len(body) >= _GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+
+        try:
+            response = session.post(self.server_url + self._batch['path'], data=body, headers=headers,
+                                    timeout=(SUBMISSION_CONNECT_TIMEOUT, SUBMISSION_READ_TIMEOUT))
+        except Exception as e:
+            self.breaker.record_failure()
+            self._record(self._retries(submissions, f"Could not reach the approval server: {e}"))
+            return
+
+        if response.status_code in (404, 405, 501):
+            # The server stopped taking batches; the submissions stay due and go one by one
+            print("Approval server no longer takes batches; sending samples one by one")
+            self._batch = False
+            return
+        if response.status_code == 413 and len(submissions) > 1:
+            # Too large for the server; the submissions stay due and go in smaller batches
+            self._batch['max_samples'] = max(1, len(submissions) // 2)
+            return
+        if _is_transient(response.status_code):
+            self.breaker.record_failure()
+            self._record(self._retries(submissions, f"Approval server error {response.status_code}",
+                                       _retry_after(response)))
+            return
+        self.breaker.record_success()
+        if not 200 <= response.status_code < 300:
+            error = f"Rejected by the approval server ({response.status_code}): {response.text[:200]}"
+            self._record([(submission.id, FAILED, error, None) for submission in submissions])
+            return
+
+        try:
+            results = {result['key']: result for result in response.json()['results']}
+        except (ValueError, KeyError, TypeError):
+            results = {}
+        outcomes = []
+        retry = []
+        for submission in submissions:
+            result = results.get(submission.key) or {}
+            if result.get('status') == 'accepted':
+                outcomes.append((submission.id, SENT, None, None))
+            elif result.get('status') == 'rejected':
+                outcomes.append((submission.id, FAILED,
+                                 f"Rejected by the approval server: {result.get('error') or 'no reason given'}",
+                                 None))
+            else:
+                retry.append(submission)
+        if retry:
+            outcomes += self._retries(retry, "The approval server did not accept the sample: "
+                                             f"{(results.get(retry[0].key) or {}).get('error') or 'no result'}")
+        self._record(outcomes)
+
+    def _retries(self, submissions: List[Submission], error: str,
+                 delay: Optional[float] = None) -> List[Tuple[int, str, Optional[str], Optional[float]]]:
+        """
+        Schedule another attempt with exponential backoff, or give up after
+        max_attempts; submissions that failed together are retried together
+        """
+        if delay is None:
+            attempt = min(submission.attempts for submission in submissions) + 1
+            delay = min(SUBMISSION_BACKOFF_MAX_SECONDS, SUBMISSION_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+            # Jitter, so clients that failed together do not all come back together
+            delay *= random.uniform(0.5, 1.0)
+        outcomes = []
+        for submission in submissions:
+            attempt = submission.attempts + 1
+            if attempt >= self.max_attempts:
+                outcomes.append((submission.id, FAILED, f"{error} (gave up after {attempt} attempts)", None))
+            else:
+                outcomes.append((submission.id, QUEUED, error, time.time() + delay))
+        return outcomes
+
+    def _record(self, outcomes: List[Tuple[int, str, Optional[str], Optional[float]]]):
+        for updated in self.outbox.record_attempts(outcomes):
+            self._changed(updated)
+
+
+def _is_transient(status_code: int) -> bool:
+    """Whether a response status is worth retrying later"""
+    return status_code in (408, 429) or status_code >= 500
+
+
+def _retry_after(response) -> Optional[float]:
+    """Seconds to wait from a Retry-After header given in seconds, if any"""
+    try:
+        return min(SUBMISSION_BACKOFF_MAX_SECONDS, max(0.0, float(response.headers.get('Retry-After'))))
+    except (TypeError, ValueError):
+        return None
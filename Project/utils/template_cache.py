@@ -0,0 +1,89 @@
+"""
+Compiled master template blueprints
+
+Each master template is parsed once into an in-memory blueprint and reused
+for every workbook created from it. Blueprints are keyed by path, mtime and
+size, so editing a template on disk is picked up on the next project creation.
+"""
+import os
+import threading
+from typing import Dict, Tuple
+from utils.xlsx_package import (
+    REL_TYPE_SHARED_STRINGS,
+    REL_TYPE_STYLES,
+    REL_TYPE_THEME,
+    StylesPart,
+    WorksheetPart,
+    XlsxWorkbook
+)
+
+
+class TemplateBlueprint:
+    """Everything needed to stamp sample sheets from one master template"""
+
+    def __init__(self, template_path: str, key: Tuple[int, int]):
+        self.template_path = template_path
+        self.key = key
+
+        template = XlsxWorkbook.open(template_path)
+        sheet = template.sheets()[0]
+        worksheet = WorksheetPart(template.parts[sheet['part']])
+
+        self.sheet_name = sheet['name']
+        self.styles_xml = template.parts[template.related_part(REL_TYPE_STYLES)]
+        theme_part = template.related_part(REL_TYPE_THEME)
+        self.theme_xml = template.parts.get(theme_part) if theme_part else None
+        strings_part = template.related_part(REL_TYPE_SHARED_STRINGS)
+        self.shared_strings_xml = template.parts.get(strings_part) if strings_part else None
+        self.shared_strings = template.shared_strings
+
+        # Sheet XML ready to be copied into another package
+        worksheet.detach_relationships()
+        self.sheet_xml = worksheet.to_bytes()
+
+    def new_styles(self) -> StylesPart:
+        """Get a fresh, editable copy of the template styles"""
+        return StylesPart(self.styles_xml)
+
+    def new_worksheet(self) -> WorksheetPart:
+        """Get a fresh, editable copy of the template sheet"""
+        return WorksheetPart(self.sheet_xml)
+
+
+_blueprints: Dict[str, TemplateBlueprint] = {}
+_blueprints_lock = threading.Lock()
+
+
+def _file_key(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_blueprint(template_path: str) -> TemplateBlueprint:
+    """
+    Get the compiled blueprint for a master template
+
+    The template is only read when it has not been compiled yet in this
+    session or when its mtime or size changed since it was compiled.
+
+    Args:
+        template_path: Path to the master template
+
+    Returns:
+        TemplateBlueprint for the template's first sheet
+    """
+    path = os.path.abspath(template_path)
+    key = _file_key(path)
+    with _blueprints_lock:
+        blueprint = _blueprints.get(path)
+        if blueprint is None or blueprint.key != key:
+            blueprint = TemplateBlueprint(path, key)
+            _blueprints[path] = blueprint
+        return blueprint
+
+
+def clear_blueprints():
+    """Drop every cached blueprint"""
+    with _blueprints_lock:
+        _blueprints.clear()
+
@@ -0,0 +1,266 @@
+"""
+Tracing - timing spans around workbook operations
+
+Every public handler method and its internal steps (open, copy template,
+write cells, autofit, save, backup) run inside a span. A finished span is
+appended to a rotating trace file in the Chrome trace event format, which
+chrome://tracing and ui.perfetto.dev open directly, and its duration is
+kept in a short per-operation history for the in-app latency view.
+
+The trace file is a JSON array written one event per line without the
+closing bracket, which the trace viewers accept, so an event is on disk as
+soon as its span ends and nothing has to be rewritten on exit.
+"""
+import collections
+import contextlib
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from config.settings import (
+    TRACE_BACKUP_COUNT,
+    TRACE_ENABLED,
+    TRACE_FILE_PATH,
+    TRACE_MAX_BYTES,
+    TRACE_RECENT_SPANS
+)
+
+
+class Tracer:
+    """Records spans to a rotating Chrome trace file and keeps recent latencies"""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None,
+                 backup_count: Optional[int] = None, recent_spans: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        """
+        Args:
+            path: Trace file, defaults to TRACE_FILE_PATH; '' keeps no file
+            max_bytes: Size at which the file is rotated, defaults to TRACE_MAX_BYTES
+            backup_count: Rotated files kept as path.1 ... path.N, defaults to TRACE_BACKUP_COUNT
+            recent_spans: Durations kept per operation, defaults to TRACE_RECENT_SPANS
+            enabled: Whether spans are recorded at all, defaults to TRACE_ENABLED
+        """
+        self.path = path if path is not None else TRACE_FILE_PATH
+        self.max_bytes = max_bytes or TRACE_MAX_BYTES
+        self.backup_count = backup_count if backup_count is not None else TRACE_BACKUP_COUNT
+        self.enabled = enabled if enabled is not None else TRACE_ENABLED
+        self._recent = collections.defaultdict(
+            lambda: collections.deque(maxlen=recent_spans or TRACE_RECENT_SPANS))
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._pid = os.getpid()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time the block as one span
+
+        Args:
+            name: Operation name, e.g. "save_characterisation_data" or "autofit"
+            **attributes: Recorded with the span, e.g. sheet, samples, cells
+
+        Yields:
+            The attribute dictionary, for values only known inside the block
+        """
+        if not self.enabled:
+            yield attributes
+            return
+        started = time.time_ns()
+        start = time.perf_counter_ns()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes['error'] = str(e) or type(e).__name__
+            raise
+        finally:
+            self._record(name, started, time.perf_counter_ns() - start, attributes)
+
+    def _record(self, name: str, started_ns: int, duration_ns: int, attributes: Dict[str, Any]):
+        event = {
+            'name': name,
+            'cat': 'workbook',
+            'ph': 'X',
+            'ts': started_ns // 1000,
+            'dur': duration_ns // 1000,
+            'pid': self._pid,
+            'tid': threading.get_ident(),
+            'args': attributes,
+        }
+        with self._lock:
+            self._recent[name].append(duration_ns / 1e9)
+            self._counts[name] += 1
+            if self.path:
+                self._write(event)
+
+    def _write(self, event: Dict[str, Any]):
+        """Append one event, rotating the file first if it would grow past max_bytes"""
+        line = json.dumps(event, default=str, separators=(',', ':')) + ',\n'
+        data = line.encode('utf-8')
+        try:
+            if self._file is None:
+                self._open()
+            elif self._size + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self._size += len(data)
+        except OSError as e:
+            print(f"Warning: Could not write trace file {self.path}; tracing to memory only: {e}")
+            self.path = None
+            self._close_file()
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+        if self._size == 0:
+            self._file.write(b'[\n')
+            self._size = 2
+
+    def _rotate(self):
+        self._close_file()
+        try:
+            if self.backup_count > 0:
+                for number in range(self.backup_count - 1, 0, -1):
+                    source = f"{self.path}.{number}"
+                    if os.path.exists(source):
+                        os.replace(source, f"{self.path}.{number + 1}")
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        except OSError as e:
+            # Another process has the file open (Windows): keep appending, and
+            # try again once another max_bytes have been written
+            print(f"Warning: Could not rotate trace file {self.path}: {e}")
+            self._open()
+            self._size = 0
+            return
+        self._open()
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def latency_summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get latency statistics over each operation's recent spans
+
+        Returns:
+            Operation names mapped to {'count', 'p50', 'p95', 'max', 'last'};
+            count is every span since startup, the times (in seconds) cover
+            the recent ones
+        """
+        with self._lock:
+            recent = {name: list(durations) for name, durations in self._recent.items()}
+            counts = dict(self._counts)
+        summary = {}
+        for name, durations in recent.items():
+            ordered = sorted(durations)
+            summary[name] = {
+                'count': counts[name],
+                'p50': _percentile(ordered, 50),
+                'p95': _percentile(ordered, 95),
+                'max': ordered[-1],
+                'last': durations[-1],
+            }
+        return summary
+
+    def reset(self):
+        """Forget the recent latencies; the trace file is left as it is"""
+        with self._lock:
+            self._recent.clear()
+            self._counts.clear()
+
+    def close(self):
+        """Close the trace file; later spans reopen it"""
+        with self._lock:
+            self._close_file()
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    rank = math.ceil(len(ordered) * percent / 100)
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
+
+
+def span(name: str, **attributes: Any):
+    """Time a block as a span of the process-wide tracer; see Tracer.span()"""
+    return get_tracer().span(name, **attributes)
+
+
+def _call_attributes(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Span attributes for the handler arguments worth seeing in a trace"""
+    attributes = {}
+    path = arguments.get('excel_path') or arguments.get('file_path')
+    if path:
+        attributes['workbook'] = os.path.basename(str(path))
+    for argument, attribute in (('sheet_name', 'sheet'), ('old_name', 'sheet'),
+                                ('sample_count', 'samples'), ('sample_type', 'sample_type')):
+        if arguments.get(argument) is not None:
+            attributes[attribute] = arguments[argument]
+    if isinstance(arguments.get('data'), dict):
+        attributes['cells'] = len(arguments['data'])
+    if arguments.get('cell_ranges') is not None:
+        attributes['cells'] = len(arguments['cell_ranges'])
+    if isinstance(arguments.get('sheets_data'), dict):
+        attributes['sheets'] = len(arguments['sheets_data'])
+        attributes['cells'] = sum(len(data) for data in arguments['sheets_data'].values())
+    if isinstance(arguments.get('renames'), dict):
+        attributes['renames'] = len(arguments['renames'])
+    return attributes
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorate a handler method so every call is a span
+
+    The workbook, sheet, sample count and number of cells are taken from the
+    call's arguments when it has them.
+
+    Args:
+        name: Span name, defaults to the method name
+    """
+    def decorate(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+        span_name = name or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            tracer = get_tracer()
+            if not tracer.enabled:
+                return method(*args, **kwargs)
+            try:
+                arguments = signature.bind_partial(*args, **kwargs).arguments
+            except TypeError:
+                arguments = {}
+            attributes = _call_attributes(arguments)
+            attributes['handler'] = type(args[0]).__name__ if args else None
+            with tracer.span(span_name, **attributes):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -3,6 +3,7 @@ Input validation utilities
 """
 import re
 from datetime import datetime
+from config.settings import MIN_SAMPLE_COUNT, get_max_sample_count
 
 
 def validate_project_name(project_name):
@@ -30,19 +31,22 @@ def validate_project_name(project_name):
     return True
 
 
-def validate_sample_count(sample_count):
+def validate_sample_count(sample_count, max_count=None):
     """
     Validate sample count
     
     Args:
         sample_count (int): Number of samples
+        max_count (int): Upper limit, defaults to the limit of the configured Excel engine
         
     Returns:
         bool: True if valid, False otherwise
     """
+    if max_count is None:
+        max_count = get_max_sample_count()
     try:
         count = int(sample_count)
-        return count > 0 and count <= 100  # Reasonable upper limit
+        return count >= MIN_SAMPLE_COUNT and count <= max_count
     except (ValueError, TypeError):
         return False
 
@@ -111,6 +115,43 @@ def validate_sample_name(sample_name, existing_names):
     return True
 
 
+def validate_sample_renames(renames, sample_names):
+    """
+    Validate a set of sample renames applied together
+    
+    Each new name must pass validate_sample_name and carry no surrounding
+    spaces, and after renaming no two samples may share a name (compared
+    case-insensitively, as Excel does). Names freed by the batch itself can
+    be reused, so samples may swap names.
+    
+    Args:
+        renames (dict): New names keyed by current sample name
+        sample_names (list): Current names of all samples
+        
+    Returns:
+        dict: Problem description keyed by current sample name, empty if all renames are valid
+    """
+    errors = {}
+    for old_name, new_name in renames.items():
+        if old_name not in sample_names:
+            errors[old_name] = "does not exist"
+        elif not validate_sample_name(new_name, []) or new_name != new_name.strip():
+            errors[old_name] = f"'{new_name}' is not a valid sheet name"
+    
+    final_names = {}
+    for name in sample_names:
+        final_names.setdefault(renames.get(name, name).lower(), []).append(name)
+    for names in final_names.values():
+        if len(names) > 1:
+            # Clashing with a sample that keeps its name, or only within the batch
+            problem = "already exists" if any(name not in renames for name in names) else "is used more than once"
+            for name in names:
+                if name in renames:
+                    errors.setdefault(name, f"'{renames[name]}' {problem}")
+    
+    return errors
+
+
 def validate_excel_path(file_path):
     """
     Validate Excel file path
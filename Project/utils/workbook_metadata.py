@@ -0,0 +1,116 @@
+"""
+Workbook metadata cache - sheet names and project summaries without opening workbooks
+
+Checking whether a sheet exists or showing a project's summary only needs
+workbook.xml and the summary sheet's XML part, not Excel or the whole file.
+Both are read straight from the .xlsx archive and cached by path, mtime and
+size, so repeat calls for an unchanged workbook cost one stat.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from config.settings import WORKBOOK_METADATA_CACHE_SIZE
+from utils.xlsx_reader import read_sheet_names, read_workbook_cells
+
+# Summary sheet rows written when a project is created
+SUMMARY_CELLS = {
+    'project_name': 'B3',
+    'project_type': 'B4',
+    'sample_type': 'B5',
+    'total_samples': 'B6',
+    'created_date': 'B7',
+    'status': 'B8'
+}
+
+
+class WorkbookMetadata:
+    """Sheet names and project summary of one version of a workbook, each read on first use"""
+
+    def __init__(self, path: str, key: Tuple[int, int]):
+        self.path = path
+        self.key = key
+        self._sheet_names = None
+        self._summary = None
+
+    @property
+    def sheet_names(self) -> List[str]:
+        if self._sheet_names is None:
+            self._sheet_names = read_sheet_names(self.path)
+        return self._sheet_names
+
+    @property
+    def summary(self) -> Dict[str, Any]:
+        if self._summary is None:
+            summary_data = {}
+            summary_sheets = [name for name in self.sheet_names if 'summary' in name.lower()]
+            if summary_sheets:
+                try:
+                    values = read_workbook_cells(self.path, SUMMARY_CELLS.values(),
+                                                 summary_sheets[:1])[summary_sheets[0]]
+                    summary_data = {key: values[ref] for key, ref in SUMMARY_CELLS.items()}
+                except Exception:
+                    summary_data['error'] = "Could not read summary data"
+            self._summary = summary_data
+        return self._summary
+
+
+_metadata: "OrderedDict[str, WorkbookMetadata]" = OrderedDict()
+_metadata_lock = threading.Lock()
+
+
+def _file_key(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_metadata(excel_path: str) -> WorkbookMetadata:
+    """
+    Get the cached metadata for a workbook
+
+    The entry is replaced when the workbook's mtime or size changed since it
+    was cached; the least recently used entries are dropped beyond
+    WORKBOOK_METADATA_CACHE_SIZE.
+
+    Args:
+        excel_path: Path to the .xlsx file
+
+    Returns:
+        WorkbookMetadata for the current version of the file
+    """
+    path = os.path.abspath(excel_path)
+    key = _file_key(path)
+    with _metadata_lock:
+        metadata = _metadata.get(path)
+        if metadata is None or metadata.key != key:
+            metadata = WorkbookMetadata(path, key)
+            _metadata[path] = metadata
+        _metadata.move_to_end(path)
+        while len(_metadata) > WORKBOOK_METADATA_CACHE_SIZE:
+            _metadata.popitem(last=False)
+        return metadata
+
+
+def get_sheet_names(excel_path: str) -> List[str]:
+    """Get a workbook's sheet names in tab order"""
+    return list(get_metadata(excel_path).sheet_names)
+
+
+def get_summary(excel_path: str) -> Dict[str, Any]:
+    """
+    Get the project details from a workbook's summary sheet
+
+    Returns:
+        Dictionary with project_name, project_type, sample_type, total_samples,
+        created_date and status; empty if there is no summary sheet
+    """
+    return dict(get_metadata(excel_path).summary)
+
+
+def clear_metadata(excel_path: Optional[str] = None):
+    """Drop the cached metadata of one workbook, or of every workbook"""
+    with _metadata_lock:
+        if excel_path is None:
+            _metadata.clear()
+        else:
+            _metadata.pop(os.path.abspath(excel_path), None)
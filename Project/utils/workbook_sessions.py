@@ -0,0 +1,206 @@
+"""
+Workbook sessions - keep recently used workbooks open between operations
+
+Opening and saving a project workbook is the expensive part of every save,
+rename and read. A WorkbookSessionCache keeps the most recently used
+workbooks open, remembers which ones hold unsaved changes, and saves them
+on demand, when they are closed, or when they are evicted.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config.settings import WORKBOOK_CACHE_SIZE
+
+
+def _file_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+class WorkbookSession:
+    """A workbook held open by a WorkbookSessionCache"""
+
+    def __init__(self, path: str, book: Any):
+        self.path = path
+        self.book = book
+        self.dirty = False
+        self.last_used = time.monotonic()
+        self.file_key = _file_key(path)
+        # Scratch space for the engine (e.g. what it knows about cell contents)
+        self.state = {}
+
+    def mark_dirty(self):
+        """Record that the workbook holds changes that are not on disk yet"""
+        self.dirty = True
+
+    def sheet_state(self, sheet_name: str) -> Dict[str, Any]:
+        """
+        Get what this session has written to a sheet
+
+        Returns:
+            Dictionary with 'values' (cell range -> last value written),
+            'merged' (ranges already merged and centred) and 'changed'
+            (cell ranges written since the engine last handled them)
+        """
+        sheets = self.state.setdefault('sheets', {})
+        return sheets.setdefault(sheet_name, {'values': {}, 'merged': set(), 'changed': set()})
+
+    def rename_sheet_state(self, old_name: str, new_name: str):
+        """Carry a sheet's written-state over to its new name"""
+        self.rename_sheets_state({old_name: new_name})
+
+    def rename_sheets_state(self, renames: Dict[str, str]):
+        """Carry the written-state of several sheets renamed together over to their new names"""
+        sheets = self.state.get('sheets', {})
+        moved = {renames[name]: sheets.pop(name) for name in list(sheets) if name in renames}
+        sheets.update(moved)
+
+
+class WorkbookSessionCache:
+    """LRU cache of open workbooks with dirty tracking"""
+
+    def __init__(self, opener: Callable[[str], Any], saver: Callable[[WorkbookSession], None],
+                 closer: Callable[[WorkbookSession], None], max_size: Optional[int] = None):
+        """
+        Args:
+            opener: Opens a workbook path and returns the engine's workbook object
+            saver: Writes a session's workbook back to its path
+            closer: Releases a session's workbook (without saving)
+            max_size: Number of workbooks to keep open, defaults to WORKBOOK_CACHE_SIZE
+        """
+        self._opener = opener
+        self._saver = saver
+        self._closer = closer
+        self.max_size = max(1, max_size if max_size is not None else WORKBOOK_CACHE_SIZE)
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def get(self, path: str) -> WorkbookSession:
+        """
+        Get the open session for a workbook, opening it if needed
+
+        A clean session whose file changed on disk since it was opened is
+        reopened, so another writer's changes are never hidden.
+        """
+        key = self._key(path)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and not session.dirty and session.file_key != _file_key(path):
+                self._close_session(key, save=False)
+                session = None
+
+            if session is None:
+                session = WorkbookSession(path, self._opener(path))
+                self._sessions[key] = session
+                self._evict()
+            else:
+                self._sessions.move_to_end(key)
+
+            session.last_used = time.monotonic()
+            return session
+
+    def peek(self, path: str) -> Optional[WorkbookSession]:
+        """Get the session for a workbook if it is open, without opening it"""
+        with self._lock:
+            return self._sessions.get(self._key(path))
+
+    def mark_dirty(self, path: str):
+        """Mark an open workbook as holding unsaved changes"""
+        with self._lock:
+            session = self._sessions.get(self._key(path))
+            if session is not None:
+                session.mark_dirty()
+
+    def is_dirty(self, path: str) -> bool:
+        """Check whether a workbook has changes that are not on disk yet"""
+        session = self.peek(path)
+        return bool(session and session.dirty)
+
+    def file_updated(self, path: str):
+        """Record that a clean open workbook's file was rewritten to match its session"""
+        with self._lock:
+            session = self._sessions.get(self._key(path))
+            if session is not None:
+                session.file_key = _file_key(path)
+
+    def _save(self, session: WorkbookSession):
+        self._saver(session)
+        session.dirty = False
+        session.file_key = _file_key(session.path)
+
+    def flush(self, path: Optional[str] = None) -> List[str]:
+        """
+        Save dirty workbooks
+
+        Args:
+            path: Workbook to save, None for every open workbook
+
+        Returns:
+            Paths of the workbooks that were saved
+        """
+        with self._lock:
+            if path is not None:
+                session = self._sessions.get(self._key(path))
+                sessions = [session] if session is not None else []
+            else:
+                sessions = list(self._sessions.values())
+
+            saved = []
+            for session in sessions:
+                if session.dirty:
+                    self._save(session)
+                    saved.append(session.path)
+            return saved
+
+    def close(self, path: Optional[str] = None, save: bool = True):
+        """
+        Close workbooks, saving pending changes first unless save is False
+
+        Args:
+            path: Workbook to close, None for every open workbook
+            save: Whether to save dirty workbooks before closing them
+        """
+        with self._lock:
+            keys = [self._key(path)] if path is not None else list(self._sessions)
+            for key in keys:
+                if key in self._sessions:
+                    self._close_session(key, save=save)
+
+    def _close_session(self, key: str, save: bool):
+        session = self._sessions[key]
+        try:
+            if save and session.dirty:
+                self._save(session)
+        finally:
+            # Keep a session whose changes could not be saved so they are not lost
+            if not (save and session.dirty):
+                del self._sessions[key]
+                try:
+                    self._closer(session)
+                except Exception as e:
+                    print(f"Warning: Could not close workbook {session.path}: {e}")
+
+    def _evict(self):
+        """Close least recently used workbooks beyond max_size"""
+        for key in list(self._sessions)[:-self.max_size]:
+            if len(self._sessions) <= self.max_size:
+                break
+            try:
+                self._close_session(key, save=True)
+            except Exception as e:
+                print(f"Warning: Could not save workbook before closing it: {e}")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, path: str) -> bool:
+        return self._key(path) in self._sessions
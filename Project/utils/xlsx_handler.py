@@ -0,0 +1,764 @@
+"""
+Headless Excel handling - edits project workbooks as .xlsx packages, no Excel process needed
+"""
+import datetime
+import os
+import re
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
+from config.settings import (
+    MASTER_TEMPLATE_PATH,
+    BASE_PROJECT_DIR,
+    MASTER_TEMPLATE_PATH_EFFLUENT,
+    MASTER_TEMPLATE_PATH_BMP_SOLID,
+    MASTER_TEMPLATE_PATH_BMP_EFFLUENT
+)
+from utils.backup_store import BackupStore
+from utils.column_widths import column_width, display_text, text_width
+from utils.template_cache import TemplateBlueprint, get_blueprint
+from utils.tracing import span, traced
+from utils.validators import validate_sample_renames
+from utils.workbook_metadata import get_sheet_names, get_summary
+from utils.workbook_sessions import WorkbookSessionCache
+from utils.xlsx_package import (
+    EMPTY_WORKSHEET,
+    SheetStamp,
+    StylesPart,
+    WorksheetPart,
+    XlsxWorkbook,
+    cell_ref,
+    from_excel_serial,
+    range_cells,
+    rename_sheets_in_package,
+    ranges_overlap,
+    shape_range_values,
+    split_cell_ref,
+    to_excel_serial,
+    write_new_workbook
+)
+from utils.xlsx_reader import read_workbook_cells
+
+
+# Excel converts typed numbers and ISO dates into real numbers and dates when
+# xlwings assigns a string; the headless engine stores them the same way
+_NUMBER_RE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+_DATE_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})(?: (\d{2}):(\d{2})(?::(\d{2}))?)?$')
+DATE_FORMAT_CODE = 'yyyy-mm-dd'
+DATETIME_FORMAT_CODE = 'yyyy-mm-dd hh:mm:ss'
+
+# Placeholders left in the pre-rendered BMP sample sheet
+_HEADER_TOKEN = '{{bmp_sheet_header}}'
+_WIDTH_TOKEN = 1234.5
+
+
+class XlsxHandler:
+    """Headless Excel operations handler with the same API as ExcelHandler"""
+
+    def __init__(self):
+        self.master_template_path = MASTER_TEMPLATE_PATH
+        self.master_template_path_effluent = MASTER_TEMPLATE_PATH_EFFLUENT
+        self.master_template_path_bmp_solid = MASTER_TEMPLATE_PATH_BMP_SOLID
+        self.master_template_path_bmp_effluent = MASTER_TEMPLATE_PATH_BMP_EFFLUENT
+        self.base_dir = BASE_PROJECT_DIR
+        self._workbook_cache = WorkbookSessionCache(
+            opener=self._open_workbook,
+            saver=self._save_session,
+            closer=lambda session: None
+        )
+
+    @traced('open')
+    def _open_workbook(self, excel_path: str) -> XlsxWorkbook:
+        """Load a project workbook for the session cache"""
+        return XlsxWorkbook.open(excel_path)
+
+    def _save_session(self, session):
+        """Fit the columns that changed since the last save, then write the workbook"""
+        self._fit_changed_columns(session)
+        with span('save', workbook=os.path.basename(session.path)):
+            session.book.save(session.path)
+        self._create_backup(session.path)
+
+    @traced()
+    def flush(self, excel_path: Optional[str] = None) -> List[str]:
+        """
+        Save workbooks with pending changes
+
+        Args:
+            excel_path: Workbook to save, None for every open workbook
+
+        Returns:
+            Paths of the workbooks that were saved
+        """
+        try:
+            return self._workbook_cache.flush(excel_path)
+        except Exception as e:
+            raise Exception(f"Failed to save Excel workbook: {e}")
+
+    def close_workbooks(self, excel_path: Optional[str] = None):
+        """Save pending changes and close open workbooks"""
+        self._workbook_cache.close(excel_path)
+
+    def close(self):
+        """Save pending changes and close open workbooks"""
+        self._workbook_cache.close()
+
+    def _project_file_path(self, project_name: str, kind: str, sample_type: str) -> str:
+        """Build (and create the folder for) a new project workbook path"""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        folder_name = f"{project_name}_{datetime.datetime.now().strftime('%Y%m%d')}"
+        folder_path = os.path.join(self.base_dir, folder_name)
+        os.makedirs(folder_path, exist_ok=True)
+
+        return os.path.join(folder_path, f"{project_name}_{kind}_{sample_type}_{timestamp}.xlsx")
+
+    @traced()
+    def create_bmp_workbook(self, project_name: str, sample_count: int,
+                            sample_sheets: List[str], sample_type: str = "Solid") -> str:
+        """
+        Create a new Excel workbook with multiple sheets for BMP analysis
+
+        Args:
+            project_name: Name of the project
+            sample_count: Number of samples
+            sample_sheets: List of sheet names
+            sample_type: "Solid" or "Effluent"
+
+        Returns:
+            Path to the created Excel file
+        """
+        new_file_path = self._project_file_path(project_name, "BMP", sample_type)
+
+        try:
+            template_path = (
+                self.master_template_path_bmp_solid if sample_type == "Solid"
+                else self.master_template_path_bmp_effluent
+            )
+
+            if not os.path.exists(template_path):
+                raise FileNotFoundError(f"BMP template file not found: {template_path}")
+
+            self._build_project_workbook(
+                new_file_path, template_path, "BMP_Summary", "BMP PROJECT SUMMARY",
+                "BMP Analysis", project_name, sample_count, sample_sheets, sample_type,
+                bmp_format=True
+            )
+
+            # Create backup
+            self._create_backup(new_file_path)
+
+            return new_file_path
+
+        except Exception as e:
+            raise Exception(f"Failed to create BMP workbook: {e}")
+
+    @traced()
+    def create_characterisation_workbook(self, project_name: str, sample_count: int,
+                                         sample_sheets: List[str], sample_type: str = "Solid") -> str:
+        """
+        Create a new Excel workbook with multiple sheets for characterisation
+
+        Args:
+            project_name: Name of the project
+            sample_count: Number of samples
+            sample_sheets: List of sheet names
+            sample_type: "Solid" or "Effluent"
+
+        Returns:
+            Path to the created Excel file
+        """
+        new_file_path = self._project_file_path(project_name, "characterisation", sample_type)
+
+        try:
+            template_path = (
+                self.master_template_path if sample_type == "Solid"
+                else self.master_template_path_effluent
+            )
+
+            if not os.path.exists(template_path):
+                raise FileNotFoundError(f"Characterisation template file not found: {template_path}")
+
+            self._build_project_workbook(
+                new_file_path, template_path, "Char_Summary", "CHARACTERISATION PROJECT SUMMARY",
+                "Characterisation", project_name, sample_count, sample_sheets, sample_type
+            )
+
+            # Create backup
+            self._create_backup(new_file_path)
+
+            return new_file_path
+
+        except Exception as e:
+            raise Exception(f"Failed to create characterisation workbook: {e}")
+
+    @traced('copy_template')
+    def _build_project_workbook(self, file_path: str, template_path: str, summary_name: str,
+                                summary_title: str, project_type: str, project_name: str,
+                                sample_count: int, sample_sheets: List[str], sample_type: str,
+                                bmp_format: bool = False):
+        """
+        Stream a project workbook to disk: a summary sheet followed by one
+        copy of the template's first sheet per sample. The sample sheet is
+        rendered once from the cached template blueprint and each copy only
+        has its header substituted, so memory stays flat however many samples
+        there are. The template's styles, theme and shared strings are carried
+        over so the copied cells keep their formats.
+        """
+        blueprint = get_blueprint(template_path)
+        styles = blueprint.new_styles()
+
+        summary_xml = self._summary_sheet(
+            styles, summary_title, project_name, project_type, sample_type, sample_count
+        )
+        if bmp_format:
+            stamp, column_a_width = self._bmp_sheet_stamp(blueprint, styles)
+        else:
+            stamp, column_a_width = SheetStamp(blueprint.sheet_xml), None
+
+        sheet_names = sample_sheets[:sample_count]
+
+        def sheets():
+            yield [summary_xml]
+            for sheet_name in sheet_names:
+                if column_a_width is None:
+                    yield stamp.render()
+                else:
+                    header = f"BMP Analysis - {sheet_name}"
+                    yield stamp.render(header=header, width=f'width="{column_a_width(header):g}"')
+
+        write_new_workbook(
+            file_path,
+            [summary_name] + sheet_names,
+            sheets(),
+            styles.to_bytes(),
+            theme=blueprint.theme_xml,
+            shared_strings=blueprint.shared_strings_xml
+        )
+
+    def _summary_sheet(self, styles: StylesPart, title: str, project_name: str,
+                       project_type: str, sample_type: str, sample_count: int) -> bytes:
+        """Render a project summary sheet"""
+        worksheet = WorksheetPart(EMPTY_WORKSHEET)
+
+        # Project information
+        title_style = styles.derive_xf(0, font_id=styles.add_font(0, bold=True, size=16))
+        label_style = styles.derive_xf(0, font_id=styles.add_font(0, bold=True))
+        worksheet.set_cell("A1", title, style=title_style)
+
+        summary_data = [
+            ["Project Name:", project_name],
+            ["Project Type:", project_type],
+            ["Sample Type:", sample_type],
+            ["Total Samples:", sample_count],
+            ["Created Date:", datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
+            ["Status:", "In Progress"]
+        ]
+
+        for i, (label, value) in enumerate(summary_data, start=3):
+            worksheet.set_cell(f"A{i}", label, style=label_style)
+            self._write_cell(worksheet, styles, f"B{i}", value)
+
+        # Auto-fit columns
+        self._auto_fit_columns(worksheet, styles, [], columns=[1, 2])
+        return worksheet.to_bytes()
+
+    def _bmp_sheet_stamp(self, blueprint: TemplateBlueprint,
+                         styles: StylesPart) -> Tuple[SheetStamp, Optional[Callable[[str], float]]]:
+        """
+        Apply BMP-specific formatting to the template sheet once, leaving
+        placeholders for the per-sample header and the width of its column
+
+        Returns:
+            Tuple of (sheet stamp, function giving column A's width for a header),
+            the function being None when the template already fills A1 and
+            every sample sheet is identical
+        """
+        worksheet = blueprint.new_worksheet()
+        shared_strings = blueprint.shared_strings
+        try:
+            if worksheet.get_value("A1", shared_strings, styles) is not None:
+                # Auto-fit important columns
+                self._auto_fit_columns(worksheet, styles, shared_strings, columns=[1, 2, 3, 4, 5])
+                return SheetStamp(worksheet.to_bytes()), None
+
+            # Add sheet identifier
+            header_font = styles.add_font(styles.font_index(worksheet.cell_style("A1")), bold=True, size=14)
+            header_style = styles.derive_xf(worksheet.cell_style("A1"), font_id=header_font)
+            worksheet.set_cell("A1", _HEADER_TOKEN, style=header_style)
+
+            # Auto-fit important columns; column A also depends on the header
+            self._auto_fit_columns(worksheet, styles, shared_strings, columns=[2, 3, 4, 5])
+            widths = self._column_text_widths(worksheet, styles, shared_strings, columns=[1], skip={"A1"})
+            worksheet.set_column_width(1, _WIDTH_TOKEN)
+            header_font = styles.font_info(header_style)
+
+            def column_a_width(header: str) -> float:
+                header_width = text_width(header, header_font['name'], header_font['size'],
+                                          header_font['bold'])
+                return column_width(widths.get(1, []) + [header_width])[0]
+
+            stamp = SheetStamp(worksheet.to_bytes(), {
+                'header': _HEADER_TOKEN,
+                'width': f'width="{_WIDTH_TOKEN:g}"',
+            })
+            return stamp, column_a_width
+
+        except Exception as e:
+            print(f"Warning: Could not format BMP sheets: {e}")
+            return SheetStamp(blueprint.sheet_xml), None
+
+    @traced('backup')
+    def _create_backup(self, file_path: str):
+        """Store the current version of the workbook in its folder's backup store"""
+        try:
+            BackupStore.for_workbook(file_path).snapshot(file_path)
+        except Exception as e:
+            print(f"Warning: Could not create backup: {e}")
+
+    @traced()
+    def save_bmp_data(self, excel_path: str, sheet_name: str, data: Dict[str, Any]):
+        """
+        Save BMP data to a specific sheet
+
+        Args:
+            excel_path: Path to the Excel file
+            sheet_name: Name of the sheet to save to
+            data: Dictionary with cell ranges as keys and values to save
+        """
+        try:
+            self._save_sheet_data(excel_path, sheet_name, data)
+        except Exception as e:
+            raise Exception(f"Failed to save BMP data to Excel: {e}")
+
+    @traced()
+    def save_characterisation_data(self, excel_path: str, sheet_name: str, data: Dict[str, Any]):
+        """
+        Save characterisation data to a specific sheet
+
+        Args:
+            excel_path: Path to the Excel file
+            sheet_name: Name of the sheet to save to
+            data: Dictionary with cell ranges as keys and values to save
+        """
+        try:
+            self._save_sheet_data(excel_path, sheet_name, data)
+        except Exception as e:
+            raise Exception(f"Failed to save characterisation data to Excel: {e}")
+
+    @traced()
+    def save_many(self, excel_path: str,
+                  sheets_data: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Optional[str]]]:
+        """
+        Save values for many sheets in one open/write/save pass
+
+        Args:
+            excel_path: Path to the Excel file
+            sheets_data: Sheet names mapped to {cell range: value} dictionaries
+
+        Returns:
+            Sheet names mapped to {cell range: error message}, None for cells that were saved
+        """
+        try:
+            session = self._workbook_cache.get(excel_path)
+            workbook = session.book
+            sheet_names = workbook.sheet_names()
+            results = {}
+
+            for sheet_name, data in sheets_data.items():
+                if sheet_name not in sheet_names:
+                    error = f"Sheet '{sheet_name}' does not exist"
+                    results[sheet_name] = {cell_range: error for cell_range in data}
+                    continue
+
+                worksheet = workbook.worksheet(sheet_name)
+                state = session.sheet_state(sheet_name)
+                results[sheet_name] = self._write_sheet_data(worksheet, workbook.styles,
+                                                             workbook.shared_strings, data, state)
+                if state['changed']:
+                    session.mark_dirty()
+
+            self._workbook_cache.flush(excel_path)
+            return results
+
+        except Exception as e:
+            raise Exception(f"Failed to save data to Excel: {e}")
+
+    def _save_sheet_data(self, excel_path: str, sheet_name: str, data: Dict[str, Any]):
+        """Write cell values into one sheet of the open workbook"""
+        session = self._workbook_cache.get(excel_path)
+        workbook = session.book
+        worksheet = workbook.worksheet(sheet_name)
+
+        state = session.sheet_state(sheet_name)
+        results = self._write_sheet_data(worksheet, workbook.styles, workbook.shared_strings, data, state)
+        for cell_range, error in results.items():
+            if error:
+                print(f"Warning: Could not save data to {cell_range}: {error}")
+
+        # Nothing to save when every value was already there; changed
+        # columns are fitted when the workbook is written
+        if state['changed']:
+            # Written to disk by flush(), on close or on eviction
+            session.mark_dirty()
+
+    @traced('write_cells')
+    def _write_sheet_data(self, worksheet: WorksheetPart, styles: StylesPart, shared_strings: List[str],
+                          data: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """
+        Write cell values into a worksheet, merging and centring ranges
+
+        Cells already holding the value are skipped: the saved values of the
+        form cells are read from the worksheet the first time the session
+        writes to them. A range is merged and centred once per session.
+
+        Args:
+            worksheet: Sheet to write to
+            styles: Workbook styles
+            shared_strings: Workbook shared string table
+            data: Dictionary with cell ranges as keys and values to save
+            state: The session's sheet_state for this sheet
+
+        Returns:
+            Cell ranges mapped to an error message, None for cells that were written
+        """
+        written = state['values']
+        results = {}
+        for cell_range, value in data.items():
+            try:
+                # A merged range keeps its value in the top-left cell
+                ref = range_cells(cell_range)[0][0] if ':' in cell_range else cell_range
+                if cell_range not in written:
+                    written[cell_range] = worksheet.get_value(ref, shared_strings, styles)
+
+                if ':' in cell_range and cell_range not in state['merged']:
+                    if self._merge_and_centre(worksheet, styles, cell_range):
+                        # Restyled or merged; the value is written again with it
+                        written.pop(cell_range, None)
+                    state['merged'].add(cell_range)
+
+                if cell_range in written and written[cell_range] == self._stored_value(value):
+                    results[cell_range] = None
+                    continue
+
+                self._write_cell(worksheet, styles, ref, value)
+                written[cell_range] = self._stored_value(value)
+                state['changed'].add(cell_range)
+                results[cell_range] = None
+            except Exception as e:
+                written.pop(cell_range, None)
+                results[cell_range] = str(e)
+        return results
+
+    def _merge_and_centre(self, worksheet: WorksheetPart, styles: StylesPart, cell_range: str) -> bool:
+        """
+        Merge and centre a range the way Excel ends up after clear / unmerge /
+        merge: only the top-left cell keeps a value and any merge overlapping
+        the range is replaced by this one. An identical merge is left in place.
+
+        Returns:
+            True if the worksheet was changed
+        """
+        cells = [ref for row in range_cells(cell_range) for ref in row]
+        already_merged = cell_range.upper() in worksheet.merged_ranges()
+        changed = False
+        for index, ref in enumerate(cells):
+            centred = styles.derive_xf(worksheet.cell_style(ref), horizontal='center')
+            if already_merged or index == 0:
+                if centred != worksheet.cell_style(ref):
+                    worksheet.set_cell_style(ref, centred)
+                    changed = True
+            else:
+                worksheet.set_cell(ref, None, style=centred)
+                changed = True
+
+        if not already_merged:
+            merged = [ref for ref in worksheet.merged_ranges() if not ranges_overlap(ref, cell_range)]
+            worksheet.set_merged_ranges(merged + [cell_range.upper()])
+            changed = True
+        return changed
+
+    def _write_cell(self, worksheet: WorksheetPart, styles: StylesPart, ref: str, value: Any):
+        """Write a single value, applying a date format when Excel would"""
+        value, format_code = self._coerce_value(value)
+        style = None
+        if format_code:
+            style = styles.derive_xf(worksheet.cell_style(ref), num_fmt_id=styles.add_num_fmt(format_code))
+        worksheet.set_cell(ref, value, style=style)
+
+    def _stored_value(self, value: Any) -> Any:
+        """Get what reading a cell back returns after value is written to it"""
+        stored, format_code = self._coerce_value(value)
+        if stored == '':
+            return None
+        if format_code:
+            return from_excel_serial(stored)
+        return float(stored) if isinstance(stored, int) and not isinstance(stored, bool) else stored
+
+    def _coerce_value(self, value: Any) -> Tuple[Any, Optional[str]]:
+        """
+        Convert a Python value to what Excel stores for it
+
+        Returns:
+            Tuple of (cell value, number format code or None)
+        """
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            has_time = isinstance(value, datetime.datetime) and value.time() != datetime.time()
+            return to_excel_serial(value), DATETIME_FORMAT_CODE if has_time else DATE_FORMAT_CODE
+
+        if isinstance(value, str):
+            text = value.strip()
+            if _NUMBER_RE.match(text):
+                number = float(text)
+                return int(number) if number.is_integer() and 'e' not in text.lower() else number, None
+            match = _DATE_RE.match(text)
+            if match:
+                try:
+                    parts = [int(part) for part in match.groups() if part is not None]
+                    return self._coerce_value(datetime.datetime(*parts))
+                except ValueError:
+                    pass
+
+        return value, None
+
+    @traced('autofit')
+    def _fit_changed_columns(self, session):
+        """Re-fit only the columns holding cells written since the last save"""
+        workbook = session.book
+        for sheet_name, state in session.state.get('sheets', {}).items():
+            if not state['changed']:
+                continue
+            # Merged ranges don't count towards AutoFit, so only single cells matter
+            columns = {split_cell_ref(ref)[1] for ref in state['changed'] if ':' not in ref}
+            if columns:
+                try:
+                    self._auto_fit_columns(workbook.worksheet(sheet_name), workbook.styles,
+                                           workbook.shared_strings, columns=columns)
+                except Exception as e:
+                    print(f"Warning: Could not auto-fit columns on {sheet_name}: {e}")
+            state['changed'].clear()
+
+    def _auto_fit_columns(self, worksheet: WorksheetPart, styles: StylesPart,
+                          shared_strings: List[str], columns: Optional[Iterable[int]] = None):
+        """
+        Size columns to their widest displayed value, like Excel's AutoFit,
+        capping them at MAX_COLUMN_WIDTH and wrapping the text of capped columns
+
+        Args:
+            worksheet: Sheet to resize
+            styles: Workbook styles, used for fonts and to recognise dates
+            shared_strings: Workbook shared strings
+            columns: 1-based column numbers to fit, None for every used column
+        """
+        text_widths = self._column_text_widths(worksheet, styles, shared_strings, columns)
+        for col, widths in text_widths.items():
+            width, wrap = column_width(widths)
+            if width is None:
+                continue
+            worksheet.set_column_width(col, width)
+            if wrap:
+                self._wrap_column(worksheet, styles, col)
+
+    def _wrap_column(self, worksheet: WorksheetPart, styles: StylesPart, col: int):
+        """Turn on text wrapping for every stored cell in a column"""
+        for row, cell_col in list(worksheet.iter_cells()):
+            if cell_col == col:
+                ref = cell_ref(row, col)
+                wrapped = styles.derive_xf(worksheet.cell_style(ref), wrap_text=True)
+                if wrapped != worksheet.cell_style(ref):
+                    worksheet.set_cell_style(ref, wrapped)
+
+    def _column_text_widths(self, worksheet: WorksheetPart, styles: StylesPart,
+                            shared_strings: List[str], columns: Optional[Iterable[int]] = None,
+                            skip: Optional[set] = None) -> Dict[int, List[float]]:
+        """
+        Get the displayed text width of every counted cell, per column (cells
+        inside merged ranges are ignored, as AutoFit does)
+        """
+        columns = set(columns) if columns is not None else None
+        skip = set(skip or ())
+        skip.update(ref for merged in worksheet.merged_ranges()
+                    for row in range_cells(merged) for ref in row)
+        fonts = {}
+        widths = {}
+        for row, col in worksheet.iter_cells():
+            if columns is not None and col not in columns:
+                continue
+            ref = cell_ref(row, col)
+            if ref in skip:
+                continue
+            value = worksheet.get_value(ref, shared_strings, styles)
+            if value is None:
+                continue
+            style = worksheet.cell_style(ref)
+            if style not in fonts:
+                fonts[style] = styles.font_info(style)
+            font = fonts[style]
+            widths.setdefault(col, []).append(
+                text_width(display_text(value), font['name'], font['size'], font['bold'])
+            )
+        return widths
+
+    @traced()
+    def rename_sheet(self, excel_path: str, old_name: str, new_name: str):
+        """
+        Rename a sheet in the Excel workbook with validation
+
+        Args:
+            excel_path: Path to the Excel file
+            old_name: Current name of the sheet
+            new_name: New name for the sheet
+        """
+        try:
+            self._rename_sheets(excel_path, {old_name: new_name})
+        except Exception as e:
+            raise Exception(f"Failed to rename sheet: {e}")
+
+    @traced()
+    def rename_sheets(self, excel_path: str, renames: Dict[str, str]):
+        """
+        Rename several sheets in one rewrite of the workbook; all names are
+        validated first and either every sheet is renamed or none is
+
+        Args:
+            excel_path: Path to the Excel file
+            renames: New sheet names keyed by current sheet name
+        """
+        try:
+            self._rename_sheets(excel_path, renames)
+        except Exception as e:
+            raise Exception(f"Failed to rename sheets: {e}")
+
+    def _rename_sheets(self, excel_path: str, renames: Dict[str, str]):
+        """Validate and apply renames in the package, then bring an open session up to date"""
+        # Pending edits go to disk first so the file can be renamed in place
+        self._workbook_cache.flush(excel_path)
+
+        # Excel rejects names it cannot store or that clash; so do we
+        errors = validate_sample_renames(renames, get_sheet_names(excel_path))
+        if errors:
+            raise ValueError("; ".join(f"{name}: {error}" for name, error in errors.items()))
+
+        # Only the parts naming the sheets are rewritten; the rest is copied as stored
+        replacements = rename_sheets_in_package(excel_path, renames)
+        self._create_backup(excel_path)
+
+        session = self._workbook_cache.peek(excel_path)
+        if session is not None and replacements:
+            session.book.update_parts(replacements)
+            session.rename_sheets_state(renames)
+            self._workbook_cache.file_updated(excel_path)
+
+    @traced()
+    def get_sheet_data(self, excel_path: str, sheet_name: str, cell_ranges: List[str]) -> Dict[str, Any]:
+        """
+        Get data from specific cell ranges in a sheet with error handling
+
+        Args:
+            excel_path: Path to the Excel file
+            sheet_name: Name of the sheet
+            cell_ranges: List of cell ranges to read
+
+        Returns:
+            Dictionary with cell ranges as keys and their values
+        """
+        try:
+            workbook = self._workbook_cache.get(excel_path).book
+            worksheet = workbook.worksheet(sheet_name)
+
+            data = {}
+            for cell_range in cell_ranges:
+                try:
+                    data[cell_range] = self._read_range(workbook, worksheet, cell_range)
+                except Exception as e:
+                    print(f"Warning: Could not read {cell_range}: {e}")
+                    data[cell_range] = None
+
+            return data
+
+        except Exception as e:
+            raise Exception(f"Failed to read data from Excel: {e}")
+
+    @traced()
+    def get_all_sheet_data(self, excel_path: str, cell_ranges: List[str],
+                           sheet_names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the same cell ranges from many sheets in one streaming pass over the
+        file, without parsing every worksheet in full
+
+        Args:
+            excel_path: Path to the Excel file
+            cell_ranges: List of cell ranges to read from every sheet
+            sheet_names: Sheets to read, None for all of them
+
+        Returns:
+            Dictionary with sheet names as keys and get_sheet_data()-style dictionaries as values
+        """
+        try:
+            # Pending edits must be on disk before the file is read directly
+            self.flush(excel_path)
+            return read_workbook_cells(excel_path, cell_ranges, sheet_names)
+        except Exception as e:
+            raise Exception(f"Failed to read data from Excel: {e}")
+
+    def _read_range(self, workbook: XlsxWorkbook, worksheet: WorksheetPart, cell_range: str) -> Any:
+        """Read a cell or range, shaped like xlwings' Range.value"""
+        rows = [[worksheet.get_value(ref, workbook.shared_strings, workbook.styles) for ref in row]
+                for row in range_cells(cell_range)]
+        return shape_range_values(rows)
+
+    @traced()
+    def check_sheet_exists(self, excel_path: str, sheet_name: str) -> bool:
+        """
+        Check if a sheet exists in the workbook
+
+        Args:
+            excel_path: Path to the Excel file
+            sheet_name: Name of the sheet to check
+
+        Returns:
+            True if sheet exists, False otherwise
+        """
+        try:
+            if self._workbook_cache.is_dirty(excel_path):
+                return sheet_name in self._workbook_cache.get(excel_path).book.sheet_names()
+            return sheet_name in get_sheet_names(excel_path)
+        except Exception:
+            return False
+
+    @traced()
+    def get_project_summary(self, excel_path: str) -> Dict[str, Any]:
+        """
+        Get project summary information from Excel file
+
+        Args:
+            excel_path: Path to the Excel file
+
+        Returns:
+            Dictionary with project summary data
+        """
+        try:
+            if not self._workbook_cache.is_dirty(excel_path):
+                return get_summary(excel_path)
+
+            workbook = self._workbook_cache.get(excel_path).book
+            summary_data = {}
+
+            # Look for summary sheets
+            summary_sheets = [name for name in workbook.sheet_names()
+                              if 'summary' in name.lower()]
+
+            if summary_sheets:
+                summary_sheet = workbook.worksheet(summary_sheets[0])
+                # Extract summary information
+                try:
+                    keys = ['project_name', 'project_type', 'sample_type',
+                            'total_samples', 'created_date', 'status']
+                    for row, key in enumerate(keys, start=3):
+                        summary_data[key] = summary_sheet.get_value(
+                            f"B{row}", workbook.shared_strings, workbook.styles
+                        )
+                except Exception:
+                    summary_data['error'] = "Could not read summary data"
+
+            return summary_data
+
+        except Exception as e:
+            return {'error': f"Failed to read project summary: {e}"}
@@ -0,0 +1,1474 @@
+"""
+Low-level helpers for reading and editing the .xlsx package without Excel
+
+An .xlsx file is a zip archive of XML parts. The classes here keep every part
+they do not need to touch byte-for-byte and only re-render the fragments that
+actually change (cells, merged ranges, column widths, sheet names, new styles),
+so workbooks written by Excel stay valid after a headless edit.
+"""
+import contextlib
+import datetime
+import html
+import os
+import posixpath
+import re
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
+
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+REL_TYPE_OFFICE_DOCUMENT = REL_NS + "/officeDocument"
+REL_TYPE_WORKSHEET = REL_NS + "/worksheet"
+REL_TYPE_STYLES = REL_NS + "/styles"
+REL_TYPE_THEME = REL_NS + "/theme"
+REL_TYPE_SHARED_STRINGS = REL_NS + "/sharedStrings"
+REL_TYPE_CORE_PROPERTIES = "http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties"
+REL_TYPE_EXTENDED_PROPERTIES = REL_NS + "/extended-properties"
+
+CT_WORKBOOK = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"
+CT_WORKSHEET = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+CT_STYLES = "application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"
+CT_THEME = "application/vnd.openxmlformats-officedocument.theme+xml"
+CT_SHARED_STRINGS = "application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+CT_CORE_PROPERTIES = "application/vnd.openxmlformats-package.core-properties+xml"
+CT_EXTENDED_PROPERTIES = "application/vnd.openxmlformats-officedocument.extended-properties+xml"
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Excel stores dates as days since 1899-12-30 (the 1900 leap-year bug included)
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+# Largest sheet Excel can address (XFD1048576)
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+
+# Built-in number formats that Excel renders as dates or times
+BUILTIN_DATE_FORMAT_IDS = set(range(14, 23)) | {45, 46, 47}
+
+# Worksheet elements that follow <mergeCells> in the schema order
+_AFTER_MERGE_CELLS = (
+    'phoneticPr', 'conditionalFormatting', 'dataValidations', 'hyperlinks',
+    'printOptions', 'pageMargins', 'pageSetup', 'headerFooter', 'rowBreaks',
+    'colBreaks', 'customProperties', 'cellWatches', 'ignoredErrors', 'smartTags',
+    'drawing', 'legacyDrawing', 'legacyDrawingHF', 'picture', 'oleObjects',
+    'controls', 'webPublishItems', 'tableParts', 'extLst'
+)
+
+# Worksheet elements that only make sense together with their own relationships
+_RELATIONSHIP_ELEMENTS = (
+    'drawing', 'legacyDrawing', 'legacyDrawingHF', 'picture', 'oleObjects',
+    'controls', 'tableParts'
+)
+
+_CELL_REF_RE = re.compile(r'^\$?([A-Za-z]{1,3})\$?(\d+)$')
+_INVALID_XML_CHARS_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_ATTR_RE = re.compile(r'([\w:]+)="([^"]*)"')
+_ROW_RE = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+_CELL_RE = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_CELL_ATTR_R_RE = re.compile(r'\br="\$?([A-Za-z]{1,3})\$?(\d+)"')
+_SHEET_DATA_RE = re.compile(r'<sheetData\s*/>|<sheetData>(.*?)</sheetData>', re.S)
+_MERGE_CELLS_RE = re.compile(r'<mergeCells\b[^>]*?(?:/>|>.*?</mergeCells>)', re.S)
+_MERGE_CELL_RE = re.compile(r'<mergeCell\b[^>]*\bref="([^"]+)"')
+_COLS_RE = re.compile(r'<cols\b[^>]*?(?:/>|>.*?</cols>)', re.S)
+_COL_RE = re.compile(r'<col\b([^>]*?)/>')
+_DIMENSION_RE = re.compile(r'<dimension\b[^>]*?/>')
+_WORKBOOK_SHEET_RE = re.compile(r'<sheet\b[^>]*?/>')
+_DEFINED_NAME_RE = re.compile(r'(<definedName\b[^>]*>)(.*?)(</definedName>)', re.S)
+# Formula elements of worksheets (f, data validation and conditional format
+# formulas) and charts (c:f)
+_FORMULA_RE = re.compile(r'(<((?:\w+:)?(?:f|formula\d?))\b[^>]*>)(.*?)(</\2>)', re.S)
+_STRING_LITERAL_RE = re.compile(r'("(?:[^"]|"")*")')
+# The sheet (or First:Last sheets of a 3D reference) before the '!' of a
+# reference, quoted or bare; a ']' before it means another workbook's sheet
+_SHEET_PREFIX_RE = re.compile(r"(?<![\w.'\]])(?:'((?:[^']|'')+)'|([^\W\d][\w.]*(?::[^\W\d][\w.]*)?))(?=!)")
+_SHEET_SOURCE_RE = re.compile(r'<worksheetSource\b[^>]*?/?>')
+_TITLE_RE = re.compile(r'(<vt:lpstr>)(.*?)(</vt:lpstr>)', re.S)
+
+# Zip records written by rewrite_package
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+_CENTRAL_HEADER = struct.Struct('<4s6H3L5H2L')
+_END_RECORD = struct.Struct('<4s4H2LH')
+_ZIP_LIMIT = 0xFFFFFFFF
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+# ---------------------------------------------------------------------------
+# Cell references
+# ---------------------------------------------------------------------------
+
+def column_index(letters: str) -> int:
+    """Convert column letters (e.g. "AB") to a 1-based column number"""
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + (ord(char) - 64)
+    return index
+
+
+def column_letter(index: int) -> str:
+    """Convert a 1-based column number to column letters"""
+    letters = ""
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def split_cell_ref(ref: str) -> Tuple[int, int]:
+    """
+    Split an A1-style cell reference into numbers
+
+    Args:
+        ref: Cell reference such as "B3" or "$B$3"
+
+    Returns:
+        Tuple of (row, column), both 1-based
+    """
+    match = _CELL_REF_RE.match(ref.strip())
+    if not match:
+        raise ValueError(f"Invalid cell reference: {ref}")
+    row, col = int(match.group(2)), column_index(match.group(1))
+    if not (1 <= row <= MAX_ROWS and col <= MAX_COLUMNS):
+        raise ValueError(f"Cell reference outside the sheet: {ref}")
+    return row, col
+
+
+def cell_ref(row: int, col: int) -> str:
+    """Build an A1-style cell reference from 1-based row and column numbers"""
+    return f"{column_letter(col)}{row}"
+
+
+def range_bounds(range_ref: str) -> Tuple[int, int, int, int]:
+    """
+    Get the bounds of a cell or range reference
+
+    Returns:
+        Tuple of (first_row, first_col, last_row, last_col)
+    """
+    if ':' in range_ref:
+        start, end = range_ref.split(':', 1)
+    else:
+        start = end = range_ref
+    first_row, first_col = split_cell_ref(start)
+    last_row, last_col = split_cell_ref(end)
+    return (min(first_row, last_row), min(first_col, last_col),
+            max(first_row, last_row), max(first_col, last_col))
+
+
+def range_cells(range_ref: str) -> List[List[str]]:
+    """Expand a range reference into rows of cell references"""
+    first_row, first_col, last_row, last_col = range_bounds(range_ref)
+    return [[cell_ref(row, col) for col in range(first_col, last_col + 1)]
+            for row in range(first_row, last_row + 1)]
+
+
+def shape_range_values(rows: List[List[Any]]) -> Any:
+    """
+    Shape the values of a range like xlwings' Range.value: a scalar for one
+    cell, a flat list for a single row or column, otherwise a list of rows
+    """
+    if len(rows) == 1 and len(rows[0]) == 1:
+        return rows[0][0]
+    if len(rows) == 1:
+        return rows[0]
+    if all(len(row) == 1 for row in rows):
+        return [row[0] for row in rows]
+    return rows
+
+
+def ranges_overlap(first: str, second: str) -> bool:
+    """Check whether two range references share at least one cell"""
+    a = range_bounds(first)
+    b = range_bounds(second)
+    return not (a[2] < b[0] or b[2] < a[0] or a[3] < b[1] or b[3] < a[1])
+
+
+# ---------------------------------------------------------------------------
+# XML text helpers
+# ---------------------------------------------------------------------------
+
+def xml_text(value: Any) -> str:
+    """Escape a value for use as XML character data"""
+    # html.escape rather than xml.sax.saxutils.escape, which imports urllib at startup
+    return html.escape(_INVALID_XML_CHARS_RE.sub('', str(value)), quote=False)
+
+
+def xml_attr(value: Any) -> str:
+    """Escape a value for use inside a double-quoted XML attribute"""
+    return html.escape(_INVALID_XML_CHARS_RE.sub('', str(value)), quote=False).replace('"', '&quot;')
+
+
+def parse_attrs(tag: str) -> Dict[str, str]:
+    """Parse the attributes of a start tag into an unescaped dictionary"""
+    return {name: html.unescape(value) for name, value in _ATTR_RE.findall(tag)}
+
+
+def set_attr(tag: str, name: str, value: Optional[Any]) -> str:
+    """
+    Set, replace or remove (value None) an attribute on a start tag string
+
+    Args:
+        tag: Start tag such as '<c r="A1" s="2">' or '<c r="A1"/>'
+        name: Attribute name
+        value: New attribute value, or None to remove the attribute
+
+    Returns:
+        The updated start tag
+    """
+    pattern = re.compile(r'\s' + re.escape(name) + r'="[^"]*"')
+    if value is None:
+        return pattern.sub('', tag, count=1)
+    replacement = f' {name}="{xml_attr(value)}"'
+    if pattern.search(tag):
+        return pattern.sub(lambda _: replacement, tag, count=1)
+    end = -2 if tag.endswith('/>') else -1
+    return tag[:end] + replacement + tag[end:]
+
+
+def text_content(fragment: str) -> str:
+    """Concatenate the <t> runs of a string item, ignoring phonetic runs"""
+    fragment = re.sub(r'<rPh\b.*?</rPh>', '', fragment, flags=re.S)
+    return ''.join(html.unescape(text) for text in re.findall(r'<t(?:\s[^>]*)?>(.*?)</t>', fragment, re.S))
+
+
+# ---------------------------------------------------------------------------
+# Dates
+# ---------------------------------------------------------------------------
+
+def to_excel_serial(value: Any) -> Union[int, float]:
+    """Convert a date or datetime to an Excel serial number"""
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    delta = value - EXCEL_EPOCH
+    return delta.days + delta.seconds / 86400.0 if delta.seconds else delta.days
+
+
+def from_excel_serial(serial: float) -> datetime.datetime:
+    """Convert an Excel serial number to a datetime (rounded to the millisecond)"""
+    milliseconds = round(float(serial) * 86400000)
+    return EXCEL_EPOCH + datetime.timedelta(milliseconds=milliseconds)
+
+
+def is_date_format(format_code: str) -> bool:
+    """Check whether a number format code renders values as dates or times"""
+    code = re.sub(r'"[^"]*"|\[[^\]]*\]|\\.|_.|\*.', '', format_code)
+    return bool(re.search(r'[dmyhs]', code, re.I))
+
+
+# ---------------------------------------------------------------------------
+# Package I/O
+# ---------------------------------------------------------------------------
+
+def read_package(path: str) -> "OrderedDict[str, bytes]":
+    """Read every part of an .xlsx package into memory, preserving part order"""
+    parts = OrderedDict()
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if not info.is_dir():
+                parts[info.filename] = archive.read(info)
+    return parts
+
+
+class ArchiveParts:
+    """
+    Parts mapping over an open archive that reads each part only when it is
+    asked for; parts assigned to it are kept in `changed` instead
+    """
+
+    def __init__(self, archive: zipfile.ZipFile):
+        self.archive = archive
+        self.changed = OrderedDict()
+        self._names = [info.filename for info in archive.infolist() if not info.is_dir()]
+        self._name_set = set(self._names)
+
+    def get(self, name: Optional[str], default: Optional[bytes] = None) -> Optional[bytes]:
+        if name in self.changed:
+            return self.changed[name]
+        if name not in self._name_set:
+            return default
+        return self.archive.read(name)
+
+    def __getitem__(self, name: str) -> bytes:
+        data = self.get(name)
+        if data is None:
+            raise KeyError(name)
+        return data
+
+    def __setitem__(self, name: str, data: bytes):
+        self.changed[name] = data
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.changed or name in self._name_set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names + [name for name in self.changed if name not in self._name_set])
+
+
+@contextlib.contextmanager
+def atomic_file(path: str, suffix: str = '.xlsx'):
+    """
+    Open a new file that replaces `path` only once it is complete
+
+    The file is written to a temporary file next to the target and moved
+    into place, so a crash mid-write never leaves a truncated workbook.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.~', suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+@contextlib.contextmanager
+def _atomic_archive(path: str):
+    """Open a new zip archive that replaces `path` only once it is complete"""
+    with atomic_file(path) as f:
+        with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as archive:
+            yield archive
+
+
+def write_package(path: str, parts: Dict[str, bytes]):
+    """
+    Write an .xlsx package atomically
+
+    Args:
+        path: Destination .xlsx path
+        parts: Mapping of part name to part bytes
+    """
+    with _atomic_archive(path) as archive:
+        # [Content_Types].xml first, as Excel writes it
+        names = sorted(parts, key=lambda name: name != '[Content_Types].xml')
+        for name in names:
+            archive.writestr(name, parts[name])
+
+
+def _dos_date_time(date_time: Tuple[int, ...]) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time[:6]
+    return ((max(year, 1980) - 1980) << 9 | month << 5 | day,
+            hour << 11 | minute << 5 | second // 2)
+
+
+def raw_member_offset(source, info: zipfile.ZipInfo) -> int:
+    """
+    Find where a member's stored (still compressed) bytes start in an archive file
+
+    Args:
+        source: The archive file, opened in binary mode
+        info: The member's ZipInfo from the archive's central directory
+
+    Returns:
+        File offset of the member's data; info.compress_size bytes long
+    """
+    if info.flag_bits & 0x1:
+        raise ValueError(f"Encrypted part {info.filename} cannot be copied")
+    source.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(source.read(_LOCAL_HEADER.size))
+    return info.header_offset + _LOCAL_HEADER.size + header[9] + header[10]
+
+
+class RawZipWriter:
+    """
+    Writes zip members from bytes that are already compressed, so parts can be
+    copied between archives without being inflated and deflated again
+    """
+
+    def __init__(self, target):
+        """
+        Args:
+            target: File opened for binary writing, positioned at its start
+        """
+        self.target = target
+        self._entries = []
+
+    def add(self, name: str, flags: int, method: int, date_time: Tuple[int, ...],
+            crc: int, compressed_size: int, size: int, write_data: Callable[[], None]):
+        """
+        Write a member whose compressed data write_data() writes to the target
+
+        Sizes go in the local header, so the member never has a trailing data
+        descriptor (flag bit 3).
+        """
+        offset = self.target.tell()
+        if max(offset, compressed_size, size) >= _ZIP_LIMIT:
+            raise ValueError("Workbook is too large to rewrite in place")
+        name_bytes = name.encode('utf-8')
+        flags &= 0x806
+        if not name.isascii():
+            flags |= 0x800
+        dos_date, dos_time = _dos_date_time(date_time)
+        self.target.write(_LOCAL_HEADER.pack(b'PK\x03\x04', 20, flags, method, dos_time, dos_date,
+                                             crc, compressed_size, size, len(name_bytes), 0))
+        self.target.write(name_bytes)
+        write_data()
+        self._entries.append((name_bytes, flags, method, dos_time, dos_date,
+                              crc, compressed_size, size, offset))
+
+    def add_bytes(self, name: str, data: bytes, date_time: Optional[Tuple[int, ...]] = None):
+        """Deflate and write a member"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        self.add(name, 0, zipfile.ZIP_DEFLATED, date_time or time.localtime()[:6], zlib.crc32(data),
+                 len(compressed), len(data), lambda: self.target.write(compressed))
+
+    def copy(self, source, info: zipfile.ZipInfo):
+        """Copy a member of another archive file as its stored compressed bytes"""
+        def copy_data():
+            source.seek(raw_member_offset(source, info))
+            remaining = info.compress_size
+            while remaining:
+                chunk = source.read(min(remaining, _COPY_CHUNK_SIZE))
+                if not chunk:
+                    raise ValueError(f"Part {info.filename} is truncated")
+                self.target.write(chunk)
+                remaining -= len(chunk)
+
+        self.add(info.filename, info.flag_bits, info.compress_type, info.date_time,
+                 info.CRC, info.compress_size, info.file_size, copy_data)
+
+    def close(self):
+        """Write the central directory"""
+        directory_offset = self.target.tell()
+        for name_bytes, flags, method, dos_time, dos_date, crc, compressed_size, size, offset in self._entries:
+            self.target.write(_CENTRAL_HEADER.pack(b'PK\x01\x02', 20, 20, flags, method, dos_time, dos_date,
+                                                   crc, compressed_size, size, len(name_bytes),
+                                                   0, 0, 0, 0, 0, offset))
+            self.target.write(name_bytes)
+        directory_size = self.target.tell() - directory_offset
+        self.target.write(_END_RECORD.pack(b'PK\x05\x06', 0, 0, len(self._entries), len(self._entries),
+                                           directory_size, directory_offset, 0))
+
+
+def rewrite_package(path: str, replacements: Dict[str, bytes]):
+    """
+    Replace some parts of an .xlsx package atomically
+
+    Every other part is copied as its stored compressed bytes, without being
+    decompressed or recompressed, so only the replaced parts cost any work
+    beyond a plain file copy.
+
+    Args:
+        path: .xlsx path to rewrite in place
+        replacements: Mapping of part name to new part bytes; names not in
+                      the package are added at the end
+    """
+    now = time.localtime()[:6]
+    # The source is closed before the rewritten file replaces it
+    with atomic_file(path) as target, open(path, 'rb') as source, zipfile.ZipFile(source) as archive:
+        writer = RawZipWriter(target)
+        names = set()
+        for info in archive.infolist():
+            names.add(info.filename)
+            if info.filename not in replacements:
+                writer.copy(source, info)
+
+        for name in [name for name in names if name in replacements] + \
+                [name for name in replacements if name not in names]:
+            writer.add_bytes(name, replacements[name], now)
+        writer.close()
+
+
+def rels_part_name(part_name: str) -> str:
+    """Get the relationships part name for a part (e.g. xl/_rels/workbook.xml.rels)"""
+    directory, base = posixpath.split(part_name)
+    return posixpath.join(directory, '_rels', base + '.rels')
+
+
+def resolve_part_name(source_part: str, target: str) -> str:
+    """Resolve a relationship target relative to the part that owns it"""
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def parse_relationships(data: Optional[bytes]) -> List[Dict[str, str]]:
+    """Parse a .rels part into a list of {'id', 'type', 'target', 'mode'} dictionaries"""
+    if not data:
+        return []
+    relationships = []
+    for tag in re.findall(r'<Relationship\b[^>]*?/?>', data.decode('utf-8')):
+        attrs = parse_attrs(tag)
+        relationships.append({
+            'id': attrs.get('Id', ''),
+            'type': attrs.get('Type', ''),
+            'target': attrs.get('Target', ''),
+            'mode': attrs.get('TargetMode', 'Internal'),
+        })
+    return relationships
+
+
+def render_relationships(relationships: List[Tuple[str, str, str]]) -> bytes:
+    """Render (id, type, target) tuples as a .rels part"""
+    body = ''.join(
+        f'<Relationship Id="{xml_attr(rel_id)}" Type="{xml_attr(rel_type)}" '
+        f'Target="{xml_attr(target)}"/>'
+        for rel_id, rel_type, target in relationships
+    )
+    return (XML_DECLARATION + f'<Relationships xmlns="{PKG_REL_NS}">{body}</Relationships>').encode('utf-8')
+
+
+def parse_shared_strings(data: Optional[bytes]) -> List[str]:
+    """Parse xl/sharedStrings.xml into a list of plain strings"""
+    if not data:
+        return []
+    xml = data.decode('utf-8')
+    return [text_content(item or '') for item in
+            re.findall(r'<si\b[^>]*?(?:/>|>(.*?)</si>)', xml, re.S)]
+
+
+# ---------------------------------------------------------------------------
+# Styles
+# ---------------------------------------------------------------------------
+
+class StylesPart:
+    """
+    Editable view of xl/styles.xml
+
+    Existing fonts, number formats and cell formats are never changed because
+    other cells may share them; new combinations are appended instead and
+    reused when the same combination is requested again.
+    """
+
+    def __init__(self, data: bytes):
+        self.xml = data.decode('utf-8')
+        self.fonts = self._parse_block('fonts', 'font')
+        self.cell_xfs = self._parse_block('cellXfs', 'xf')
+        self.num_fmts = {
+            int(attrs.get('numFmtId', 0)): attrs.get('formatCode', '')
+            for attrs in (parse_attrs(tag) for tag in re.findall(r'<numFmt\b[^>]*?/>', self.xml))
+        }
+        self.modified = False
+
+    def _parse_block(self, block: str, item: str) -> List[str]:
+        match = re.search(rf'<{block}\b[^>]*?(?:/>|>(.*?)</{block}>)', self.xml, re.S)
+        if not match or not match.group(1):
+            return []
+        return re.findall(rf'<{item}\b[^>]*?/>|<{item}\b[^>]*?>.*?</{item}>', match.group(1), re.S)
+
+    def _render_block(self, xml: str, block: str, items: List[str]) -> str:
+        content = ''.join(items)
+        pattern = re.compile(rf'<{block}\b([^>]*?)(?:/>|>.*?</{block}>)', re.S)
+        match = pattern.search(xml)
+        if match:
+            start_tag = set_attr(f'<{block}{match.group(1)}>', 'count', len(items))
+            return xml[:match.start()] + f'{start_tag}{content}</{block}>' + xml[match.end():]
+        # numFmts is the first child of styleSheet; the others always exist
+        root = re.search(r'<styleSheet\b[^>]*>', xml)
+        element = f'<{block} count="{len(items)}">{content}</{block}>'
+        return xml[:root.end()] + element + xml[root.end():]
+
+    def _xf(self, index: int) -> str:
+        if 0 <= index < len(self.cell_xfs):
+            return self.cell_xfs[index]
+        return self.cell_xfs[0] if self.cell_xfs else '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+
+    def _append(self, items: List[str], item: str) -> int:
+        if item in items:
+            return items.index(item)
+        items.append(item)
+        self.modified = True
+        return len(items) - 1
+
+    def font_index(self, xf_index: int) -> int:
+        """Get the font index used by a cell format"""
+        return int(parse_attrs(self._xf(xf_index).split('>', 1)[0]).get('fontId', 0))
+
+    def font_info(self, xf_index: int) -> Dict[str, Any]:
+        """Get the name, size and bold flag of the font used by a cell format"""
+        font_id = self.font_index(xf_index)
+        font = self.fonts[font_id] if font_id < len(self.fonts) else ''
+        size = re.search(r'<sz\b[^>]*\bval="([\d.]+)"', font)
+        name = re.search(r'<name\b[^>]*\bval="([^"]*)"', font)
+        bold = re.search(r'<b\b([^>]*)/>', font)
+        return {
+            'name': html.unescape(name.group(1)) if name else 'Calibri',
+            'size': float(size.group(1)) if size else 11.0,
+            'bold': bool(bold) and 'val="0"' not in bold.group(1) and 'val="false"' not in bold.group(1),
+        }
+
+    def is_date_style(self, xf_index: int) -> bool:
+        """Check whether a cell format displays its value as a date"""
+        num_fmt_id = int(parse_attrs(self._xf(xf_index).split('>', 1)[0]).get('numFmtId', 0))
+        if num_fmt_id in BUILTIN_DATE_FORMAT_IDS:
+            return True
+        code = self.num_fmts.get(num_fmt_id)
+        return bool(code) and is_date_format(code)
+
+    def add_font(self, base_font: int = 0, bold: Optional[bool] = None,
+                 size: Optional[float] = None) -> int:
+        """
+        Get (or append) a font derived from an existing one
+
+        Args:
+            base_font: Index of the font to start from
+            bold: Force bold on or off, None to keep the base setting
+            size: New point size, None to keep the base size
+
+        Returns:
+            Index of the derived font
+        """
+        font = self.fonts[base_font] if base_font < len(self.fonts) else '<font/>'
+        if font.endswith('/>') and not font.endswith('</font>'):
+            font = font[:-2] + '></font>'
+        start, body = font.split('>', 1)
+        body = body[:-len('</font>')]
+        if bold is not None:
+            body = re.sub(r'<b\b[^>]*/>', '', body)
+            if bold:
+                body = '<b/>' + body
+        if size is not None:
+            body = re.sub(r'<sz\b[^>]*/>', '', body)
+            body = f'<sz val="{size:g}"/>' + body
+        return self._append(self.fonts, f'{start}>{body}</font>')
+
+    def add_num_fmt(self, format_code: str) -> int:
+        """Get (or append) the id of a custom number format"""
+        for num_fmt_id, code in self.num_fmts.items():
+            if code == format_code:
+                return num_fmt_id
+        num_fmt_id = max([163] + list(self.num_fmts)) + 1
+        self.num_fmts[num_fmt_id] = format_code
+        self.modified = True
+        return num_fmt_id
+
+    def derive_xf(self, base_index: int, font_id: Optional[int] = None,
+                  num_fmt_id: Optional[int] = None, horizontal: Optional[str] = None,
+                  wrap_text: Optional[bool] = None) -> int:
+        """
+        Get (or append) a cell format derived from an existing one
+
+        Args:
+            base_index: Index of the cell format to start from (a cell's s attribute)
+            font_id: Font to apply
+            num_fmt_id: Number format to apply
+            horizontal: Horizontal alignment to apply (e.g. "center")
+            wrap_text: Turn text wrapping on or off
+
+        Returns:
+            Index of the derived cell format
+        """
+        xf = self._xf(base_index)
+        if xf.endswith('/>') and not xf.endswith('</xf>'):
+            start, body = xf[:-2] + '>', ''
+        else:
+            start, body = xf.split('>', 1)
+            start += '>'
+            body = body[:-len('</xf>')]
+        if font_id is not None:
+            start = set_attr(set_attr(start, 'fontId', font_id), 'applyFont', 1)
+        if num_fmt_id is not None:
+            start = set_attr(set_attr(start, 'numFmtId', num_fmt_id), 'applyNumberFormat', 1)
+        alignment_attrs = {}
+        if horizontal is not None:
+            alignment_attrs['horizontal'] = horizontal
+        if wrap_text is not None:
+            alignment_attrs['wrapText'] = 1 if wrap_text else None
+        if alignment_attrs:
+            start = set_attr(start, 'applyAlignment', 1)
+            alignment = re.search(r'<alignment\b[^>]*?/>', body)
+            # alignment is the first child of xf
+            tag = alignment.group(0) if alignment else '<alignment/>'
+            for name, value in alignment_attrs.items():
+                tag = set_attr(tag, name, value)
+            body = body.replace(alignment.group(0), tag, 1) if alignment else tag + body
+        xf = start + body + '</xf>' if body else start[:-1] + '/>'
+        return self._append(self.cell_xfs, xf)
+
+    def to_bytes(self) -> bytes:
+        xml = self._render_block(self.xml, 'fonts', self.fonts)
+        xml = self._render_block(xml, 'cellXfs', self.cell_xfs)
+        if self.num_fmts:
+            num_fmts = [f'<numFmt numFmtId="{num_fmt_id}" formatCode="{xml_attr(code)}"/>'
+                        for num_fmt_id, code in sorted(self.num_fmts.items())]
+            xml = self._render_block(xml, 'numFmts', num_fmts)
+        return xml.encode('utf-8')
+
+
+# ---------------------------------------------------------------------------
+# Worksheets
+# ---------------------------------------------------------------------------
+
+class _Row:
+    """A <row> of sheetData, parsed into cells only once it is touched"""
+
+    __slots__ = ('number', 'attrs', 'raw', '_cells')
+
+    def __init__(self, number: int, attrs: str, raw: Optional[str]):
+        self.number = number
+        self.attrs = attrs
+        self.raw = raw
+        self._cells = None
+
+    @property
+    def cells(self) -> Dict[int, str]:
+        if self._cells is None:
+            self._cells = {}
+            next_col = 1
+            for match in _CELL_RE.finditer(self.raw[self.raw.index('>') + 1:] if self.raw.endswith('</row>') else ''):
+                ref = _CELL_ATTR_R_RE.search(match.group(1))
+                col = column_index(ref.group(1)) if ref else next_col
+                self._cells[col] = match.group(0)
+                next_col = col + 1
+        return self._cells
+
+    def touch(self):
+        """Mark the row as edited so it is re-rendered from its cells"""
+        self.cells  # parse the cells before dropping the raw text
+        self.raw = None
+        self.attrs = set_attr(self.attrs, 'spans', None)
+
+    def render(self) -> str:
+        if self.raw is not None:
+            return self.raw
+        if not self._cells:
+            return f'<row{self.attrs}/>'
+        cells = ''.join(self._cells[col] for col in sorted(self._cells))
+        return f'<row{self.attrs}>{cells}</row>'
+
+
+class WorksheetPart:
+    """
+    Editable view of a worksheet part
+
+    The XML is split around <sheetData>: the head (sheet views, column widths)
+    and tail (merged cells, page setup, ...) are kept as text, and rows are
+    only parsed into cells once they are read or written.
+    """
+
+    def __init__(self, data: bytes):
+        xml = data.decode('utf-8')
+        match = _SHEET_DATA_RE.search(xml)
+        if not match:
+            raise ValueError("Worksheet part has no sheetData element")
+        self.head = xml[:match.start()]
+        self.tail = xml[match.end():]
+        self.rows = {}
+        for row_match in _ROW_RE.finditer(match.group(1) or ''):
+            attrs = row_match.group(1)
+            number = int(parse_attrs(attrs).get('r', len(self.rows) + 1))
+            self.rows[number] = _Row(number, attrs, row_match.group(0))
+        self.modified = False
+
+    # -- cells -------------------------------------------------------------
+
+    def cell_xml(self, ref: str) -> Optional[str]:
+        """Get the raw <c> element for a cell, or None if the cell is not stored"""
+        row, col = split_cell_ref(ref)
+        if row not in self.rows:
+            return None
+        return self.rows[row].cells.get(col)
+
+    def cell_style(self, ref: str) -> int:
+        """Get the cell format index (s attribute) of a cell"""
+        cell = self.cell_xml(ref)
+        if not cell:
+            row = self.rows.get(split_cell_ref(ref)[0])
+            row_attrs = parse_attrs(row.attrs) if row else {}
+            return int(row_attrs.get('s', 0)) if row_attrs.get('customFormat') in ('1', 'true') else 0
+        return int(parse_attrs(cell.split('>', 1)[0]).get('s', 0))
+
+    def cell_formula(self, ref: str) -> Optional[str]:
+        """Get the formula text of a cell, or None if it holds a constant"""
+        cell = self.cell_xml(ref)
+        match = re.search(r'<f\b[^>]*?(?:/>|>(.*?)</f>)', cell or '', re.S)
+        if not match:
+            return None
+        return '=' + html.unescape(match.group(1) or '')
+
+    def get_value(self, ref: str, shared_strings: List[str],
+                  styles: Optional[StylesPart] = None) -> Any:
+        """
+        Get the value of a cell the way xlwings reports it
+
+        Numbers are returned as floats, date-formatted numbers as datetimes,
+        strings resolved from the shared string table, and empty cells as None.
+        """
+        cell = self.cell_xml(ref)
+        if not cell or cell.endswith('/>') and '</c>' not in cell:
+            return None
+        start, body = cell.split('>', 1)
+        attrs = parse_attrs(start)
+        cell_type = attrs.get('t', 'n')
+        if cell_type == 'inlineStr':
+            return text_content(body)
+        value = re.search(r'<v\b[^>]*?(?:/>|>(.*?)</v>)', body, re.S)
+        if not value or value.group(1) is None:
+            return None
+        text = html.unescape(value.group(1))
+        if cell_type == 's':
+            index = int(text)
+            return shared_strings[index] if index < len(shared_strings) else None
+        if cell_type in ('str', 'e'):
+            return text
+        if cell_type == 'b':
+            return text in ('1', 'true')
+        number = float(text)
+        if styles is not None and styles.is_date_style(int(attrs.get('s', 0))):
+            return from_excel_serial(number)
+        return number
+
+    def set_cell(self, ref: str, value: Any, style: Optional[int] = None):
+        """
+        Write a constant into a cell, replacing any value or formula
+
+        Args:
+            ref: Cell reference
+            value: str, bool, int, float or None (clears the contents)
+            style: Cell format index, None to keep the current one
+        """
+        row_number, col = split_cell_ref(ref)
+        row = self.rows.get(row_number)
+        if row is None:
+            row = self.rows[row_number] = _Row(row_number, f' r="{row_number}"', None)
+            row._cells = {}
+        row.touch()
+
+        if style is None:
+            style = self.cell_style(ref)
+        attrs = f' r="{cell_ref(row_number, col)}"'
+        if style:
+            attrs += f' s="{style}"'
+
+        if value is None or value == '':
+            cell = f'<c{attrs}/>'
+        elif isinstance(value, bool):
+            cell = f'<c{attrs} t="b"><v>{int(value)}</v></c>'
+        elif isinstance(value, (int, float)):
+            cell = f'<c{attrs}><v>{value!r}</v></c>'
+        else:
+            text = str(value)
+            space = ' xml:space="preserve"' if text != text.strip() or '\n' in text else ''
+            cell = f'<c{attrs} t="inlineStr"><is><t{space}>{xml_text(text)}</t></is></c>'
+
+        row.cells[col] = cell
+        self.modified = True
+
+    def set_cell_style(self, ref: str, style: int):
+        """Change the format index of a cell, keeping its value or formula"""
+        cell = self.cell_xml(ref)
+        if not cell:
+            self.set_cell(ref, None, style=style)
+            return
+        row_number, col = split_cell_ref(ref)
+        row = self.rows[row_number]
+        row.touch()
+        end = cell.index('/>') + 2 if cell.endswith('/>') and '</c>' not in cell else cell.index('>') + 1
+        row.cells[col] = set_attr(cell[:end], 's', style or None) + cell[end:]
+        self.modified = True
+
+    def iter_cells(self):
+        """Yield (row, col) for every stored cell, in row order"""
+        for number in sorted(self.rows):
+            for col in sorted(self.rows[number].cells):
+                yield number, col
+
+    # -- merged ranges -------------------------------------------------------
+
+    def merged_ranges(self) -> List[str]:
+        """Get the merged range references of the sheet"""
+        match = _MERGE_CELLS_RE.search(self.tail)
+        return _MERGE_CELL_RE.findall(match.group(0)) if match else []
+
+    def set_merged_ranges(self, ranges: List[str]):
+        """Replace the merged ranges of the sheet"""
+        element = ''
+        if ranges:
+            items = ''.join(f'<mergeCell ref="{xml_attr(ref)}"/>' for ref in ranges)
+            element = f'<mergeCells count="{len(ranges)}">{items}</mergeCells>'
+        match = _MERGE_CELLS_RE.search(self.tail)
+        if match:
+            self.tail = self.tail[:match.start()] + element + self.tail[match.end():]
+        elif element:
+            self.tail = _insert_before(self.tail, _AFTER_MERGE_CELLS, element)
+        self.modified = True
+
+    # -- columns -------------------------------------------------------------
+
+    def _col_entries(self) -> List[Dict[str, str]]:
+        match = _COLS_RE.search(self.head)
+        if not match:
+            return []
+        return [parse_attrs(attrs) for attrs in _COL_RE.findall(match.group(0))]
+
+    def column_widths(self) -> Dict[int, float]:
+        """Get the explicit column widths of the sheet, keyed by 1-based column"""
+        widths = {}
+        for entry in self._col_entries():
+            if 'width' not in entry:
+                continue
+            first, last = int(entry.get('min', 1)), int(entry.get('max', 1))
+            # Whole-sheet spans only carry a default; don't expand them
+            for col in range(first, min(last, first + 255) + 1):
+                widths[col] = float(entry['width'])
+        return widths
+
+    def set_column_width(self, col: int, width: float):
+        """Set the width of a single column, splitting any span that covers it"""
+        entries = []
+        found = False
+        for entry in self._col_entries():
+            first, last = int(entry.get('min', 1)), int(entry.get('max', 1))
+            if first <= col <= last:
+                found = True
+                if first < col:
+                    entries.append(dict(entry, min=str(first), max=str(col - 1)))
+                entries.append(dict(entry, min=str(col), max=str(col), width=f'{width:g}', customWidth='1'))
+                if col < last:
+                    entries.append(dict(entry, min=str(col + 1), max=str(last)))
+            else:
+                entries.append(entry)
+        if not found:
+            entries.append({'min': str(col), 'max': str(col), 'width': f'{width:g}', 'customWidth': '1'})
+        entries.sort(key=lambda entry: int(entry['min']))
+
+        items = ''.join(
+            '<col' + ''.join(f' {name}="{xml_attr(value)}"' for name, value in entry.items()) + '/>'
+            for entry in entries
+        )
+        element = f'<cols>{items}</cols>'
+        match = _COLS_RE.search(self.head)
+        if match:
+            self.head = self.head[:match.start()] + element + self.head[match.end():]
+        else:
+            # <cols> directly precedes <sheetData>
+            self.head += element
+        self.modified = True
+
+    # -- whole sheet ---------------------------------------------------------
+
+    def detach_relationships(self):
+        """
+        Drop elements that point at other package parts (drawings, tables,
+        printer settings, external hyperlinks) so the sheet XML can be reused
+        in another package, and clear the selected-tab flag.
+        """
+        for name in _RELATIONSHIP_ELEMENTS:
+            self.tail = re.sub(rf'<{name}\b[^>]*?(?:/>|>.*?</{name}>)', '', self.tail, flags=re.S)
+        self.tail = re.sub(r'<hyperlink\b[^>]*\br:id="[^"]*"[^>]*/>', '', self.tail)
+        self.tail = re.sub(r'<hyperlinks>\s*</hyperlinks>', '', self.tail)
+        self.tail = re.sub(r'\sr:id="[^"]*"', '', self.tail)
+        self.head = re.sub(r'\stabSelected="[^"]*"', '', self.head)
+        self.modified = True
+
+    def used_bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """Get (first_row, first_col, last_row, last_col) of the stored cells"""
+        rows, cols = [], []
+        for number, row in self.rows.items():
+            if row.raw is not None:
+                row_cols = [column_index(letters) for letters, _ in _CELL_ATTR_R_RE.findall(row.raw)]
+            else:
+                row_cols = list(row.cells)
+            if row_cols:
+                rows.append(number)
+                cols.extend(row_cols)
+        if not rows:
+            return None
+        return min(rows), min(cols), max(rows), max(cols)
+
+    def to_bytes(self) -> bytes:
+        head = self.head
+        if self.modified:
+            bounds = self.used_bounds()
+            dimension = 'A1'
+            if bounds:
+                dimension = f"{cell_ref(bounds[0], bounds[1])}:{cell_ref(bounds[2], bounds[3])}"
+            head = _DIMENSION_RE.sub(f'<dimension ref="{dimension}"/>', head, count=1)
+        rows = ''.join(self.rows[number].render() for number in sorted(self.rows))
+        sheet_data = f'<sheetData>{rows}</sheetData>' if rows else '<sheetData/>'
+        return (head + sheet_data + self.tail).encode('utf-8')
+
+
+def _insert_before(xml: str, element_names: Tuple[str, ...], element: str) -> str:
+    """Insert an element before the first of the named elements, or before the root end tag"""
+    positions = [match.start() for name in element_names
+                 for match in [re.search(rf'<{name}\b', xml)] if match]
+    if positions:
+        position = min(positions)
+    else:
+        position = xml.rindex('</')
+    return xml[:position] + element + xml[position:]
+
+
+EMPTY_WORKSHEET = (
+    XML_DECLARATION
+    + f'<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+    '<dimension ref="A1"/><sheetViews><sheetView workbookViewId="0"/></sheetViews>'
+    '<sheetFormatPr defaultRowHeight="15"/><sheetData/>'
+    '<pageMargins left="0.7" right="0.7" top="0.75" bottom="0.75" header="0.3" footer="0.3"/>'
+    '</worksheet>'
+).encode('utf-8')
+
+
+# ---------------------------------------------------------------------------
+# Sheet references
+# ---------------------------------------------------------------------------
+
+def quote_sheet_name(name: str) -> str:
+    """Write a sheet name the way a formula refers to it, quoted when needed"""
+    if (re.fullmatch(r'[A-Za-z_][A-Za-z0-9_.]*', name)
+            and not re.fullmatch(r'[A-Za-z]{1,3}\d+|[Rr]\d*[Cc]\d*|true|false', name, re.I)):
+        return name
+    return "'" + name.replace("'", "''") + "'"
+
+
+def rename_sheet_references(formula: str, old_name: str, new_name: str) -> str:
+    """
+    Point the references to one sheet in a formula at its new name
+
+    References inside string literals and to other workbooks ([1]Sheet!A1)
+    are left alone; sheet names are matched case-insensitively, as Excel does.
+    Either end of a 3D reference (First:Last!A1) is renamed too.
+
+    Args:
+        formula: Formula text, without the leading '='
+        old_name: Sheet name the formula may refer to
+        new_name: New name of the sheet
+
+    Returns:
+        The formula with the references renamed
+    """
+    return sheet_reference_renamer({old_name: new_name})(formula)
+
+
+def sheet_reference_renamer(renames: Dict[str, str]) -> Callable[[str], str]:
+    """
+    Build a function that renames the references to several sheets in a
+    formula at once, the way rename_sheet_references() does for one
+
+    Args:
+        renames: New sheet names by current sheet name
+
+    Returns:
+        Function taking formula text and returning it with the references renamed
+    """
+    new_names = {old_name.lower(): new_name for old_name, new_name in renames.items()}
+
+    def replace(match):
+        quoted, bare = match.groups()
+        text = quoted.replace("''", "'") if quoted is not None else bare
+        names = text.split(':')
+        if '[' in text or len(names) > 2:
+            # Another workbook's sheet, e.g. '[1]Sheet'!A1
+            return match.group(0)
+        renamed = [new_names.get(name.lower(), name) for name in names]
+        if renamed == names:
+            return match.group(0)
+        if len(renamed) == 1:
+            return quote_sheet_name(renamed[0])
+        # A 3D reference is quoted as a whole when either name needs quotes
+        if all(quote_sheet_name(name) == name for name in renamed):
+            return ':'.join(renamed)
+        return "'" + ':'.join(renamed).replace("'", "''") + "'"
+
+    def rename(formula: str) -> str:
+        pieces = _STRING_LITERAL_RE.split(formula)
+        # Odd pieces are the string literals
+        return ''.join(piece if i % 2 else _SHEET_PREFIX_RE.sub(replace, piece)
+                       for i, piece in enumerate(pieces))
+    return rename
+
+
+def _rename_in_elements(xml: str, element_re: "re.Pattern", text_group: int,
+                        renamer: Callable[[str], str]) -> str:
+    """Rename sheet references in the text of every element a pattern matches"""
+    def rename(match):
+        text = html.unescape(match.group(text_group))
+        renamed = renamer(text)
+        if renamed == text:
+            return match.group(0)
+        return (match.group(0)[:match.start(text_group) - match.start(0)] + xml_text(renamed)
+                + match.group(0)[match.end(text_group) - match.start(0):])
+    return element_re.sub(rename, xml)
+
+
+# ---------------------------------------------------------------------------
+# Workbooks
+# ---------------------------------------------------------------------------
+
+class XlsxWorkbook:
+    """An .xlsx package held in memory, with worksheets and styles parsed on demand"""
+
+    def __init__(self, parts: "OrderedDict[str, bytes]"):
+        self.parts = parts
+        root_rels = parse_relationships(parts.get('_rels/.rels'))
+        self.workbook_part = next(
+            (resolve_part_name('', rel['target']) for rel in root_rels
+             if rel['type'] == REL_TYPE_OFFICE_DOCUMENT),
+            'xl/workbook.xml'
+        )
+        self.relationships = parse_relationships(parts.get(rels_part_name(self.workbook_part)))
+        self._worksheets = {}
+        self._sheets = None
+        self._styles = None
+        self._shared_strings = None
+
+    @classmethod
+    def open(cls, path: str) -> "XlsxWorkbook":
+        """Load a workbook from disk"""
+        return cls(read_package(path))
+
+    def related_part(self, rel_type: str) -> Optional[str]:
+        """Get the name of the first workbook-level part of a relationship type"""
+        for rel in self.relationships:
+            if rel['type'] == rel_type:
+                return resolve_part_name(self.workbook_part, rel['target'])
+        return None
+
+    def _sheet_tags(self) -> List[str]:
+        xml = self.parts[self.workbook_part].decode('utf-8')
+        sheets = re.search(r'<sheets\b[^>]*>(.*?)</sheets>', xml, re.S)
+        return _WORKBOOK_SHEET_RE.findall(sheets.group(1)) if sheets else []
+
+    def sheets(self) -> List[Dict[str, str]]:
+        """Get the sheets in tab order as {'name', 'part'} dictionaries"""
+        if self._sheets is None:
+            targets = {rel['id']: resolve_part_name(self.workbook_part, rel['target'])
+                       for rel in self.relationships}
+            self._sheets = []
+            for tag in self._sheet_tags():
+                attrs = parse_attrs(tag)
+                self._sheets.append({'name': attrs.get('name', ''),
+                                     'part': targets.get(attrs.get('r:id'))})
+        return [dict(sheet) for sheet in self._sheets]
+
+    def sheet_names(self) -> List[str]:
+        """Get the sheet names in tab order"""
+        return [sheet['name'] for sheet in self.sheets()]
+
+    def worksheet(self, name: str) -> WorksheetPart:
+        """Get the editable worksheet part for a sheet name"""
+        for sheet in self.sheets():
+            if sheet['name'] == name:
+                if sheet['part'] not in self._worksheets:
+                    self._worksheets[sheet['part']] = WorksheetPart(self.parts[sheet['part']])
+                return self._worksheets[sheet['part']]
+        raise KeyError(f"Sheet '{name}' does not exist")
+
+    @property
+    def styles(self) -> StylesPart:
+        if self._styles is None:
+            part = self.related_part(REL_TYPE_STYLES)
+            self._styles = StylesPart(self.parts[part])
+        return self._styles
+
+    @property
+    def shared_strings(self) -> List[str]:
+        if self._shared_strings is None:
+            part = self.related_part(REL_TYPE_SHARED_STRINGS)
+            self._shared_strings = parse_shared_strings(self.parts.get(part) if part else None)
+        return self._shared_strings
+
+    def rename_sheet(self, old_name: str, new_name: str):
+        """
+        Rename a sheet and every reference to it
+
+        Only metadata is touched: the sheet entry and defined names in
+        workbook.xml, formulas in worksheets and charts that refer to the
+        sheet, pivot cache sources and the sheet titles in docProps/app.xml.
+        """
+        self.rename_sheets({old_name: new_name})
+
+    def rename_sheets(self, renames: Dict[str, str]):
+        """
+        Rename several sheets at once, the way rename_sheet() renames one
+
+        The names are swapped simultaneously, so sheets may trade names
+        (A -> B, B -> A) and every part is scanned only once for all of them.
+
+        Args:
+            renames: New sheet names by current sheet name
+        """
+        renames = {old_name: new_name for old_name, new_name in renames.items() if old_name != new_name}
+        if not renames:
+            return
+
+        sheet_names = self.sheet_names()
+        missing = [name for name in renames if name not in sheet_names]
+        if missing:
+            raise KeyError(f"Sheet '{missing[0]}' does not exist")
+        seen = set()
+        for name in sheet_names:
+            name = renames.get(name, name)
+            if name.lower() in seen:
+                raise ValueError(f"Sheet '{name}' already exists")
+            seen.add(name.lower())
+
+        renamer = sheet_reference_renamer(renames)
+
+        def rename_source(match):
+            sheet = parse_attrs(match.group(0)).get('sheet')
+            if sheet not in renames:
+                return match.group(0)
+            return set_attr(match.group(0), 'sheet', renames[sheet])
+
+        def rename_title(match):
+            title = html.unescape(match.group(2))
+            if title not in renames:
+                return match.group(0)
+            return match.group(1) + xml_text(renames[title]) + match.group(3)
+
+        xml = self.parts[self.workbook_part].decode('utf-8')
+        for tag in self._sheet_tags():
+            name = parse_attrs(tag).get('name')
+            if name in renames:
+                xml = xml.replace(tag, set_attr(tag, 'name', renames[name]), 1)
+        xml = _rename_in_elements(xml, _DEFINED_NAME_RE, 2, renamer)
+        self.parts[self.workbook_part] = xml.encode('utf-8')
+        self._sheets = None
+
+        # Edited worksheets are rendered first so their formulas are renamed too
+        for part, worksheet in list(self._worksheets.items()):
+            if worksheet.modified:
+                self.parts[part] = worksheet.to_bytes()
+
+        # Cheap byte search first; most parts never mention the sheets
+        needles = {max(re.split(r'[&<>"\']', name), key=len).encode('utf-8').lower()
+                   for name in renames}
+        for part in list(self.parts):
+            if not part.endswith('.xml') or not part.startswith(
+                    ('xl/worksheets/', 'xl/charts/', 'xl/chartsheets/', 'xl/pivotCache/')):
+                continue
+            data = self.parts[part].lower()
+            if not any(needle in data for needle in needles):
+                continue
+            part_xml = self.parts[part].decode('utf-8')
+            renamed = _rename_in_elements(part_xml, _FORMULA_RE, 3, renamer)
+            renamed = _SHEET_SOURCE_RE.sub(rename_source, renamed)
+            if renamed != part_xml:
+                self.parts[part] = renamed.encode('utf-8')
+                self._worksheets.pop(part, None)
+
+        if 'docProps/app.xml' in self.parts:
+            app_xml = self.parts['docProps/app.xml'].decode('utf-8')
+            renamed = _TITLE_RE.sub(rename_title, app_xml)
+            if renamed != app_xml:
+                self.parts['docProps/app.xml'] = renamed.encode('utf-8')
+
+    def update_parts(self, parts: Dict[str, bytes]):
+        """Take over parts rewritten outside this workbook, dropping what was parsed from them"""
+        for name, data in parts.items():
+            self.parts[name] = data
+            self._worksheets.pop(name, None)
+        self._sheets = None
+        self._styles = None
+        self._shared_strings = None
+
+    def save(self, path: str):
+        """Write the workbook, re-rendering only the parts that were edited"""
+        for part, worksheet in self._worksheets.items():
+            if worksheet.modified:
+                self.parts[part] = worksheet.to_bytes()
+                worksheet.modified = False
+        if self._styles is not None and self._styles.modified:
+            self.parts[self.related_part(REL_TYPE_STYLES)] = self._styles.to_bytes()
+            self._styles.modified = False
+        write_package(path, self.parts)
+
+
+def rename_sheet_in_package(path: str, old_name: str, new_name: str) -> Dict[str, bytes]:
+    """
+    Rename a sheet in an .xlsx file on disk, rewriting only the parts that
+    mention it and copying the rest as they are
+
+    Args:
+        path: Path to the .xlsx file
+        old_name: Current name of the sheet
+        new_name: New name for the sheet
+
+    Returns:
+        The rewritten parts, by part name
+    """
+    return rename_sheets_in_package(path, {old_name: new_name})
+
+
+def rename_sheets_in_package(path: str, renames: Dict[str, str]) -> Dict[str, bytes]:
+    """
+    Rename several sheets in an .xlsx file on disk with a single rewrite;
+    either every sheet is renamed or, on error, none is
+
+    Args:
+        path: Path to the .xlsx file
+        renames: New sheet names by current sheet name
+
+    Returns:
+        The rewritten parts, by part name
+    """
+    with zipfile.ZipFile(path) as archive:
+        parts = ArchiveParts(archive)
+        XlsxWorkbook(parts).rename_sheets(renames)
+        replacements = dict(parts.changed)
+    if replacements:
+        rewrite_package(path, replacements)
+    return replacements
+
+
+class SheetStamp:
+    """
+    Worksheet XML rendered once with placeholder tokens
+
+    Each copy is produced by splicing values in between the pre-rendered
+    chunks, so stamping a sheet costs a few byte concatenations instead of a
+    parse and re-render.
+    """
+
+    def __init__(self, xml: bytes, placeholders: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            xml: Rendered worksheet XML
+            placeholders: Mapping of field name to the token written in its place
+        """
+        marks = []
+        for field, token in (placeholders or {}).items():
+            token_bytes = token.encode('utf-8')
+            position = xml.find(token_bytes)
+            while position >= 0:
+                marks.append((position, len(token_bytes), field))
+                position = xml.find(token_bytes, position + len(token_bytes))
+        marks.sort()
+
+        self.chunks = []
+        self.fields = []
+        last = 0
+        for position, length, field in marks:
+            self.chunks.append(xml[last:position])
+            self.fields.append(field)
+            last = position + length
+        self.chunks.append(xml[last:])
+
+    def render(self, **values: Any) -> Iterator[bytes]:
+        """Yield the chunks of one copy with the placeholder values filled in"""
+        encoded = {field: xml_text(value).encode('utf-8') for field, value in values.items()}
+        for chunk, field in zip(self.chunks, self.fields):
+            yield chunk
+            yield encoded[field]
+        yield self.chunks[-1]
+
+
+def workbook_metadata_parts(sheet_names: List[str], styles: bytes,
+                            theme: Optional[bytes] = None,
+                            shared_strings: Optional[bytes] = None) -> "OrderedDict[str, bytes]":
+    """
+    Assemble every part of a new workbook except the worksheets themselves
+
+    Worksheet i (1-based, in tab order) is expected at xl/worksheets/sheet{i}.xml.
+
+    Args:
+        sheet_names: Sheet names in tab order
+        styles: xl/styles.xml content
+        theme: xl/theme/theme1.xml content, if any
+        shared_strings: xl/sharedStrings.xml content, if any
+
+    Returns:
+        Ordered mapping of part name to bytes
+    """
+    parts = OrderedDict()
+    overrides = [
+        ('/xl/workbook.xml', CT_WORKBOOK),
+        ('/xl/styles.xml', CT_STYLES),
+        ('/docProps/core.xml', CT_CORE_PROPERTIES),
+        ('/docProps/app.xml', CT_EXTENDED_PROPERTIES),
+    ]
+    workbook_rels = []
+    sheet_tags = []
+
+    for index, name in enumerate(sheet_names, start=1):
+        overrides.append((f'/xl/worksheets/sheet{index}.xml', CT_WORKSHEET))
+        workbook_rels.append((f'rId{index}', REL_TYPE_WORKSHEET, f'worksheets/sheet{index}.xml'))
+        sheet_tags.append(f'<sheet name="{xml_attr(name)}" sheetId="{index}" r:id="rId{index}"/>')
+
+    next_id = len(sheet_names) + 1
+    workbook_rels.append((f'rId{next_id}', REL_TYPE_STYLES, 'styles.xml'))
+    if theme:
+        next_id += 1
+        workbook_rels.append((f'rId{next_id}', REL_TYPE_THEME, 'theme/theme1.xml'))
+        overrides.append(('/xl/theme/theme1.xml', CT_THEME))
+    if shared_strings:
+        next_id += 1
+        workbook_rels.append((f'rId{next_id}', REL_TYPE_SHARED_STRINGS, 'sharedStrings.xml'))
+        overrides.append(('/xl/sharedStrings.xml', CT_SHARED_STRINGS))
+
+    override_tags = ''.join(f'<Override PartName="{name}" ContentType="{content_type}"/>'
+                            for name, content_type in overrides)
+    parts['[Content_Types].xml'] = (
+        XML_DECLARATION + f'<Types xmlns="{CONTENT_TYPES_NS}">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        f'{override_tags}</Types>'
+    ).encode('utf-8')
+    parts['_rels/.rels'] = render_relationships([
+        ('rId1', REL_TYPE_OFFICE_DOCUMENT, 'xl/workbook.xml'),
+        ('rId2', REL_TYPE_CORE_PROPERTIES, 'docProps/core.xml'),
+        ('rId3', REL_TYPE_EXTENDED_PROPERTIES, 'docProps/app.xml'),
+    ])
+    parts['docProps/core.xml'] = _core_properties()
+    parts['docProps/app.xml'] = (
+        XML_DECLARATION
+        + '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+        '<Application>Microsoft Excel</Application></Properties>'
+    ).encode('utf-8')
+    parts['xl/workbook.xml'] = (
+        XML_DECLARATION + f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+        '<bookViews><workbookView activeTab="0"/></bookViews>'
+        f'<sheets>{"".join(sheet_tags)}</sheets>'
+        '<calcPr calcId="191029" fullCalcOnLoad="1"/></workbook>'
+    ).encode('utf-8')
+    parts['xl/_rels/workbook.xml.rels'] = render_relationships(workbook_rels)
+    parts['xl/styles.xml'] = styles
+    if theme:
+        parts['xl/theme/theme1.xml'] = theme
+    if shared_strings:
+        parts['xl/sharedStrings.xml'] = shared_strings
+    return parts
+
+
+def write_new_workbook(path: str, sheet_names: List[str], sheets: Iterable[Iterable[bytes]],
+                       styles: bytes, theme: Optional[bytes] = None,
+                       shared_strings: Optional[bytes] = None):
+    """
+    Stream a new workbook to disk one part at a time
+
+    Worksheets are pulled from `sheets` one by one and written straight into
+    the archive, so peak memory does not grow with the number of sheets.
+
+    Args:
+        path: Destination .xlsx path
+        sheet_names: Sheet names in tab order
+        sheets: One iterable of XML chunks per sheet, in the same order
+        styles: xl/styles.xml content (complete before streaming starts)
+        theme: xl/theme/theme1.xml content, if any
+        shared_strings: xl/sharedStrings.xml content, if any
+    """
+    metadata = workbook_metadata_parts(sheet_names, styles, theme, shared_strings)
+    with _atomic_archive(path) as archive:
+        for name, data in metadata.items():
+            archive.writestr(name, data)
+        for index, chunks in enumerate(sheets, start=1):
+            with archive.open(f'xl/worksheets/sheet{index}.xml', 'w') as stream:
+                for chunk in chunks:
+                    stream.write(chunk)
+
+
+def _core_properties() -> bytes:
+    now = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return (
+        XML_DECLARATION
+        + '<cp:coreProperties '
+        'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+        'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+        f'<dcterms:created xsi:type="dcterms:W3CDTF">{now}</dcterms:created>'
+        f'<dcterms:modified xsi:type="dcterms:W3CDTF">{now}</dcterms:modified>'
+        '</cp:coreProperties>'
+    ).encode('utf-8')
@@ -0,0 +1,162 @@
+"""
+Streaming reads - pull the same cells out of many sheets in one pass
+
+Reading a project's samples one sheet at a time through Excel (or through a
+fully parsed package) costs a round trip or a whole-sheet parse per sample.
+read_workbook_cells() opens the .xlsx archive once, resolves the shared
+strings and date formats once, then streams each sheet's XML and keeps only
+the requested cells, stopping at the last row any of them is on.
+"""
+import zipfile
+from typing import Any, Dict, Iterable, List, Optional
+from xml.etree import ElementTree
+
+from utils.xlsx_package import (
+    MAIN_NS,
+    ArchiveParts,
+    StylesPart,
+    XlsxWorkbook,
+    cell_ref,
+    from_excel_serial,
+    range_bounds,
+    range_cells,
+    shape_range_values,
+    split_cell_ref
+)
+
+_ROW_TAG = f'{{{MAIN_NS}}}row'
+_CELL_TAG = f'{{{MAIN_NS}}}c'
+_VALUE_TAG = f'{{{MAIN_NS}}}v'
+_INLINE_TAG = f'{{{MAIN_NS}}}is'
+_TEXT_TAG = f'{{{MAIN_NS}}}t'
+_PHONETIC_TAG = f'{{{MAIN_NS}}}rPh'
+
+_CHUNK_SIZE = 4096
+
+
+def read_sheet_names(excel_path: str) -> List[str]:
+    """Get a workbook's sheet names in tab order, reading only workbook.xml and its relationships"""
+    with zipfile.ZipFile(excel_path) as archive:
+        return XlsxWorkbook(ArchiveParts(archive)).sheet_names()
+
+
+def read_workbook_cells(excel_path: str, cell_ranges: Iterable[str],
+                        sheet_names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the same cell ranges from many sheets in a single pass over the file
+
+    Args:
+        excel_path: Path to the .xlsx file
+        cell_ranges: Cell or range references to read from every sheet
+        sheet_names: Sheets to read, None for all of them in tab order
+
+    Returns:
+        Dictionary of {sheet name: {cell range: value}}, values shaped like
+        get_sheet_data() returns them
+    """
+    range_refs = {cell_range: range_cells(cell_range) for cell_range in cell_ranges}
+    wanted = {ref for rows in range_refs.values() for row in rows for ref in row}
+    last_row = max((range_bounds(cell_range)[2] for cell_range in range_refs), default=0)
+
+    with zipfile.ZipFile(excel_path) as archive:
+        workbook = XlsxWorkbook(ArchiveParts(archive))
+        sheets = workbook.sheets()
+        if sheet_names is not None:
+            sheet_names = list(sheet_names)
+            parts = {sheet['name']: sheet['part'] for sheet in sheets}
+            missing = [name for name in sheet_names if name not in parts]
+            if missing:
+                raise KeyError(f"Sheet '{missing[0]}' does not exist")
+            sheets = [{'name': name, 'part': parts[name]} for name in sheet_names]
+
+        shared_strings = workbook.shared_strings if wanted else []
+        styles = workbook.styles if wanted else None
+        date_styles = {}
+
+        result = {}
+        for sheet in sheets:
+            with archive.open(sheet['part']) as stream:
+                values = _stream_cells(stream, wanted, last_row, shared_strings, styles, date_styles)
+            result[sheet['name']] = {
+                cell_range: shape_range_values([[values.get(ref) for ref in row] for row in rows])
+                for cell_range, rows in range_refs.items()
+            }
+        return result
+
+
+def _stream_cells(stream, wanted: set, last_row: int, shared_strings: List[str],
+                  styles: Optional[StylesPart], date_styles: Dict[int, bool]) -> Dict[str, Any]:
+    """Collect the wanted cells of one worksheet, stopping after last_row"""
+    values = {}
+    if not wanted:
+        return values
+
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    row_number = 0
+    col = 0
+    while True:
+        # Small chunks so little is parsed past the last wanted row
+        chunk = stream.read(_CHUNK_SIZE)
+        if not chunk:
+            parser.close()
+            return values
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            tag = element.tag
+            if event == 'start':
+                if tag == _ROW_TAG:
+                    # Rows and cells may leave out their reference; count them instead
+                    row_number = int(element.get('r') or row_number + 1)
+                    if row_number > last_row:
+                        return values
+                    col = 0
+                continue
+
+            if tag == _CELL_TAG:
+                ref = element.get('r')
+                if ref:
+                    _, col = split_cell_ref(ref)
+                else:
+                    col += 1
+                ref = cell_ref(row_number, col)
+                if ref in wanted:
+                    values[ref] = _cell_value(element, shared_strings, styles, date_styles)
+                    if len(values) == len(wanted):
+                        return values
+                element.clear()
+            elif tag == _ROW_TAG:
+                element.clear()
+
+
+def _cell_value(element, shared_strings: List[str], styles: Optional[StylesPart],
+                date_styles: Dict[int, bool]) -> Any:
+    """Convert a parsed <c> element the way WorksheetPart.get_value does"""
+    cell_type = element.get('t', 'n')
+    if cell_type == 'inlineStr':
+        inline = element.find(_INLINE_TAG)
+        if inline is None:
+            return None
+        # Phonetic guide runs are not part of the displayed text
+        phonetic = {id(text) for run in inline.iter(_PHONETIC_TAG) for text in run.iter(_TEXT_TAG)}
+        return ''.join(text.text or '' for text in inline.iter(_TEXT_TAG) if id(text) not in phonetic)
+
+    value = element.find(_VALUE_TAG)
+    if value is None or value.text is None:
+        return None
+    text = value.text
+    if cell_type == 's':
+        index = int(text)
+        return shared_strings[index] if index < len(shared_strings) else None
+    if cell_type in ('str', 'e'):
+        return text
+    if cell_type == 'b':
+        return text in ('1', 'true')
+
+    number = float(text)
+    style = int(element.get('s', 0))
+    if styles is not None:
+        if style not in date_styles:
+            date_styles[style] = styles.is_date_style(style)
+        if date_styles[style]:
+            return from_excel_serial(number)
+    return number